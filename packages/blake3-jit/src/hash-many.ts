@@ -0,0 +1,217 @@
+/**
+ * BLAKE3 Batch Hashing - many independent messages at once
+ *
+ * hash() parallelizes across the chunks of one large input, which does not help
+ * with lots of small messages (Merkle tree nodes, MACs of digests, ...). hashMany()
+ * instead gives each of the 4 WASM SIMD lanes its own message, refilling a lane
+ * with the next message as soon as the previous one is done.
+ */
+
+import { Hasher } from "./hasher.js";
+import {
+  IV,
+  CHUNK_START,
+  CHUNK_END,
+  ROOT,
+  KEYED_HASH,
+  BLOCK_LEN,
+  CHUNK_LEN,
+  KEY_LEN,
+  OUT_LEN,
+} from "./constants.js";
+import { readLittleEndianWordsPartial } from "./utils.js";
+import { initSimdSync, getSimdMemory, runCompress4x, SIMD_MEMORY } from "./wasm-simd.js";
+
+// Pre-computed memory offsets for SIMD operations (single-block mode)
+const SIMD_BLOCK_BASE = SIMD_MEMORY.BLOCK_WORDS / 4;
+const SIMD_CV_BASE = SIMD_MEMORY.CHAINING_VALUES / 4;
+const SIMD_OUT_BASE = SIMD_MEMORY.OUTPUT / 4;
+const SIMD_COUNTER_LOW_BASE = SIMD_MEMORY.COUNTER_LOW / 4;
+const SIMD_COUNTER_HIGH_BASE = SIMD_MEMORY.COUNTER_HIGH / 4;
+const SIMD_BLOCK_LEN_BASE = SIMD_MEMORY.BLOCK_LEN / 4;
+const SIMD_FLAGS_BASE = SIMD_MEMORY.FLAGS / 4;
+
+const LANES = 4;
+
+// ===== Module-level reusable buffers (single-threaded safe) =====
+const reusableKeyWords = new Uint32Array(8);
+const reusableBlockWords = new Uint32Array(16);
+// Message index processed by each lane, -1 when idle
+const laneMessage = new Int32Array(LANES);
+// Byte offset of the next block of each lane's message
+const laneOffset = new Uint32Array(LANES);
+
+let simdAvailable = false;
+
+function ensureSimdSync(): boolean {
+  if (simdAvailable) return true;
+  simdAvailable = initSimdSync();
+  return simdAvailable;
+}
+
+/**
+ * Hash many independent messages, writing the 32-byte digest of `inputs[i]`
+ * to `out[i * 32 .. i * 32 + 32]`.
+ *
+ * Messages of up to one chunk (1024 bytes) are hashed 4 at a time in the WASM
+ * SIMD lanes. Longer messages, or all messages when SIMD is unavailable, are
+ * hashed one by one.
+ *
+ * @param inputs - Messages to hash
+ * @param key - Optional 32-byte key, for keyed hashing of every message
+ * @param out - Output buffer, at least `inputs.length * 32` bytes
+ * @returns `out`
+ *
+ * @example
+ * ```typescript
+ * const digests = hashMany(messages, undefined, new Uint8Array(messages.length * 32));
+ * const macs = hashMany(messages, key, new Uint8Array(messages.length * 32));
+ * ```
+ */
+export function hashMany(
+  inputs: readonly Uint8Array[],
+  key: Uint8Array | undefined,
+  out: Uint8Array,
+): Uint8Array {
+  if (key && key.length !== KEY_LEN) {
+    throw new Error(`Key must be ${KEY_LEN} bytes, got ${key.length}`);
+  }
+  if (out.length < inputs.length * OUT_LEN) {
+    throw new Error(`Output must be at least ${inputs.length * OUT_LEN} bytes, got ${out.length}`);
+  }
+
+  const mem = ensureSimdSync() ? getSimdMemory() : null;
+  let hasher: Hasher | null = null;
+  const hashOne = (i: number) => {
+    hasher = hasher ? hasher.reset() : key ? Hasher.newKeyed(key) : new Hasher();
+    out.set(hasher.update(inputs[i]).finalize(OUT_LEN), i * OUT_LEN);
+  };
+
+  if (!mem) {
+    for (let i = 0; i < inputs.length; i++) {
+      hashOne(i);
+    }
+    return out;
+  }
+
+  const mem32 = mem.view32;
+  const keyWords = reusableKeyWords;
+  if (key) {
+    for (let w = 0; w < 8; w++) {
+      const off = w * 4;
+      keyWords[w] = key[off] | (key[off + 1] << 8) | (key[off + 2] << 16) | (key[off + 3] << 24);
+    }
+  } else {
+    keyWords.set(IV);
+  }
+  const baseFlags = key ? KEYED_HASH : 0;
+
+  // Next message to give to a lane
+  let next = 0;
+  const takeNext = (): number => {
+    while (next < inputs.length && inputs[next].length > CHUNK_LEN) {
+      next++;
+    }
+    return next < inputs.length ? next++ : -1;
+  };
+
+  let active = 0;
+  for (let lane = 0; lane < LANES; lane++) {
+    const m = takeNext();
+    laneMessage[lane] = m;
+    laneOffset[lane] = 0;
+    if (m >= 0) {
+      active++;
+      for (let w = 0; w < 8; w++) {
+        mem32[SIMD_CV_BASE + w * 4 + lane] = keyWords[w];
+      }
+    }
+  }
+
+  // Every message fits in a single chunk, so the chunk counter is always 0
+  for (let lane = 0; lane < LANES; lane++) {
+    mem32[SIMD_COUNTER_LOW_BASE + lane] = 0;
+    mem32[SIMD_COUNTER_HIGH_BASE + lane] = 0;
+  }
+
+  const block = reusableBlockWords;
+  while (active > 0) {
+    // Load the next block of each lane, transposed
+    for (let lane = 0; lane < LANES; lane++) {
+      const m = laneMessage[lane];
+      if (m < 0) {
+        // Idle lane: compress an empty block and ignore the result
+        mem32[SIMD_BLOCK_LEN_BASE + lane] = 0;
+        mem32[SIMD_FLAGS_BASE + lane] = 0;
+        continue;
+      }
+      const input = inputs[m];
+      const offset = laneOffset[lane];
+      const blockLen = Math.min(BLOCK_LEN, input.length - offset);
+
+      let flags = baseFlags;
+      if (offset === 0) flags |= CHUNK_START;
+      if (offset + BLOCK_LEN >= input.length) flags |= CHUNK_END | ROOT;
+
+      if (blockLen === BLOCK_LEN) {
+        for (let w = 0, off = offset; w < 16; w++, off += 4) {
+          mem32[SIMD_BLOCK_BASE + w * 4 + lane] =
+            input[off] | (input[off + 1] << 8) | (input[off + 2] << 16) | (input[off + 3] << 24);
+        }
+      } else {
+        readLittleEndianWordsPartial(input, offset, blockLen, block);
+        for (let w = 0; w < 16; w++) {
+          mem32[SIMD_BLOCK_BASE + w * 4 + lane] = block[w];
+        }
+      }
+      mem32[SIMD_BLOCK_LEN_BASE + lane] = blockLen;
+      mem32[SIMD_FLAGS_BASE + lane] = flags;
+    }
+
+    runCompress4x();
+
+    // Feed the output CVs back, or write the digest and refill the lane for finished messages
+    for (let lane = 0; lane < LANES; lane++) {
+      const m = laneMessage[lane];
+      if (m < 0) continue;
+
+      if ((mem32[SIMD_FLAGS_BASE + lane] & ROOT) === 0) {
+        for (let w = 0; w < 8; w++) {
+          mem32[SIMD_CV_BASE + w * 4 + lane] = mem32[SIMD_OUT_BASE + w * 4 + lane];
+        }
+        laneOffset[lane] += BLOCK_LEN;
+        continue;
+      }
+
+      // The root output's first 8 words are the 32-byte digest
+      let o = m * OUT_LEN;
+      for (let w = 0; w < 8; w++, o += 4) {
+        const word = mem32[SIMD_OUT_BASE + w * 4 + lane];
+        out[o] = word;
+        out[o + 1] = word >>> 8;
+        out[o + 2] = word >>> 16;
+        out[o + 3] = word >>> 24;
+      }
+
+      const nextMessage = takeNext();
+      laneMessage[lane] = nextMessage;
+      laneOffset[lane] = 0;
+      if (nextMessage < 0) {
+        active--;
+      } else {
+        for (let w = 0; w < 8; w++) {
+          mem32[SIMD_CV_BASE + w * 4 + lane] = keyWords[w];
+        }
+      }
+    }
+  }
+
+  // Multi-chunk messages get no benefit from the lanes, hash them one by one
+  for (let i = 0; i < inputs.length; i++) {
+    if (inputs[i].length > CHUNK_LEN) {
+      hashOne(i);
+    }
+  }
+
+  return out;
+}
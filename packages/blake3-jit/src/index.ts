@@ -26,6 +26,7 @@
 // Core exports
 export { Hasher, XofReader } from "./hasher.js";
 export { hash, hashInto, warmupSimd } from "./hash.js";
+export { hashMany } from "./hash-many.js";
 
 // Convenience imports
 import { Hasher } from "./hasher.js";
@@ -86,6 +87,7 @@ export function createHasher(): Hasher {
 
 // Import for default export
 import { hash, hashInto, warmupSimd } from "./hash.js";
+import { hashMany } from "./hash-many.js";
 
 // Pre-warm SIMD in browser environments (non-blocking)
 // This avoids initialization latency on first large hash
@@ -99,6 +101,7 @@ if (typeof globalThis !== "undefined" && typeof globalThis.document !== "undefin
 export default {
   hash,
   hashInto,
+  hashMany,
   Hasher,
   createHasher,
   createKeyed,
@@ -0,0 +1,77 @@
+import { describe, it, expect } from "vitest";
+import { Hasher, hashMany } from "../src/index.js";
+
+const LENGTHS = [0, 1, 63, 64, 65, 1023, 1024, 1025, 2048, 3000, 8192];
+
+// Same input pattern as the official BLAKE3 test vectors
+function input(length: number, seed = 0): Uint8Array {
+  const bytes = new Uint8Array(length);
+  for (let i = 0; i < length; i++) {
+    bytes[i] = (i + seed) % 251;
+  }
+  return bytes;
+}
+
+function toHex(bytes: Uint8Array): string {
+  return Array.from(bytes, (byte) => byte.toString(16).padStart(2, "0")).join("");
+}
+
+// Reference: the streaming hasher, fed in uneven pieces
+function streamingHash(message: Uint8Array, key: Uint8Array | undefined): string {
+  const hasher = key ? Hasher.newKeyed(key) : new Hasher();
+  for (let offset = 0; offset < message.length; offset += 100) {
+    hasher.update(message.subarray(offset, offset + 100));
+  }
+  return toHex(hasher.finalize(32));
+}
+
+function batchHashes(messages: Uint8Array[], key: Uint8Array | undefined): string[] {
+  const out = hashMany(messages, key, new Uint8Array(messages.length * 32));
+  return messages.map((_, i) => toHex(out.subarray(i * 32, i * 32 + 32)));
+}
+
+const KEY = input(32, 7);
+
+describe("hashMany", () => {
+  it("matches the official test vector for the empty input", () => {
+    expect(batchHashes([new Uint8Array(0)], undefined)).toEqual([
+      "af1349b9f5f9a1a6a0404dea36dcc9499bcb25c9adc112b7cc9a93cae41f3262",
+    ]);
+  });
+
+  for (const [mode, key] of [
+    ["unkeyed", undefined],
+    ["keyed", KEY],
+  ] as const) {
+    describe(mode, () => {
+      for (const length of LENGTHS) {
+        it(`matches Hasher for batches of ${length}-byte inputs`, () => {
+          // More messages than SIMD lanes, and not a multiple of them
+          const messages = Array.from({ length: 9 }, (_, i) => input(length, i));
+          expect(batchHashes(messages, key)).toEqual(messages.map((message) => streamingHash(message, key)));
+        });
+      }
+
+      it("matches Hasher for a batch of mixed input lengths", () => {
+        const messages = [...LENGTHS, ...LENGTHS.slice().reverse(), 5, 1024, 0, 64, 4096, 1].map((length, i) =>
+          input(length, i),
+        );
+        expect(batchHashes(messages, key)).toEqual(messages.map((message) => streamingHash(message, key)));
+      });
+    });
+  }
+
+  it("writes each digest at its offset, and leaves the rest of the output untouched", () => {
+    const messages = [input(10), input(2000), input(64)];
+    const out = new Uint8Array(messages.length * 32 + 8).fill(0xaa);
+
+    expect(hashMany(messages, undefined, out)).toBe(out);
+    expect(toHex(out.subarray(32, 64))).toBe(streamingHash(messages[1], undefined));
+    expect([...out.subarray(messages.length * 32)]).toEqual(new Array(8).fill(0xaa));
+  });
+
+  it("rejects invalid keys and too small outputs", () => {
+    expect(() => hashMany([input(1)], new Uint8Array(16), new Uint8Array(32))).toThrow(/Key must be 32 bytes/);
+    expect(() => hashMany([input(1), input(2)], undefined, new Uint8Array(32))).toThrow(/Output must be at least 64/);
+  });
+});
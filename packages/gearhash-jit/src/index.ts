@@ -4,22 +4,37 @@
  * Uses a tiny hand-written WASM module with native i64 arithmetic.
  * The hash state is kept as raw bytes in JS (avoiding BigInt in the hot path)
  * and written to WASM memory only for the `nextMatch` call.
+ *
+ * A hasher can also own a WASM input buffer (`bufferSize` option): data
+ * written to `hasher.buffer` is scanned in place, with the hash state living
+ * in WASM memory, so nothing is copied per call.
  */
 
 import {
   initWasm,
+  createInstance,
   wasmNextMatch,
   getView,
   HASH_OFFSET,
   MASK_OFFSET,
   INPUT_OFFSET,
   MAX_INPUT_SIZE,
+  type WasmInstance,
 } from "./wasm.js";
 
 export { GEAR_TABLE } from "./table.js";
 
+export interface HasherOptions {
+  /**
+   * Size of a WASM-owned input buffer, exposed as `hasher.buffer`.
+   * Views of this buffer passed to `nextMatch` are scanned without copying.
+   */
+  bufferSize?: number;
+}
+
 export class Hasher {
   private readonly maskBytes: Uint8Array;
+  private readonly instance: WasmInstance | null;
 
   /**
    * The current 64-bit rolling hash state as 8 little-endian bytes.
@@ -27,11 +42,28 @@ export class Hasher {
    */
   readonly hash: Uint8Array;
 
-  constructor(mask: bigint) {
+  /**
+   * WASM-owned input buffer, when created with `bufferSize`. Write data here
+   * and pass subarrays of it to `nextMatch` to scan them in place.
+   */
+  readonly buffer: Uint8Array | null;
+
+  constructor(mask: bigint, options?: HasherOptions) {
     initWasm();
     this.maskBytes = new Uint8Array(8);
-    this.hash = new Uint8Array(8);
     new DataView(this.maskBytes.buffer).setBigUint64(0, mask, true);
+
+    if (options?.bufferSize) {
+      this.instance = createInstance(options.bufferSize);
+      const view = this.instance.view;
+      view.set(this.maskBytes, MASK_OFFSET);
+      this.hash = view.subarray(HASH_OFFSET, HASH_OFFSET + 8);
+      this.buffer = view.subarray(INPUT_OFFSET, INPUT_OFFSET + options.bufferSize);
+    } else {
+      this.instance = null;
+      this.hash = new Uint8Array(8);
+      this.buffer = null;
+    }
   }
 
   /**
@@ -43,6 +75,12 @@ export class Hasher {
   nextMatch(buf: Uint8Array): number {
     const len = buf.length;
     if (len === 0) return -1;
+
+    // In place: `buf` is a view of this hasher's own buffer
+    if (this.instance && buf.buffer === this.instance.memory.buffer && buf.byteOffset >= INPUT_OFFSET) {
+      return this.instance.nextMatch(buf.byteOffset, len);
+    }
+
     if (len > MAX_INPUT_SIZE) {
       throw new RangeError(`Input too large: ${len} > ${MAX_INPUT_SIZE}`);
     }
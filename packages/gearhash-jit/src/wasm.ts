@@ -9,6 +9,10 @@
  *   2048-2055:  Hash state (u64, persists across calls)
  *   2056-2063:  Mask (u64, set per-hasher before each call)
  *   4096+:      Input buffer
+ *
+ * Hashers created with a `bufferSize` get their own instance and memory:
+ * their hash state and mask stay at the offsets above, and callers write
+ * input straight into the buffer at INPUT_OFFSET.
  */
 
 import { GEAR_TABLE } from "./table.js";
@@ -20,7 +24,6 @@ export const INPUT_OFFSET = 4096;
 const PAGES = 8; // 512 KB
 export const MAX_INPUT_SIZE = PAGES * 65536 - INPUT_OFFSET;
 
-let wasmMemory: WebAssembly.Memory | null = null;
 let wasmView: Uint8Array | null = null;
 let wasmFn: ((inputStart: number, inputLen: number) => number) | null = null;
 
@@ -192,20 +195,46 @@ function generateWasmBytes(): Uint8Array {
   return new Uint8Array(code);
 }
 
-export function initWasm(): void {
-  if (wasmFn) return;
+let wasmModule: WebAssembly.Module | null = null;
+
+function getModule(): WebAssembly.Module {
+  if (!wasmModule) {
+    wasmModule = new WebAssembly.Module(generateWasmBytes());
+  }
+  return wasmModule;
+}
 
-  const bytes = generateWasmBytes();
-  wasmMemory = new WebAssembly.Memory({ initial: PAGES });
-  const module = new WebAssembly.Module(bytes);
-  const instance = new WebAssembly.Instance(module, { js: { mem: wasmMemory } });
-  wasmFn = instance.exports.nextMatch as (start: number, len: number) => number;
-  wasmView = new Uint8Array(wasmMemory.buffer);
+export interface WasmInstance {
+  memory: WebAssembly.Memory;
+  view: Uint8Array;
+  nextMatch: (inputStart: number, inputLen: number) => number;
+}
 
-  const dv = new DataView(wasmMemory.buffer);
+/**
+ * Instantiate the module with its own memory, large enough for `inputSize`
+ * bytes of input at INPUT_OFFSET, with an all-zero hash state.
+ */
+export function createInstance(inputSize: number): WasmInstance {
+  const memory = new WebAssembly.Memory({
+    initial: Math.max(PAGES, Math.ceil((INPUT_OFFSET + inputSize) / 65536)),
+  });
+  const instance = new WebAssembly.Instance(getModule(), { js: { mem: memory } });
+  const view = new Uint8Array(memory.buffer);
+
+  const dv = new DataView(memory.buffer);
   for (let i = 0; i < 256; i++) {
     dv.setBigUint64(TABLE_OFFSET + i * 8, GEAR_TABLE[i], true);
   }
+
+  return { memory, view, nextMatch: instance.exports.nextMatch as (start: number, len: number) => number };
+}
+
+export function initWasm(): void {
+  if (wasmFn) return;
+
+  const instance = createInstance(MAX_INPUT_SIZE);
+  wasmFn = instance.nextMatch;
+  wasmView = instance.view;
 }
 
 export function wasmNextMatch(inputStart: number, inputLen: number): number {
@@ -169,4 +169,27 @@ describe("gearhash-jit", () => {
     const buf = new Uint8Array([10, 20, 30, 40, 50]);
     expect(hasher.nextMatch(buf)).toBe(hasher2.nextMatch(buf));
   });
+
+  it("should scan its own buffer in place, with the same results", () => {
+    const input = generateTestInput();
+    const hasher = new Hasher(BENCH_MASK, { bufferSize: input.length });
+    const buffer = hasher.buffer!;
+    expect(buffer.length).toBe(input.length);
+    buffer.set(input);
+
+    let offset = 0;
+    for (const expected of EXPECTED.slice(0, -1)) {
+      const pos = hasher.nextMatch(buffer.subarray(offset));
+      expect(offset).toBe(expected.offset);
+      expect(pos).toBe(expected.size);
+      expect(hexHash(hasher.hash)).toBe(expected.hash);
+      offset += pos;
+      hasher.resetHash();
+    }
+
+    // Inputs outside the buffer still work, going through the shared instance
+    hasher.resetHash();
+    expect(hasher.nextMatch(input)).toBe(EXPECTED[0].size);
+    expect(hexHash(hasher.hash)).toBe(EXPECTED[0].hash);
+  });
 });
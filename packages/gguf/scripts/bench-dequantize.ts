@@ -0,0 +1,43 @@
+/**
+ * Measures the throughput of `dequantize` for each supported quantization type
+ *
+ * Usage: pnpm run bench:dequantize
+ */
+
+import { dequantize, GGML_DEQUANTIZABLE_BLOCKS } from "../src/dequantize";
+import { GGMLQuantizationType } from "../src/types";
+import type { GGMLDequantizableType } from "../src/dequantize";
+
+const INPUT_BYTES = 64 * 1024 * 1024;
+const ITERATIONS = 5;
+
+const rows: Array<Record<string, string>> = [];
+
+for (const key of Object.keys(GGML_DEQUANTIZABLE_BLOCKS)) {
+	const type = Number(key) as GGMLDequantizableType;
+	const { blockSize, typeSize } = GGML_DEQUANTIZABLE_BLOCKS[type];
+	const nBlocks = Math.floor(INPUT_BYTES / typeSize);
+	const data = new Uint8Array(nBlocks * typeSize);
+	for (let i = 0; i < data.length; i++) {
+		data[i] = (i * 2654435761) >>> 24;
+	}
+	const out = new Float32Array(nBlocks * blockSize);
+
+	// warm up the JIT and the f16 table
+	dequantize(type, data.subarray(0, typeSize * 1024), out);
+
+	const start = performance.now();
+	for (let i = 0; i < ITERATIONS; i++) {
+		dequantize(type, data, out);
+	}
+	const seconds = (performance.now() - start) / 1000 / ITERATIONS;
+
+	rows.push({
+		type: GGMLQuantizationType[type],
+		"input GB/s": (data.byteLength / seconds / 1e9).toFixed(2),
+		"output GB/s": (out.byteLength / seconds / 1e9).toFixed(2),
+		"Mweights/s": (out.length / seconds / 1e6).toFixed(0),
+	});
+}
+
+console.table(rows);
@@ -0,0 +1,113 @@
+import { describe, expect, it } from "vitest";
+import { GGMLQuantizationType } from "./types";
+import { dequantize, dequantizeStream, GGML_DEQUANTIZABLE_BLOCKS } from "./dequantize";
+
+const F16_ONE = [0x00, 0x3c];
+const F16_HALF = [0x00, 0x38];
+
+describe("dequantize", () => {
+	it("F32, F16 and BF16", () => {
+		expect(dequantize(GGMLQuantizationType.F32, new Uint8Array(new Float32Array([1.5, -2]).buffer))).toEqual(
+			new Float32Array([1.5, -2]),
+		);
+		// 1, -2, 65504 (max), 2^-24 (smallest subnormal)
+		expect(dequantize(GGMLQuantizationType.F16, new Uint8Array([0x00, 0x3c, 0x00, 0xc0, 0xff, 0x7b, 0x01, 0x00]))).toEqual(
+			new Float32Array([1, -2, 65504, 2 ** -24]),
+		);
+		expect(dequantize(GGMLQuantizationType.BF16, new Uint8Array([0x80, 0x3f, 0x00, 0xc0]))).toEqual(
+			new Float32Array([1, -2]),
+		);
+	});
+
+	it("Q4_0 and Q8_0", () => {
+		const q4 = new Uint8Array([...F16_HALF, ...Array.from({ length: 16 }, (_, j) => j | ((15 - j) << 4))]);
+		expect(Array.from(dequantize(GGMLQuantizationType.Q4_0, q4))).toEqual([
+			...Array.from({ length: 16 }, (_, j) => (j - 8) / 2),
+			...Array.from({ length: 16 }, (_, j) => (7 - j) / 2),
+		]);
+
+		const q8 = new Uint8Array([...F16_HALF, ...Array.from({ length: 32 }, (_, j) => (j - 16) & 0xff)]);
+		expect(Array.from(dequantize(GGMLQuantizationType.Q8_0, q8))).toEqual(Array.from({ length: 32 }, (_, j) => (j - 16) / 2));
+	});
+
+	it("Q4_K and Q5_K", () => {
+		// Sub-block j has scale j + 1 and min j, split over the 12 packed 6-bit scale bytes
+		const scales = new Uint8Array(12);
+		for (let j = 0; j < 8; j++) {
+			if (j < 4) {
+				scales[j] = j + 1;
+				scales[j + 4] = j;
+			} else {
+				scales[j + 4] = (j + 1) | (j << 4);
+			}
+		}
+		const qs = Array.from({ length: 128 }, (_, l) => (l % 16) | ((15 - (l % 16)) << 4));
+		const expected = Array.from({ length: 256 }, (_, k) => {
+			const j = Math.floor(k / 32);
+			const l = k % 32;
+			const q = j % 2 === 0 ? l % 16 : 15 - (l % 16);
+			return (j + 1) * q - j;
+		});
+
+		const q4k = new Uint8Array([...F16_ONE, ...F16_ONE, ...scales, ...qs]);
+		expect(Array.from(dequantize(GGMLQuantizationType.Q4_K, q4k))).toEqual(expected);
+
+		// High bits all set: every weight gets +16
+		const q5k = new Uint8Array([...F16_ONE, ...F16_ONE, ...scales, ...new Array(32).fill(0xff), ...qs]);
+		expect(Array.from(dequantize(GGMLQuantizationType.Q5_K, q5k))).toEqual(
+			expected.map((value, k) => value + 16 * (Math.floor(k / 32) + 1)),
+		);
+	});
+
+	it("Q6_K", () => {
+		const block = new Uint8Array(210);
+		block.fill(0x1b, 128, 192); // qh: 0b00011011 -> high bits 3, 2, 1, 0 for the 4 quarters
+		block.fill(2, 192, 208); // scales
+		block.set(F16_HALF, 208);
+		// q = (high << 4) - 32
+		expect(Array.from(dequantize(GGMLQuantizationType.Q6_K, block))).toEqual(
+			Array.from({ length: 256 }, (_, k) => [16, 0, -16, -32][Math.floor((k % 128) / 32)]),
+		);
+	});
+
+	it("writes to the output array and validates lengths", () => {
+		const out = new Float32Array(4);
+		expect(dequantize(GGMLQuantizationType.F16, new Uint8Array([...F16_ONE, ...F16_ONE]), out)).toBe(out);
+		expect(Array.from(out)).toEqual([1, 1, 0, 0]);
+
+		expect(() => dequantize(GGMLQuantizationType.Q8_0, new Uint8Array(35))).toThrow(RangeError);
+		expect(() => dequantize(GGMLQuantizationType.F16, new Uint8Array(10), out)).toThrow(/too small/);
+		expect(() => dequantize(GGMLQuantizationType.IQ2_XS, new Uint8Array(0))).toThrow(/not supported/);
+	});
+});
+
+describe("dequantizeStream", () => {
+	it("decodes blocks split across chunks", async () => {
+		const { typeSize } = GGML_DEQUANTIZABLE_BLOCKS[GGMLQuantizationType.Q8_0];
+		const data = Uint8Array.from({ length: typeSize * 5 }, (_, i) => (i % typeSize < 2 ? F16_HALF[i % 2] : i & 0xff));
+		const chunks = [data.subarray(0, 7), data.subarray(7, 80), data.subarray(80, 81), data.subarray(81)];
+
+		const stream = new ReadableStream<Uint8Array>({
+			start(controller) {
+				chunks.forEach((chunk) => controller.enqueue(chunk));
+				controller.close();
+			},
+		});
+		const decoded: number[] = [];
+		for await (const weights of dequantizeStream(GGMLQuantizationType.Q8_0, stream)) {
+			decoded.push(...weights);
+		}
+
+		expect(decoded).toEqual(Array.from(dequantize(GGMLQuantizationType.Q8_0, data)));
+	});
+
+	it("rejects a truncated stream", async () => {
+		async function* chunks() {
+			yield new Uint8Array(40);
+		}
+		const generator = dequantizeStream(GGMLQuantizationType.Q8_0, chunks());
+
+		expect((await generator.next()).value).toHaveLength(32);
+		await expect(generator.next()).rejects.toThrow(/partial block/);
+	});
+});
@@ -0,0 +1,309 @@
+import { GGMLQuantizationType } from "./types";
+
+const QK_K = 256;
+
+/**
+ * Number of weights and bytes in a block of each quantization type supported by {@link dequantize}.
+ *
+ * Layouts copied from https://github.com/ggml-org/llama.cpp/blob/master/ggml/src/ggml-quants.c
+ */
+export const GGML_DEQUANTIZABLE_BLOCKS = {
+	[GGMLQuantizationType.F32]: { blockSize: 1, typeSize: 4 },
+	[GGMLQuantizationType.F16]: { blockSize: 1, typeSize: 2 },
+	[GGMLQuantizationType.BF16]: { blockSize: 1, typeSize: 2 },
+	[GGMLQuantizationType.Q4_0]: { blockSize: 32, typeSize: 2 + 16 },
+	[GGMLQuantizationType.Q8_0]: { blockSize: 32, typeSize: 2 + 32 },
+	[GGMLQuantizationType.Q4_K]: { blockSize: QK_K, typeSize: 2 + 2 + 12 + QK_K / 2 },
+	[GGMLQuantizationType.Q5_K]: { blockSize: QK_K, typeSize: 2 + 2 + 12 + QK_K / 8 + QK_K / 2 },
+	[GGMLQuantizationType.Q6_K]: { blockSize: QK_K, typeSize: QK_K / 2 + QK_K / 4 + QK_K / 16 + 2 },
+} as const;
+
+export type GGMLDequantizableType = keyof typeof GGML_DEQUANTIZABLE_BLOCKS;
+
+export function isDequantizable(type: GGMLQuantizationType): type is GGMLDequantizableType {
+	return type in GGML_DEQUANTIZABLE_BLOCKS;
+}
+
+let f16Table: Float32Array | undefined;
+
+/**
+ * Every half-precision float, indexed by its bits. 256KB, built on first use, so that F16 values
+ * (including the block scales of quantized types) are converted with a single lookup.
+ */
+function getF16Table(): Float32Array {
+	if (!f16Table) {
+		f16Table = new Float32Array(65536);
+		for (let h = 0; h < 65536; h++) {
+			const sign = h & 0x8000 ? -1 : 1;
+			const exponent = (h >> 10) & 0x1f;
+			const mantissa = h & 0x3ff;
+			if (exponent === 0) {
+				f16Table[h] = sign * mantissa * 2 ** -24;
+			} else if (exponent === 0x1f) {
+				f16Table[h] = mantissa ? NaN : sign * Infinity;
+			} else {
+				f16Table[h] = sign * (1 + mantissa / 1024) * 2 ** (exponent - 15);
+			}
+		}
+	}
+	return f16Table;
+}
+
+/**
+ * Dequantizes tensor data to 32-bit floats.
+ *
+ * `data` must contain whole blocks, little-endian, as stored in GGUF files. Use {@link dequantizeStream} to decode
+ * data as it is downloaded.
+ *
+ * @param out Where to write the weights, instead of allocating a new array. Must be large enough for all the blocks in `data`.
+ * @returns the weights, `out` if provided
+ */
+export function dequantize(type: GGMLQuantizationType, data: Uint8Array, out?: Float32Array): Float32Array {
+	if (!isDequantizable(type)) {
+		throw new TypeError(`Dequantization of ${GGMLQuantizationType[type] ?? type} is not supported`);
+	}
+	const { blockSize, typeSize } = GGML_DEQUANTIZABLE_BLOCKS[type];
+	if (data.byteLength % typeSize !== 0) {
+		throw new RangeError(`Data length ${data.byteLength} is not a multiple of the ${typeSize}-byte block size`);
+	}
+	const nBlocks = data.byteLength / typeSize;
+	const length = nBlocks * blockSize;
+	if (out && out.length < length) {
+		throw new RangeError(`Output is too small: ${out.length} < ${length} weights`);
+	}
+	const y = out ?? new Float32Array(length);
+
+	switch (type) {
+		case GGMLQuantizationType.F32:
+			dequantizeF32(data, y, length);
+			break;
+		case GGMLQuantizationType.F16:
+			dequantizeF16(data, y, length);
+			break;
+		case GGMLQuantizationType.BF16:
+			dequantizeBF16(data, y, length);
+			break;
+		case GGMLQuantizationType.Q4_0:
+			dequantizeQ4_0(data, y, nBlocks);
+			break;
+		case GGMLQuantizationType.Q8_0:
+			dequantizeQ8_0(data, y, nBlocks);
+			break;
+		case GGMLQuantizationType.Q4_K:
+			dequantizeQ4_K(data, y, nBlocks);
+			break;
+		case GGMLQuantizationType.Q5_K:
+			dequantizeQ5_K(data, y, nBlocks);
+			break;
+		case GGMLQuantizationType.Q6_K:
+			dequantizeQ6_K(data, y, nBlocks);
+			break;
+	}
+
+	return y;
+}
+
+/**
+ * Dequantizes tensor data as it arrives, eg from `fetch(...).body`, without holding the whole tensor in memory.
+ *
+ * Chunks can be of any size, partial blocks are kept until the rest of the block arrives.
+ *
+ * @returns the weights of each chunk, in order
+ */
+export async function* dequantizeStream(
+	type: GGMLQuantizationType,
+	chunks: AsyncIterable<Uint8Array> | ReadableStream<Uint8Array>,
+): AsyncGenerator<Float32Array> {
+	if (!isDequantizable(type)) {
+		throw new TypeError(`Dequantization of ${GGMLQuantizationType[type] ?? type} is not supported`);
+	}
+	const { typeSize } = GGML_DEQUANTIZABLE_BLOCKS[type];
+	let pending = new Uint8Array(0);
+
+	for await (const chunk of iterate(chunks)) {
+		let data = chunk;
+		if (pending.byteLength) {
+			data = new Uint8Array(pending.byteLength + chunk.byteLength);
+			data.set(pending);
+			data.set(chunk, pending.byteLength);
+		}
+		const wholeBytes = data.byteLength - (data.byteLength % typeSize);
+		if (wholeBytes) {
+			yield dequantize(type, data.subarray(0, wholeBytes));
+		}
+		pending = data.slice(wholeBytes);
+	}
+
+	if (pending.byteLength) {
+		throw new RangeError(`Stream ended with a partial block of ${pending.byteLength} bytes`);
+	}
+}
+
+async function* iterate(chunks: AsyncIterable<Uint8Array> | ReadableStream<Uint8Array>): AsyncGenerator<Uint8Array> {
+	if (Symbol.asyncIterator in chunks) {
+		yield* chunks as AsyncIterable<Uint8Array>;
+		return;
+	}
+	const reader = chunks.getReader();
+	try {
+		for (;;) {
+			const { done, value } = await reader.read();
+			if (done) {
+				return;
+			}
+			yield value;
+		}
+	} finally {
+		reader.releaseLock();
+	}
+}
+
+/**
+ * Typed array views need aligned offsets, which subarrays of downloaded data rarely are
+ */
+function u16View(data: Uint8Array, length: number): Uint16Array {
+	if (data.byteOffset % 2 === 0) {
+		return new Uint16Array(data.buffer, data.byteOffset, length);
+	}
+	return new Uint16Array(data.slice(0, length * 2).buffer);
+}
+
+function dequantizeF32(data: Uint8Array, y: Float32Array, length: number): void {
+	const view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+	for (let i = 0; i < length; i++) {
+		y[i] = view.getFloat32(i * 4, true);
+	}
+}
+
+function dequantizeF16(data: Uint8Array, y: Float32Array, length: number): void {
+	const table = getF16Table();
+	const halves = u16View(data, length);
+	for (let i = 0; i < length; i++) {
+		y[i] = table[halves[i]];
+	}
+}
+
+function dequantizeBF16(data: Uint8Array, y: Float32Array, length: number): void {
+	// bf16 is the upper half of a f32
+	const halves = u16View(data, length);
+	const bits = new Uint32Array(y.buffer, y.byteOffset, length);
+	for (let i = 0; i < length; i++) {
+		bits[i] = halves[i] << 16;
+	}
+}
+
+function dequantizeQ4_0(x: Uint8Array, y: Float32Array, nBlocks: number): void {
+	const table = getF16Table();
+	for (let i = 0, p = 0, o = 0; i < nBlocks; i++, p += 18, o += 32) {
+		const d = table[x[p] | (x[p + 1] << 8)];
+		for (let j = 0; j < 16; j++) {
+			const q = x[p + 2 + j];
+			y[o + j] = ((q & 0x0f) - 8) * d;
+			y[o + j + 16] = ((q >> 4) - 8) * d;
+		}
+	}
+}
+
+function dequantizeQ8_0(x: Uint8Array, y: Float32Array, nBlocks: number): void {
+	const table = getF16Table();
+	const qs = new Int8Array(x.buffer, x.byteOffset, x.byteLength);
+	for (let i = 0, p = 0, o = 0; i < nBlocks; i++, p += 34, o += 32) {
+		const d = table[x[p] | (x[p + 1] << 8)];
+		for (let j = 0; j < 32; j++) {
+			y[o + j] = qs[p + 2 + j] * d;
+		}
+	}
+}
+
+/**
+ * Unpacks the 6-bit scales and mins of the 8 sub-blocks of a Q4_K/Q5_K block (`get_scale_min_k4` in ggml)
+ */
+function unpackScalesMinsK4(x: Uint8Array, p: number, scales: Uint8Array, mins: Uint8Array): void {
+	for (let j = 0; j < 8; j++) {
+		if (j < 4) {
+			scales[j] = x[p + j] & 63;
+			mins[j] = x[p + j + 4] & 63;
+		} else {
+			scales[j] = (x[p + j + 4] & 0x0f) | ((x[p + j - 4] >> 6) << 4);
+			mins[j] = (x[p + j + 4] >> 4) | ((x[p + j] >> 6) << 4);
+		}
+	}
+}
+
+function dequantizeQ4_K(x: Uint8Array, y: Float32Array, nBlocks: number): void {
+	const table = getF16Table();
+	const scales = new Uint8Array(8);
+	const mins = new Uint8Array(8);
+	for (let i = 0, p = 0, o = 0; i < nBlocks; i++, p += 144, o += QK_K) {
+		const d = table[x[p] | (x[p + 1] << 8)];
+		const dmin = table[x[p + 2] | (x[p + 3] << 8)];
+		unpackScalesMinsK4(x, p + 4, scales, mins);
+		const qs = p + 16;
+		for (let j = 0; j < 4; j++) {
+			const d1 = d * scales[2 * j];
+			const m1 = dmin * mins[2 * j];
+			const d2 = d * scales[2 * j + 1];
+			const m2 = dmin * mins[2 * j + 1];
+			const q = qs + 32 * j;
+			const out = o + 64 * j;
+			for (let l = 0; l < 32; l++) {
+				y[out + l] = d1 * (x[q + l] & 0x0f) - m1;
+				y[out + l + 32] = d2 * (x[q + l] >> 4) - m2;
+			}
+		}
+	}
+}
+
+function dequantizeQ5_K(x: Uint8Array, y: Float32Array, nBlocks: number): void {
+	const table = getF16Table();
+	const scales = new Uint8Array(8);
+	const mins = new Uint8Array(8);
+	for (let i = 0, p = 0, o = 0; i < nBlocks; i++, p += 176, o += QK_K) {
+		const d = table[x[p] | (x[p + 1] << 8)];
+		const dmin = table[x[p + 2] | (x[p + 3] << 8)];
+		unpackScalesMinsK4(x, p + 4, scales, mins);
+		const qh = p + 16;
+		const qs = p + 48;
+		for (let j = 0; j < 4; j++) {
+			const d1 = d * scales[2 * j];
+			const m1 = dmin * mins[2 * j];
+			const d2 = d * scales[2 * j + 1];
+			const m2 = dmin * mins[2 * j + 1];
+			const u1 = 1 << (2 * j);
+			const u2 = 2 << (2 * j);
+			const q = qs + 32 * j;
+			const out = o + 64 * j;
+			for (let l = 0; l < 32; l++) {
+				const h = x[qh + l];
+				y[out + l] = d1 * ((x[q + l] & 0x0f) + (h & u1 ? 16 : 0)) - m1;
+				y[out + l + 32] = d2 * ((x[q + l] >> 4) + (h & u2 ? 16 : 0)) - m2;
+			}
+		}
+	}
+}
+
+function dequantizeQ6_K(x: Uint8Array, y: Float32Array, nBlocks: number): void {
+	const table = getF16Table();
+	const signed = new Int8Array(x.buffer, x.byteOffset, x.byteLength);
+	for (let i = 0, p = 0, o = 0; i < nBlocks; i++, p += 210, o += QK_K) {
+		const d = table[x[p + 208] | (x[p + 209] << 8)];
+		for (let n = 0; n < 2; n++) {
+			const ql = p + 64 * n;
+			const qh = p + 128 + 32 * n;
+			const sc = p + 192 + 8 * n;
+			const out = o + 128 * n;
+			for (let l = 0; l < 32; l++) {
+				const is = l >> 4;
+				const h = x[qh + l];
+				const q1 = ((x[ql + l] & 0x0f) | ((h & 3) << 4)) - 32;
+				const q2 = ((x[ql + l + 32] & 0x0f) | (((h >> 2) & 3) << 4)) - 32;
+				const q3 = ((x[ql + l] >> 4) | (((h >> 4) & 3) << 4)) - 32;
+				const q4 = ((x[ql + l + 32] >> 4) | (((h >> 6) & 3) << 4)) - 32;
+				y[out + l] = d * signed[sc + is] * q1;
+				y[out + l + 32] = d * signed[sc + is + 2] * q2;
+				y[out + l + 64] = d * signed[sc + is + 4] * q3;
+				y[out + l + 96] = d * signed[sc + is + 6] * q4;
+			}
+		}
+	}
+}
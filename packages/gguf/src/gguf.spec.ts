@@ -13,6 +13,7 @@ import {
 	findNearestQuantType,
 	serializeGgufMetadata,
 	buildGgufHeader,
+	ggufTensorByteRanges,
 } from "./gguf";
 import fs from "node:fs";
 import { tmpdir } from "node:os";
@@ -970,6 +971,109 @@ describe("gguf", () => {
 		}, 30000);
 	});
 
+	it("computes the byte ranges of the tensors", () => {
+		const ranges = ggufTensorByteRanges({
+			tensorDataOffset: 1024n,
+			tensorInfos: [
+				{ name: "token_embd.weight", n_dims: 2, shape: [256n, 4n], dtype: GGMLQuantizationType.Q4_K, offset: 0n },
+				{ name: "output_norm.weight", n_dims: 1, shape: [256n], dtype: GGMLQuantizationType.F32, offset: 576n },
+			],
+		});
+
+		expect(ranges).toEqual({
+			// 4 blocks of 256 Q4_K weights, 144 bytes per block
+			"token_embd.weight": { start: 1024, end: 1024 + 576 },
+			"output_norm.weight": { start: 1024 + 576, end: 1024 + 576 + 1024 },
+		});
+	});
+
+	it("reads big headers with growing, prefetched chunks", async () => {
+		// A header with a ~11MB vocabulary, as a single string array
+		const tokens = Array.from({ length: 400_000 }, (_, i) => new TextEncoder().encode(`token-${i}`.padEnd(20, "_")));
+		const key = new TextEncoder().encode("tokenizer.ggml.tokens");
+		const file = new Uint8Array(24 + 8 + key.length + 4 + 4 + 8 + tokens.length * 28);
+		const view = new DataView(file.buffer);
+		file.set(new TextEncoder().encode("GGUF"), 0);
+		view.setUint32(4, 3, true); // version
+		view.setBigUint64(8, 0n, true); // tensor_count
+		view.setBigUint64(16, 1n, true); // kv_count
+		let off = 24;
+		view.setBigUint64(off, BigInt(key.length), true);
+		file.set(key, (off += 8));
+		off += key.length;
+		view.setUint32(off, GGUFValueType.ARRAY, true);
+		view.setUint32((off += 4), GGUFValueType.STRING, true);
+		view.setBigUint64((off += 4), BigInt(tokens.length), true);
+		off += 8;
+		for (const token of tokens) {
+			view.setBigUint64(off, BigInt(token.length), true);
+			file.set(token, (off += 8));
+			off += token.length;
+		}
+
+		const requestedRanges: string[] = [];
+		const fetch = (async (_input: RequestInfo | URL, init?: RequestInit) => {
+			const range = new Headers(init?.headers).get("range") ?? "";
+			requestedRanges.push(range);
+			const [start, end] = range.slice("bytes=".length).split("-").map(Number);
+			return new Response(file.slice(start, end + 1), {
+				status: 206,
+				headers: { "content-range": `bytes ${start}-${Math.min(end, file.length - 1)}/${file.length}` },
+			});
+		}) as typeof globalThis.fetch;
+
+		const { metadata } = await gguf("https://example.com/model.gguf", { fetch });
+
+		expect(metadata["tokenizer.ggml.tokens"]).toHaveLength(400_000);
+		expect(requestedRanges).toEqual(["bytes=0-1999999", "bytes=2000000-5999999", "bytes=6000000-13999999"]);
+	});
+
+	it("aborts the chunk read ahead once the header is parsed", async () => {
+		// A header with a ~4MB vocabulary, followed by tensor data
+		const tokens = Array.from({ length: 150_000 }, (_, i) => new TextEncoder().encode(`token-${i}`.padEnd(20, "_")));
+		const key = new TextEncoder().encode("tokenizer.ggml.tokens");
+		const file = new Uint8Array(20_000_000);
+		const view = new DataView(file.buffer);
+		file.set(new TextEncoder().encode("GGUF"), 0);
+		view.setUint32(4, 3, true); // version
+		view.setBigUint64(8, 0n, true); // tensor_count
+		view.setBigUint64(16, 1n, true); // kv_count
+		let off = 24;
+		view.setBigUint64(off, BigInt(key.length), true);
+		file.set(key, (off += 8));
+		off += key.length;
+		view.setUint32(off, GGUFValueType.ARRAY, true);
+		view.setUint32((off += 4), GGUFValueType.STRING, true);
+		view.setBigUint64((off += 4), BigInt(tokens.length), true);
+		off += 8;
+		for (const token of tokens) {
+			view.setBigUint64(off, BigInt(token.length), true);
+			file.set(token, (off += 8));
+			off += token.length;
+		}
+
+		const requests: Array<{ range: string; signal?: AbortSignal | null }> = [];
+		const fetch = (async (_input: RequestInfo | URL, init?: RequestInit) => {
+			const range = new Headers(init?.headers).get("range") ?? "";
+			requests.push({ range, signal: init?.signal });
+			const [start, end] = range.slice("bytes=".length).split("-").map(Number);
+			return new Response(file.slice(start, end + 1), {
+				status: 206,
+				headers: { "content-range": `bytes ${start}-${Math.min(end, file.length - 1)}/${file.length}` },
+			});
+		}) as typeof globalThis.fetch;
+
+		const { metadata } = await gguf("https://example.com/model.gguf", { fetch });
+
+		expect(metadata["tokenizer.ggml.tokens"]).toHaveLength(150_000);
+		expect(requests.map(({ range }) => range)).toEqual([
+			"bytes=0-1999999",
+			"bytes=2000000-5999999",
+			"bytes=6000000-13999999",
+		]);
+		expect(requests[2].signal?.aborted).toBe(true);
+	});
+
 	describe("malformed tensor shapes", () => {
 		/**
 		 * Builds a minimal GGUF v3 file with the given tensor shapes. Hermetic on purpose: the
@@ -1,5 +1,6 @@
 import type { MetadataValue, Version, GGUFMetadata, GGUFTypedMetadata, GGUFTensorInfo, GGUFParseOutput } from "./types";
 import { GGUFValueType } from "./types";
+import { GGML_QUANT_SIZES } from "./quant-descriptions";
 import { isBackend } from "./utils/isBackend";
 import { promisesQueue } from "./utils/promisesQueue";
 
@@ -15,6 +16,8 @@ export type {
 } from "./types";
 export { GGUFValueType, GGMLQuantizationType, Architecture } from "./types";
 export { GGUF_QUANT_DESCRIPTIONS } from "./quant-descriptions";
+export { dequantize, dequantizeStream, isDequantizable, GGML_DEQUANTIZABLE_BLOCKS } from "./dequantize";
+export type { GGMLDequantizableType } from "./dequantize";
 export {
 	parseGGUFQuantLabel,
 	GGUF_QUANT_RE,
@@ -90,15 +93,25 @@ function isGGUFValueType(n: number): n is GGUFValueType {
 	return typeof GGUFValueType[n] === "string";
 }
 
-const HTTP_CHUNK_SIZE = 2 * 10 ** 6; /// 2MB
+const HTTP_CHUNK_SIZE = 2 * 10 ** 6; /// 2MB, size of the first chunk
+const HTTP_MAX_CHUNK_SIZE = 16 * 10 ** 6; /// 16MB, chunks double in size up to this
 const HTTP_DATA_LEEWAY = 5 * 10 ** 5; /// 500kb
 const HTTP_TOTAL_MAX_SIZE = 50 * 10 ** 6; /// 50MB
 
 /**
  * Internal stateful instance to fetch ranges of HTTP data when needed
+ *
+ * The first chunk is small, as it holds the whole header of most files. Headers that don't fit are
+ * usually big (eg huge tokenizer vocabularies), so each following chunk is twice as large as the previous
+ * one, and is fetched in the background while the previous one is parsed.
  */
 class RangeView {
-	protected chunk: number;
+	/**
+	 * Number of bytes of the file loaded in the buffer
+	 */
+	protected loadedBytes: number;
+	private chunkSize: number;
+	private prefetched?: { start: number; end: number; data: Promise<Uint8Array>; controller?: AbortController };
 	private buffer: ArrayBuffer;
 	private dataView: DataView;
 	/**
@@ -126,7 +139,8 @@ class RangeView {
 			additionalFetchHeaders?: Record<string, string>;
 		},
 	) {
-		this.chunk = 0;
+		this.loadedBytes = 0;
+		this.chunkSize = HTTP_CHUNK_SIZE;
 		/// TODO(fix typing)
 		// eslint-disable-next-line @typescript-eslint/ban-ts-comment
 		// @ts-ignore
@@ -134,15 +148,53 @@ class RangeView {
 		this.dataView = new DataView(this.buffer);
 	}
 	/**
-	 * Fetch a new chunk from the server
+	 * Load the next chunk into the buffer
+	 */
+	async fetchChunk(): Promise<void> {
+		const start = this.loadedBytes;
+		if (start >= HTTP_TOTAL_MAX_SIZE) {
+			throw new Error(`GGUF header exceeds the maximum supported size (${HTTP_TOTAL_MAX_SIZE} bytes)`);
+		}
+		const chunk = this.prefetched?.start === start ? this.prefetched : this.readChunk(start);
+		this.prefetched = undefined;
+
+		this.appendBuffer(await chunk.data, chunk.start, chunk.end);
+		this.loadedBytes = chunk.end;
+
+		// Past the first chunk, the header is big: read ahead
+		if (
+			start > 0 &&
+			this.loadedBytes < HTTP_TOTAL_MAX_SIZE &&
+			(this.totalFileSize === undefined || this.loadedBytes < this.totalFileSize)
+		) {
+			const controller = new AbortController();
+			this.prefetched = { ...this.readChunk(this.loadedBytes, controller.signal), controller };
+			// Errors are thrown by the fetchChunk call that uses the prefetched chunk, if any
+			this.prefetched.data.catch(() => {});
+		}
+	}
+	/**
+	 * Abort the chunk being read ahead, if any, once the header is parsed
+	 */
+	close(): void {
+		this.prefetched?.controller?.abort();
+		this.prefetched = undefined;
+	}
+	private readChunk(start: number, signal?: AbortSignal): { start: number; end: number; data: Promise<Uint8Array> } {
+		const end = Math.min(start + this.chunkSize, HTTP_TOTAL_MAX_SIZE);
+		this.chunkSize = Math.min(this.chunkSize * 2, HTTP_MAX_CHUNK_SIZE);
+		return { start, end, data: this.readRange(start, end, signal) };
+	}
+	/**
+	 * Fetch a range of bytes from the server
 	 */
-	async fetchChunk() {
-		const range = [this.chunk * HTTP_CHUNK_SIZE, (this.chunk + 1) * HTTP_CHUNK_SIZE - 1];
+	protected async readRange(start: number, end: number, signal?: AbortSignal): Promise<Uint8Array> {
 		const response = await (this.params?.fetch ?? fetch)(this.uri, {
 			headers: {
 				...(this.params?.additionalFetchHeaders ?? {}),
-				Range: `bytes=${range[0]}-${range[1]}`,
+				Range: `bytes=${start}-${end - 1}`,
 			},
+			signal,
 		});
 		// "bytes 0-999/49501056" — the total is the only part we want, and it costs no extra request
 		const contentRange = response.headers.get("content-range");
@@ -153,14 +205,13 @@ class RangeView {
 				this.totalFileSize = parsed;
 			}
 		}
-		const buf = new Uint8Array(await response.arrayBuffer());
-		this.appendBuffer(buf);
-		this.chunk += 1;
+		return new Uint8Array(await response.arrayBuffer());
 	}
 	/**
-	 * Append new data into the buffer
+	 * Append new data into the buffer, at `start`, and grow the buffer to `end`
 	 */
-	appendBuffer(buf: Uint8Array) {
+	appendBuffer(buf: Uint8Array, start: number, end: number) {
+		const data = buf.subarray(0, end - start);
 		/// TODO(fix typing)
 		// eslint-disable-next-line @typescript-eslint/ban-ts-comment
 		// @ts-ignore
@@ -168,17 +219,17 @@ class RangeView {
 			/// TODO(fix typing)
 			// eslint-disable-next-line @typescript-eslint/ban-ts-comment
 			// @ts-ignore
-			this.buffer.resize((this.chunk + 1) * HTTP_CHUNK_SIZE);
-			new Uint8Array(this.buffer).set(buf, this.chunk * HTTP_CHUNK_SIZE);
+			this.buffer.resize(end);
+			new Uint8Array(this.buffer).set(data, start);
 		} else {
 			// If the browser does not support ArrayBuffer.resize, we fallback to this polyfill version
 			/// TODO(fix typing)
 			// eslint-disable-next-line @typescript-eslint/ban-ts-comment
 			// @ts-ignore
-			const newBuffer = new ArrayBuffer((this.chunk + 1) * HTTP_CHUNK_SIZE, { maxByteLength: HTTP_TOTAL_MAX_SIZE });
+			const newBuffer = new ArrayBuffer(end, { maxByteLength: HTTP_TOTAL_MAX_SIZE });
 			const arrView = new Uint8Array(newBuffer);
 			arrView.set(new Uint8Array(this.buffer));
-			arrView.set(buf, this.chunk * HTTP_CHUNK_SIZE);
+			arrView.set(data, start);
 			this.buffer = newBuffer;
 			this.dataView = new DataView(this.buffer);
 		}
@@ -199,16 +250,13 @@ class RangeView {
  */
 class RangeViewLocalFile extends RangeView {
 	/**
-	 * Read a new chunk from local file system.
+	 * Read a range of bytes from local file system.
 	 */
-	override async fetchChunk(): Promise<void> {
+	protected override async readRange(start: number, end: number): Promise<Uint8Array> {
 		const { FileBlob } = await import("./utils/FileBlob");
 		const blob = await FileBlob.create(this.uri);
 		this.totalFileSize = blob.size;
-		const range = [this.chunk * HTTP_CHUNK_SIZE, (this.chunk + 1) * HTTP_CHUNK_SIZE];
-		const buffer = await blob.slice(range[0], range[1]).arrayBuffer();
-		this.appendBuffer(new Uint8Array(buffer));
-		this.chunk += 1;
+		return new Uint8Array(await blob.slice(start, end).arrayBuffer());
 	}
 }
 
@@ -405,6 +453,17 @@ export async function gguf(
 		}
 		r = new RangeView(uri, params);
 	}
+	try {
+		return await parseGguf(r, params);
+	} finally {
+		r.close();
+	}
+}
+
+async function parseGguf(
+	r: RangeView,
+	params?: { typedMetadata?: boolean; computeParametersCount?: boolean },
+): Promise<GGUFParseOutput & { parameterCount?: number; typedMetadata?: GGUFTypedMetadata }> {
 	await r.fetchChunk();
 
 	const checkBuffer = (buffer: Uint8Array, header: Uint8Array) => {
@@ -883,6 +942,32 @@ export async function buildGgufHeader(
 	});
 }
 
+/**
+ * Byte ranges of the tensors in the file, by tensor name.
+ *
+ * Can be used to fetch individual tensors without downloading the whole file, eg with `TensorReader` from `@huggingface/hub`.
+ */
+export function ggufTensorByteRanges(
+	parsed: Pick<GGUFParseOutput, "tensorInfos" | "tensorDataOffset">,
+): Record<string, { start: number; end: number }> {
+	const tensorDataOffset = Number(parsed.tensorDataOffset);
+	const ranges: Record<string, { start: number; end: number }> = {};
+	for (const { name, shape, dtype, offset } of parsed.tensorInfos) {
+		const bitsPerWeight = GGML_QUANT_SIZES[dtype];
+		if (bitsPerWeight === undefined) {
+			throw new Error(`Unknown size for tensor "${name}" of type ${dtype}`);
+		}
+		const nElem = shape.reduce((acc, val) => acc * Number(val), 1);
+		const start = tensorDataOffset + Number(offset);
+		const end = start + (nElem * bitsPerWeight) / 8;
+		if (!Number.isSafeInteger(start) || !Number.isSafeInteger(end)) {
+			throw new Error(`Tensor "${name}" has an invalid byte range`);
+		}
+		ranges[name] = { start, end };
+	}
+	return ranges;
+}
+
 export async function ggufAllShards(
 	url: string,
 	params?: {
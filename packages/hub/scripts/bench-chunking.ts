@@ -0,0 +1,119 @@
+import { parseArgs } from "node:util";
+import { cpus } from "node:os";
+import { join } from "node:path";
+import { createChunker, finalize, hashToHex, nextBlock } from "@huggingface/xetchunk-wasm";
+import { chunkStreamInParallel, XetChunkerPool } from "../src/utils/XetChunkerPool.js";
+
+/**
+ * This script compares xet chunking + hashing throughput on the main thread and with XetChunkerPool,
+ * and checks that both give the same chunks.
+ *
+ * Usage:
+ *
+ * pnpm --filter hub bench:chunking
+ * pnpm --filter hub bench:chunking --size 4096 --workers 1,2,4,8,16
+ */
+
+const PIECE_SIZE = 64 * 1024;
+
+function randomBlob(size: number): Blob {
+	const pieces: Uint8Array[] = [];
+	let state = 0x12345678;
+	for (let offset = 0; offset < size; offset += PIECE_SIZE) {
+		const piece = new Uint8Array(Math.min(PIECE_SIZE, size - offset));
+		const view = new Uint32Array(piece.buffer, 0, piece.length >> 2);
+		for (let i = 0; i < view.length; i++) {
+			// xorshift32
+			state ^= state << 13;
+			state ^= state >>> 17;
+			state ^= state << 5;
+			view[i] = state;
+		}
+		pieces.push(piece);
+	}
+	return new Blob(pieces);
+}
+
+async function chunkSequentially(blob: Blob): Promise<string[]> {
+	const chunker = createChunker();
+	const hashes: string[] = [];
+	const reader = blob.stream().getReader();
+	while (true) {
+		const { done, value } = await reader.read();
+		if (done) {
+			break;
+		}
+		for (const chunk of nextBlock(chunker, value)) {
+			hashes.push(hashToHex(chunk.hash));
+		}
+	}
+	const last = finalize(chunker);
+	if (last) {
+		hashes.push(hashToHex(last.hash));
+	}
+	return hashes;
+}
+
+async function chunkInParallel(blob: Blob, pool: XetChunkerPool): Promise<string[]> {
+	const hashes: string[] = [];
+	for await (const { chunks } of chunkStreamInParallel(blob.stream(), pool)) {
+		hashes.push(...chunks.map((chunk) => chunk.hash));
+	}
+	return hashes;
+}
+
+async function measure(label: string, size: number, fn: () => Promise<string[]>): Promise<string[]> {
+	const start = performance.now();
+	const hashes = await fn();
+	const seconds = (performance.now() - start) / 1000;
+	console.log(`${label.padEnd(20)} ${(size / 1e6 / seconds).toFixed(1).padStart(8)} MB/s  (${hashes.length} chunks)`);
+	return hashes;
+}
+
+async function main() {
+	const { values: args } = parseArgs({
+		options: {
+			size: {
+				type: "string",
+				short: "s",
+				default: "1024",
+			},
+			workers: {
+				type: "string",
+				short: "w",
+			},
+		},
+	});
+
+	const size = Number(args.size) * 1024 * 1024;
+	const maxWorkers = cpus().length;
+	const workerCounts = args.workers
+		? args.workers.split(",").map(Number)
+		: [1, 2, 4, 8, 16, 32].filter((count) => count <= maxWorkers);
+
+	console.log(`Chunking ${args.size} MB of random data, ${maxWorkers} cores`);
+	const blob = randomBlob(size);
+
+	const expected = await measure("main thread", size, () => chunkSequentially(blob));
+
+	for (const count of workerCounts) {
+		// Workers inherit tsx's loader from execArgv, so they can run the TypeScript entry point directly
+		const pool = await XetChunkerPool.create({
+			size: count,
+			workerUrl: join(__dirname, "../src/utils/xetChunkWorker-node.ts"),
+		});
+		try {
+			const hashes = await measure(`${count} worker(s)`, size, () => chunkInParallel(blob, pool));
+			if (hashes.length !== expected.length || hashes.some((hash, i) => hash !== expected[i])) {
+				throw new Error(`Chunks with ${count} worker(s) differ from the main thread's chunks`);
+			}
+		} finally {
+			pool.terminate();
+		}
+	}
+}
+
+main().catch((error) => {
+	console.error("Error:", error);
+	process.exit(1);
+});
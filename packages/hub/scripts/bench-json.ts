@@ -0,0 +1,147 @@
+import { parseArgs } from "node:util";
+import { JsonStreamTokenizer, streamJson } from "../src/utils/streamJson.js";
+import { parseSafetensorsIndexStream } from "../src/lib/parse-safetensors-index.js";
+
+/**
+ * This script compares the throughput of the streaming JSON parser with `JSON.parse`, on a
+ * `model.safetensors.index.json`-like document and on a page of a listing API.
+ *
+ * Usage:
+ *
+ * pnpm --filter hub bench:json
+ * pnpm --filter hub bench:json --size 128 --chunk-size 16
+ */
+
+function safetensorsIndex(size: number): string {
+	const entries: string[] = [];
+	let length = 0;
+	for (let i = 0; length < size; i++) {
+		const shard = String((i % 163) + 1).padStart(6, "0");
+		const entry = `"model.layers.${i >> 6}.mlp.experts.${i & 63}.down_proj.weight":"model-${shard}-of-000163.safetensors"`;
+		entries.push(entry);
+		length += entry.length + 1;
+	}
+	return `{"metadata":{"total_size":1234567890},"weight_map":{${entries.join(",")}}}`;
+}
+
+function listing(size: number): string {
+	const items: string[] = [];
+	let length = 0;
+	for (let i = 0; length < size; i++) {
+		const item = JSON.stringify({
+			_id: i.toString(16).padStart(24, "0"),
+			id: `user-${i % 1000}/model-${i}`,
+			likes: i % 97,
+			downloads: i * 13,
+			private: false,
+			pipeline_tag: "text-generation",
+			tags: ["transformers", "safetensors", "llama", "text-generation", "conversational", "license:apache-2.0"],
+			createdAt: "2024-05-01T12:00:00.000Z",
+			lastModified: "2024-06-01T12:00:00.000Z",
+			description: "Model card with \"quotes\", escapes\\n and unicode: éà 🤗",
+		});
+		items.push(item);
+		length += item.length + 1;
+	}
+	return `[${items.join(",")}]`;
+}
+
+function chunked(bytes: Uint8Array, chunkSize: number): Uint8Array[] {
+	const chunks: Uint8Array[] = [];
+	for (let offset = 0; offset < bytes.length; offset += chunkSize) {
+		chunks.push(bytes.subarray(offset, offset + chunkSize));
+	}
+	return chunks;
+}
+
+function toStream(chunks: Uint8Array[]): ReadableStream<Uint8Array> {
+	let i = 0;
+	return new ReadableStream<Uint8Array>({
+		pull(controller) {
+			if (i < chunks.length) {
+				controller.enqueue(chunks[i++]);
+			} else {
+				controller.close();
+			}
+		},
+	});
+}
+
+async function measure(label: string, size: number, fn: () => unknown): Promise<void> {
+	// warmup
+	await fn();
+	const start = performance.now();
+	await fn();
+	const seconds = (performance.now() - start) / 1000;
+	console.log(`${label.padEnd(40)} ${(size / 1e6 / seconds).toFixed(1).padStart(8)} MB/s`);
+}
+
+async function main() {
+	const { values: args } = parseArgs({
+		options: {
+			size: {
+				type: "string",
+				short: "s",
+				default: "64",
+			},
+			"chunk-size": {
+				type: "string",
+				short: "c",
+				default: "64",
+			},
+		},
+	});
+
+	const size = Number(args.size) * 1024 * 1024;
+	const chunkSize = Number(args["chunk-size"]) * 1024;
+	const decoder = new TextDecoder();
+
+	for (const [name, text] of [
+		["safetensors index", safetensorsIndex(size)],
+		["listing", listing(size)],
+	] as const) {
+		const bytes = new TextEncoder().encode(text);
+		const chunks = chunked(bytes, chunkSize);
+		console.log(`\n${name}: ${(bytes.length / 1e6).toFixed(1)} MB in ${args["chunk-size"]} kB chunks`);
+
+		await measure("JSON.parse (decode + parse)", bytes.length, () => JSON.parse(decoder.decode(bytes)));
+
+		await measure("JsonStreamTokenizer", bytes.length, () => {
+			let count = 0;
+			const tokenizer = new JsonStreamTokenizer(() => count++);
+			for (const chunk of chunks) {
+				tokenizer.write(chunk);
+			}
+			tokenizer.end();
+			return count;
+		});
+
+		await measure("JsonStreamTokenizer, skipping values", bytes.length, () => {
+			let count = 0;
+			const tokenizer = new JsonStreamTokenizer(() => count++, {
+				skipValue: (key) => key === "weight_map" || key === "tags" || key === "description",
+			});
+			for (const chunk of chunks) {
+				tokenizer.write(chunk);
+			}
+			tokenizer.end();
+			return count;
+		});
+
+		await measure("streamJson (async generator)", bytes.length, async () => {
+			let count = 0;
+			for await (const _event of streamJson(toStream(chunks))) {
+				count++;
+			}
+			return count;
+		});
+
+		if (name === "safetensors index") {
+			await measure("parseSafetensorsIndexStream", bytes.length, () =>
+				parseSafetensorsIndexStream(toStream(chunks), { maxBytes: Infinity }),
+			);
+		}
+	}
+}
+
+main();
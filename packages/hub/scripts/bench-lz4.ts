@@ -0,0 +1,93 @@
+import { parseArgs } from "node:util";
+import {
+	lz4Compress,
+	lz4DecompressInto,
+	setXetChunkCodecWasmEnabled,
+	xetChunkCodecBackend,
+} from "../src/utils/xetChunkCodec.js";
+
+/**
+ * This script compares the throughput of the xorb chunk codec (LZ4 + byte grouping) with the WebAssembly
+ * implementation and with the pure JS fallback, and checks that both give the same bytes.
+ *
+ * Usage:
+ *
+ * pnpm --filter hub bench:lz4
+ * pnpm --filter hub bench:lz4 --size 256 --chunk-size 128
+ */
+
+/**
+ * Rounded float32 weights, which compress better with byte grouping, like most model files
+ */
+function sampleChunks(size: number, chunkSize: number): Uint8Array[] {
+	const chunks: Uint8Array[] = [];
+	for (let offset = 0; offset < size; offset += chunkSize) {
+		const floats = new Float32Array(Math.min(chunkSize, size - offset) / 4);
+		for (let i = 0; i < floats.length; i++) {
+			floats[i] = Math.round(Math.sin(offset + i) * 1000) / 1000;
+		}
+		chunks.push(new Uint8Array(floats.buffer));
+	}
+	return chunks;
+}
+
+function sameBytes(a: Uint8Array, b: Uint8Array): boolean {
+	return a.byteLength === b.byteLength && a.every((byte, i) => byte === b[i]);
+}
+
+function measure<T>(label: string, size: number, fn: () => T): T {
+	const start = performance.now();
+	const result = fn();
+	const seconds = (performance.now() - start) / 1000;
+	console.log(`${label.padEnd(30)} ${(size / 1e6 / seconds).toFixed(1).padStart(8)} MB/s`);
+	return result;
+}
+
+function main() {
+	const { values: args } = parseArgs({
+		options: {
+			size: {
+				type: "string",
+				short: "s",
+				default: "512",
+			},
+			"chunk-size": {
+				type: "string",
+				short: "c",
+				default: "64",
+			},
+		},
+	});
+
+	const size = Number(args.size) * 1024 * 1024;
+	const chunks = sampleChunks(size, Number(args["chunk-size"]) * 1024);
+	const output = new Uint8Array(Math.max(...chunks.map((chunk) => chunk.byteLength)));
+
+	console.log(`Compressing ${args.size} MB in ${args["chunk-size"]} kB chunks, backend: ${xetChunkCodecBackend()}`);
+
+	const results: Record<string, Uint8Array[]> = {};
+	for (const wasm of [false, true]) {
+		setXetChunkCodecWasmEnabled(wasm);
+		const backend = xetChunkCodecBackend();
+
+		for (const byteGrouping of [false, true]) {
+			const label = `${backend}${byteGrouping ? " bg4" : ""}`;
+			const compressed = measure(`${label} compress`, size, () =>
+				chunks.map((chunk) => lz4Compress(chunk, { byteGrouping })),
+			);
+			measure(`${label} decompress`, size, () => {
+				for (const [i, frame] of compressed.entries()) {
+					lz4DecompressInto(frame, output.subarray(0, chunks[i].byteLength), { byteGrouping });
+				}
+			});
+
+			const expected = results[String(byteGrouping)];
+			if (expected && compressed.some((frame, i) => !sameBytes(frame, expected[i]))) {
+				throw new Error(`${label} compressed to different bytes than the JS implementation`);
+			}
+			results[String(byteGrouping)] = compressed;
+		}
+	}
+}
+
+main();
@@ -19,6 +19,15 @@ export type {
 } from "./types/public";
 export { HubApiError, InvalidApiResponseFormatError } from "./error";
 export { HUB_URL } from "./consts";
+export type { XetChunkStore } from "./utils/XetBlob";
+export * from "./utils/DiskXetChunkStore";
+export { ChunkCacheSnapshot } from "./utils/ChunkCacheSnapshot";
+export type { ChunkCacheSnapshotEntry } from "./utils/ChunkCacheSnapshot";
+export { XetChunkerPool, XET_CHUNKER_SEGMENT_SIZE } from "./utils/XetChunkerPool";
+export type { XetSegmentChunker } from "./utils/XetChunkerPool";
+export type { ChunkedSegment } from "./utils/chunkSegment";
+export type { TransferSchedulerOptions, TransferStat } from "./utils/TransferScheduler";
+export type { PaginateOptions } from "./utils/paginate";
 /**
  * Only exported for E2Es convenience
  */
@@ -1,14 +1,16 @@
-import { describe, test, expect, vi, beforeEach } from "vitest";
+import { describe, test, expect, vi, beforeEach, afterEach } from "vitest";
 import {
 	scanCacheDir,
+	scanCacheDirIter,
 	scanCachedRepo,
 	scanSnapshotDir,
 	parseRepoType,
 	getBlobStat,
 	type CachedFileInfo,
 } from "./cache-management";
-import { stat, readdir, realpath, lstat } from "node:fs/promises";
+import { stat, readdir, readFile, realpath, lstat, writeFile, rename } from "node:fs/promises";
 import type { Stats } from "node:fs";
+import { tmpdir } from "node:os";
 import { join } from "node:path";
 
 // Mocks
@@ -47,6 +49,76 @@ describe("scanCacheDir", () => {
 	});
 });
 
+describe("scanCacheDir on disk", () => {
+	let cacheDir: string;
+	let fs: typeof import("node:fs/promises");
+
+	beforeEach(async () => {
+		// Use the real file system for these tests
+		fs = await vi.importActual<typeof import("node:fs/promises")>("node:fs/promises");
+		vi.mocked(stat).mockImplementation(fs.stat as typeof stat);
+		vi.mocked(readdir).mockImplementation(fs.readdir as typeof readdir);
+		vi.mocked(readFile).mockImplementation(fs.readFile as typeof readFile);
+		vi.mocked(realpath).mockImplementation(fs.realpath as typeof realpath);
+		vi.mocked(lstat).mockImplementation(fs.lstat as typeof lstat);
+		vi.mocked(writeFile).mockImplementation(fs.writeFile);
+		vi.mocked(rename).mockImplementation(fs.rename);
+
+		cacheDir = await fs.mkdtemp(join(tmpdir(), "hf-cache-"));
+		for (const [repo, files] of [
+			["models--org--model", ["config.json", "model.safetensors"]],
+			["datasets--org--dataset", ["data.parquet"]],
+		] as const) {
+			await fs.mkdir(join(cacheDir, repo, "blobs"), { recursive: true });
+			await fs.mkdir(join(cacheDir, repo, "refs"));
+			await fs.mkdir(join(cacheDir, repo, "snapshots", "abc"), { recursive: true });
+			await fs.writeFile(join(cacheDir, repo, "refs", "main"), "abc");
+			for (const file of files) {
+				await fs.writeFile(join(cacheDir, repo, "blobs", file), file);
+				await fs.symlink(join("..", "..", "blobs", file), join(cacheDir, repo, "snapshots", "abc", file));
+			}
+		}
+	});
+
+	afterEach(async () => {
+		await fs.rm(cacheDir, { recursive: true, force: true });
+		await fs.rm(`${cacheDir}-index.json`, { force: true });
+	});
+
+	test("should yield each repo once scanned", async () => {
+		const names: string[] = [];
+		for await (const repo of scanCacheDirIter(cacheDir, { concurrency: 1 })) {
+			names.push(repo.id.name);
+		}
+
+		expect(names.sort()).toEqual(["org/dataset", "org/model"]);
+		const result = await scanCacheDir(cacheDir);
+		expect(result.repos.map((repo) => repo.filesCount)).toEqual([1, 2]);
+		expect(result.size).toBe("config.json".length + "model.safetensors".length + "data.parquet".length);
+	});
+
+	test("should only rescan changed repos when using an index", async () => {
+		const indexPath = `${cacheDir}-index.json`;
+		const first = await scanCacheDir(cacheDir, { indexPath });
+
+		vi.mocked(realpath).mockClear();
+		const second = await scanCacheDir(cacheDir, { indexPath });
+		expect(realpath).not.toHaveBeenCalled();
+		expect(second.repos).toEqual(first.repos);
+
+		// Add a file to the model's snapshot
+		const snapshot = join(cacheDir, "models--org--model", "snapshots", "abc");
+		await fs.writeFile(join(cacheDir, "models--org--model", "blobs", "README.md"), "README.md");
+		await fs.symlink(join("..", "..", "blobs", "README.md"), join(snapshot, "README.md"));
+		await fs.utimes(snapshot, new Date(), new Date(Date.now() + 1000));
+
+		vi.mocked(realpath).mockClear();
+		const third = await scanCacheDir(cacheDir, { indexPath });
+		expect(vi.mocked(realpath).mock.calls.every(([path]) => String(path).startsWith(snapshot))).toBe(true);
+		expect(third.repos.map((repo) => repo.filesCount)).toEqual([1, 3]);
+	});
+});
+
 describe("scanCachedRepo", () => {
 	test("should throw an error for invalid repo path", async () => {
 		await expect(() => {
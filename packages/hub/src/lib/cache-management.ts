@@ -1,8 +1,10 @@
 import { homedir } from "node:os";
-import { join, basename } from "node:path";
-import { stat, readdir, readFile, realpath, lstat } from "node:fs/promises";
+import { join, basename, dirname } from "node:path";
+import { stat, readdir, readFile, realpath, lstat, writeFile, rename } from "node:fs/promises";
 import type { Stats } from "node:fs";
 import type { RepoType, RepoId } from "../types/public";
+import { eventToGenerator } from "../utils/eventToGenerator";
+import { promisesQueueStreaming } from "../utils/promisesQueueStreaming";
 
 function getDefaultHome(): string {
 	return join(homedir(), ".cache");
@@ -29,6 +31,20 @@ export function getRepoFolderName({ name, type }: RepoId): string {
 	return parts.join(REPO_ID_SEPARATOR);
 }
 
+/**
+ * Lock file held while files are added to or removed from a cached repo, see {@link pruneCache}
+ */
+export function getRepoLockPath(repoPath: string): string {
+	return join(dirname(repoPath), ".locks", `${basename(repoPath)}.lock`);
+}
+
+/**
+ * Lock file held while a blob of a cached repo is downloaded, so that its `.incomplete` file has a single writer
+ */
+export function getBlobLockPath(repoPath: string, etag: string): string {
+	return join(dirname(repoPath), ".locks", basename(repoPath), `${etag}.lock`);
+}
+
 export interface CachedFileInfo {
 	path: string;
 	/**
@@ -69,53 +85,213 @@ export interface HFCacheInfo {
 	warnings: Error[];
 }
 
-export async function scanCacheDir(cacheDir: string | undefined = undefined): Promise<HFCacheInfo> {
-	if (!cacheDir) {
-		cacheDir = getHFHubCachePath();
-	}
+export interface ScanCacheOptions {
+	/**
+	 * Maximum number of file system operations (stat, readdir, ...) in flight at once, also the number of repos scanned concurrently
+	 *
+	 * @default 64
+	 */
+	concurrency?: number;
+	/**
+	 * Path of a JSON file where scan results are kept, along with the modification times of the directories they were read from.
+	 *
+	 * Repos whose snapshots and refs didn't change since the previous scan are read from the index instead of being scanned again.
+	 * The index is created or updated once the scan completes.
+	 *
+	 * Note that access times of repos read from the index are the ones from their last full scan.
+	 */
+	indexPath?: string;
+}
 
-	const s = await stat(cacheDir);
-	if (!s.isDirectory()) {
-		throw new Error(
-			`Scan cache expects a directory but found a file: ${cacheDir}. Please use \`cacheDir\` argument or set \`HF_HUB_CACHE\` environment variable.`,
-		);
-	}
+const DEFAULT_SCAN_CONCURRENCY = 64;
+const CACHE_INDEX_VERSION = 1;
+
+/**
+ * Runs a file system operation once a slot of the pool is available
+ */
+type FsLimit = <T>(operation: () => Promise<T>) => Promise<T>;
+
+function createFsLimit(concurrency: number): FsLimit {
+	let running = 0;
+	const waiters: Array<() => void> = [];
+	return async (operation) => {
+		if (running >= concurrency) {
+			// The slot is handed over by the operation that finishes
+			await new Promise<void>((resolve) => waiters.push(resolve));
+		} else {
+			running++;
+		}
+		try {
+			return await operation();
+		} finally {
+			const next = waiters.shift();
+			if (next) {
+				next();
+			} else {
+				running--;
+			}
+		}
+	};
+}
 
-	const repos: CachedRepoInfo[] = [];
-	const warnings: Error[] = [];
+const unlimited: FsLimit = (operation) => operation();
 
-	const directories = await readdir(cacheDir);
-	for (const repo of directories) {
-		// skip .locks folder
-		if (repo === ".locks") {
-			continue;
-		}
+interface CacheIndexEntry {
+	/**
+	 * Modification times of the repo's directories and ref files, relative to the repo path
+	 */
+	mtimes: Record<string, number>;
+	repo: CachedRepoInfo;
+}
 
-		// get the absolute path of the repo
-		const absolute = join(cacheDir, repo);
+interface CacheIndex {
+	version: number;
+	repos: Record<string, CacheIndexEntry>;
+}
 
-		// ignore non-directory element
-		const s = await stat(absolute);
-		if (!s.isDirectory()) {
-			continue;
+async function readCacheIndex(indexPath: string): Promise<CacheIndex["repos"]> {
+	try {
+		const index = JSON.parse(await readFile(indexPath, "utf-8")) as CacheIndex;
+		if (index.version !== CACHE_INDEX_VERSION) {
+			return {};
 		}
-
-		try {
-			const cached = await scanCachedRepo(absolute);
-			repos.push(cached);
-		} catch (err: unknown) {
-			warnings.push(err as Error);
+		for (const entry of Object.values(index.repos)) {
+			// Dates are serialized as strings
+			const repo = entry.repo;
+			repo.lastAccessedAt = new Date(repo.lastAccessedAt);
+			repo.lastModifiedAt = new Date(repo.lastModifiedAt);
+			for (const revision of repo.revisions) {
+				revision.lastModifiedAt = new Date(revision.lastModifiedAt);
+				for (const file of revision.files) {
+					file.blob.lastAccessedAt = new Date(file.blob.lastAccessedAt);
+					file.blob.lastModifiedAt = new Date(file.blob.lastModifiedAt);
+				}
+			}
 		}
+		return index.repos;
+	} catch {
+		// Missing or corrupted index, scan everything
+		return {};
+	}
+}
+
+async function writeCacheIndex(indexPath: string, repos: CacheIndex["repos"]): Promise<void> {
+	const index: CacheIndex = { version: CACHE_INDEX_VERSION, repos };
+	const incomplete = `${indexPath}.incomplete`;
+	await writeFile(incomplete, JSON.stringify(index));
+	await rename(incomplete, indexPath);
+}
+
+async function isIndexEntryFresh(repoPath: string, entry: CacheIndexEntry, limit: FsLimit): Promise<boolean> {
+	try {
+		const stats = await Promise.all(Object.keys(entry.mtimes).map((path) => limit(() => stat(join(repoPath, path)))));
+		return Object.values(entry.mtimes).every((mtime, i) => stats[i].mtimeMs === mtime);
+	} catch {
+		return false;
+	}
+}
+
+export async function scanCacheDir(
+	cacheDir: string | undefined = undefined,
+	opts?: ScanCacheOptions,
+): Promise<HFCacheInfo> {
+	const repos: CachedRepoInfo[] = [];
+	const warnings: Error[] = [];
+
+	for await (const repo of scanCacheDirIter(cacheDir, { ...opts, onWarning: (err) => warnings.push(err) })) {
+		repos.push(repo);
 	}
+	// Repos are yielded as they finish, sort them for a stable output
+	repos.sort((a, b) => (a.path < b.path ? -1 : a.path > b.path ? 1 : 0));
 
 	return {
 		repos: repos,
-		size: [...repos.values()].reduce((sum, repo) => sum + repo.size, 0),
+		size: repos.reduce((sum, repo) => sum + repo.size, 0),
 		warnings: warnings,
 	};
 }
 
-export async function scanCachedRepo(repoPath: string): Promise<CachedRepoInfo> {
+/**
+ * Same as {@link scanCacheDir}, but yields each repo as soon as it is scanned.
+ *
+ * Repos that can't be scanned are skipped, and the error is passed to `onWarning`.
+ */
+export async function* scanCacheDirIter(
+	cacheDir: string | undefined = undefined,
+	opts?: ScanCacheOptions & { onWarning?: (err: Error) => void },
+): AsyncGenerator<CachedRepoInfo> {
+	if (!cacheDir) {
+		cacheDir = getHFHubCachePath();
+	}
+	const root = cacheDir;
+
+	const s = await stat(root);
+	if (!s.isDirectory()) {
+		throw new Error(
+			`Scan cache expects a directory but found a file: ${root}. Please use \`cacheDir\` argument or set \`HF_HUB_CACHE\` environment variable.`,
+		);
+	}
+
+	const concurrency = opts?.concurrency ?? DEFAULT_SCAN_CONCURRENCY;
+	const limit = createFsLimit(concurrency);
+	const previousIndex = opts?.indexPath ? await readCacheIndex(opts.indexPath) : {};
+	const index: CacheIndex["repos"] = {};
+
+	const directories = await limit(() => readdir(root));
+
+	yield* eventToGenerator<CachedRepoInfo, void>(async (yieldCallback, returnCallback) => {
+		await promisesQueueStreaming(
+			directories.map((repo) => async () => {
+				// skip .locks folder
+				if (repo === ".locks") {
+					return;
+				}
+
+				// get the absolute path of the repo
+				const absolute = join(root, repo);
+
+				// ignore non-directory element
+				const s = await limit(() => stat(absolute));
+				if (!s.isDirectory()) {
+					return;
+				}
+
+				try {
+					const previous = previousIndex[repo];
+					if (previous && (await isIndexEntryFresh(absolute, previous, limit))) {
+						index[repo] = previous;
+						yieldCallback(previous.repo);
+						return;
+					}
+					const mtimes: Record<string, number> = {};
+					const cached = await scanRepo(absolute, limit, mtimes);
+					index[repo] = { mtimes, repo: cached };
+					yieldCallback(cached);
+				} catch (err: unknown) {
+					opts?.onWarning?.(err as Error);
+				}
+			}),
+			concurrency,
+		);
+		returnCallback();
+	});
+
+	if (opts?.indexPath) {
+		await writeCacheIndex(opts.indexPath, index);
+	}
+}
+
+export async function scanCachedRepo(
+	repoPath: string,
+	opts?: Pick<ScanCacheOptions, "concurrency">,
+): Promise<CachedRepoInfo> {
+	return scanRepo(repoPath, createFsLimit(opts?.concurrency ?? DEFAULT_SCAN_CONCURRENCY));
+}
+
+/**
+ * @param mtimes - If provided, filled with the modification times of the directories and ref files, taken before reading them
+ */
+async function scanRepo(repoPath: string, limit: FsLimit, mtimes?: Record<string, number>): Promise<CachedRepoInfo> {
 	// get the directory name
 	const name = basename(repoPath);
 	if (!name.includes(REPO_ID_SEPARATOR)) {
@@ -130,52 +306,58 @@ export async function scanCachedRepo(repoPath: string): Promise<CachedRepoInfo>
 	const snapshotsPath = join(repoPath, "snapshots");
 	const refsPath = join(repoPath, "refs");
 
-	const snapshotStat = await stat(snapshotsPath);
+	const [snapshotStat, refsStat] = await Promise.all([limit(() => stat(snapshotsPath)), limit(() => stat(refsPath))]);
 	if (!snapshotStat.isDirectory()) {
 		throw new Error(`Snapshots dir doesn't exist in cached repo ${snapshotsPath}`);
 	}
+	if (mtimes) {
+		mtimes["snapshots"] = snapshotStat.mtimeMs;
+		mtimes["refs"] = refsStat.mtimeMs;
+	}
 
 	// Check if the refs directory exists and scan it
 	const refsByHash: Map<string, string[]> = new Map();
-	const refsStat = await stat(refsPath);
-	if (refsStat.isDirectory()) {
-		await scanRefsDir(refsPath, refsByHash);
-	}
-
-	// Scan snapshots directory and collect cached revision information
-	const cachedRevisions: CachedRevisionInfo[] = [];
-	const blobStats: Map<string, Stats> = new Map(); // Store blob stats
-
-	const snapshotDirs = await readdir(snapshotsPath);
-	for (const dir of snapshotDirs) {
-		if (FILES_TO_IGNORE.includes(dir)) {
-			continue;
-		} // Ignore unwanted files
-
-		const revisionPath = join(snapshotsPath, dir);
-		const revisionStat = await stat(revisionPath);
-		if (!revisionStat.isDirectory()) {
-			throw new Error(`Snapshots folder corrupted. Found a file: ${revisionPath}`);
-		}
+	const blobStats: Map<string, Promise<Stats>> = new Map(); // Store blob stats, shared between snapshots
 
-		const cachedFiles: CachedFileInfo[] = [];
-		await scanSnapshotDir(revisionPath, cachedFiles, blobStats);
+	const [, snapshotDirs] = await Promise.all([
+		refsStat.isDirectory() ? readRefs(refsPath, refsByHash, limit, mtimes) : undefined,
+		limit(() => readdir(snapshotsPath)),
+	]);
 
-		const revisionLastModified =
-			cachedFiles.length > 0
-				? Math.max(...[...cachedFiles].map((file) => file.blob.lastModifiedAt.getTime()))
-				: revisionStat.mtimeMs;
-
-		cachedRevisions.push({
-			commitOid: dir,
-			files: cachedFiles,
-			refs: refsByHash.get(dir) || [],
-			size: [...cachedFiles].reduce((sum, file) => sum + file.blob.size, 0),
-			path: revisionPath,
-			lastModifiedAt: new Date(revisionLastModified),
-		});
-
-		refsByHash.delete(dir);
+	// Scan snapshots directory and collect cached revision information
+	const cachedRevisions: CachedRevisionInfo[] = await Promise.all(
+		snapshotDirs
+			.filter((dir) => !FILES_TO_IGNORE.includes(dir)) // Ignore unwanted files
+			.map(async (dir) => {
+				const revisionPath = join(snapshotsPath, dir);
+				const revisionStat = await limit(() => stat(revisionPath));
+				if (!revisionStat.isDirectory()) {
+					throw new Error(`Snapshots folder corrupted. Found a file: ${revisionPath}`);
+				}
+				if (mtimes) {
+					mtimes[join("snapshots", dir)] = revisionStat.mtimeMs;
+				}
+
+				const cachedFiles = await readSnapshot(revisionPath, blobStats, limit);
+
+				const revisionLastModified =
+					cachedFiles.length > 0
+						? Math.max(...cachedFiles.map((file) => file.blob.lastModifiedAt.getTime()))
+						: revisionStat.mtimeMs;
+
+				return {
+					commitOid: dir,
+					files: cachedFiles,
+					refs: refsByHash.get(dir) || [],
+					size: cachedFiles.reduce((sum, file) => sum + file.blob.size, 0),
+					path: revisionPath,
+					lastModifiedAt: new Date(revisionLastModified),
+				};
+			}),
+	);
+
+	for (const revision of cachedRevisions) {
+		refsByHash.delete(revision.commitOid);
 	}
 
 	// Verify that all refs refer to a valid revision
@@ -185,12 +367,10 @@ export async function scanCachedRepo(repoPath: string): Promise<CachedRepoInfo>
 		);
 	}
 
-	const repoStats = await stat(repoPath);
-	const repoLastAccessed =
-		blobStats.size > 0 ? Math.max(...[...blobStats.values()].map((stat) => stat.atimeMs)) : repoStats.atimeMs;
-
-	const repoLastModified =
-		blobStats.size > 0 ? Math.max(...[...blobStats.values()].map((stat) => stat.mtimeMs)) : repoStats.mtimeMs;
+	const stats = await Promise.all(blobStats.values());
+	const repoStats = stats.length > 0 ? undefined : await limit(() => stat(repoPath));
+	const repoLastAccessed = repoStats ? repoStats.atimeMs : Math.max(...stats.map((stat) => stat.atimeMs));
+	const repoLastModified = repoStats ? repoStats.mtimeMs : Math.max(...stats.map((stat) => stat.mtimeMs));
 
 	// Return the constructed CachedRepoInfo object
 	return {
@@ -199,29 +379,43 @@ export async function scanCachedRepo(repoPath: string): Promise<CachedRepoInfo>
 			type: repoType,
 		},
 		path: repoPath,
-		filesCount: blobStats.size,
+		filesCount: stats.length,
 		revisions: cachedRevisions,
-		size: [...blobStats.values()].reduce((sum, stat) => sum + stat.size, 0),
+		size: stats.reduce((sum, stat) => sum + stat.size, 0),
 		lastAccessedAt: new Date(repoLastAccessed),
 		lastModifiedAt: new Date(repoLastModified),
 	};
 }
 
 export async function scanRefsDir(refsPath: string, refsByHash: Map<string, string[]>): Promise<void> {
-	const refFiles = await readdir(refsPath, { withFileTypes: true });
-	for (const refFile of refFiles) {
-		const refFilePath = join(refsPath, refFile.name);
-		if (refFile.isDirectory()) {
-			continue; // Skip directories
-		}
+	await readRefs(refsPath, refsByHash, unlimited);
+}
 
-		const commitHash = await readFile(refFilePath, "utf-8");
-		const refName = refFile.name;
-		if (!refsByHash.has(commitHash)) {
-			refsByHash.set(commitHash, []);
-		}
-		refsByHash.get(commitHash)?.push(refName);
-	}
+async function readRefs(
+	refsPath: string,
+	refsByHash: Map<string, string[]>,
+	limit: FsLimit,
+	mtimes?: Record<string, number>,
+): Promise<void> {
+	const refFiles = await limit(() => readdir(refsPath, { withFileTypes: true }));
+	await Promise.all(
+		refFiles
+			.filter((refFile) => !refFile.isDirectory()) // Skip directories
+			.map(async (refFile) => {
+				const refFilePath = join(refsPath, refFile.name);
+				if (mtimes) {
+					// Refs are overwritten in place, which doesn't update the directory's mtime
+					mtimes[join("refs", refFile.name)] = (await limit(() => stat(refFilePath))).mtimeMs;
+				}
+
+				const commitHash = await limit(() => readFile(refFilePath, "utf-8"));
+				const refName = refFile.name;
+				if (!refsByHash.has(commitHash)) {
+					refsByHash.set(commitHash, []);
+				}
+				refsByHash.get(commitHash)?.push(refName);
+			}),
+	);
 }
 
 export async function scanSnapshotDir(
@@ -229,28 +423,46 @@ export async function scanSnapshotDir(
 	cachedFiles: CachedFileInfo[],
 	blobStats: Map<string, Stats>,
 ): Promise<void> {
-	const files = await readdir(revisionPath, { withFileTypes: true });
-	for (const file of files) {
-		if (file.isDirectory()) {
-			continue; // Skip directories
-		}
-
-		const filePath = join(revisionPath, file.name);
-		const blobPath = await realpath(filePath);
-		const blobStat = await getBlobStat(blobPath, blobStats);
-
-		cachedFiles.push({
-			path: filePath,
-			blob: {
-				path: blobPath,
-				size: blobStat.size,
-				lastAccessedAt: new Date(blobStat.atimeMs),
-				lastModifiedAt: new Date(blobStat.mtimeMs),
-			},
-		});
+	const pending = new Map([...blobStats].map(([path, stat]) => [path, Promise.resolve(stat)]));
+	cachedFiles.push(...(await readSnapshot(revisionPath, pending, unlimited)));
+	for (const [path, stat] of pending) {
+		blobStats.set(path, await stat);
 	}
 }
 
+async function readSnapshot(
+	revisionPath: string,
+	blobStats: Map<string, Promise<Stats>>,
+	limit: FsLimit,
+): Promise<CachedFileInfo[]> {
+	const files = await limit(() => readdir(revisionPath, { withFileTypes: true }));
+	return Promise.all(
+		files
+			.filter((file) => !file.isDirectory()) // Skip directories
+			.map(async (file) => {
+				const filePath = join(revisionPath, file.name);
+				const blobPath = await limit(() => realpath(filePath));
+				// Files of different snapshots often point to the same blob, only stat it once
+				let blobStat = blobStats.get(blobPath);
+				if (!blobStat) {
+					blobStat = limit(() => lstat(blobPath));
+					blobStats.set(blobPath, blobStat);
+				}
+				const { size, atimeMs, mtimeMs } = await blobStat;
+
+				return {
+					path: filePath,
+					blob: {
+						path: blobPath,
+						size,
+						lastAccessedAt: new Date(atimeMs),
+						lastModifiedAt: new Date(mtimeMs),
+					},
+				};
+			}),
+	);
+}
+
 export async function getBlobStat(blobPath: string, blobStats: Map<string, Stats>): Promise<Stats> {
 	const blob = blobStats.get(blobPath);
 	if (!blob) {
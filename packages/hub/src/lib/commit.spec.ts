@@ -268,4 +268,100 @@ size 4194304
 			});
 		}
 	}, 60_000);
+
+	it("should not upload LFS files the Hub already has, even if the repo is on xet", async () => {
+		const requests: string[] = [];
+		const fetch = (async (input: string | URL | Request, init?: RequestInit) => {
+			const url = input.toString();
+			requests.push(url);
+			if (url.includes("/preupload/")) {
+				return Response.json({ files: [{ path: "model.bin", uploadMode: "lfs" }] });
+			}
+			if (url.includes("/xet-write-token/")) {
+				return Response.json({ accessToken: "xet_token", casUrl: "https://cas.test", exp: Date.now() / 1000 + 3600 });
+			}
+			if (url.endsWith("/objects/batch")) {
+				const { objects } = JSON.parse(init?.body as string) as { objects: Array<{ oid: string; size: number }> };
+				// No upload action: the Hub already has the files
+				return Response.json({ transfer: "xet", objects });
+			}
+			if (url.includes("/commit/")) {
+				return Response.json({ commitOid: "commit-1", commitUrl: "https://hub.test/commit" });
+			}
+			return new Response("Not found", { status: 404 });
+		}) as typeof globalThis.fetch;
+
+		const output = await commit({
+			repo: "user/repo",
+			accessToken: "hf_token",
+			hubUrl: "https://hub.test",
+			fetch,
+			title: "Some commit",
+			operations: [{ operation: "addOrUpdate", path: "model.bin", content: new Blob([lfsContent]) }],
+		});
+
+		assert.strictEqual(output?.commit.oid, "commit-1");
+		assert.deepStrictEqual(requests, [
+			"https://hub.test/api/models/user/repo/preupload/main",
+			"https://hub.test/user/repo.git/info/lfs/objects/batch",
+			"https://hub.test/api/models/user/repo/commit/main",
+		]);
+	});
+
+	it("should wait for the other LFS uploads to stop before failing", async () => {
+		let slowUploadSettled = false;
+		const fetch = (async (input: string | URL | Request, init?: RequestInit) => {
+			const url = input.toString();
+			if (url.includes("/preupload/")) {
+				const { files } = JSON.parse(init?.body as string) as { files: Array<{ path: string }> };
+				return Response.json({ files: files.map((file) => ({ path: file.path, uploadMode: "lfs" })) });
+			}
+			if (url.endsWith("/objects/batch")) {
+				const { objects } = JSON.parse(init?.body as string) as { objects: Array<{ oid: string; size: number }> };
+				return Response.json({
+					transfer: "basic",
+					objects: objects.map((obj, i) => ({
+						...obj,
+						actions: { upload: { href: `https://storage.test/${i === 0 ? "failing" : "slow"}` } },
+					})),
+				});
+			}
+			if (url === "https://storage.test/failing") {
+				return new Response("Forbidden", { status: 403 });
+			}
+			if (url === "https://storage.test/slow") {
+				// Only stops some time after being aborted
+				return new Promise<Response>((_, reject) => {
+					init?.signal?.addEventListener("abort", () =>
+						setTimeout(() => {
+							slowUploadSettled = true;
+							reject(new DOMException("Aborted", "AbortError"));
+						}, 50),
+					);
+				});
+			}
+			return new Response("Not found", { status: 404 });
+		}) as typeof globalThis.fetch;
+
+		let error: unknown;
+		try {
+			await commit({
+				repo: "user/repo",
+				accessToken: "hf_token",
+				hubUrl: "https://hub.test",
+				fetch,
+				useXet: false,
+				title: "Some commit",
+				operations: [
+					{ operation: "addOrUpdate", path: "failing.bin", content: new Blob(["a".repeat(1000)]) },
+					{ operation: "addOrUpdate", path: "slow.bin", content: new Blob(["b".repeat(1000)]) },
+				],
+			});
+		} catch (err) {
+			error = err;
+		}
+
+		assert.match(String(error), /failing\.bin/);
+		assert.strictEqual(slowUploadSettled, true);
+	});
 });
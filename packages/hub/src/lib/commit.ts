@@ -11,11 +11,10 @@ import type {
 	ApiPreuploadRequest,
 	ApiPreuploadResponse,
 } from "../types/api/api-commit";
-import type { CredentialsParams, RepoDesignation } from "../types/public";
+import type { CredentialsParams, RepoDesignation, RepoId } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
 import { chunk } from "../utils/chunk";
 import { promisesQueue } from "../utils/promisesQueue";
-import { promisesQueueStreaming } from "../utils/promisesQueueStreaming";
 import { sha256 } from "../utils/sha256";
 import { toRepoId } from "../utils/toRepoId";
 import { WebBlob } from "../utils/WebBlob";
@@ -25,12 +24,16 @@ import { isFrontend } from "../utils/isFrontend";
 import { createBlobs } from "../utils/createBlobs";
 import type { XetTokenParams } from "../utils/uploadShards";
 import { uploadShards } from "../utils/uploadShards";
+import { xetWriteToken } from "../utils/xetWriteToken";
 import { splitAsyncGenerator } from "../utils/splitAsyncGenerator";
 import { SplicedBlob } from "../utils/SplicedBlob";
+import type { ChunkCacheSnapshot } from "../utils/ChunkCacheSnapshot";
+import type { XetChunkerPool } from "../utils/XetChunkerPool";
+import type { TransferSchedulerOptions } from "../utils/TransferScheduler";
+import { TransferScheduler } from "../utils/TransferScheduler";
+import { promisesAllOrAbort } from "../utils/promisesAllOrAbort";
 
 const CONCURRENT_SHAS = 5;
-const CONCURRENT_LFS_UPLOADS = 5;
-const MULTIPART_PARALLEL_UPLOAD = 5;
 
 export interface CommitDeletedEntry {
 	operation: "delete";
@@ -43,6 +46,10 @@ export interface CommitFile {
 	operation: "addOrUpdate";
 	path: string;
 	content: ContentSource;
+	/**
+	 * sha256 of the content, if already known (eg from a previous upload attempt), to skip hashing it
+	 */
+	sha256?: string;
 	// forceLfs?: boolean
 }
 
@@ -149,6 +156,33 @@ export type CommitParams = {
 	 * Use xet protocol: https://huggingface.co/blog/xet-on-the-hub to upload, rather than a basic S3 PUT
 	 */
 	useXet?: boolean;
+	/**
+	 * Xet dedup info from previous uploads, updated with the chunks of this commit.
+	 *
+	 * Persist it with `serialize()` after the commit succeeded, to skip re-uploading or globally querying chunks already seen.
+	 */
+	xetChunkCacheSnapshot?: ChunkCacheSnapshot;
+	/**
+	 * Workers chunking and hashing large files in parallel for xet uploads, instead of on the main thread.
+	 */
+	xetChunkerPool?: XetChunkerPool;
+	/**
+	 * Upload LFS files to xet while computing their sha256, reading them once instead of twice.
+	 *
+	 * Files are then uploaded before the LFS batch call, even those the Hub already has,
+	 * and uploaded a second time if the batch call doesn't pick xet.
+	 * Only worth it for new content, in repos known to be on xet.
+	 *
+	 * @default false
+	 */
+	xetHashWhileUploading?: boolean;
+	/**
+	 * Tuning of LFS uploads when not using xet. All files and parts of multipart uploads share a byte budget
+	 * and a concurrency limit, adjusted to the measured throughput. Failed parts are retried individually.
+	 *
+	 * Use `onStat` to get the throughput of each uploaded file or part.
+	 */
+	lfsUploads?: TransferSchedulerOptions;
 	// Credentials are optional due to custom fetch functions or cookie auth
 } & Partial<CredentialsParams>;
 
@@ -181,6 +215,16 @@ export type CommitProgressEvent =
 			path: string;
 			progress: number;
 			state: "hashing" | "uploading" | "error";
+	  }
+	| {
+			/**
+			 * The hashes of a LFS file are known. Can be sent twice for a file,
+			 * the second time with its xet hash after it's uploaded.
+			 */
+			event: "fileHashed";
+			path: string;
+			sha256: string;
+			xetHash?: string;
 	  };
 
 /**
@@ -205,6 +249,8 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 	yield { event: "phase", phase: "preuploading" };
 
 	let useXet = params.useXet ?? true;
+	// Shared by all batches of files, so that the tuned concurrency carries over
+	const lfsScheduler = new TransferScheduler(params.lfsUploads);
 
 	const lfsShas = new Map<string, string | null>();
 
@@ -261,6 +307,8 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 						...operation,
 						content: blob.blob,
 						path: blob.path,
+						// The sha256 is for a single file, not a folder
+						sha256: lazyBlobs.length === 1 ? operation.sha256 : undefined,
 					}));
 				}),
 			)
@@ -312,16 +360,56 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 
 		yield { event: "phase", phase: "uploadingLargeFiles" };
 
+		// When asked, and if the repo gives xet write tokens without an LFS batch call, files are uploaded to xet
+		// and hashed in the same pass, instead of being read a first time to get the sha256s needed by the LFS batch call
+		let fusedXetParams =
+			useXet && params.xetHashWhileUploading && lfsShas.size > 0
+				? await fetchRepoXetParams({
+						accessToken,
+						fetch: params.fetch,
+						hubUrl: params.hubUrl ?? HUB_URL,
+						repo: repoId,
+						rev: params.branch ?? "main",
+					})
+				: null;
+
 		for (const operations of chunk(
 			allOperations.filter(isFileOperation).filter((op) => lfsShas.has(op.path)),
 			100,
 		)) {
-			const shas = yield* eventToGenerator<
-				{ event: "fileProgress"; state: "hashing"; path: string; progress: number },
-				string[]
-			>((yieldCallback, returnCallback, rejectCallack) => {
+			// Files uploaded to xet while being hashed
+			const uploadedToXet = new Set<string>();
+			const unhashed = operations.filter((op) => !op.sha256);
+			if (fusedXetParams && unhashed.length > 0) {
+				const source = (async function* () {
+					for (const op of unhashed) {
+						abortSignal?.throwIfAborted();
+						yield { content: op.content, path: op.path };
+					}
+				})();
+				yield* uploadXetFiles(source, {
+					...params,
+					accessToken,
+					repo: repoId,
+					xetParams: fusedXetParams,
+					computeSha256: true,
+					onFile: (path, sha256) => {
+						if (sha256) {
+							lfsShas.set(path, sha256);
+							uploadedToXet.add(path);
+						}
+					},
+				});
+			}
+
+			const shas = yield* eventToGenerator<CommitProgressEvent, string[]>((yieldCallback, returnCallback, rejectCallack) => {
 				return promisesQueue(
 					operations.map((op) => async () => {
+						const knownSha = op.sha256 ?? lfsShas.get(op.path);
+						if (knownSha) {
+							lfsShas.set(op.path, knownSha);
+							return knownSha;
+						}
 						const iterator = sha256(op.content, { useWebWorker: params.useWebWorkers, abortSignal: abortSignal });
 						let res: IteratorResult<number, string>;
 						do {
@@ -332,6 +420,7 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 						} while (!res.done);
 						const sha = res.value;
 						lfsShas.set(op.path, res.value);
+						yieldCallback({ event: "fileHashed", path: op.path, sha256: sha });
 						return sha;
 					}),
 					CONCURRENT_SHAS,
@@ -383,6 +472,8 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 
 			if (useXet && json.transfer !== "xet") {
 				useXet = false;
+				// The files already uploaded to xet need to be uploaded again to LFS storage
+				fusedXetParams = null;
 			}
 
 			let xetParams: XetTokenParams | null = null;
@@ -424,59 +515,27 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 						};
 					}
 				}
-				const source = (async function* () {
-					for (const obj of json.objects) {
-						const op = shaToOperation.get(obj.oid);
-						if (!op || !obj.actions?.upload) {
-							continue;
-						}
-						abortSignal?.throwIfAborted();
-						yield { content: op.content, path: op.path, sha256: obj.oid };
-					}
-				})();
 				if (xetParams) {
-					const fixedXetParams = xetParams;
-					const sources = splitAsyncGenerator(source, 5);
-					yield* eventToGenerator((yieldCallback, returnCallback, rejectCallback) =>
-						Promise.all(
-							sources.map(async function (source) {
-								for await (const event of uploadShards(source, {
-									fetch: params.fetch,
-									accessToken,
-									hubUrl: params.hubUrl ?? HUB_URL,
-									repo: repoId,
-									xetParams: fixedXetParams,
-									// todo: maybe leave empty if PR?
-									rev: params.branch ?? "main",
-									isPullRequest: params.isPullRequest,
-									yieldCallback: (event) => yieldCallback({ ...event, state: "uploading" }),
-								})) {
-									if (event.event === "file") {
-										yieldCallback({
-											event: "fileProgress" as const,
-											path: event.path,
-											progress: 1,
-											state: "uploading" as const,
-										});
-									} else if (event.event === "fileProgress") {
-										yieldCallback({
-											event: "fileProgress" as const,
-											path: event.path,
-											progress: event.progress,
-											state: "uploading" as const,
-										});
-									}
-								}
-							}),
-						).then(() => returnCallback(undefined), rejectCallback),
-					);
+					const source = (async function* () {
+						for (const obj of json.objects) {
+							const op = shaToOperation.get(obj.oid);
+							if (!op || !obj.actions?.upload || uploadedToXet.has(op.path)) {
+								continue;
+							}
+							abortSignal?.throwIfAborted();
+							yield { content: op.content, path: op.path, sha256: obj.oid };
+						}
+					})();
+					yield* uploadXetFiles(source, { ...params, accessToken, repo: repoId, xetParams });
 				} else {
 					// No LFS file to upload
 				}
 			} else {
 				yield* eventToGenerator<CommitProgressEvent, void>((yieldCallback, returnCallback, rejectCallback) => {
-					return promisesQueueStreaming(
-						json.objects.map((obj) => async () => {
+					// Concurrency is handled by lfsScheduler, for files and parts alike.
+					// If an upload fails, the others are aborted and awaited before the commit fails
+					return promisesAllOrAbort(
+						json.objects.map(async (obj) => {
 							const op = shaToOperation.get(obj.oid);
 
 							if (!op) {
@@ -535,47 +594,56 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 								const progressCallback = (progress: number) =>
 									yieldCallback({ event: "fileProgress", path: op.path, progress, state: "uploading" });
 
-								await promisesQueueStreaming(
-									parts.map((part) => async () => {
-										abortSignal?.throwIfAborted();
-
+								await promisesAllOrAbort(
+									parts.map(async (part) => {
 										const index = parseInt(part) - 1;
 										const slice = content.slice(index * chunkSize, (index + 1) * chunkSize);
 
-										const res = await (params.fetch ?? fetch)(header[part], {
-											method: "PUT",
-											/** Unfortunately, browsers don't support our inherited version of Blob in fetch calls */
-											body: slice instanceof WebBlob && isFrontend ? await slice.arrayBuffer() : slice,
-											signal: abortSignal,
-											...({
-												progressHint: {
-													path: op.path,
-													part: index,
-													numParts: parts.length,
-													progressCallback,
-												},
-												// eslint-disable-next-line @typescript-eslint/no-explicit-any
-											} as any),
-										});
-
-										if (!res.ok) {
-											throw await createApiError(res, {
-												requestId: batchRequestId,
-												message: `Error while uploading part ${part} of ${
-													operations[shas.indexOf(obj.oid)].path
-												} to LFS storage`,
-											});
-										}
-
-										const eTag = res.headers.get("ETag");
-
-										if (!eTag) {
-											throw new Error("Cannot get ETag of part during multipart upload");
-										}
+										// Retried as a whole by the scheduler, so the body is recreated for each attempt
+										const eTag = await lfsScheduler.run(
+											{ path: op.path, part: +part, bytes: slice.size },
+											async () => {
+												abortSignal?.throwIfAborted();
+
+												const res = await (params.fetch ?? fetch)(header[part], {
+													method: "PUT",
+													/** Unfortunately, browsers don't support our inherited version of Blob in fetch calls */
+													body: slice instanceof WebBlob && isFrontend ? await slice.arrayBuffer() : slice,
+													signal: abortSignal,
+													...({
+														progressHint: {
+															path: op.path,
+															part: index,
+															numParts: parts.length,
+															progressCallback,
+														},
+														// eslint-disable-next-line @typescript-eslint/no-explicit-any
+													} as any),
+												});
+
+												if (!res.ok) {
+													throw await createApiError(res, {
+														requestId: batchRequestId,
+														message: `Error while uploading part ${part} of ${
+															operations[shas.indexOf(obj.oid)].path
+														} to LFS storage`,
+													});
+												}
+
+												const eTag = res.headers.get("ETag");
+
+												if (!eTag) {
+													throw new Error("Cannot get ETag of part during multipart upload");
+												}
+
+												return eTag;
+											},
+											{ signal: abortSignal },
+										);
 
 										completeReq.parts[Number(part) - 1].etag = eTag;
 									}),
-									MULTIPART_PARALLEL_UPLOAD,
+									abortController,
 								);
 
 								abortSignal?.throwIfAborted();
@@ -606,35 +674,45 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 									state: "uploading",
 								});
 							} else {
-								const res = await (params.fetch ?? fetch)(obj.actions.upload.href, {
-									method: "PUT",
-									headers: {
-										...(batchRequestId ? { "X-Request-Id": batchRequestId } : undefined),
-									},
-									/** Unfortunately, browsers don't support our inherited version of Blob in fetch calls */
-									body: content instanceof WebBlob && isFrontend ? await content.arrayBuffer() : content,
-									signal: abortSignal,
-									...({
-										progressHint: {
-											path: op.path,
-											progressCallback: (progress: number) =>
-												yieldCallback({
-													event: "fileProgress",
+								const uploadUrl = obj.actions.upload.href;
+
+								await lfsScheduler.run(
+									{ path: op.path, bytes: content.size },
+									async () => {
+										abortSignal?.throwIfAborted();
+
+										const res = await (params.fetch ?? fetch)(uploadUrl, {
+											method: "PUT",
+											headers: {
+												...(batchRequestId ? { "X-Request-Id": batchRequestId } : undefined),
+											},
+											/** Unfortunately, browsers don't support our inherited version of Blob in fetch calls */
+											body: content instanceof WebBlob && isFrontend ? await content.arrayBuffer() : content,
+											signal: abortSignal,
+											...({
+												progressHint: {
 													path: op.path,
-													progress,
-													state: "uploading",
-												}),
-										},
-										// eslint-disable-next-line @typescript-eslint/no-explicit-any
-									} as any),
-								});
+													progressCallback: (progress: number) =>
+														yieldCallback({
+															event: "fileProgress",
+															path: op.path,
+															progress,
+															state: "uploading",
+														}),
+												},
+												// eslint-disable-next-line @typescript-eslint/no-explicit-any
+											} as any),
+										});
 
-								if (!res.ok) {
-									throw await createApiError(res, {
-										requestId: batchRequestId,
-										message: `Error while uploading ${operations[shas.indexOf(obj.oid)].path} to LFS storage`,
-									});
-								}
+										if (!res.ok) {
+											throw await createApiError(res, {
+												requestId: batchRequestId,
+												message: `Error while uploading ${operations[shas.indexOf(obj.oid)].path} to LFS storage`,
+											});
+										}
+									},
+									{ signal: abortSignal },
+								);
 
 								yieldCallback({
 									event: "fileProgress",
@@ -644,8 +722,8 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 								});
 							}
 						}),
-						CONCURRENT_LFS_UPLOADS,
-					).then(returnCallback, rejectCallback);
+						abortController,
+					).then(() => returnCallback(undefined), rejectCallback);
 				});
 			}
 		}
@@ -745,6 +823,93 @@ export async function* commitIter(params: CommitParams): AsyncGenerator<CommitPr
 	}
 }
 
+/**
+ * Xet upload params from the repo's write token endpoint, or null if it doesn't give one (eg the repo is not on xet)
+ */
+async function fetchRepoXetParams(params: {
+	accessToken: string | undefined;
+	fetch?: typeof fetch;
+	hubUrl: string;
+	repo: RepoId;
+	rev: string;
+}): Promise<XetTokenParams | null> {
+	const xetParams: XetTokenParams = {
+		sessionId: crypto.randomUUID(),
+		refreshWriteTokenUrl: `${params.hubUrl}/api/${params.repo.type}s/${params.repo.name}/xet-write-token/${encodeURIComponent(
+			params.rev,
+		)}`,
+	};
+	try {
+		await xetWriteToken({ accessToken: params.accessToken, fetch: params.fetch, xetParams });
+		return xetParams;
+	} catch {
+		// The LFS batch call will decide whether to use xet, after hashing the files
+		return null;
+	}
+}
+
+/**
+ * Uploads files to xet, 5 at a time, and reports progress for them
+ */
+async function* uploadXetFiles(
+	source: AsyncGenerator<{ content: Blob; path: string; sha256?: string }>,
+	params: Pick<
+		CommitParams,
+		"fetch" | "hubUrl" | "branch" | "isPullRequest" | "xetChunkCacheSnapshot" | "xetChunkerPool"
+	> & {
+		accessToken: string | undefined;
+		repo: RepoId;
+		xetParams: XetTokenParams;
+		computeSha256?: boolean;
+		/**
+		 * Called once a file is uploaded, with its sha256 if known
+		 */
+		onFile?: (path: string, sha256: string | undefined) => void;
+	},
+): AsyncGenerator<CommitProgressEvent> {
+	const sources = splitAsyncGenerator(source, 5);
+	yield* eventToGenerator<CommitProgressEvent, void>((yieldCallback, returnCallback, rejectCallback) =>
+		Promise.all(
+			sources.map(async function (source) {
+				for await (const event of uploadShards(source, {
+					fetch: params.fetch,
+					accessToken: params.accessToken,
+					hubUrl: params.hubUrl ?? HUB_URL,
+					repo: params.repo,
+					xetParams: params.xetParams,
+					// todo: maybe leave empty if PR?
+					rev: params.branch ?? "main",
+					isPullRequest: params.isPullRequest,
+					chunkCacheSnapshot: params.xetChunkCacheSnapshot,
+					chunkerPool: params.xetChunkerPool,
+					computeSha256: params.computeSha256,
+					yieldCallback: (event) => yieldCallback({ ...event, state: "uploading" }),
+				})) {
+					if (event.event === "file") {
+						params.onFile?.(event.path, event.sha256);
+						if (event.sha256) {
+							yieldCallback({ event: "fileHashed", path: event.path, sha256: event.sha256, xetHash: event.xetHash });
+						}
+						yieldCallback({
+							event: "fileProgress" as const,
+							path: event.path,
+							progress: 1,
+							state: "uploading" as const,
+						});
+					} else if (event.event === "fileProgress") {
+						yieldCallback({
+							event: "fileProgress" as const,
+							path: event.path,
+							progress: event.progress,
+							state: "uploading" as const,
+						});
+					}
+				}
+			}),
+		).then(() => returnCallback(undefined), rejectCallback),
+	);
+}
+
 export async function* commitIterBucket(params: CommitParams): AsyncGenerator<CommitProgressEvent> {
 	const accessToken = checkCredentials(params);
 	const repoId = toRepoId(params.repo);
@@ -841,6 +1006,8 @@ export async function* commitIterBucket(params: CommitParams): AsyncGenerator<Co
 							repo: repoId,
 							xetParams,
 							rev: params.branch ?? "main",
+							chunkCacheSnapshot: params.xetChunkCacheSnapshot,
+							chunkerPool: params.xetChunkerPool,
 							yieldCallback: (event) => yieldCallback({ ...event, state: "uploading" }),
 						})) {
 							if (event.event === "file") {
@@ -4,10 +4,11 @@ import { dirname, join } from "node:path";
 import { lstat, mkdir, stat, symlink, rename } from "node:fs/promises";
 import { pathsInfo } from "./paths-info";
 import { createWriteStream, type Stats } from "node:fs";
-import { getHFHubCachePath, getRepoFolderName } from "./cache-management";
+import { getBlobLockPath, getHFHubCachePath, getRepoFolderName, getRepoLockPath } from "./cache-management";
 import { toRepoId } from "../utils/toRepoId";
 import { downloadFileToCacheDir } from "./download-file-to-cache-dir";
 import { createSymlink } from "../utils/symlink";
+import { withLockFile } from "../utils/lockFile";
 
 vi.mock("node:fs/promises", () => ({
 	rename: vi.fn(),
@@ -29,6 +30,10 @@ vi.mock("../utils/symlink", () => ({
 	createSymlink: vi.fn(),
 }));
 
+vi.mock("../utils/lockFile", () => ({
+	withLockFile: vi.fn(),
+}));
+
 const DUMMY_REPO: RepoId = {
 	name: "hello-world",
 	type: "model",
@@ -65,6 +70,7 @@ describe("downloadFileToCacheDir", () => {
 	const fetchMock: typeof fetch = vi.fn();
 	beforeEach(() => {
 		vi.resetAllMocks();
+		vi.mocked(withLockFile).mockImplementation((_lockPath, fn) => fn());
 		// mock 200 request
 		vi.mocked(fetchMock).mockResolvedValue(
 			new Response("dummy-body", {
@@ -303,4 +309,100 @@ describe("downloadFileToCacheDir", () => {
 		// 3. should create symlink pointing to blob
 		expect(createSymlink).toHaveBeenCalledWith({ sourcePath: expectedBlob, finalPath: expectPointer });
 	});
+
+	test("should resume an existing incomplete file with a range request", async () => {
+		const expectedBlob = _getBlobFile({
+			repo: DUMMY_REPO,
+			etag: DUMMY_ETAG,
+		});
+		const incomplete = `${expectedBlob}.incomplete`;
+
+		// only the incomplete file exists
+		vi.mocked(stat).mockImplementation(async (path) => {
+			if (path === incomplete) {
+				return { size: 20 } as Stats;
+			}
+			throw new Error("Do not exists");
+		});
+		vi.mocked(fetchMock).mockImplementation(
+			async () =>
+				new Response("dummy-body", {
+					status: 206,
+					headers: {
+						etag: DUMMY_ETAG,
+						"Content-Range": "bytes 0-0/55",
+					},
+				}),
+		);
+
+		// eslint-disable-next-line @typescript-eslint/no-explicit-any
+		vi.mocked(createWriteStream).mockReturnValue(async function* () {} as any);
+
+		await downloadFileToCacheDir({
+			repo: DUMMY_REPO,
+			path: "/README.md",
+			fetch: fetchMock,
+			revision: "dd4bc8b21efa05ec961e3efc4ee5e3832a3679c7",
+			pathInfo: { oid: DUMMY_ETAG },
+		});
+
+		// no pathsInfo round trip when pathInfo is provided
+		expect(pathsInfo).not.toHaveBeenCalled();
+		expect(createWriteStream).toHaveBeenCalledWith(incomplete, { flags: "a" });
+		expect(fetchMock).toHaveBeenCalledWith(
+			expect.anything(),
+			expect.objectContaining({ headers: expect.objectContaining({ Range: "bytes=20-54" }) }),
+		);
+		expect(rename).toHaveBeenCalledWith(incomplete, expectedBlob);
+	});
+
+	test("should hold the blob's lock while downloading and resuming", async () => {
+		const repoPath = join(getHFHubCachePath(), getRepoFolderName(DUMMY_REPO));
+		const expectedBlob = _getBlobFile({
+			repo: DUMMY_REPO,
+			etag: DUMMY_ETAG,
+		});
+		const incomplete = `${expectedBlob}.incomplete`;
+
+		const held = new Set<string>();
+		vi.mocked(withLockFile).mockImplementation(async (lockPath, fn) => {
+			held.add(lockPath);
+			try {
+				return await fn();
+			} finally {
+				held.delete(lockPath);
+			}
+		});
+		const locksWhen: Record<string, string[]> = {};
+		vi.mocked(stat).mockImplementation(async (path) => {
+			if (path === incomplete) {
+				locksWhen.resume = [...held];
+				return { size: 20 } as Stats;
+			}
+			throw new Error("Do not exists");
+		});
+		vi.mocked(createWriteStream).mockImplementation(() => {
+			locksWhen.write = [...held];
+			// eslint-disable-next-line @typescript-eslint/no-explicit-any
+			return async function* () {} as any;
+		});
+		vi.mocked(rename).mockImplementation(async () => {
+			locksWhen.rename = [...held];
+		});
+
+		await downloadFileToCacheDir({
+			repo: DUMMY_REPO,
+			path: "/README.md",
+			fetch: fetchMock,
+			revision: "dd4bc8b21efa05ec961e3efc4ee5e3832a3679c7",
+			pathInfo: { oid: DUMMY_ETAG },
+		});
+
+		const blobLock = getBlobLockPath(repoPath, DUMMY_ETAG);
+		expect(locksWhen).toEqual({
+			resume: [blobLock],
+			write: [blobLock],
+			rename: [blobLock, getRepoLockPath(repoPath)],
+		});
+	});
 });
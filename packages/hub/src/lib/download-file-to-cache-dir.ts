@@ -1,12 +1,14 @@
-import { getHFHubCachePath, getRepoFolderName } from "./cache-management";
+import { getBlobLockPath, getHFHubCachePath, getRepoFolderName, getRepoLockPath } from "./cache-management";
 import { dirname, join } from "node:path";
 import { rename, lstat, mkdir, stat } from "node:fs/promises";
 import type { PathInfo } from "./paths-info";
 import { pathsInfo } from "./paths-info";
 import type { CredentialsParams, RepoDesignation } from "../types/public";
+import type { XetChunkStore } from "../utils/XetBlob";
 import { toRepoId } from "../utils/toRepoId";
 import { downloadFile } from "./download-file";
 import { createSymlink } from "../utils/symlink";
+import { withLockFile } from "../utils/lockFile";
 import { Readable } from "node:stream";
 import type { ReadableStream } from "node:stream/web";
 import { pipeline } from "node:stream/promises";
@@ -37,6 +39,17 @@ async function exists(path: string, followSymlinks?: boolean): Promise<boolean>
 	}
 }
 
+/**
+ * @returns the size of the file, or 0 if it doesn't exist
+ */
+async function fileSize(path: string): Promise<number> {
+	try {
+		return (await stat(path)).size;
+	} catch (err: unknown) {
+		return 0;
+	}
+}
+
 /**
  * Download a given file if it's not already present in the local cache.
  * @param params
@@ -64,6 +77,22 @@ export async function downloadFileToCacheDir(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
+		/**
+		 * For xet files, local store of decoded chunks shared across downloads, eg a {@link DiskXetChunkStore}.
+		 */
+		xetChunkStore?: XetChunkStore;
+		/**
+		 * Info about the file, for example an entry returned by {@link listFiles}, to save the {@link pathsInfo} round trip.
+		 *
+		 * Only used when `revision` is a commit hash.
+		 */
+		pathInfo?: Pick<PathInfo, "oid" | "lfs" | "xetHash">;
+		/**
+		 * Resume an interrupted download from its `.incomplete` file, using a range request for the missing bytes.
+		 *
+		 * @default true
+		 */
+		resume?: boolean;
 	} & Partial<CredentialsParams>,
 ): Promise<string> {
 	const repoId = toRepoId(params.repo);
@@ -84,17 +113,22 @@ export async function downloadFileToCacheDir(
 		}
 	}
 
-	const pathsInformation: PathInfo[] = await pathsInfo({
-		...params,
-		paths: [params.path],
-		revision,
-		expand: true,
-	});
-	if (!pathsInformation || pathsInformation.length !== 1) {
-		throw new Error(`cannot get path info for ${params.path}`);
+	let info: Pick<PathInfo, "oid" | "lfs" | "xetHash" | "lastCommit">;
+	if (commitHash && params.pathInfo) {
+		info = params.pathInfo;
+	} else {
+		const pathsInformation: PathInfo[] = await pathsInfo({
+			...params,
+			paths: [params.path],
+			revision,
+			expand: true,
+		});
+		if (!pathsInformation || pathsInformation.length !== 1) {
+			throw new Error(`cannot get path info for ${params.path}`);
+		}
+		info = pathsInformation[0];
 	}
 
-	const info = pathsInformation[0];
 	let etag: string;
 	if (info.lfs) {
 		etag = info.lfs.oid;
@@ -114,35 +148,63 @@ export async function downloadFileToCacheDir(
 		return pointerPath;
 	}
 
-	// mkdir blob and pointer path parent directory
+	// mkdir blob parent directory
 	await mkdir(dirname(blobPath), { recursive: true });
-	await mkdir(dirname(pointerPath), { recursive: true });
 
-	// We might already have the blob but not the pointer
-	// shortcut the download if needed
-	if (await exists(blobPath)) {
-		// create symlinks in snapshot folder to blob object
-		await createSymlink({ sourcePath: blobPath, finalPath: pointerPath });
-		return pointerPath;
-	}
+	// Files are only added to the cache while holding the repo's lock, so that pruneCache doesn't remove them at the same time
+	const lockPath = getRepoLockPath(storageFolder);
+
+	// The blob's lock is held during the whole download, so that other downloads of the same blob, in this process
+	// or another, wait for it instead of writing to the same `.incomplete` file
+	return withLockFile(getBlobLockPath(storageFolder, etag), async () => {
+		// We might already have the blob but not the pointer
+		// shortcut the download if needed
+		const linked = await withLockFile(lockPath, async () => {
+			if (!(await exists(blobPath))) {
+				return false;
+			}
+			// create symlinks in snapshot folder to blob object
+			await mkdir(dirname(pointerPath), { recursive: true });
+			await createSymlink({ sourcePath: blobPath, finalPath: pointerPath });
+			return true;
+		});
+		if (linked) {
+			return pointerPath;
+		}
 
-	const incomplete = `${blobPath}.incomplete`;
-	console.debug(`Downloading ${params.path} to ${incomplete}`);
+		const incomplete = `${blobPath}.incomplete`;
+		const incompleteSize = params.resume === false ? 0 : await fileSize(incomplete);
 
-	const blob: Blob | null = await downloadFile({
-		...params,
-		revision,
-	});
+		const blob: Blob | null = await downloadFile({
+			...params,
+			revision,
+		});
 
-	if (!blob) {
-		throw new Error(`invalid response for file ${params.path}`);
-	}
+		if (!blob) {
+			throw new Error(`invalid response for file ${params.path}`);
+		}
 
-	await pipeline(Readable.fromWeb(blob.stream() as ReadableStream), createWriteStream(incomplete));
+		if (incompleteSize > 0 && incompleteSize <= blob.size) {
+			// The blob is content-addressed, so the bytes already on disk are still valid: only fetch the rest
+			if (incompleteSize < blob.size) {
+				console.debug(`Resuming download of ${params.path} to ${incomplete} from byte ${incompleteSize}`);
+				await pipeline(
+					Readable.fromWeb(blob.slice(incompleteSize).stream() as ReadableStream),
+					createWriteStream(incomplete, { flags: "a" }),
+				);
+			}
+		} else {
+			console.debug(`Downloading ${params.path} to ${incomplete}`);
+			await pipeline(Readable.fromWeb(blob.stream() as ReadableStream), createWriteStream(incomplete));
+		}
 
-	// rename .incomplete file to expect blob
-	await rename(incomplete, blobPath);
-	// create symlinks in snapshot folder to blob object
-	await createSymlink({ sourcePath: blobPath, finalPath: pointerPath });
-	return pointerPath;
+		await withLockFile(lockPath, async () => {
+			// rename .incomplete file to expect blob
+			await rename(incomplete, blobPath);
+			// create symlinks in snapshot folder to blob object
+			await mkdir(dirname(pointerPath), { recursive: true });
+			await createSymlink({ sourcePath: blobPath, finalPath: pointerPath });
+		});
+		return pointerPath;
+	});
 }
@@ -3,7 +3,7 @@ import { checkCredentials } from "../utils/checkCredentials";
 import { WebBlob } from "../utils/WebBlob";
 import { XetBlob } from "../utils/XetBlob";
 import type { ParallelDownloadOptions } from "../utils/XetBlob";
-import type { XetReadToken } from "../utils/XetBlob";
+import type { XetChunkStore, XetReadToken } from "../utils/XetBlob";
 import type { FileDownloadInfoOutput } from "./file-download-info";
 import { fileDownloadInfo } from "./file-download-info";
 
@@ -53,6 +53,12 @@ export async function downloadFile(
 		 * @default true
 		 */
 		parallelDownloads?: boolean | ParallelDownloadOptions;
+		/**
+		 * For xet files, local store of decoded chunks shared across downloads, eg a {@link DiskXetChunkStore}.
+		 *
+		 * Chunks already in the store are not downloaded again, eg when downloading a new revision of a file.
+		 */
+		xetChunkStore?: XetChunkStore;
 	} & Partial<CredentialsParams>,
 ): Promise<Blob | null> {
 	const accessToken = checkCredentials(params);
@@ -82,6 +88,7 @@ export async function downloadFile(
 			size: info.size,
 			readToken: typeof params.xet === "object" ? params.xet.readToken : undefined,
 			parallelDownloads: params.parallelDownloads,
+			chunkStore: params.xetChunkStore,
 		});
 	}
 
@@ -28,10 +28,13 @@ export * from "./oauth-handle-redirect";
 export * from "./oauth-login-url";
 export * from "./parse-safetensors-metadata";
 export * from "./paths-info";
+export * from "./prune-cache";
 export * from "./repo-exists";
 export * from "./snapshot-download";
 export * from "./space-info";
+export * from "./tensor-reader";
 export * from "./upload-file";
 export * from "./upload-files";
 export * from "./upload-files-with-progress";
+export * from "./upload-large-folder";
 export * from "./who-am-i";
@@ -1,8 +1,8 @@
 import { HUB_URL } from "../consts";
-import { createApiError } from "../error";
 import type { CredentialsParams } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
-import { parseLinkHeader } from "../utils/parseLinkHeader";
+import type { PaginateOptions } from "../utils/paginate";
+import { paginate } from "../utils/paginate";
 import type { ApiCollectionInfo } from "../types/api/api-collection";
 
 /*
@@ -40,7 +40,7 @@ export async function* listCollections(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
-	} & Partial<CredentialsParams>,
+	} & Partial<CredentialsParams> & PaginateOptions,
 ): AsyncGenerator<ApiCollectionInfo> {
 	const accessToken = params && checkCredentials(params);
 
@@ -69,34 +69,22 @@ export async function* listCollections(
 		searchParams.append("q", params.search.q);
 	}
 
-	let url: string | undefined = `${params?.hubUrl || HUB_URL}/api/collections?${searchParams}`;
+	const url = `${params?.hubUrl || HUB_URL}/api/collections?${searchParams}`;
 
-	while (url) {
-		const res: Response = await (params?.fetch ?? fetch)(url, {
-			headers: {
-				accept: "application/json",
-				...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
-			},
-		});
+	for await (const collection of paginate<ApiCollectionInfo>(url, {
+		headers: {
+			accept: "application/json",
+			...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
+		},
+		fetch: params?.fetch,
+		prefetchPages: params?.prefetchPages,
+	})) {
+		yield collection;
 
-		if (!res.ok) {
-			throw await createApiError(res);
-		}
-
-		const collections: ApiCollectionInfo[] = await res.json();
-
-		for (const collection of collections) {
-			yield collection;
+		totalToFetch--;
 
-			totalToFetch--;
-
-			if (totalToFetch <= 0) {
-				return;
-			}
+		if (totalToFetch <= 0) {
+			return;
 		}
-
-		const linkHeader = res.headers.get("Link");
-
-		url = linkHeader ? parseLinkHeader(linkHeader).next : undefined;
 	}
 }
@@ -1,9 +1,9 @@
 import { HUB_URL } from "../consts";
-import { createApiError } from "../error";
 import type { ApiDatasetInfo } from "../types/api/api-dataset";
 import type { CredentialsParams } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
-import { parseLinkHeader } from "../utils/parseLinkHeader";
+import type { PaginateOptions } from "../utils/paginate";
+import { paginate } from "../utils/paginate";
 import { pick } from "../utils/pick";
 
 export const DATASET_EXPAND_KEYS = [
@@ -79,7 +79,7 @@ export async function* listDatasets<
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
-	} & Partial<CredentialsParams>,
+	} & Partial<CredentialsParams> & PaginateOptions,
 ): AsyncGenerator<DatasetEntry & Pick<ApiDatasetInfo, T>> {
 	const accessToken = params && checkCredentials(params);
 	let totalToFetch = params?.limit ?? Infinity;
@@ -94,42 +94,29 @@ export async function* listDatasets<
 		...DATASET_EXPAND_KEYS.map((val) => ["expand", val] satisfies [string, string]),
 		...(params?.additionalFields?.map((val) => ["expand", val] satisfies [string, string]) ?? []),
 	]).toString();
-	let url: string | undefined = `${params?.hubUrl || HUB_URL}/api/datasets` + (search ? "?" + search : "");
+	const url = `${params?.hubUrl || HUB_URL}/api/datasets` + (search ? "?" + search : "");
 
-	while (url) {
-		const res: Response = await (params?.fetch ?? fetch)(url, {
-			headers: {
-				accept: "application/json",
-				...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
-			},
-		});
-
-		if (!res.ok) {
-			throw await createApiError(res);
-		}
-
-		const items: ApiDatasetInfo[] = await res.json();
-
-		for (const item of items) {
-			yield {
-				...(params?.additionalFields && pick(item, params.additionalFields)),
-				id: item._id,
-				name: item.id,
-				private: item.private,
-				downloads: item.downloads,
-				likes: item.likes,
-				gated: item.gated,
-				updatedAt: new Date(item.lastModified),
-			} as DatasetEntry & Pick<ApiDatasetInfo, T>;
-			totalToFetch--;
-			if (totalToFetch <= 0) {
-				return;
-			}
+	for await (const item of paginate<ApiDatasetInfo>(url, {
+		headers: {
+			accept: "application/json",
+			...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
+		},
+		fetch: params?.fetch,
+		prefetchPages: params?.prefetchPages,
+	})) {
+		yield {
+			...(params?.additionalFields && pick(item, params.additionalFields)),
+			id: item._id,
+			name: item.id,
+			private: item.private,
+			downloads: item.downloads,
+			likes: item.likes,
+			gated: item.gated,
+			updatedAt: new Date(item.lastModified),
+		} as DatasetEntry & Pick<ApiDatasetInfo, T>;
+		totalToFetch--;
+		if (totalToFetch <= 0) {
+			return;
 		}
-
-		const linkHeader = res.headers.get("Link");
-
-		url = linkHeader ? parseLinkHeader(linkHeader).next : undefined;
-		// Could update limit in url to fetch less items if not all items of next page are needed.
 	}
 }
@@ -1,9 +1,9 @@
 import { HUB_URL } from "../consts";
-import { createApiError } from "../error";
 import type { ApiIndexTreeEntry } from "../types/api/api-index-tree";
 import type { CredentialsParams, RepoDesignation } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
-import { parseLinkHeader } from "../utils/parseLinkHeader";
+import type { PaginateOptions } from "../utils/paginate";
+import { paginate } from "../utils/paginate";
 import { toRepoId } from "../utils/toRepoId";
 
 export interface ListFileEntry {
@@ -72,35 +72,23 @@ export async function* listFiles(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
-	} & Partial<CredentialsParams>,
+	} & Partial<CredentialsParams> & PaginateOptions,
 ): AsyncGenerator<ListFileEntry> {
 	const accessToken = checkCredentials(params);
 	const repoId = toRepoId(params.repo);
 	const revision = repoId.type === "bucket" ? undefined : params.revision || "main";
-	let url: string | undefined = `${params.hubUrl || HUB_URL}/api/${repoId.type}s/${repoId.name}/tree${
+	const url = `${params.hubUrl || HUB_URL}/api/${repoId.type}s/${repoId.name}/tree${
 		revision ? `/${revision}` : ""
 	}${params.path ? "/" + params.path : ""}?recursive=${!!params.recursive}&expand=${!!params.expand}`;
 
-	while (url) {
-		const res: Response = await (params.fetch ?? fetch)(url, {
-			headers: {
-				accept: "application/json",
-				...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
-			},
-		});
-
-		if (!res.ok) {
-			throw await createApiError(res);
-		}
-
-		const items: ApiIndexTreeEntry[] = await res.json();
-
-		for (const item of items) {
-			yield item;
-		}
-
-		const linkHeader = res.headers.get("Link");
-
-		url = linkHeader ? parseLinkHeader(linkHeader).next : undefined;
+	for await (const item of paginate<ApiIndexTreeEntry>(url, {
+		headers: {
+			accept: "application/json",
+			...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
+		},
+		fetch: params.fetch,
+		prefetchPages: params.prefetchPages,
+	})) {
+		yield item;
 	}
 }
@@ -1,9 +1,9 @@
 import { HUB_URL } from "../consts";
-import { createApiError } from "../error";
 import type { ApiModelInfo } from "../types/api/api-model";
 import type { CredentialsParams, PipelineType } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
-import { parseLinkHeader } from "../utils/parseLinkHeader";
+import type { PaginateOptions } from "../utils/paginate";
+import { paginate } from "../utils/paginate";
 import { normalizeInferenceProviderMapping } from "../utils/normalizeInferenceProviderMapping";
 
 export const MODEL_EXPAND_KEYS = [
@@ -107,7 +107,7 @@ export async function* listModels<const T extends ModelAdditionalField = never>(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
-	} & Partial<CredentialsParams>,
+	} & Partial<CredentialsParams> & PaginateOptions,
 ): AsyncGenerator<ModelEntry & ResolveModelAdditionalFields<T>> {
 	const accessToken = params && checkCredentials(params);
 	let totalToFetch = params?.limit ?? Infinity;
@@ -131,60 +131,47 @@ export async function* listModels<const T extends ModelAdditionalField = never>(
 		...MODEL_EXPAND_KEYS.map((val) => ["expand", val] satisfies [string, string]),
 		...additionalExpandKeys.map((val) => ["expand", val] satisfies [string, string]),
 	]).toString();
-	let url: string | undefined = `${params?.hubUrl || HUB_URL}/api/models?${search}`;
-
-	while (url) {
-		const res: Response = await (params?.fetch ?? fetch)(url, {
-			headers: {
-				accept: "application/json",
-				...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
-			},
-		});
-
-		if (!res.ok) {
-			throw await createApiError(res);
-		}
-
-		const items: ApiModelInfo[] = await res.json();
-
-		for (const item of items) {
-			const additional: Record<string, unknown> = {};
-			if (params?.additionalFields) {
-				for (const field of params.additionalFields) {
-					if (field === "filePaths") {
-						additional.filePaths = (item.siblings ?? []).map((s) => s.rfilename);
-					} else if (field === "inferenceProviderMapping" && item.inferenceProviderMapping) {
-						additional.inferenceProviderMapping = normalizeInferenceProviderMapping(
-							item.id,
-							item.inferenceProviderMapping,
-						);
-					} else {
-						additional[field] = item[field as keyof ApiModelInfo];
-					}
+	const url = `${params?.hubUrl || HUB_URL}/api/models?${search}`;
+
+	for await (const item of paginate<ApiModelInfo>(url, {
+		headers: {
+			accept: "application/json",
+			...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
+		},
+		fetch: params?.fetch,
+		prefetchPages: params?.prefetchPages,
+	})) {
+		const additional: Record<string, unknown> = {};
+		if (params?.additionalFields) {
+			for (const field of params.additionalFields) {
+				if (field === "filePaths") {
+					additional.filePaths = (item.siblings ?? []).map((s) => s.rfilename);
+				} else if (field === "inferenceProviderMapping" && item.inferenceProviderMapping) {
+					additional.inferenceProviderMapping = normalizeInferenceProviderMapping(
+						item.id,
+						item.inferenceProviderMapping,
+					);
+				} else {
+					additional[field] = item[field as keyof ApiModelInfo];
 				}
 			}
-
-			yield {
-				...additional,
-				id: item._id,
-				name: item.id,
-				private: item.private,
-				task: item.pipeline_tag,
-				downloads: item.downloads,
-				gated: item.gated,
-				likes: item.likes,
-				updatedAt: new Date(item.lastModified),
-			} as ModelEntry & ResolveModelAdditionalFields<T>;
-			totalToFetch--;
-
-			if (totalToFetch <= 0) {
-				return;
-			}
 		}
 
-		const linkHeader = res.headers.get("Link");
-
-		url = linkHeader ? parseLinkHeader(linkHeader).next : undefined;
-		// Could update url to reduce the limit if we don't need the whole 500 of the next batch.
+		yield {
+			...additional,
+			id: item._id,
+			name: item.id,
+			private: item.private,
+			task: item.pipeline_tag,
+			downloads: item.downloads,
+			gated: item.gated,
+			likes: item.likes,
+			updatedAt: new Date(item.lastModified),
+		} as ModelEntry & ResolveModelAdditionalFields<T>;
+		totalToFetch--;
+
+		if (totalToFetch <= 0) {
+			return;
+		}
 	}
 }
@@ -1,9 +1,9 @@
 import { HUB_URL } from "../consts";
-import { createApiError } from "../error";
 import type { ApiSpaceInfo } from "../types/api/api-space";
 import type { CredentialsParams, SpaceSdk } from "../types/public";
 import { checkCredentials } from "../utils/checkCredentials";
-import { parseLinkHeader } from "../utils/parseLinkHeader";
+import type { PaginateOptions } from "../utils/paginate";
+import { paginate } from "../utils/paginate";
 import { pick } from "../utils/pick";
 
 export const SPACE_EXPAND_KEYS = [
@@ -66,7 +66,7 @@ export async function* listSpaces<
 		 * Sort spaces by a specific field.
 		 */
 		sort?: "createdAt" | "downloads" | "likes" | "lastModified" | "likes30d" | "trendingScore" | "mainSize" | "id";
-	} & Partial<CredentialsParams>,
+	} & Partial<CredentialsParams> & PaginateOptions,
 ): AsyncGenerator<SpaceEntry & Pick<ApiSpaceInfo, T>> {
 	const accessToken = params && checkCredentials(params);
 	const search = new URLSearchParams([
@@ -81,36 +81,24 @@ export async function* listSpaces<
 			(val) => ["expand", val] satisfies [string, string],
 		),
 	]).toString();
-	let url: string | undefined = `${params?.hubUrl || HUB_URL}/api/spaces?${search}`;
+	const url = `${params?.hubUrl || HUB_URL}/api/spaces?${search}`;
 
-	while (url) {
-		const res: Response = await (params?.fetch ?? fetch)(url, {
-			headers: {
-				accept: "application/json",
-				...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
-			},
-		});
-
-		if (!res.ok) {
-			throw await createApiError(res);
-		}
-
-		const items: ApiSpaceInfo[] = await res.json();
-
-		for (const item of items) {
-			yield {
-				...(params?.additionalFields && pick(item, params.additionalFields)),
-				id: item._id,
-				name: item.id,
-				sdk: item.sdk,
-				likes: item.likes,
-				private: item.private,
-				updatedAt: new Date(item.lastModified),
-			} as SpaceEntry & Pick<ApiSpaceInfo, T>;
-		}
-
-		const linkHeader = res.headers.get("Link");
-
-		url = linkHeader ? parseLinkHeader(linkHeader).next : undefined;
+	for await (const item of paginate<ApiSpaceInfo>(url, {
+		headers: {
+			accept: "application/json",
+			...(accessToken ? { Authorization: `Bearer ${accessToken}` } : undefined),
+		},
+		fetch: params?.fetch,
+		prefetchPages: params?.prefetchPages,
+	})) {
+		yield {
+			...(params?.additionalFields && pick(item, params.additionalFields)),
+			id: item._id,
+			name: item.id,
+			sdk: item.sdk,
+			likes: item.likes,
+			private: item.private,
+			updatedAt: new Date(item.lastModified),
+		} as SpaceEntry & Pick<ApiSpaceInfo, T>;
 	}
 }
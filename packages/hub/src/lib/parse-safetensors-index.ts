@@ -1,4 +1,5 @@
-import { streamJson } from "../utils/streamJson";
+import type { JsonStreamEvent } from "../utils/streamJson";
+import { JsonStreamTokenizer } from "../utils/streamJson";
 
 /**
  * Streaming reader for `*.safetensors.index.json`.
@@ -65,6 +66,8 @@ const MAX_TOKEN_LENGTH = 100_000;
 /** JSON nesting depth. Real indexes are 2 deep. */
 const MAX_DEPTH = 64;
 
+const NEEDED_ROOT_KEYS = new Set(["dtype", "metadata", "weight_map"]);
+
 /**
  * Hard budget for the data we actually need: shard filenames + `metadata`.
  *
@@ -91,8 +94,9 @@ const MAX_WEIGHT_MAP_CHARS = 24_000_000;
 /**
  * Wraps a byte stream to abort past `maxBytes`.
  *
- * Also the place where early termination pays off: throwing here propagates into `streamJson`'s
- * `finally`, which cancels the reader and lets the HTTP response be torn down mid-body.
+ * Also the place where early termination pays off: throwing here, or from the parser while the
+ * chunks are consumed, runs the `finally` below, which cancels the reader and lets the HTTP response
+ * be torn down mid-body.
  */
 async function* limitBytes(stream: ReadableStream<Uint8Array>, maxBytes: number): AsyncGenerator<Uint8Array> {
 	let total = 0;
@@ -159,10 +163,7 @@ export async function parseSafetensorsIndexStream(
 		}
 	};
 
-	for await (const event of streamJson(limitBytes(stream, maxBytes), {
-		maxTokenLength: MAX_TOKEN_LENGTH,
-		maxDepth: MAX_DEPTH,
-	})) {
+	const onEvent = (event: JsonStreamEvent): void => {
 		switch (event.type) {
 			case "startObject":
 			case "startArray":
@@ -245,7 +246,19 @@ export async function parseSafetensorsIndexStream(
 				break;
 			}
 		}
+	};
+
+	const tokenizer = new JsonStreamTokenizer(onEvent, {
+		maxTokenLength: MAX_TOKEN_LENGTH,
+		maxDepth: MAX_DEPTH,
+		// Other root keys, and values nested in `weight_map` / `metadata` entries, are not needed:
+		// skip them without parsing their contents
+		skipValue: (key, keyDepth) => (keyDepth === 1 ? !NEEDED_ROOT_KEYS.has(key) : keyDepth > 2),
+	});
+	for await (const bytes of limitBytes(stream, maxBytes)) {
+		tokenizer.write(bytes);
 	}
+	tokenizer.end();
 
 	if (!sawRootObject) {
 		throw new SafetensorsIndexParseError("safetensors index must be a JSON object");
@@ -15,6 +15,47 @@ import type { Dtype, TensorInfo, SafetensorsFileHeader } from "./parse-safetenso
 import { sum } from "../utils/sum";
 
 describe("parseSafetensorsMetadata", () => {
+	/**
+	 * Builds the bytes of a minimal safetensors file from a JSON header plus a data buffer,
+	 * and a fetch that serves it (including the `Range: bytes=0-0` probe `WebBlob.create`
+	 * uses to learn the file size). The ranges of the GET requests for the file are pushed to `requestedRanges`.
+	 */
+	const fetchForFile = (
+		header: Record<string, unknown>,
+		dataBytes = 0,
+		requestedRanges: Array<string | null> = [],
+	): typeof fetch => {
+		const headerBytes = new TextEncoder().encode(JSON.stringify(header));
+		const file = new Uint8Array(8 + headerBytes.length + dataBytes);
+		new DataView(file.buffer).setBigUint64(0, BigInt(headerBytes.length), true);
+		file.set(headerBytes, 8);
+		return (async (input: RequestInfo | URL, init?: RequestInit) => {
+			const url = typeof input === "string" ? input : input instanceof URL ? input.href : input.url;
+			if (!url.endsWith(".safetensors")) {
+				// config.json, the sharded index, existence probes... — `downloadFile` treats a
+				// 404 as "not found" only when the Hub's X-Error-Code says so.
+				return new Response(null, { status: 404, headers: { "X-Error-Code": "EntryNotFound" } });
+			}
+			const range = new Headers(init?.headers).get("range");
+			if (init?.method !== "HEAD") {
+				requestedRanges.push(range);
+			}
+			if (range?.startsWith("bytes=")) {
+				const [start, endRaw] = range.slice("bytes=".length).split("-");
+				const startByte = Number(start);
+				const endByte = endRaw === "" ? file.length - 1 : Math.min(Number(endRaw), file.length - 1);
+				return new Response(file.slice(startByte, endByte + 1), {
+					status: 206,
+					headers: {
+						"content-range": `bytes ${startByte}-${endByte}/${file.length}`,
+						etag: '"hermetic-test-file"',
+					},
+				});
+			}
+			return new Response(file, { status: 200, headers: { etag: '"hermetic-test-file"' } });
+		}) as typeof fetch;
+	};
+
 	it("fetch info for single-file (with the default conventional filename)", async () => {
 		const parse = await parseSafetensorsMetadata({
 			repo: "google-bert/bert-base-uncased",
@@ -190,40 +231,6 @@ describe("parseSafetensorsMetadata", () => {
 	});
 
 	describe("malformed headers (crafted parameter counts)", () => {
-		/**
-		 * Builds the bytes of a minimal safetensors file from a JSON header plus a data buffer,
-		 * and a fetch that serves it (including the `Range: bytes=0-0` probe `WebBlob.create`
-		 * uses to learn the file size).
-		 */
-		const fetchForFile = (header: Record<string, unknown>, dataBytes = 0): typeof fetch => {
-			const headerBytes = new TextEncoder().encode(JSON.stringify(header));
-			const file = new Uint8Array(8 + headerBytes.length + dataBytes);
-			new DataView(file.buffer).setBigUint64(0, BigInt(headerBytes.length), true);
-			file.set(headerBytes, 8);
-			return (async (input: RequestInfo | URL, init?: RequestInit) => {
-				const url = typeof input === "string" ? input : input instanceof URL ? input.href : input.url;
-				if (!url.endsWith(".safetensors")) {
-					// config.json, the sharded index, existence probes... — `downloadFile` treats a
-					// 404 as "not found" only when the Hub's X-Error-Code says so.
-					return new Response(null, { status: 404, headers: { "X-Error-Code": "EntryNotFound" } });
-				}
-				const range = new Headers(init?.headers).get("range");
-				if (range?.startsWith("bytes=")) {
-					const [start, endRaw] = range.slice("bytes=".length).split("-");
-					const startByte = Number(start);
-					const endByte = endRaw === "" ? file.length - 1 : Number(endRaw);
-					return new Response(file.slice(startByte, endByte + 1), {
-						status: 206,
-						headers: {
-							"content-range": `bytes ${startByte}-${endByte}/${file.length}`,
-							etag: '"hermetic-test-file"',
-						},
-					});
-				}
-				return new Response(file, { status: 200, headers: { etag: '"hermetic-test-file"' } });
-			}) as typeof fetch;
-		};
-
 		it("rejects absurd tensor dims (the 1.8e308-param single-file PoC shape)", async () => {
 			const fetch = fetchForFile(
 				{
@@ -335,6 +342,91 @@ describe("parseSafetensorsMetadata", () => {
 		});
 	});
 
+	describe("speculative header read", () => {
+		const header = {
+			__metadata__: { format: "pt" },
+			weight: { dtype: "F32", shape: [10, 20], data_offsets: [0, 800] },
+		};
+
+		it("reads the header and the file size from a single ranged request", async () => {
+			const requestedRanges: Array<string | null> = [];
+			const parse = await parseSafetensorsMetadata({
+				repo: "some-user/small-model",
+				path: "model.safetensors",
+				computeParametersCount: true,
+				fetch: fetchForFile(header, 800, requestedRanges),
+			});
+
+			assert(!parse.sharded);
+			assert.deepStrictEqual(parse.parameterCount, { F32: 200 });
+			assert.deepStrictEqual(requestedRanges, ["bytes=0-262143"]);
+		});
+
+		it("fetches the rest of a header that doesn't fit in the prefix", async () => {
+			const requestedRanges: Array<string | null> = [];
+			const headerLength = JSON.stringify(header).length;
+			const parse = await parseSafetensorsMetadata({
+				repo: "some-user/small-model",
+				path: "model.safetensors",
+				computeParametersCount: true,
+				speculativeHeaderBytes: 32,
+				fetch: fetchForFile(header, 800, requestedRanges),
+			});
+
+			assert(!parse.sharded);
+			assert.deepStrictEqual(parse.header, header);
+			assert.deepStrictEqual(requestedRanges, ["bytes=0-31", `bytes=32-${8 + headerLength - 1}`]);
+		});
+
+		it("reads the rest of the header from the whole file when the server ignores the second range", async () => {
+			const requestedRanges: Array<string | null> = [];
+			const fileFetch = fetchForFile(header, 800, requestedRanges);
+			const parse = await parseSafetensorsMetadata({
+				repo: "some-user/small-model",
+				path: "model.safetensors",
+				computeParametersCount: true,
+				speculativeHeaderBytes: 32,
+				fetch: ((input: RequestInfo | URL, init?: RequestInit) => {
+					const headers = new Headers(init?.headers);
+					if (requestedRanges.length > 0) {
+						headers.delete("range");
+					}
+					return fileFetch(input, { ...init, headers });
+				}) as typeof fetch,
+			});
+
+			assert(!parse.sharded);
+			assert.deepStrictEqual(parse.header, header);
+			assert.deepStrictEqual(requestedRanges, ["bytes=0-31", null]);
+		});
+
+		it("still validates offsets against the size from Content-Range", async () => {
+			await expect(
+				parseSafetensorsMetadata({
+					repo: "some-user/truncated-model",
+					path: "model.safetensors",
+					computeParametersCount: true,
+					fetch: fetchForFile(header, 400),
+				}),
+			).rejects.toThrow(/exceeds the file size/);
+		});
+
+		it("uses separate requests when disabled", async () => {
+			const requestedRanges: Array<string | null> = [];
+			const parse = await parseSafetensorsMetadata({
+				repo: "some-user/small-model",
+				path: "model.safetensors",
+				computeParametersCount: true,
+				speculativeHeaderBytes: 0,
+				fetch: fetchForFile(header, 800, requestedRanges),
+			});
+
+			assert(!parse.sharded);
+			assert.deepStrictEqual(parse.header, header);
+			assert.strictEqual(requestedRanges.length, 3);
+		});
+	});
+
 	it("should detect sharded safetensors filename", async () => {
 		const safetensorsFilename = "model_00005-of-00072.safetensors"; // https://huggingface.co/bigscience/bloom/blob/4d8e28c67403974b0f17a4ac5992e4ba0b0dbb6f/model_00005-of-00072.safetensors
 		const safetensorsShardFileInfo = parseSafetensorsShardFilename(safetensorsFilename);
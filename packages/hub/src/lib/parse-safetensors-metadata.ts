@@ -1,4 +1,8 @@
+import { HUB_URL } from "../consts";
+import { createApiError } from "../error";
 import type { CredentialsParams, RepoDesignation } from "../types/public";
+import { checkCredentials } from "../utils/checkCredentials";
+import { concatUint8Arrays } from "../utils/concatUint8Arrays";
 import { omit } from "../utils/omit";
 import { toRepoId } from "../utils/toRepoId";
 import { typedEntries } from "../utils/typedEntries";
@@ -8,6 +12,8 @@ import { promisesQueue } from "../utils/promisesQueue";
 import type { SetRequired } from "../vendor/type-fest/set-required";
 import { parseSafetensorsIndexStream } from "./parse-safetensors-index";
 import { sum } from "../utils/sum";
+import type { TensorByteRange } from "./tensor-reader";
+import { TensorReader } from "./tensor-reader";
 
 export const SAFETENSORS_FILE = "model.safetensors";
 export const SAFETENSORS_INDEX_FILE = "model.safetensors.index.json";
@@ -43,6 +49,7 @@ export function parseSafetensorsShardFilename(filename: string): SafetensorsShar
 
 const PARALLEL_DOWNLOADS = 20;
 const MAX_HEADER_LENGTH = 25_000_000; // 25MB
+const SPECULATIVE_HEADER_BYTES = 256 * 1024; // fits the header of all but the largest files in one request
 const MAX_CONFIG_LENGTH = 10_000_000; // 10MB — config.json is typically small; cap to avoid large memory use
 const MAX_SHARD_COUNT = 10_000; // well above any real sharded model; blocks crafted index with millions of entries
 // Upper bound on a single tensor dimension, mirroring the gguf package. Dims are multiplied
@@ -346,18 +353,38 @@ async function fetchModelConfig(
 	}
 }
 
-async function parseSingleFile(
+function checkHeaderLength(path: string, lengthOfHeader: bigint): void {
+	if (lengthOfHeader <= 0) {
+		throw new SafetensorParseError(`Failed to parse file ${path}: safetensors header is malformed.`);
+	}
+	if (lengthOfHeader > MAX_HEADER_LENGTH) {
+		throw new SafetensorParseError(
+			`Failed to parse file ${path}: safetensor header is too big. Maximum supported size is ${MAX_HEADER_LENGTH} bytes.`,
+		);
+	}
+}
+
+function parseFileSize(value: string | null | undefined): number | undefined {
+	if (!value) {
+		return undefined;
+	}
+	const size = Number(value);
+	return Number.isSafeInteger(size) && size >= 0 ? size : undefined;
+}
+
+/**
+ * Reads the header through `downloadFile`: one request to resolve the file, one for the header length
+ * and one for the header itself.
+ */
+async function readHeaderFromBlob(
 	path: string,
 	params: {
 		repo: RepoDesignation;
 		revision?: string;
 		hubUrl?: string;
-		/**
-		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
-		 */
 		fetch?: typeof fetch;
 	} & Partial<CredentialsParams>,
-): Promise<{ header: SafetensorsFileHeader; fileSizeBytes: number | undefined }> {
+): Promise<{ headerBytes: Uint8Array; fileSizeBytes: number | undefined }> {
 	const blob = await downloadFile({ ...params, path });
 
 	if (!blob) {
@@ -367,31 +394,176 @@ async function parseSingleFile(
 	const bufLengthOfHeaderLE = await blob.slice(0, 8).arrayBuffer();
 	const lengthOfHeader = new DataView(bufLengthOfHeaderLE).getBigUint64(0, true);
 	// ^little-endian
-	if (lengthOfHeader <= 0) {
-		throw new SafetensorParseError(`Failed to parse file ${path}: safetensors header is malformed.`);
+	checkHeaderLength(path, lengthOfHeader);
+
+	const headerBytes = new Uint8Array(await blob.slice(8, 8 + Number(lengthOfHeader)).arrayBuffer());
+
+	// The blob's size is the file's true size (WebBlob learns it from the Content-Range probe);
+	// undefined when a custom fetch doesn't report one.
+	const fileSizeBytes = Number.isFinite(blob.size) && blob.size >= 0 ? blob.size : undefined;
+
+	return { headerBytes, fileSizeBytes };
+}
+
+/**
+ * Reads the header with a single ranged request for the first `prefixBytes` of the file, and a
+ * follow-up request for the rest of the header only when it doesn't fit in the prefix.
+ *
+ * The file size comes from the `Content-Range` of that same response.
+ */
+async function readHeaderSpeculatively(
+	path: string,
+	prefixBytes: number,
+	params: {
+		repo: RepoDesignation;
+		revision?: string;
+		hubUrl?: string;
+		fetch?: typeof fetch;
+	} & Partial<CredentialsParams>,
+): Promise<{ headerBytes: Uint8Array; fileSizeBytes: number | undefined }> {
+	const accessToken = checkCredentials(params);
+	const repoId = toRepoId(params.repo);
+	const hubUrl = params.hubUrl ?? HUB_URL;
+	const url = `${hubUrl}/${repoId.type === "model" ? "" : `${repoId.type}s/`}${repoId.name}/resolve/${encodeURIComponent(
+		params.revision ?? "main",
+	)}/${path}`;
+	const customFetch = params.fetch ?? fetch;
+	const fetchRange = async (start: number, end: number): Promise<Response> => {
+		const resp = await customFetch(url, {
+			headers: {
+				Range: `bytes=${start}-${end - 1}`,
+				...(accessToken && { Authorization: `Bearer ${accessToken}` }),
+			},
+		});
+		if (resp.status === 404 && resp.headers.get("X-Error-Code") === "EntryNotFound") {
+			throw new SafetensorParseError(`Failed to parse file ${path}: failed to fetch safetensors header length.`);
+		}
+		if (!resp.ok) {
+			throw await createApiError(resp);
+		}
+		return resp;
+	};
+
+	const resp = await fetchRange(0, prefixBytes);
+	// 206 → the total size is in `Content-Range`. 200 → the server ignored `Range` and is sending
+	// the whole file, so we stop reading it once we have the header.
+	const ranged = resp.status === 206;
+	const fileSizeBytes = ranged
+		? parseFileSize(resp.headers.get("content-range")?.split("/").pop())
+		: resp.headers.get("content-encoding")
+			? undefined
+			: parseFileSize(resp.headers.get("content-length"));
+
+	if (!resp.body) {
+		throw new SafetensorParseError(`Failed to parse file ${path}: failed to fetch safetensors header length.`);
 	}
-	if (lengthOfHeader > MAX_HEADER_LENGTH) {
-		throw new SafetensorParseError(
-			`Failed to parse file ${path}: safetensor header is too big. Maximum supported size is ${MAX_HEADER_LENGTH} bytes.`,
-		);
+	const reader = resp.body.getReader();
+	const chunks: Uint8Array[] = [];
+	let received = 0;
+	const readUntil = async (length: number) => {
+		while (received < length) {
+			const { done, value } = await reader.read();
+			if (done) {
+				break;
+			}
+			chunks.push(value);
+			received += value.byteLength;
+		}
+	};
+
+	try {
+		await readUntil(8);
+		if (received < 8) {
+			throw new SafetensorParseError(`Failed to parse file ${path}: safetensors header is malformed.`);
+		}
+		const lengthOfHeader = new DataView(concatUint8Arrays(chunks).buffer).getBigUint64(0, true);
+		// ^little-endian
+		checkHeaderLength(path, lengthOfHeader);
+		const headerEnd = 8 + Number(lengthOfHeader);
+
+		await readUntil(ranged ? Math.min(headerEnd, prefixBytes) : headerEnd);
+		const prefix = concatUint8Arrays(chunks);
+
+		if (prefix.byteLength >= headerEnd || !ranged || prefix.byteLength < prefixBytes) {
+			// Either the header fits, or the file ends before it does - in which case the JSON parse fails
+			return { headerBytes: prefix.subarray(8, headerEnd), fileSizeBytes };
+		}
+
+		const rest = await fetchRange(prefix.byteLength, headerEnd);
+		if (rest.status !== 206) {
+			// The server ignored `Range` this time, and is sending the file from the start
+			const file = await readBodyPrefix(rest, headerEnd);
+			return { headerBytes: file.subarray(8, headerEnd), fileSizeBytes };
+		}
+		const headerBytes = concatUint8Arrays([prefix.subarray(8), new Uint8Array(await rest.arrayBuffer())]);
+		return { headerBytes: headerBytes.subarray(0, Number(lengthOfHeader)), fileSizeBytes };
+	} finally {
+		await reader.cancel().catch(() => {});
 	}
+}
+
+/**
+ * Reads the first `length` bytes of a response body, or less if it ends before, then cancels the rest
+ */
+async function readBodyPrefix(resp: Response, length: number): Promise<Uint8Array> {
+	if (!resp.body) {
+		return new Uint8Array(0);
+	}
+	const reader = resp.body.getReader();
+	const chunks: Uint8Array[] = [];
+	let received = 0;
+	try {
+		while (received < length) {
+			const { done, value } = await reader.read();
+			if (done) {
+				break;
+			}
+			chunks.push(value);
+			received += value.byteLength;
+		}
+	} finally {
+		await reader.cancel().catch(() => {});
+	}
+	return concatUint8Arrays(chunks);
+}
+
+async function parseSingleFile(
+	path: string,
+	params: {
+		repo: RepoDesignation;
+		revision?: string;
+		hubUrl?: string;
+		/**
+		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
+		 */
+		fetch?: typeof fetch;
+		/**
+		 * Number of bytes to fetch at the start of the file, in a single request, to read its header.
+		 * 0 to read the header length then the header with separate requests.
+		 *
+		 * @default 262_144
+		 */
+		speculativeHeaderBytes?: number;
+	} & Partial<CredentialsParams>,
+): Promise<{ header: SafetensorsFileHeader; fileSizeBytes: number | undefined; dataOffset: number }> {
+	const prefixBytes = params.speculativeHeaderBytes ?? SPECULATIVE_HEADER_BYTES;
+	const { headerBytes, fileSizeBytes } =
+		prefixBytes > 0
+			? await readHeaderSpeculatively(path, Math.max(prefixBytes, 8), params)
+			: await readHeaderFromBlob(path, params);
 
 	let header: SafetensorsFileHeader;
 	try {
-		header = JSON.parse(await blob.slice(8, 8 + Number(lengthOfHeader)).text());
+		header = JSON.parse(new TextDecoder().decode(headerBytes));
 	} catch (err) {
 		throw new SafetensorParseError(`Failed to parse file ${path}: safetensors header is not valid JSON.`);
 	}
 
-	// The blob's size is the file's true size (WebBlob learns it from the Content-Range probe);
-	// undefined when a custom fetch doesn't report one.
-	const fileSizeBytes = Number.isFinite(blob.size) && blob.size >= 0 ? blob.size : undefined;
-
 	for (const [tensorName, info] of typedEntries(omit(header, "__metadata__"))) {
 		validateTensorEntry(path, tensorName, info, fileSizeBytes);
 	}
 
-	return { header, fileSizeBytes };
+	return { header, fileSizeBytes, dataOffset: 8 + headerBytes.byteLength };
 }
 
 async function parseShardedIndex(
@@ -445,6 +617,12 @@ async function fetchAllHeaders(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
+		/**
+		 * Number of bytes to fetch at the start of each shard, in a single request, to read its header.
+		 *
+		 * @default 262_144
+		 */
+		speculativeHeaderBytes?: number;
 	} & Partial<CredentialsParams>,
 ): Promise<SafetensorsShardedHeaders> {
 	const pathPrefix = path.slice(0, path.lastIndexOf("/") + 1);
@@ -465,7 +643,7 @@ async function fetchAllHeaders(
 					(filename) => async () =>
 						[filename, await parseSingleFile(pathPrefix + filename, params)] satisfies [
 							string,
-							{ header: SafetensorsFileHeader; fileSizeBytes: number | undefined },
+							{ header: SafetensorsFileHeader; fileSizeBytes: number | undefined; dataOffset: number },
 						],
 				),
 				PARALLEL_DOWNLOADS,
@@ -541,6 +719,13 @@ export async function parseSafetensorsMetadata(
 		 * @default undefined
 		 */
 		library?: string;
+		/**
+		 * Number of bytes to fetch at the start of each safetensors file, in a single request, to read its header.
+		 * Headers that don't fit take one more request. 0 to use separate requests for the header length and the header.
+		 *
+		 * @default 262_144
+		 */
+		speculativeHeaderBytes?: number;
 		hubUrl?: string;
 		revision?: string;
 		/**
@@ -568,6 +753,13 @@ export async function parseSafetensorsMetadata(
 		 * @default undefined
 		 */
 		library?: string;
+		/**
+		 * Number of bytes to fetch at the start of each safetensors file, in a single request, to read its header.
+		 * Headers that don't fit take one more request. 0 to use separate requests for the header length and the header.
+		 *
+		 * @default 262_144
+		 */
+		speculativeHeaderBytes?: number;
 		hubUrl?: string;
 		revision?: string;
 		/**
@@ -582,6 +774,7 @@ export async function parseSafetensorsMetadata(
 		path?: string;
 		computeParametersCount?: boolean;
 		library?: string;
+		speculativeHeaderBytes?: number;
 		hubUrl?: string;
 		revision?: string;
 		/**
@@ -991,3 +1184,45 @@ function shouldSkipTensor(tensorName: string, dtype: Dtype, quantConfig?: Quanti
 	const suffix = getTensorSuffix(tensorName);
 	return suffix !== GPTQ_QWEIGHT_SUFFIX && GPTQ_AWQ_AUXILIARY_SUFFIXES.includes(suffix);
 }
+
+/**
+ * Parses the header of a single safetensors file, and returns a {@link TensorReader} to fetch individual tensors
+ * from it without downloading the whole file.
+ *
+ * For sharded models, call it on each shard listed in the index's `weight_map`.
+ */
+export async function safetensorsTensorReader(
+	params: {
+		repo: RepoDesignation;
+		/**
+		 * Relative path of the safetensors file inside `repo`
+		 */
+		path: string;
+		hubUrl?: string;
+		revision?: string;
+		/**
+		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
+		 */
+		fetch?: typeof fetch;
+		/**
+		 * Number of bytes to fetch at the start of the file, in a single request, to read its header.
+		 *
+		 * @default 262_144
+		 */
+		speculativeHeaderBytes?: number;
+	} & Partial<CredentialsParams>,
+): Promise<{ header: SafetensorsFileHeader; reader: TensorReader }> {
+	const { header, dataOffset } = await parseSingleFile(params.path, params);
+	const blob = await downloadFile(params);
+
+	if (!blob) {
+		throw new SafetensorParseError(`Failed to read file ${params.path}: file not found.`);
+	}
+
+	const ranges: Record<string, TensorByteRange> = {};
+	for (const [name, info] of typedEntries(omit(header, "__metadata__"))) {
+		ranges[name] = { start: dataOffset + info.data_offsets[0], end: dataOffset + info.data_offsets[1] };
+	}
+
+	return { header, reader: new TensorReader(blob, ranges) };
+}
@@ -0,0 +1,116 @@
+import { describe, test, expect, beforeEach, afterEach } from "vitest";
+import { mkdir, mkdtemp, readdir, realpath, rm, symlink, utimes, writeFile } from "node:fs/promises";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import { pruneCache } from "./prune-cache";
+import { getRepoLockPath, scanCacheDir } from "./cache-management";
+import { withLockFile } from "../utils/lockFile";
+
+const OLD_COMMIT = "0".repeat(40);
+const MAIN_COMMIT = "1".repeat(40);
+
+describe("pruneCache", () => {
+	let cacheDir: string;
+	let repoPath: string;
+
+	/**
+	 * Creates a blob of `size` bytes accessed at `accessedAt` (seconds), and links it from the given revisions
+	 */
+	async function addBlob(name: string, size: number, accessedAt: number, revisions: string[]) {
+		const blobPath = join(repoPath, "blobs", name);
+		await writeFile(blobPath, "x".repeat(size));
+		await utimes(blobPath, accessedAt, accessedAt);
+		for (const revision of revisions) {
+			await mkdir(join(repoPath, "snapshots", revision), { recursive: true });
+			await symlink(join("..", "..", "blobs", name), join(repoPath, "snapshots", revision, `${name}.txt`));
+		}
+	}
+
+	beforeEach(async () => {
+		cacheDir = await realpath(await mkdtemp(join(tmpdir(), "hf-prune-")));
+		repoPath = join(cacheDir, "models--org--model");
+		await mkdir(join(repoPath, "blobs"), { recursive: true });
+		await mkdir(join(repoPath, "refs"));
+		await writeFile(join(repoPath, "refs", "main"), MAIN_COMMIT);
+
+		// "shared" is in both revisions, "old" only in the old one and "new" only in main
+		await addBlob("old", 100, 1_000, [OLD_COMMIT]);
+		await addBlob("shared", 100, 2_000, [OLD_COMMIT, MAIN_COMMIT]);
+		await addBlob("new", 100, 3_000, [MAIN_COMMIT]);
+		await addBlob("orphan", 10, 4_000, []);
+		await writeFile(join(repoPath, "blobs", "downloading.incomplete"), "x".repeat(1000));
+		await symlink(join("..", "..", "blobs", "missing"), join(repoPath, "snapshots", MAIN_COMMIT, "dangling.txt"));
+	});
+
+	afterEach(async () => {
+		await rm(cacheDir, { recursive: true, force: true });
+	});
+
+	test("should only report what would be removed in dry run mode", async () => {
+		const output = await pruneCache({ cacheDir, maxBytes: 250, dryRun: true });
+
+		expect(output.sizeBefore).toBe(310);
+		expect(output.sizeAfter).toBe(200);
+		expect(output.removedBlobs.sort()).toEqual([join(repoPath, "blobs", "old"), join(repoPath, "blobs", "orphan")]);
+		expect(output.removedFiles.sort()).toEqual([
+			join(repoPath, "snapshots", OLD_COMMIT, "old.txt"),
+			join(repoPath, "snapshots", MAIN_COMMIT, "dangling.txt"),
+		]);
+		// "shared" is still in the old revision
+		expect(output.removedRevisions).toEqual([]);
+		expect((await readdir(join(repoPath, "blobs"))).length).toBe(5);
+	});
+
+	test("should remove the least recently accessed blobs along with their files and revisions", async () => {
+		const output = await pruneCache({ cacheDir, maxBytes: 150 });
+
+		expect(output.sizeAfter).toBe(100);
+		expect(output.removedRevisions).toEqual([join(repoPath, "snapshots", OLD_COMMIT)]);
+		expect((await readdir(join(repoPath, "blobs"))).sort()).toEqual(["downloading.incomplete", "new"]);
+		expect(await readdir(join(repoPath, "snapshots"))).toEqual([MAIN_COMMIT]);
+		expect(await readdir(join(repoPath, "snapshots", MAIN_COMMIT))).toEqual(["new.txt"]);
+
+		const cache = await scanCacheDir(cacheDir);
+		expect(cache.warnings).toEqual([]);
+		expect(cache.size).toBe(100);
+	});
+
+	test("should keep the files of revisions pointed to by refs", async () => {
+		const output = await pruneCache({ cacheDir, maxBytes: 0, keepRefs: ["main"] });
+
+		expect(output.sizeAfter).toBe(200);
+		expect((await readdir(join(repoPath, "blobs"))).sort()).toEqual(["downloading.incomplete", "new", "shared"]);
+		expect(await readdir(join(repoPath, "snapshots", MAIN_COMMIT))).toEqual(["new.txt", "shared.txt"].sort());
+	});
+
+	test("should wait for the repo's lock", async () => {
+		let released = false;
+		const lock = withLockFile(getRepoLockPath(repoPath), async () => {
+			await new Promise((resolve) => setTimeout(resolve, 100));
+			released = true;
+		});
+		// Let the lock be acquired
+		await new Promise((resolve) => setTimeout(resolve, 20));
+
+		await pruneCache({ cacheDir, maxBytes: 0 });
+
+		expect(released).toBe(true);
+		await lock;
+	});
+
+	test("should only count the blobs actually removed in sizeAfter", async () => {
+		const lock = withLockFile(getRepoLockPath(repoPath), async () => {
+			await new Promise((resolve) => setTimeout(resolve, 100));
+			// Removed by something else after pruneCache planned to remove it
+			await rm(join(repoPath, "blobs", "old"));
+		});
+		// Let the lock be acquired
+		await new Promise((resolve) => setTimeout(resolve, 20));
+
+		const output = await pruneCache({ cacheDir, maxBytes: 250 });
+		await lock;
+
+		expect(output.removedBlobs).toEqual([join(repoPath, "blobs", "orphan")]);
+		expect(output.sizeAfter).toBe(300);
+	});
+});
@@ -0,0 +1,277 @@
+import { lstat, readdir, readFile, realpath, rm, unlink } from "node:fs/promises";
+import { join, relative } from "node:path";
+import { getHFHubCachePath, getRepoLockPath, REPO_ID_SEPARATOR } from "./cache-management";
+import { withLockFile } from "../utils/lockFile";
+
+export interface PruneCacheOptions {
+	/**
+	 * @default the hub cache path, see {@link getHFHubCachePath}
+	 */
+	cacheDir?: string;
+	/**
+	 * Size the cache must fit in, in bytes. The least recently accessed blobs are removed until it does.
+	 */
+	maxBytes: number;
+	/**
+	 * Never remove files of revisions pointed to by refs: all refs if `true`, or only the given ones, eg `["main"]`.
+	 *
+	 * @default false
+	 */
+	keepRefs?: boolean | string[];
+	/**
+	 * Only compute what would be removed, without removing anything
+	 *
+	 * @default false
+	 */
+	dryRun?: boolean;
+}
+
+export interface PruneCacheOutput {
+	/**
+	 * Size of the blobs in the cache before pruning, in bytes
+	 */
+	sizeBefore: number;
+	/**
+	 * `sizeBefore` minus the size of the removed blobs, in bytes.
+	 *
+	 * Can be more than `maxBytes` if the remaining blobs are all kept because of `keepRefs`, or if some repos couldn't be pruned.
+	 */
+	sizeAfter: number;
+	/**
+	 * Removed blobs
+	 */
+	removedBlobs: string[];
+	/**
+	 * Removed snapshot files: the ones pointing to removed blobs and the dangling symlinks
+	 */
+	removedFiles: string[];
+	/**
+	 * Revisions left without files, removed along with the refs pointing to them
+	 */
+	removedRevisions: string[];
+	/**
+	 * Errors for repos that couldn't be pruned
+	 */
+	warnings: Error[];
+}
+
+interface CachedBlob {
+	path: string;
+	size: number;
+	lastAccessedAt: number;
+	/**
+	 * Snapshot files pointing to the blob
+	 */
+	files: string[];
+	kept: boolean;
+}
+
+interface CachedRevision {
+	path: string;
+	refPaths: string[];
+	blobs: Set<CachedBlob>;
+}
+
+interface RepoEntries {
+	blobs: Map<string, CachedBlob>;
+	revisions: CachedRevision[];
+	/**
+	 * Symlinks in snapshots whose target doesn't exist anymore
+	 */
+	dangling: string[];
+}
+
+/**
+ * Lists the files in `dir` and its subdirectories
+ */
+async function listFilesRecursive(dir: string): Promise<string[]> {
+	const entries = await readdir(dir, { withFileTypes: true });
+	const files = await Promise.all(
+		entries.map((entry) =>
+			entry.isDirectory() ? listFilesRecursive(join(dir, entry.name)) : Promise.resolve([join(dir, entry.name)]),
+		),
+	);
+	return files.flat();
+}
+
+async function readRepoEntries(repoPath: string, keepRefs: boolean | string[]): Promise<RepoEntries> {
+	let blobsPath: string;
+	try {
+		blobsPath = await realpath(join(repoPath, "blobs"));
+	} catch (err) {
+		if ((err as NodeJS.ErrnoException).code === "ENOENT") {
+			// Nothing downloaded in this repo
+			return { blobs: new Map(), revisions: [], dangling: [] };
+		}
+		throw err;
+	}
+	const refsPath = join(repoPath, "refs");
+	const snapshotsPath = join(repoPath, "snapshots");
+
+	const blobs = new Map<string, CachedBlob>();
+	for (const name of await readdir(blobsPath)) {
+		// Downloads in progress
+		if (name.endsWith(".incomplete")) {
+			continue;
+		}
+		const path = join(blobsPath, name);
+		const blobStat = await lstat(path);
+		blobs.set(path, { path, size: blobStat.size, lastAccessedAt: blobStat.atimeMs, files: [], kept: false });
+	}
+
+	const refsByCommit = new Map<string, string[]>();
+	for (const refPath of await listFilesRecursive(refsPath).catch(() => [])) {
+		const commit = (await readFile(refPath, "utf-8")).trim();
+		refsByCommit.set(commit, [...(refsByCommit.get(commit) ?? []), refPath]);
+	}
+
+	const revisions: CachedRevision[] = [];
+	const dangling: string[] = [];
+	for (const commit of await readdir(snapshotsPath)) {
+		const revisionPath = join(snapshotsPath, commit);
+		if (!(await lstat(revisionPath)).isDirectory()) {
+			continue;
+		}
+		const refPaths = refsByCommit.get(commit) ?? [];
+		const kept =
+			keepRefs === true
+				? refPaths.length > 0
+				: Array.isArray(keepRefs) && refPaths.some((refPath) => keepRefs.includes(relative(refsPath, refPath)));
+		const revision: CachedRevision = { path: revisionPath, refPaths, blobs: new Set() };
+
+		for (const file of await listFilesRecursive(revisionPath)) {
+			// Files copied when symlinks are not supported don't point to a blob
+			if (!(await lstat(file)).isSymbolicLink()) {
+				continue;
+			}
+			let target: string;
+			try {
+				target = await realpath(file);
+			} catch (err) {
+				if ((err as NodeJS.ErrnoException).code === "ENOENT") {
+					dangling.push(file);
+					continue;
+				}
+				throw err;
+			}
+			const blob = blobs.get(target);
+			if (blob) {
+				blob.files.push(file);
+				blob.kept ||= kept;
+				revision.blobs.add(blob);
+			}
+		}
+		revisions.push(revision);
+	}
+
+	return { blobs, revisions, dangling };
+}
+
+/**
+ * Removes the least recently accessed blobs of the cache until it fits in `maxBytes`, along with the snapshot files pointing to them.
+ *
+ * Blobs that no snapshot points to go first. A blob shared by several snapshots is only counted once, and all the snapshot files pointing to it are removed with it.
+ * Revisions left without files are removed with their refs, and dangling symlinks are removed as well.
+ *
+ * Each repo is modified while holding its lock file (see {@link getRepoLockPath}), which {@link downloadFileToCacheDir} also takes
+ * before adding files to the cache. Downloads in progress are left untouched.
+ *
+ * Note: this does not work in the browser
+ */
+export async function pruneCache(params: PruneCacheOptions): Promise<PruneCacheOutput> {
+	const cacheDir = params.cacheDir ?? getHFHubCachePath();
+	const keepRefs = params.keepRefs ?? false;
+	const warnings: Error[] = [];
+
+	const repos = new Map<string, RepoEntries>();
+	for (const name of await readdir(cacheDir)) {
+		if (!name.includes(REPO_ID_SEPARATOR)) {
+			continue;
+		}
+		const repoPath = join(cacheDir, name);
+		try {
+			repos.set(repoPath, await readRepoEntries(repoPath, keepRefs));
+		} catch (err) {
+			warnings.push(err as Error);
+		}
+	}
+
+	const blobs = [...repos.values()].flatMap((repo) => [...repo.blobs.values()]);
+	const sizeBefore = blobs.reduce((sum, blob) => sum + blob.size, 0);
+
+	// Unreferenced blobs first, then least recently accessed
+	const candidates = blobs
+		.filter((blob) => !blob.kept)
+		.sort((a, b) => Number(a.files.length > 0) - Number(b.files.length > 0) || a.lastAccessedAt - b.lastAccessedAt);
+
+	let plannedSize = sizeBefore;
+	const evicted = new Set<string>();
+	for (const blob of candidates) {
+		if (plannedSize <= params.maxBytes) {
+			break;
+		}
+		evicted.add(blob.path);
+		plannedSize -= blob.size;
+	}
+
+	// Only what is actually removed is reported: repos can fail to be pruned, or change before their lock is taken
+	const output: PruneCacheOutput = {
+		sizeBefore,
+		sizeAfter: sizeBefore,
+		removedBlobs: [],
+		removedFiles: [],
+		removedRevisions: [],
+		warnings,
+	};
+
+	for (const [repoPath, planned] of repos) {
+		if (planned.dangling.length === 0 && ![...planned.blobs.keys()].some((path) => evicted.has(path))) {
+			continue;
+		}
+
+		const prune = async (entries: RepoEntries) => {
+			const removedBlobs = [...entries.blobs.values()].filter((blob) => evicted.has(blob.path) && !blob.kept);
+			const removed = new Set(removedBlobs);
+			const removedRevisions = entries.revisions.filter(
+				(revision) => revision.blobs.size > 0 && [...revision.blobs].every((blob) => removed.has(blob)),
+			);
+
+			// Remove the symlinks before their blobs, so that they are never left dangling
+			for (const file of [...entries.dangling, ...removedBlobs.flatMap((blob) => blob.files)]) {
+				if (!params.dryRun) {
+					await unlink(file);
+				}
+				output.removedFiles.push(file);
+			}
+			for (const blob of removedBlobs) {
+				if (!params.dryRun) {
+					await unlink(blob.path);
+				}
+				output.removedBlobs.push(blob.path);
+				output.sizeAfter -= blob.size;
+			}
+			for (const revision of removedRevisions) {
+				if (!params.dryRun) {
+					for (const refPath of revision.refPaths) {
+						await unlink(refPath);
+					}
+					await rm(revision.path, { recursive: true, force: true });
+				}
+				output.removedRevisions.push(revision.path);
+			}
+		};
+
+		try {
+			if (params.dryRun) {
+				await prune(planned);
+			} else {
+				// Read the repo again while holding its lock, in case files were added in the meantime
+				await withLockFile(getRepoLockPath(repoPath), async () => prune(await readRepoEntries(repoPath, keepRefs)));
+			}
+		} catch (err) {
+			warnings.push(err as Error);
+		}
+	}
+
+	return output;
+}
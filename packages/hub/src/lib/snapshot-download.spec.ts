@@ -270,4 +270,113 @@ describe("snapshotDownload", () => {
 			}),
 		);
 	});
+
+	test("listing entries should be forwarded as pathInfo", async () => {
+		const entry: ListFileEntry = {
+			oid: "dummy-etag",
+			type: "file",
+			path: "file.txt",
+			size: 10,
+			xetHash: "dummy-xet-hash",
+		};
+		vi.mocked(listFiles).mockReturnValue(toAsyncGenerator([entry]));
+
+		await snapshotDownload({
+			repo: {
+				name: "foo/bar",
+				type: "model",
+			},
+		});
+
+		expect(downloadFileToCacheDir).toHaveBeenCalledWith(
+			expect.objectContaining({
+				path: "file.txt",
+				revision: DUMMY_SHA,
+				pathInfo: entry,
+			}),
+		);
+	});
+
+	test("concurrency should be bounded by count and by maxBytesInFlight", async () => {
+		const entries: ListFileEntry[] = Array.from({ length: 8 }, (_, i) => ({
+			oid: `dummy-etag-${i}`,
+			type: "file",
+			path: `file-${i}.bin`,
+			size: 100,
+		}));
+		vi.mocked(listFiles).mockReturnValue(toAsyncGenerator(entries));
+
+		let active = 0;
+		let maxActive = 0;
+		vi.mocked(downloadFileToCacheDir).mockImplementation(async () => {
+			active++;
+			maxActive = Math.max(maxActive, active);
+			await new Promise((resolve) => setTimeout(resolve, 5));
+			active--;
+			return "";
+		});
+
+		await snapshotDownload({
+			repo: {
+				name: "foo/bar",
+				type: "model",
+			},
+			concurrency: 4,
+		});
+		expect(downloadFileToCacheDir).toHaveBeenCalledTimes(8);
+		expect(maxActive).toBe(4);
+
+		maxActive = 0;
+		vi.mocked(listFiles).mockReturnValue(toAsyncGenerator(entries));
+		await snapshotDownload({
+			repo: {
+				name: "foo/bar",
+				type: "model",
+			},
+			concurrency: 4,
+			maxBytesInFlight: 250,
+		});
+		expect(maxActive).toBe(2);
+	});
+
+	test("files with the same content should be downloaded once, then linked", async () => {
+		const entries: ListFileEntry[] = [
+			{ oid: "etag-a", type: "file", path: "a.txt", size: 10 },
+			{ oid: "etag-b", type: "file", path: "b.txt", size: 10 },
+			{ oid: "etag-a", type: "file", path: "copy/a.txt", size: 10 },
+			{ oid: "etag-c", type: "file", path: "c.bin", size: 10, lfs: { oid: "lfs-a", size: 10, pointerSize: 100 } },
+			{ oid: "etag-d", type: "file", path: "copy/c.bin", size: 10, lfs: { oid: "lfs-a", size: 10, pointerSize: 100 } },
+		];
+		vi.mocked(listFiles).mockReturnValue(toAsyncGenerator(entries));
+
+		const running = new Set<string>();
+		const overlaps: string[] = [];
+		vi.mocked(downloadFileToCacheDir).mockImplementation(async ({ pathInfo }) => {
+			const etag = pathInfo?.lfs?.oid ?? pathInfo?.oid ?? "";
+			if (running.has(etag)) {
+				overlaps.push(etag);
+			}
+			running.add(etag);
+			await new Promise((resolve) => setTimeout(resolve, 5));
+			running.delete(etag);
+			return "";
+		});
+
+		await snapshotDownload({
+			repo: {
+				name: "foo/bar",
+				type: "model",
+			},
+			concurrency: 4,
+		});
+
+		expect(overlaps).toEqual([]);
+		expect(vi.mocked(downloadFileToCacheDir).mock.calls.map(([params]) => params.path)).toEqual([
+			"a.txt",
+			"b.txt",
+			"c.bin",
+			"copy/a.txt",
+			"copy/c.bin",
+		]);
+	});
 });
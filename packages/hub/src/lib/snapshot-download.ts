@@ -1,4 +1,5 @@
 import type { CredentialsParams, RepoDesignation } from "../types/public";
+import type { XetChunkStore } from "../utils/XetBlob";
 import { listFiles } from "./list-files";
 import { getHFHubCachePath, getRepoFolderName } from "./cache-management";
 import { spaceInfo } from "./space-info";
@@ -8,6 +9,9 @@ import { toRepoId } from "../utils/toRepoId";
 import { join, dirname } from "node:path";
 import { mkdir, writeFile } from "node:fs/promises";
 import { downloadFileToCacheDir } from "./download-file-to-cache-dir";
+import { promisesQueueStreaming } from "../utils/promisesQueueStreaming";
+import { promisesQueue } from "../utils/promisesQueue";
+import type { ListFileEntry } from "./list-files";
 
 export const DEFAULT_REVISION = "main";
 
@@ -31,6 +35,24 @@ export async function snapshotDownload(
 		 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 		 */
 		fetch?: typeof fetch;
+		/**
+		 * For xet files, local store of decoded chunks shared across downloads, eg a {@link DiskXetChunkStore}.
+		 */
+		xetChunkStore?: XetChunkStore;
+		/**
+		 * Number of files to download in parallel.
+		 *
+		 * @default 1
+		 */
+		concurrency?: number;
+		/**
+		 * Max total size, in bytes, of the files being downloaded at the same time. Only relevant when `concurrency` > 1.
+		 *
+		 * A file bigger than the budget is still downloaded, but only once no other download is in flight.
+		 *
+		 * @default Infinity
+		 */
+		maxBytesInFlight?: number;
 	} & Partial<CredentialsParams>,
 ): Promise<string> {
 	let cacheDir: string;
@@ -99,23 +121,84 @@ export async function snapshotDownload(
 		revision: commitHash,
 	});
 
-	for await (const entry of cursor) {
-		switch (entry.type) {
-			case "file":
-				await downloadFileToCacheDir({
+	const concurrency = Math.max(1, params.concurrency ?? 1);
+	const maxBytesInFlight = params.maxBytesInFlight ?? Infinity;
+
+	// Budget is reserved before a download starts, and released once the file is in the cache.
+	let inFlightBytes = 0;
+	let waiters: Array<() => void> = [];
+	const budgetAcquire = async (n: number) => {
+		while (inFlightBytes > 0 && inFlightBytes + n > maxBytesInFlight) {
+			await new Promise<void>((resolve) => waiters.push(resolve));
+		}
+		inFlightBytes += n;
+	};
+	const budgetRelease = (n: number) => {
+		inFlightBytes -= n;
+		const resolvers = waiters;
+		waiters = [];
+		for (const resolve of resolvers) {
+			resolve();
+		}
+	};
+
+	// Files with the same content share a blob: it's downloaded once, and the other paths are linked to it afterwards
+	const downloadedEtags = new Set<string>();
+	const sameBlobEntries: ListFileEntry[] = [];
+
+	async function* downloads() {
+		for await (const entry of cursor) {
+			switch (entry.type) {
+				case "file": {
+					const etag = entry.lfs?.oid ?? entry.xetHash ?? entry.oid;
+					if (etag) {
+						if (downloadedEtags.has(etag)) {
+							sameBlobEntries.push(entry);
+							break;
+						}
+						downloadedEtags.add(etag);
+					}
+					yield async () => {
+						await budgetAcquire(entry.size);
+						try {
+							await downloadFileToCacheDir({
+								...params,
+								path: entry.path,
+								revision: commitHash,
+								cacheDir: cacheDir,
+								// The listing already has the oids, no need for a pathsInfo round trip per file
+								pathInfo: entry,
+							});
+						} finally {
+							budgetRelease(entry.size);
+						}
+					};
+					break;
+				}
+				case "directory":
+					await mkdir(join(snapshotFolder, entry.path), { recursive: true });
+					break;
+				default:
+					throw new Error(`unknown entry type: ${entry.type}`);
+			}
+		}
+	}
+
+	await promisesQueueStreaming(downloads(), concurrency);
+
+	await promisesQueue(
+		sameBlobEntries.map(
+			(entry) => () =>
+				downloadFileToCacheDir({
 					...params,
 					path: entry.path,
 					revision: commitHash,
 					cacheDir: cacheDir,
-				});
-				break;
-			case "directory":
-				await mkdir(join(snapshotFolder, entry.path), { recursive: true });
-				break;
-			default:
-				throw new Error(`unknown entry type: ${entry.type}`);
-		}
-	}
+					pathInfo: entry,
+				}),
+		),
+		concurrency,
+	);
 
 	return snapshotFolder;
 }
@@ -0,0 +1,64 @@
+import { describe, expect, it } from "vitest";
+import { WebBlob } from "../utils/WebBlob";
+import { TensorReader } from "./tensor-reader";
+
+function webBlobForFile(file: Uint8Array, requestedRanges: string[]): WebBlob {
+	const fetch = (async (_input: RequestInfo | URL, init?: RequestInit) => {
+		const range = new Headers(init?.headers).get("range") ?? "";
+		requestedRanges.push(range);
+		const [start, end] = range.slice("bytes=".length).split("-").map(Number);
+		const body = file.slice(start, end + 1);
+		// Deliver the body in small chunks, to exercise the streaming copy
+		return new Response(
+			new ReadableStream({
+				start(controller) {
+					for (let i = 0; i < body.length; i += 3) {
+						controller.enqueue(body.slice(i, i + 3));
+					}
+					controller.close();
+				},
+			}),
+			{ status: 206, headers: { "content-range": `bytes ${start}-${end}/${file.length}` } },
+		);
+	}) as typeof fetch;
+	return new WebBlob(new URL("https://example.com/model.safetensors"), 0, file.length, "", true, fetch, undefined);
+}
+
+describe("TensorReader", () => {
+	const file = Uint8Array.from({ length: 100 }, (_, i) => i);
+	const ranges = {
+		a: { start: 10, end: 20 },
+		b: { start: 22, end: 30 },
+		c: { start: 80, end: 90 },
+	};
+
+	it("fetches only the requested tensors, coalescing nearby ones", async () => {
+		const requestedRanges: string[] = [];
+		const reader = new TensorReader(webBlobForFile(file, requestedRanges), ranges);
+
+		const tensors = await reader.read(["c", "a", "b"], { maxGapBytes: 10 });
+
+		expect(tensors.a).toEqual(file.slice(10, 20));
+		expect(tensors.b).toEqual(file.slice(22, 30));
+		expect(tensors.c).toEqual(file.slice(80, 90));
+		expect(requestedRanges.sort()).toEqual(["bytes=10-29", "bytes=80-89"]);
+	});
+
+	it("writes to caller-provided buffers", async () => {
+		const reader = new TensorReader(webBlobForFile(file, []), ranges);
+		const buffer = new Uint8Array(16);
+
+		const tensors = await reader.read(["a"], { buffers: { a: buffer } });
+
+		expect(tensors.a.buffer).toBe(buffer.buffer);
+		expect(buffer.subarray(0, 10)).toEqual(file.slice(10, 20));
+		await expect(reader.read(["b"], { buffers: { b: new Uint8Array(4) } })).rejects.toThrow(/too small/);
+	});
+
+	it("rejects unknown tensors and truncated files", async () => {
+		const reader = new TensorReader(webBlobForFile(file, []), { ...ranges, d: { start: 95, end: 110 } });
+
+		await expect(reader.read(["e"])).rejects.toThrow(/Unknown tensor/);
+		await expect(reader.read(["d"])).rejects.toThrow(/Unexpected end of file/);
+	});
+});
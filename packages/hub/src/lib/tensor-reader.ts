@@ -0,0 +1,155 @@
+import { promisesQueue } from "../utils/promisesQueue";
+
+export interface TensorByteRange {
+	/** Offset of the first byte of the tensor in the file */
+	start: number;
+	/** Offset after the last byte of the tensor in the file */
+	end: number;
+}
+
+export interface TensorReadOptions {
+	/**
+	 * Buffers to write the tensors to, by tensor name, instead of allocating new ones.
+	 *
+	 * Each buffer must be at least as large as its tensor.
+	 */
+	buffers?: Record<string, Uint8Array>;
+	/**
+	 * Tensors less than this many bytes apart are fetched with a single range request, the bytes between them are discarded.
+	 *
+	 * @default 1_000_000
+	 */
+	maxGapBytes?: number;
+	/**
+	 * Max number of range requests in flight
+	 *
+	 * @default 4
+	 */
+	concurrency?: number;
+}
+
+interface PendingTensor {
+	name: string;
+	range: TensorByteRange;
+	target: Uint8Array;
+}
+
+/**
+ * Reads individual tensors out of a remote file, eg a safetensors or GGUF file returned by {@link downloadFile},
+ * without downloading the whole file.
+ *
+ * Only the byte ranges of the requested tensors are fetched. Tensors close to each other in the file are fetched
+ * with a single range request, and the data is streamed to the output buffers as it arrives.
+ *
+ * @example
+ * ```ts
+ * const { reader } = await safetensorsTensorReader({ repo: "google-bert/bert-base-uncased", path: "model.safetensors" });
+ * const { "bert.embeddings.word_embeddings.weight": embeddings } = await reader.read(["bert.embeddings.word_embeddings.weight"]);
+ * ```
+ */
+export class TensorReader {
+	readonly blob: Blob;
+	readonly ranges: Record<string, TensorByteRange>;
+
+	/**
+	 * @param blob The file containing the tensors, eg a `WebBlob` or `XetBlob` returned by {@link downloadFile}
+	 * @param ranges Byte ranges of the tensors in the file, by tensor name
+	 */
+	constructor(blob: Blob, ranges: Record<string, TensorByteRange>) {
+		this.blob = blob;
+		this.ranges = ranges;
+	}
+
+	get names(): string[] {
+		return Object.keys(this.ranges);
+	}
+
+	byteLength(name: string): number {
+		const range = this.#range(name);
+		return range.end - range.start;
+	}
+
+	/**
+	 * @returns the bytes of each tensor, by tensor name
+	 */
+	async read(names: string[], opts?: TensorReadOptions): Promise<Record<string, Uint8Array>> {
+		const tensors: PendingTensor[] = [...new Set(names)].map((name) => {
+			const range = this.#range(name);
+			const length = range.end - range.start;
+			const buffer = opts?.buffers?.[name];
+			if (buffer && buffer.byteLength < length) {
+				throw new TypeError(`Buffer for tensor ${name} is too small: ${buffer.byteLength} < ${length} bytes`);
+			}
+			return { name, range, target: buffer ? buffer.subarray(0, length) : new Uint8Array(length) };
+		});
+
+		const groups = coalesceRanges(tensors, opts?.maxGapBytes ?? 1_000_000);
+
+		await promisesQueue(
+			groups.map((group) => () => this.#readGroup(group)),
+			opts?.concurrency ?? 4,
+		);
+
+		return Object.fromEntries(tensors.map(({ name, target }) => [name, target]));
+	}
+
+	async #readGroup(group: { start: number; end: number; tensors: PendingTensor[] }): Promise<void> {
+		const reader = this.blob.slice(group.start, group.end).stream().getReader();
+		let position = group.start;
+		try {
+			while (position < group.end) {
+				const { done, value } = await reader.read();
+				if (done) {
+					break;
+				}
+				const chunkEnd = Math.min(position + value.byteLength, group.end);
+				for (const { range, target } of group.tensors) {
+					const from = Math.max(position, range.start);
+					const to = Math.min(chunkEnd, range.end);
+					if (from < to) {
+						target.set(value.subarray(from - position, to - position), from - range.start);
+					}
+				}
+				position = chunkEnd;
+			}
+		} finally {
+			await reader.cancel().catch(() => {});
+		}
+
+		if (position < group.end) {
+			throw new Error(`Unexpected end of file at byte ${position}, expected ${group.end} bytes`);
+		}
+	}
+
+	#range(name: string): TensorByteRange {
+		const range = this.ranges[name];
+		if (!range) {
+			throw new TypeError(`Unknown tensor: ${name}`);
+		}
+		return range;
+	}
+}
+
+/**
+ * Groups the tensors into as few ranges as possible, without fetching more than `maxGapBytes` of unused data between two tensors
+ */
+function coalesceRanges(
+	tensors: PendingTensor[],
+	maxGapBytes: number,
+): Array<{ start: number; end: number; tensors: PendingTensor[] }> {
+	const sorted = [...tensors].sort((a, b) => a.range.start - b.range.start);
+	const groups: Array<{ start: number; end: number; tensors: PendingTensor[] }> = [];
+
+	for (const tensor of sorted) {
+		const last = groups.at(-1);
+		if (last && tensor.range.start - last.end <= maxGapBytes) {
+			last.end = Math.max(last.end, tensor.range.end);
+			last.tensors.push(tensor);
+		} else {
+			groups.push({ start: tensor.range.start, end: tensor.range.end, tensors: [tensor] });
+		}
+	}
+
+	// Empty tensors don't need any request
+	return groups.filter((group) => group.end > group.start);
+}
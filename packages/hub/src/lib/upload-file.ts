@@ -16,6 +16,10 @@ export function uploadFile(
 		useWebWorkers?: CommitParams["useWebWorkers"];
 		abortSignal?: CommitParams["abortSignal"];
 		useXet?: CommitParams["useXet"];
+		xetChunkCacheSnapshot?: CommitParams["xetChunkCacheSnapshot"];
+		xetChunkerPool?: CommitParams["xetChunkerPool"];
+		xetHashWhileUploading?: CommitParams["xetHashWhileUploading"];
+		lfsUploads?: CommitParams["lfsUploads"];
 	} & Partial<CredentialsParams>,
 ): Promise<CommitOutput | undefined> {
 	const path =
@@ -45,5 +49,9 @@ export function uploadFile(
 		useWebWorkers: params.useWebWorkers,
 		abortSignal: params.abortSignal,
 		useXet: params.useXet,
+		xetChunkCacheSnapshot: params.xetChunkCacheSnapshot,
+		xetChunkerPool: params.xetChunkerPool,
+		xetHashWhileUploading: params.xetHashWhileUploading,
+		lfsUploads: params.lfsUploads,
 	});
 }
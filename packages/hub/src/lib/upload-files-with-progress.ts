@@ -30,6 +30,10 @@ export async function* uploadFilesWithProgress(
 		abortSignal?: CommitParams["abortSignal"];
 		maxFolderDepth?: CommitParams["maxFolderDepth"];
 		useXet?: CommitParams["useXet"];
+		xetChunkCacheSnapshot?: CommitParams["xetChunkCacheSnapshot"];
+		xetChunkerPool?: CommitParams["xetChunkerPool"];
+		xetHashWhileUploading?: CommitParams["xetHashWhileUploading"];
+		lfsUploads?: CommitParams["lfsUploads"];
 		/**
 		 * Set this to true in order to have progress events for hashing
 		 */
@@ -53,6 +57,10 @@ export async function* uploadFilesWithProgress(
 		useWebWorkers: params.useWebWorkers,
 		abortSignal: params.abortSignal,
 		useXet: params.useXet,
+		xetChunkCacheSnapshot: params.xetChunkCacheSnapshot,
+		xetChunkerPool: params.xetChunkerPool,
+		xetHashWhileUploading: params.xetHashWhileUploading,
+		lfsUploads: params.lfsUploads,
 		fetch: async (input, init) => {
 			if (!init) {
 				return fetch(input);
@@ -17,6 +17,10 @@ export function uploadFiles(
 		maxFolderDepth?: CommitParams["maxFolderDepth"];
 		abortSignal?: CommitParams["abortSignal"];
 		useXet?: CommitParams["useXet"];
+		xetChunkCacheSnapshot?: CommitParams["xetChunkCacheSnapshot"];
+		xetChunkerPool?: CommitParams["xetChunkerPool"];
+		xetHashWhileUploading?: CommitParams["xetHashWhileUploading"];
+		lfsUploads?: CommitParams["lfsUploads"];
 	} & Partial<CredentialsParams>,
 ): Promise<CommitOutput | undefined> {
 	return commit({
@@ -37,5 +41,9 @@ export function uploadFiles(
 		useWebWorkers: params.useWebWorkers,
 		abortSignal: params.abortSignal,
 		useXet: params.useXet,
+		xetChunkCacheSnapshot: params.xetChunkCacheSnapshot,
+		xetChunkerPool: params.xetChunkerPool,
+		xetHashWhileUploading: params.xetHashWhileUploading,
+		lfsUploads: params.lfsUploads,
 	});
 }
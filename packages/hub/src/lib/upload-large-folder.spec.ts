@@ -0,0 +1,153 @@
+import { describe, expect, it, beforeEach, afterEach } from "vitest";
+import { mkdir, mkdtemp, readFile, rm, writeFile } from "node:fs/promises";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import type { UploadLargeFolderEvent } from "./upload-large-folder";
+import { uploadLargeFolder, uploadLargeFolderIter } from "./upload-large-folder";
+
+/**
+ * Minimal Hub: files ending in ".bin" are LFS files, stored by sha256
+ */
+function createFakeHub() {
+	const hub = {
+		storedOids: new Set<string>(),
+		commits: [] as string[][],
+		uploads: 0,
+		failCommits: false,
+		fetch: (async (input: string | URL | Request, init?: RequestInit) => {
+			const url = input.toString();
+			if (url.includes("/preupload/")) {
+				const { files } = JSON.parse(init?.body as string) as { files: Array<{ path: string }> };
+				return Response.json({
+					files: files.map((file) => ({ path: file.path, uploadMode: file.path.endsWith(".bin") ? "lfs" : "regular" })),
+				});
+			}
+			if (url.endsWith("/objects/batch")) {
+				const { objects } = JSON.parse(init?.body as string) as { objects: Array<{ oid: string; size: number }> };
+				return Response.json({
+					transfer: "basic",
+					objects: objects.map((obj) => ({
+						...obj,
+						...(!hub.storedOids.has(obj.oid) && { actions: { upload: { href: `https://storage.test/${obj.oid}` } } }),
+					})),
+				});
+			}
+			if (url.startsWith("https://storage.test/")) {
+				hub.uploads++;
+				hub.storedOids.add(url.slice("https://storage.test/".length));
+				return new Response(null, { status: 200 });
+			}
+			if (url.includes("/commit/")) {
+				if (hub.failCommits) {
+					return new Response("Internal error", { status: 500 });
+				}
+				const lines = (init?.body as string).split("\n").map((line) => JSON.parse(line));
+				hub.commits.push(lines.filter((line) => line.key !== "header").map((line) => line.value.path));
+				return Response.json({ commitOid: `commit-${hub.commits.length}`, commitUrl: "https://hub.test/commit" });
+			}
+			return new Response("Not found", { status: 404 });
+		}) as typeof fetch,
+	};
+	return hub;
+}
+
+describe("uploadLargeFolder", () => {
+	let folder: string;
+
+	beforeEach(async () => {
+		folder = await mkdtemp(join(tmpdir(), "hf-upload-large-folder-"));
+		await mkdir(join(folder, "data"));
+		await writeFile(join(folder, "README.md"), "readme");
+		await writeFile(join(folder, "data", "a.bin"), "a".repeat(1000));
+		await writeFile(join(folder, "data", "b.bin"), "b".repeat(1000));
+		await writeFile(join(folder, "data", "c.bin"), "c".repeat(1000));
+	});
+
+	afterEach(async () => {
+		await rm(folder, { recursive: true, force: true });
+	});
+
+	it("should upload the folder in several commits", async () => {
+		const hub = createFakeHub();
+
+		const output = await uploadLargeFolder({
+			repo: "user/repo",
+			accessToken: "hf_token",
+			hubUrl: "https://hub.test",
+			fetch: hub.fetch,
+			useXet: false,
+			folder,
+			pathInRepo: "dataset",
+			maxFilesPerCommit: 3,
+		});
+
+		expect(output.committedFiles).toBe(4);
+		expect(output.skippedFiles).toBe(0);
+		expect(output.commits.map((commit) => commit?.commit.oid)).toEqual(["commit-1", "commit-2"]);
+		expect(hub.commits).toEqual([
+			["dataset/README.md", "dataset/data/a.bin", "dataset/data/b.bin"],
+			["dataset/data/c.bin"],
+		]);
+		expect(hub.uploads).toBe(3);
+
+		const manifest = (await readFile(join(folder, ".cache", "huggingface", "upload-large-folder.jsonl"), "utf-8"))
+			.trim()
+			.split("\n")
+			.map((line) => JSON.parse(line));
+		expect(manifest).toHaveLength(5);
+		expect(manifest.slice(1).every((entry) => entry.state === "committed")).toBe(true);
+		expect(manifest.find((entry) => entry.path === "dataset/data/a.bin")?.sha256).toHaveLength(64);
+	});
+
+	it("should only upload the files that changed since the last upload", async () => {
+		const hub = createFakeHub();
+		const params = {
+			repo: "user/repo",
+			accessToken: "hf_token",
+			hubUrl: "https://hub.test",
+			fetch: hub.fetch,
+			useXet: false,
+			folder,
+		};
+
+		await uploadLargeFolder(params);
+		await writeFile(join(folder, "data", "b.bin"), "B".repeat(2000));
+		const output = await uploadLargeFolder(params);
+
+		expect(output.committedFiles).toBe(1);
+		expect(output.skippedFiles).toBe(3);
+		expect(hub.commits.at(-1)).toEqual(["data/b.bin"]);
+
+		expect((await uploadLargeFolder(params)).commits).toEqual([]);
+	});
+
+	it("should resume without hashing or uploading files again", async () => {
+		const hub = createFakeHub();
+		hub.failCommits = true;
+		const params = {
+			repo: "user/repo",
+			accessToken: "hf_token",
+			hubUrl: "https://hub.test",
+			fetch: hub.fetch,
+			useXet: false,
+			folder,
+		};
+
+		await expect(uploadLargeFolder(params)).rejects.toThrow();
+		expect(hub.uploads).toBe(3);
+
+		hub.failCommits = false;
+		const events: UploadLargeFolderEvent[] = [];
+		const iterator = uploadLargeFolderIter(params);
+		let res = await iterator.next();
+		while (!res.done) {
+			events.push(res.value);
+			res = await iterator.next();
+		}
+
+		expect(res.value.committedFiles).toBe(4);
+		expect(hub.uploads).toBe(3);
+		expect(events.some((event) => event.event === "fileProgress" && event.state === "hashing")).toBe(false);
+		expect(events.some((event) => event.event === "fileHashed")).toBe(false);
+	});
+});
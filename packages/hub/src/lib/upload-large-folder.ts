@@ -0,0 +1,426 @@
+import { createReadStream } from "node:fs";
+import { appendFile, mkdir, open, readdir, rename, stat } from "node:fs/promises";
+import { dirname, join } from "node:path";
+import { createInterface } from "node:readline";
+import { fileURLToPath } from "node:url";
+import type { CredentialsParams } from "../types/public";
+import { FileBlob } from "../utils/FileBlob";
+import { promisesQueue } from "../utils/promisesQueue";
+import { toRepoId } from "../utils/toRepoId";
+import type { CommitFile, CommitOutput, CommitParams, CommitProgressEvent } from "./commit";
+import { commitIter } from "./commit";
+
+const UPLOAD_MANIFEST_VERSION = 1;
+const CONCURRENT_STATS = 64;
+/**
+ * Manifest updates are appended to the file by batches of this size, and at the end of each commit
+ */
+const MANIFEST_FLUSH_LINES = 1_000;
+/**
+ * Local folders that are never uploaded
+ */
+const IGNORED_FOLDERS = [".git", ".cache/huggingface"];
+
+export interface UploadManifestEntry {
+	/**
+	 * Path of the file in the repo
+	 */
+	path: string;
+	size: number;
+	mtimeMs: number;
+	/**
+	 * Only for LFS files
+	 */
+	sha256?: string;
+	/**
+	 * Only for LFS files uploaded with xet
+	 */
+	xetHash?: string;
+	state: "hashed" | "uploaded" | "committed";
+	/**
+	 * Commit that added the file, once committed
+	 */
+	commitOid?: string;
+}
+
+interface UploadManifestHeader {
+	version: number;
+	repo: string;
+	branch: string;
+}
+
+export type UploadLargeFolderEvent =
+	| CommitProgressEvent
+	| {
+			event: "commit";
+			/**
+			 * Paths in the repo of the files in the commit
+			 */
+			paths: string[];
+			output: CommitOutput | undefined;
+	  };
+
+export interface UploadLargeFolderOutput {
+	commits: Array<CommitOutput | undefined>;
+	/**
+	 * Number of files committed by this call
+	 */
+	committedFiles: number;
+	/**
+	 * Number of files left untouched because the manifest shows they're already committed
+	 */
+	skippedFiles: number;
+}
+
+export type UploadLargeFolderParams = {
+	repo: CommitParams["repo"];
+	/**
+	 * Local folder to upload
+	 */
+	folder: string | URL;
+	/**
+	 * Folder in the repo to upload to
+	 *
+	 * @default "" (root of the repo)
+	 */
+	pathInRepo?: string;
+	/**
+	 * Where to keep track of the files hashed, uploaded and committed, to resume an interrupted upload and
+	 * only upload what changed since the last one. Files are identified by their path, size and modification time.
+	 *
+	 * @default `<folder>/.cache/huggingface/upload-large-folder.jsonl` (`.cache/huggingface` and `.git` are not uploaded)
+	 */
+	manifestPath?: string;
+	/**
+	 * @default 1_000
+	 */
+	maxFilesPerCommit?: number;
+	/**
+	 * A single file bigger than that still gets its own commit
+	 *
+	 * @default 50GB
+	 */
+	maxBytesPerCommit?: number;
+	/**
+	 * Title of the commits, followed by the commit number
+	 *
+	 * @default "Upload large folder"
+	 */
+	commitTitle?: string;
+	hubUrl?: CommitParams["hubUrl"];
+	branch?: CommitParams["branch"];
+	fetch?: CommitParams["fetch"];
+	abortSignal?: CommitParams["abortSignal"];
+	useXet?: CommitParams["useXet"];
+	xetChunkCacheSnapshot?: CommitParams["xetChunkCacheSnapshot"];
+	xetChunkerPool?: CommitParams["xetChunkerPool"];
+	xetHashWhileUploading?: CommitParams["xetHashWhileUploading"];
+	lfsUploads?: CommitParams["lfsUploads"];
+} & Partial<CredentialsParams>;
+
+interface LocalFile {
+	/**
+	 * Path of the file in the repo
+	 */
+	path: string;
+	localPath: string;
+	size: number;
+	mtimeMs: number;
+}
+
+/**
+ * Lists the files in `folder` and its subfolders, sorted by path
+ */
+async function listLocalFiles(folder: string, pathInRepo: string): Promise<LocalFile[]> {
+	const candidates: Array<{ localPath: string; relativePath: string }> = [];
+	const dirs = [""];
+	for (let dir = dirs.pop(); dir !== undefined; dir = dirs.pop()) {
+		for (const entry of await readdir(join(folder, dir), { withFileTypes: true })) {
+			const relativePath = dir ? `${dir}/${entry.name}` : entry.name;
+			if (IGNORED_FOLDERS.includes(relativePath)) {
+				continue;
+			}
+			if (entry.isDirectory()) {
+				dirs.push(relativePath);
+			} else {
+				candidates.push({ localPath: join(folder, relativePath), relativePath });
+			}
+		}
+	}
+
+	const files = await promisesQueue(
+		candidates.map((candidate) => async () => {
+			// Follows symlinks
+			const fileStat = await stat(candidate.localPath);
+			if (!fileStat.isFile()) {
+				return null;
+			}
+			return {
+				path: pathInRepo ? `${pathInRepo}/${candidate.relativePath}` : candidate.relativePath,
+				localPath: candidate.localPath,
+				size: fileStat.size,
+				mtimeMs: fileStat.mtimeMs,
+			};
+		}),
+		CONCURRENT_STATS,
+	);
+
+	return files.filter((file): file is LocalFile => file !== null).sort((a, b) => (a.path < b.path ? -1 : 1));
+}
+
+async function readUploadManifest(
+	manifestPath: string,
+	header: UploadManifestHeader,
+): Promise<Map<string, UploadManifestEntry>> {
+	const entries = new Map<string, UploadManifestEntry>();
+	try {
+		let isHeader = true;
+		for await (const line of createInterface({ input: createReadStream(manifestPath), crlfDelay: Infinity })) {
+			let parsed: UploadManifestHeader | UploadManifestEntry;
+			try {
+				parsed = JSON.parse(line);
+			} catch {
+				// Last line cut short by a crash
+				continue;
+			}
+			if (isHeader) {
+				isHeader = false;
+				const fileHeader = parsed as UploadManifestHeader;
+				if (
+					fileHeader.version !== header.version ||
+					fileHeader.repo !== header.repo ||
+					fileHeader.branch !== header.branch
+				) {
+					// Manifest of another upload
+					return new Map();
+				}
+				continue;
+			}
+			// Later lines are updates of earlier ones
+			entries.set((parsed as UploadManifestEntry).path, parsed as UploadManifestEntry);
+		}
+	} catch (err) {
+		if ((err as NodeJS.ErrnoException).code === "ENOENT") {
+			return entries;
+		}
+		throw err;
+	}
+	return entries;
+}
+
+/**
+ * Rewrites the manifest with only the latest state of each entry
+ */
+async function writeUploadManifest(
+	manifestPath: string,
+	header: UploadManifestHeader,
+	entries: Iterable<UploadManifestEntry>,
+): Promise<void> {
+	await mkdir(dirname(manifestPath), { recursive: true });
+	const incomplete = `${manifestPath}.incomplete`;
+	const handle = await open(incomplete, "w");
+	try {
+		let lines = [JSON.stringify(header)];
+		for (const entry of entries) {
+			lines.push(JSON.stringify(entry));
+			if (lines.length >= MANIFEST_FLUSH_LINES) {
+				await handle.write(lines.join("\n") + "\n");
+				lines = [];
+			}
+		}
+		await handle.write(lines.length ? lines.join("\n") + "\n" : "");
+	} finally {
+		await handle.close();
+	}
+	await rename(incomplete, manifestPath);
+}
+
+/**
+ * Groups files in batches of at most `maxFiles` files and `maxBytes` bytes
+ */
+function batchFiles(files: LocalFile[], maxFiles: number, maxBytes: number): LocalFile[][] {
+	const batches: LocalFile[][] = [];
+	let batch: LocalFile[] = [];
+	let batchBytes = 0;
+	for (const file of files) {
+		if (batch.length > 0 && (batch.length >= maxFiles || batchBytes + file.size > maxBytes)) {
+			batches.push(batch);
+			batch = [];
+			batchBytes = 0;
+		}
+		batch.push(file);
+		batchBytes += file.size;
+	}
+	if (batch.length > 0) {
+		batches.push(batch);
+	}
+	return batches;
+}
+
+/**
+ * Uploads a local folder in several commits, keeping track of progress in a local manifest.
+ *
+ * If the upload is interrupted, running it again resumes where it stopped: committed files are skipped,
+ * and the sha256 of hashed files is reused instead of being computed again. Files uploaded but not yet
+ * committed are not uploaded again, since the Hub already has them.
+ *
+ * Running it again later only uploads the files added or modified since, making it suitable for periodic syncs.
+ * Files removed locally are not deleted from the repo.
+ *
+ * Note: this does not work in the browser
+ */
+export async function* uploadLargeFolderIter(
+	params: UploadLargeFolderParams,
+): AsyncGenerator<UploadLargeFolderEvent, UploadLargeFolderOutput> {
+	const folder = params.folder instanceof URL ? fileURLToPath(params.folder) : params.folder;
+	const pathInRepo = (params.pathInRepo ?? "").replace(/^\/+|\/+$/g, "");
+	const manifestPath = params.manifestPath ?? join(folder, ".cache", "huggingface", "upload-large-folder.jsonl");
+	const repoId = toRepoId(params.repo);
+	const header: UploadManifestHeader = {
+		version: UPLOAD_MANIFEST_VERSION,
+		repo: `${repoId.type}s/${repoId.name}`,
+		branch: params.branch ?? "main",
+	};
+
+	const files = await listLocalFiles(folder, pathInRepo);
+	const previous = await readUploadManifest(manifestPath, header);
+
+	// Only keep the entries of files that didn't change
+	const manifest = new Map<string, UploadManifestEntry>();
+	for (const file of files) {
+		const entry = previous.get(file.path);
+		if (entry && entry.size === file.size && entry.mtimeMs === file.mtimeMs) {
+			manifest.set(file.path, entry);
+		}
+	}
+	await writeUploadManifest(manifestPath, header, manifest.values());
+
+	const pending: string[] = [];
+	const record = (entry: UploadManifestEntry) => {
+		manifest.set(entry.path, entry);
+		pending.push(JSON.stringify(entry) + "\n");
+	};
+	const flush = async () => {
+		if (pending.length) {
+			await appendFile(manifestPath, pending.join(""));
+			pending.length = 0;
+		}
+	};
+
+	const toUpload = files.filter((file) => manifest.get(file.path)?.state !== "committed");
+	const batches = batchFiles(
+		toUpload,
+		params.maxFilesPerCommit ?? 1_000,
+		params.maxBytesPerCommit ?? 50 * 1024 * 1024 * 1024,
+	);
+	const output: UploadLargeFolderOutput = {
+		commits: [],
+		committedFiles: 0,
+		skippedFiles: files.length - toUpload.length,
+	};
+	const filesByPath = new Map(toUpload.map((file) => [file.path, file]));
+
+	try {
+		for (const [i, batch] of batches.entries()) {
+			const operations: CommitFile[] = await Promise.all(
+				batch.map(async (file) => ({
+					operation: "addOrUpdate" as const,
+					path: file.path,
+					content: await FileBlob.create(file.localPath),
+					sha256: manifest.get(file.path)?.sha256,
+				})),
+			);
+
+			const iterator = commitIter({
+				...(params.accessToken ? { accessToken: params.accessToken } : { credentials: params.credentials }),
+				repo: params.repo,
+				operations,
+				title: `${params.commitTitle ?? "Upload large folder"} (${i + 1}/${batches.length})`,
+				hubUrl: params.hubUrl,
+				branch: params.branch,
+				fetch: params.fetch,
+				abortSignal: params.abortSignal,
+				useXet: params.useXet,
+				xetChunkCacheSnapshot: params.xetChunkCacheSnapshot,
+				xetChunkerPool: params.xetChunkerPool,
+				xetHashWhileUploading: params.xetHashWhileUploading,
+				lfsUploads: params.lfsUploads,
+			});
+
+			const failedPaths: string[] = [];
+			let res = await iterator.next();
+			while (!res.done) {
+				const event = res.value;
+				const file = "path" in event ? filesByPath.get(event.path) : undefined;
+				if (event.event === "fileHashed" && file) {
+					const entry = manifest.get(file.path);
+					record({
+						path: file.path,
+						size: file.size,
+						mtimeMs: file.mtimeMs,
+						sha256: event.sha256,
+						xetHash: event.xetHash ?? entry?.xetHash,
+						state: entry?.state === "uploaded" ? "uploaded" : "hashed",
+					});
+				} else if (event.event === "fileProgress" && file) {
+					const entry = manifest.get(file.path);
+					if (event.state === "error") {
+						failedPaths.push(event.path);
+					} else if (event.state === "uploading" && event.progress === 1 && entry?.sha256 && entry.state === "hashed") {
+						record({ ...entry, state: "uploaded" });
+					}
+				}
+				if (pending.length >= MANIFEST_FLUSH_LINES) {
+					await flush();
+				}
+				yield event;
+				res = await iterator.next();
+			}
+			if (failedPaths.length > 0) {
+				throw new Error(
+					`Failed to upload ${failedPaths.length} file(s): ${failedPaths.slice(0, 5).join(", ")}${
+						failedPaths.length > 5 ? "..." : ""
+					}`,
+				);
+			}
+
+			for (const file of batch) {
+				record({
+					...manifest.get(file.path),
+					path: file.path,
+					size: file.size,
+					mtimeMs: file.mtimeMs,
+					state: "committed",
+					commitOid: res.value?.commit.oid,
+				});
+			}
+			await flush();
+
+			output.commits.push(res.value);
+			output.committedFiles += batch.length;
+			yield { event: "commit", paths: batch.map((file) => file.path), output: res.value };
+		}
+	} finally {
+		// Keep the hashes computed so far if the upload fails
+		await flush();
+	}
+
+	// Compact the appended updates
+	await writeUploadManifest(manifestPath, header, manifest.values());
+
+	return output;
+}
+
+/**
+ * Uploads a local folder in several commits, resuming where a previous call stopped. See {@link uploadLargeFolderIter}.
+ *
+ * Note: this does not work in the browser
+ */
+export async function uploadLargeFolder(params: UploadLargeFolderParams): Promise<UploadLargeFolderOutput> {
+	const iterator = uploadLargeFolderIter(params);
+	let res = await iterator.next();
+	while (!res.done) {
+		res = await iterator.next();
+	}
+	return res.value;
+}
@@ -1,5 +1,7 @@
 import { describe, it, expect } from "vitest";
+import { readFile } from "fs/promises";
 import { ChunkCache } from "./ChunkCache";
+import { parseShardData, ShardView } from "./shardParser";
 
 describe("ChunkCache", () => {
 	describe("basic operations", () => {
@@ -262,4 +264,46 @@ describe("ChunkCache", () => {
 			expect(cache.map.size).toBe(0);
 		});
 	});
+
+	describe("shards", () => {
+		it("looks up the chunks of a shard, with its HMAC key", async () => {
+			const bytes = new Uint8Array(await readFile("tests/gpt2-64-8bits.tflite.shard"));
+			const shardData = await parseShardData(new Blob([bytes]));
+			const cache = new ChunkCache();
+			cache.addShard(new ShardView(bytes), -1);
+
+			const hmacHash = shardData.xorbs[1].chunks[2].hash;
+			const computeHmac = (hash: string, key: string) => (hash === "original" && key === shardData.hmacKey ? hmacHash : "");
+
+			expect(cache.getChunk(hmacHash, null)).toEqual({ xorbIndex: -2, chunkIndex: 2 });
+			expect(cache.getChunk("original", computeHmac)).toEqual({ xorbIndex: -2, chunkIndex: 2 });
+			expect(cache.getChunk("other", computeHmac)).toBeUndefined();
+		});
+
+		it("looks up the raw hash in a shard without HMAC key", async () => {
+			const bytes = new Uint8Array(await readFile("tests/gpt2-64-8bits.tflite.shard"));
+			// Zero the HMAC key in the footer
+			const footerStart = bytes.length - Number(new DataView(bytes.buffer, bytes.byteOffset).getBigUint64(40, true));
+			bytes.fill(0, footerStart + 72, footerStart + 104);
+			const shardData = await parseShardData(new Blob([bytes]));
+			const cache = new ChunkCache();
+			cache.addShard(new ShardView(bytes), -1);
+
+			const hash = shardData.xorbs[1].chunks[2].hash;
+			const computeHmac = (hash: string) => `hmac-${hash}`;
+
+			expect(shardData.hmacKey).toBe("0".repeat(64));
+			expect(cache.getChunk(hash, computeHmac)).toEqual({ xorbIndex: -2, chunkIndex: 2 });
+		});
+
+		it("drops the oldest shards above maxSize chunks", async () => {
+			const shard = new ShardView(new Uint8Array(await readFile("tests/gpt2-64-8bits.tflite.shard")));
+			const cache = new ChunkCache(shard.chunkCount + 1);
+
+			cache.addShard(shard, -1);
+			cache.addShard(shard, -10);
+
+			expect(cache.shards.map(({ firstXorbIndex }) => firstXorbIndex)).toEqual([-10]);
+		});
+	});
 });
@@ -1,6 +1,35 @@
+import type { ShardView } from "./shardParser";
+
 const CHUNK_CACHE_INITIAL_SIZE = 10_000;
 const CHUNK_CACHE_GROW_FACTOR = 1.5;
 const CHUNK_CACHE_MAX_SIZE = 1_000_000;
+/** Shards without HMAC key, eg global dedup shards for public repos, contain the chunk hashes as is */
+export const NO_HMAC_KEY = "0".repeat(64);
+
+/**
+ * Wraps an HMAC function so that the HMAC of a hash with a given key is computed only once.
+ *
+ * Only the HMACs of the last hash are kept, which is enough to share them between the lookups of a chunk
+ * in the chunk cache, its shards and the chunk cache snapshot.
+ */
+export function memoizeHmacFunction(
+	hmacFunction: (hash: string, key: string) => string,
+): (hash: string, key: string) => string {
+	let lastHash: string | undefined;
+	const hmacs = new Map<string, string>();
+	return (hash, key) => {
+		if (hash !== lastHash) {
+			lastHash = hash;
+			hmacs.clear();
+		}
+		let hmac = hmacs.get(key);
+		if (hmac === undefined) {
+			hmac = hmacFunction(hash, key);
+			hmacs.set(key, hmac);
+		}
+		return hmac;
+	};
+}
 
 export class ChunkCache {
 	index = 0;
@@ -10,7 +39,16 @@ export class ChunkCache {
 	chunkIndices: Uint16Array;
 	map = new Map<string, number>(); // hash -> chunkCacheIndex. Less overhead that way, empty object is 60+B and empty array is 40+B
 	hmacs = new Set<string>(); // todo : remove old hmacs
+	/** Expiry of the shard HMAC keys, in seconds since epoch (0 = no expiry) */
+	hmacExpiries = new Map<string, number>();
+	/**
+	 * Shards from remote dedup, whose chunks are looked up in place instead of being copied to `map`.
+	 *
+	 * Xorb `i` of a shard has the xorb index `firstXorbIndex - i`
+	 */
+	shards: Array<{ shard: ShardView; firstXorbIndex: number }> = [];
 	maxSize: number;
+	#shardChunks = 0;
 
 	constructor(maxSize: number = CHUNK_CACHE_MAX_SIZE) {
 		if (maxSize < 1) {
@@ -55,6 +93,20 @@ export class ChunkCache {
 		this.index = (this.index + 1) % this.maxSize;
 	}
 
+	/**
+	 * Adds the chunks of a remote shard to the cache, without decoding them.
+	 *
+	 * Oldest shards are dropped once the shards hold more than `maxSize` chunks
+	 */
+	addShard(shard: ShardView, firstXorbIndex: number): void {
+		this.shards.push({ shard, firstXorbIndex });
+		this.#shardChunks += shard.chunkCount;
+		while (this.#shardChunks > this.maxSize && this.shards.length > 1) {
+			// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
+			this.#shardChunks -= this.shards.shift()!.shard.chunkCount;
+		}
+	}
+
 	getChunk(
 		hash: string,
 		/**
@@ -69,6 +121,7 @@ export class ChunkCache {
 		| undefined {
 		let index = this.map.get(hash);
 		if (index === undefined && hmacFunction !== null) {
+			hmacFunction = memoizeHmacFunction(hmacFunction);
 			for (const hmac of this.hmacs) {
 				index = this.map.get(hmacFunction(hash, hmac));
 				if (index !== undefined) {
@@ -77,7 +130,7 @@ export class ChunkCache {
 			}
 		}
 		if (index === undefined) {
-			return undefined;
+			return this.#getChunkFromShards(hash, hmacFunction);
 		}
 		return {
 			xorbIndex: this.xorbIndices[index],
@@ -85,6 +138,24 @@ export class ChunkCache {
 		};
 	}
 
+	#getChunkFromShards(
+		hash: string,
+		hmacFunction: ((hash: string, key: string) => string) | null,
+	): { xorbIndex: number; chunkIndex: number } | undefined {
+		for (let i = this.shards.length - 1; i >= 0; i--) {
+			const { shard, firstXorbIndex } = this.shards[i];
+			let key = hash;
+			if (hmacFunction !== null && shard.hmacKey && shard.hmacKey !== NO_HMAC_KEY) {
+				key = hmacFunction(hash, shard.hmacKey);
+			}
+			const found = shard.findChunk(key);
+			if (found) {
+				return { xorbIndex: firstXorbIndex - found.xorbIndex, chunkIndex: found.chunkIndex };
+			}
+		}
+		return undefined;
+	}
+
 	updateChunkIndex(hash: string, chunkIndex: number): void {
 		const index = this.map.get(hash);
 		if (index === undefined) {
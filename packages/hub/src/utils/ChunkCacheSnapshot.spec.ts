@@ -0,0 +1,95 @@
+import { describe, expect, it } from "vitest";
+import { ChunkCache, memoizeHmacFunction } from "./ChunkCache";
+import { ChunkCacheSnapshot } from "./ChunkCacheSnapshot";
+
+const hash = (c: string) => c.repeat(64);
+const nowSeconds = () => Math.floor(Date.now() / 1000);
+
+describe("ChunkCacheSnapshot", () => {
+	it("should find chunks after a serialize / deserialize roundtrip", () => {
+		const snapshot = new ChunkCacheSnapshot();
+		snapshot.add([
+			{ hash: hash("b"), xorbHash: hash("1"), chunkIndex: 3, expiresAt: Infinity },
+			{ hash: hash("a"), xorbHash: hash("1"), chunkIndex: 2, expiresAt: Infinity },
+			{ hash: hash("c"), xorbHash: hash("2"), chunkIndex: 0, expiresAt: Infinity },
+		]);
+		expect(snapshot.getChunk(hash("a"), null)).toMatchObject({ xorbHash: hash("1"), chunkIndex: 2 });
+
+		const loaded = ChunkCacheSnapshot.deserialize(snapshot.serialize());
+		expect(loaded.getChunk(hash("a"), null)).toMatchObject({ xorbHash: hash("1"), chunkIndex: 2 });
+		expect(loaded.getChunk(hash("b"), null)).toMatchObject({ xorbHash: hash("1"), chunkIndex: 3 });
+		expect(loaded.getChunk(hash("c"), null)).toMatchObject({ xorbHash: hash("2"), chunkIndex: 0 });
+		expect(loaded.getChunk(hash("d"), null)).toBeUndefined();
+
+		// Unaligned bytes, eg from a larger buffer
+		const bytes = snapshot.serialize();
+		const unaligned = new Uint8Array(bytes.byteLength + 1).subarray(1);
+		unaligned.set(bytes);
+		expect(ChunkCacheSnapshot.deserialize(unaligned).getChunk(hash("c"), null)).toMatchObject({ chunkIndex: 0 });
+	});
+
+	it("should drop expired entries", () => {
+		const snapshot = new ChunkCacheSnapshot();
+		snapshot.add([
+			{ hash: hash("a"), xorbHash: hash("1"), chunkIndex: 0, expiresAt: nowSeconds() - 1 },
+			{ hash: hash("b"), xorbHash: hash("2"), chunkIndex: 0, expiresAt: Infinity },
+		]);
+
+		const loaded = ChunkCacheSnapshot.deserialize(snapshot.serialize());
+		expect(loaded.getChunk(hash("a"), null)).toBeUndefined();
+		expect(loaded.getChunk(hash("b"), null)).toBeDefined();
+
+		const shortLived = ChunkCacheSnapshot.deserialize(snapshot.serialize(), { maxAge: 0 });
+		shortLived.add([{ hash: hash("c"), xorbHash: hash("3"), chunkIndex: 0, expiresAt: Infinity }]);
+		expect(shortLived.getChunk(hash("c"), null)).toBeUndefined();
+	});
+
+	it("should look up global dedup chunks with their HMAC keys, while the keys are valid", () => {
+		const hmac = (chunkHash: string, key: string) => (chunkHash[0] === "a" && key === hash("f") ? hash("e") : hash("0"));
+
+		const snapshot = new ChunkCacheSnapshot();
+		snapshot.add(
+			[{ hash: hash("e"), xorbHash: hash("1"), chunkIndex: 5, expiresAt: Infinity }],
+			[
+				{ key: hash("f"), expiresAt: Infinity },
+				{ key: hash("9"), expiresAt: Infinity },
+			],
+		);
+
+		const loaded = ChunkCacheSnapshot.deserialize(snapshot.serialize());
+		expect(loaded.getChunk(hash("a"), hmac)).toMatchObject({ xorbHash: hash("1"), chunkIndex: 5 });
+		expect(loaded.getChunk(hash("a"), null)).toBeUndefined();
+
+		const expiredKey = new ChunkCacheSnapshot();
+		expiredKey.add(
+			[{ hash: hash("e"), xorbHash: hash("1"), chunkIndex: 5, expiresAt: Infinity }],
+			[{ key: hash("f"), expiresAt: nowSeconds() - 1 }],
+		);
+		expect(ChunkCacheSnapshot.deserialize(expiredKey.serialize()).getChunk(hash("a"), hmac)).toBeUndefined();
+	});
+
+	it("should compute the HMAC of a hash once per key, across the chunk cache and the snapshot", () => {
+		const computed: string[] = [];
+		const hmac = memoizeHmacFunction((chunkHash: string, key: string) => {
+			computed.push(key);
+			return hash("0");
+		});
+
+		const chunkCache = new ChunkCache();
+		chunkCache.hmacs.add(hash("f"));
+		const snapshot = new ChunkCacheSnapshot();
+		snapshot.add(
+			[{ hash: hash("e"), xorbHash: hash("1"), chunkIndex: 5, expiresAt: Infinity }],
+			[
+				{ key: hash("f"), expiresAt: Infinity },
+				{ key: hash("9"), expiresAt: Infinity },
+			],
+		);
+
+		expect(chunkCache.getChunk(hash("a"), hmac) ?? snapshot.getChunk(hash("a"), hmac)).toBeUndefined();
+		expect(computed).toEqual([hash("f"), hash("9")]);
+
+		expect(snapshot.getChunk(hash("b"), hmac)).toBeUndefined();
+		expect(computed).toEqual([hash("f"), hash("9"), hash("f"), hash("9")]);
+	});
+});
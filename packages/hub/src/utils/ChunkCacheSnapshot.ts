@@ -0,0 +1,318 @@
+const SNAPSHOT_MAGIC = "HFCCSNAP";
+const SNAPSHOT_VERSION = 1;
+const SNAPSHOT_HEADER_SIZE = 24;
+const HASH_LENGTH = 32;
+const DEFAULT_MAX_AGE = 7 * 24 * 3600_000;
+const DEFAULT_MAX_ENTRIES = 4_000_000;
+const DEFAULT_MAX_HMAC_KEYS = 64;
+const HEX_HASH_REGEX = /^[0-9a-f]{64}$/;
+
+export interface ChunkCacheSnapshotEntry {
+	/** Chunk hash, or the chunk hash's HMAC for chunks from global dedup */
+	hash: string;
+	xorbHash: string;
+	chunkIndex: number;
+	/** Seconds since epoch */
+	expiresAt: number;
+}
+
+/**
+ * Dedup info of previous xet uploads, to reuse across upload sessions.
+ *
+ * It holds the chunks of uploaded xorbs and of global dedup shards, along with the shards' HMAC keys. With it,
+ * chunks uploaded or seen in a previous session are deduplicated without a global dedup round-trip.
+ *
+ * Entries expire: chunks from global dedup when their shard's HMAC key expires, and all chunks after `maxAge`.
+ *
+ * The serialized format is a flat binary layout: {@link ChunkCacheSnapshot.deserialize} creates typed array views over the
+ * bytes (eg a file read into memory), and looks hashes up with a binary search, without parsing or copying.
+ *
+ * @example
+ * const snapshot = existsSync(path) ? ChunkCacheSnapshot.deserialize(await readFile(path)) : new ChunkCacheSnapshot();
+ * await commit({ ...params, xetChunkCacheSnapshot: snapshot });
+ * // Only after the commit succeeded
+ * await writeFile(path, snapshot.serialize());
+ */
+export class ChunkCacheSnapshot {
+	/** Max age of an entry, in milliseconds */
+	maxAge: number;
+	/** Max number of chunk entries kept when serializing, the ones expiring last are kept */
+	maxEntries: number;
+
+	/** HMAC key => expiry, in seconds since epoch */
+	#hmacKeys = new Map<string, number>();
+	// Loaded table, views over the deserialized bytes
+	#xorbHashes: Uint8Array = new Uint8Array(0);
+	#xorbExpiries: Uint32Array = new Uint32Array(0);
+	#entryHashes: Uint8Array = new Uint8Array(0);
+	#entryXorbs: Uint32Array = new Uint32Array(0);
+	#entryChunkIndices: Uint16Array = new Uint16Array(0);
+	#xorbHashCache = new Map<number, string>();
+
+	// Entries added in this session
+	#pending = new Map<string, Omit<ChunkCacheSnapshotEntry, "hash">>();
+
+	constructor(opts?: { maxAge?: number; maxEntries?: number }) {
+		this.maxAge = opts?.maxAge ?? DEFAULT_MAX_AGE;
+		this.maxEntries = opts?.maxEntries ?? DEFAULT_MAX_ENTRIES;
+	}
+
+	static deserialize(bytes: Uint8Array, opts?: { maxAge?: number; maxEntries?: number }): ChunkCacheSnapshot {
+		if (bytes.byteOffset % 4) {
+			// Typed array views need aligned offsets
+			bytes = bytes.slice();
+		}
+		if (bytes.byteLength < SNAPSHOT_HEADER_SIZE || new TextDecoder().decode(bytes.subarray(0, 8)) !== SNAPSHOT_MAGIC) {
+			throw new Error("Invalid chunk cache snapshot");
+		}
+		const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+		const version = view.getUint32(8, true);
+		if (version !== SNAPSHOT_VERSION) {
+			throw new Error(`Unsupported chunk cache snapshot version: ${version}`);
+		}
+		const hmacKeyCount = view.getUint32(12, true);
+		const xorbCount = view.getUint32(16, true);
+		const entryCount = view.getUint32(20, true);
+
+		const expectedLength =
+			SNAPSHOT_HEADER_SIZE +
+			hmacKeyCount * (HASH_LENGTH + 4) +
+			xorbCount * (HASH_LENGTH + 4) +
+			entryCount * (HASH_LENGTH + 4 + 2);
+		if (bytes.byteLength !== expectedLength) {
+			throw new Error("Invalid chunk cache snapshot: unexpected length");
+		}
+
+		const snapshot = new ChunkCacheSnapshot(opts);
+		let offset = bytes.byteOffset + SNAPSHOT_HEADER_SIZE;
+		const take = <T>(ctor: new (buffer: ArrayBuffer, offset: number, length: number) => T, count: number, size: number) => {
+			const array = new ctor(bytes.buffer as ArrayBuffer, offset, count);
+			offset += count * size;
+			return array;
+		};
+		const hmacKeys = take(Uint8Array, hmacKeyCount * HASH_LENGTH, 1);
+		const hmacKeyExpiries = take(Uint32Array, hmacKeyCount, 4);
+		for (let i = 0; i < hmacKeyCount; i++) {
+			snapshot.#hmacKeys.set(hexFromHashBytes(hmacKeys, i), hmacKeyExpiries[i]);
+		}
+		snapshot.#xorbHashes = take(Uint8Array, xorbCount * HASH_LENGTH, 1);
+		snapshot.#xorbExpiries = take(Uint32Array, xorbCount, 4);
+		snapshot.#entryHashes = take(Uint8Array, entryCount * HASH_LENGTH, 1);
+		snapshot.#entryXorbs = take(Uint32Array, entryCount, 4);
+		snapshot.#entryChunkIndices = take(Uint16Array, entryCount, 2);
+		return snapshot;
+	}
+
+	/**
+	 * Same contract as {@link ChunkCache.getChunk}: looks up the hash, then its HMAC with each known key
+	 *
+	 * Pass the same {@link memoizeHmacFunction} as to the chunk cache to reuse the HMACs it already computed
+	 */
+	getChunk(
+		hash: string,
+		hmacFunction: ((hash: string, key: string) => string) | null,
+	): { xorbHash: string; chunkIndex: number; expiresAt: number } | undefined {
+		const now = nowSeconds();
+		const found = this.#lookup(hash, now);
+		if (found || hmacFunction === null) {
+			return found;
+		}
+		for (const [key, expiresAt] of this.#hmacKeys) {
+			if (expiresAt <= now) {
+				continue;
+			}
+			const hmacFound = this.#lookup(hmacFunction(hash, key), now);
+			if (hmacFound) {
+				return hmacFound;
+			}
+		}
+		return undefined;
+	}
+
+	/**
+	 * Record chunks and HMAC keys from an upload session
+	 */
+	add(entries: Iterable<ChunkCacheSnapshotEntry>, hmacKeys: Iterable<{ key: string; expiresAt: number }> = []): void {
+		const maxExpiresAt = nowSeconds() + Math.floor(this.maxAge / 1000);
+		for (const entry of entries) {
+			if (!HEX_HASH_REGEX.test(entry.hash) || !HEX_HASH_REGEX.test(entry.xorbHash)) {
+				continue;
+			}
+			this.#pending.set(entry.hash, {
+				xorbHash: entry.xorbHash,
+				chunkIndex: entry.chunkIndex,
+				expiresAt: Math.min(entry.expiresAt, maxExpiresAt),
+			});
+		}
+		for (const { key, expiresAt } of hmacKeys) {
+			if (HEX_HASH_REGEX.test(key)) {
+				this.#hmacKeys.set(key, Math.min(expiresAt, maxExpiresAt));
+			}
+		}
+	}
+
+	/**
+	 * Merge the loaded and added entries, without the expired ones, into a new snapshot
+	 */
+	serialize(): Uint8Array {
+		const now = nowSeconds();
+
+		const keptHmacKeys = [...this.#hmacKeys]
+			.filter(([, expiresAt]) => expiresAt > now)
+			.sort((a, b) => b[1] - a[1])
+			.slice(0, DEFAULT_MAX_HMAC_KEYS);
+
+		const entries = new Map<string, Omit<ChunkCacheSnapshotEntry, "hash">>();
+		for (let i = 0; i < this.#entryXorbs.length; i++) {
+			const xorb = this.#entryXorbs[i];
+			if (this.#xorbExpiries[xorb] > now) {
+				entries.set(hexFromHashBytes(this.#entryHashes, i), {
+					xorbHash: this.#xorbHash(xorb),
+					chunkIndex: this.#entryChunkIndices[i],
+					expiresAt: this.#xorbExpiries[xorb],
+				});
+			}
+		}
+		for (const [hash, entry] of this.#pending) {
+			if (entry.expiresAt > now) {
+				entries.set(hash, entry);
+			}
+		}
+		let keptEntries = [...entries];
+		if (keptEntries.length > this.maxEntries) {
+			keptEntries = keptEntries.sort((a, b) => b[1].expiresAt - a[1].expiresAt).slice(0, this.maxEntries);
+		}
+		// Sorted by hash for the binary search. Hex strings sort like their bytes.
+		keptEntries.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0));
+
+		const xorbIndices = new Map<string, number>();
+		const xorbExpiries: number[] = [];
+		for (const [, entry] of keptEntries) {
+			const index = xorbIndices.get(entry.xorbHash);
+			if (index === undefined) {
+				xorbIndices.set(entry.xorbHash, xorbExpiries.length);
+				xorbExpiries.push(entry.expiresAt);
+			} else {
+				xorbExpiries[index] = Math.max(xorbExpiries[index], entry.expiresAt);
+			}
+		}
+
+		const bytes = new Uint8Array(
+			SNAPSHOT_HEADER_SIZE +
+				keptHmacKeys.length * (HASH_LENGTH + 4) +
+				xorbIndices.size * (HASH_LENGTH + 4) +
+				keptEntries.length * (HASH_LENGTH + 4 + 2),
+		);
+		const view = new DataView(bytes.buffer);
+		bytes.set(new TextEncoder().encode(SNAPSHOT_MAGIC), 0);
+		view.setUint32(8, SNAPSHOT_VERSION, true);
+		view.setUint32(12, keptHmacKeys.length, true);
+		view.setUint32(16, xorbIndices.size, true);
+		view.setUint32(20, keptEntries.length, true);
+
+		let offset = SNAPSHOT_HEADER_SIZE;
+		for (const [key] of keptHmacKeys) {
+			writeHashBytes(key, bytes, offset);
+			offset += HASH_LENGTH;
+		}
+		for (const [, expiresAt] of keptHmacKeys) {
+			view.setUint32(offset, expiresAt, true);
+			offset += 4;
+		}
+		for (const xorbHash of xorbIndices.keys()) {
+			writeHashBytes(xorbHash, bytes, offset);
+			offset += HASH_LENGTH;
+		}
+		for (const expiresAt of xorbExpiries) {
+			view.setUint32(offset, expiresAt, true);
+			offset += 4;
+		}
+		for (const [hash] of keptEntries) {
+			writeHashBytes(hash, bytes, offset);
+			offset += HASH_LENGTH;
+		}
+		for (const [, entry] of keptEntries) {
+			// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
+			view.setUint32(offset, xorbIndices.get(entry.xorbHash)!, true);
+			offset += 4;
+		}
+		for (const [, entry] of keptEntries) {
+			view.setUint16(offset, entry.chunkIndex, true);
+			offset += 2;
+		}
+		return bytes;
+	}
+
+	#lookup(hash: string, now: number): { xorbHash: string; chunkIndex: number; expiresAt: number } | undefined {
+		const pending = this.#pending.get(hash);
+		if (pending) {
+			return pending.expiresAt > now ? { ...pending } : undefined;
+		}
+		if (!this.#entryXorbs.length || !HEX_HASH_REGEX.test(hash)) {
+			return undefined;
+		}
+
+		const needle = new Uint8Array(HASH_LENGTH);
+		writeHashBytes(hash, needle, 0);
+		let low = 0;
+		let high = this.#entryXorbs.length - 1;
+		while (low <= high) {
+			const mid = (low + high) >>> 1;
+			const cmp = compareHashBytes(this.#entryHashes, mid * HASH_LENGTH, needle);
+			if (cmp === 0) {
+				const xorb = this.#entryXorbs[mid];
+				if (this.#xorbExpiries[xorb] <= now) {
+					return undefined;
+				}
+				return {
+					xorbHash: this.#xorbHash(xorb),
+					chunkIndex: this.#entryChunkIndices[mid],
+					expiresAt: this.#xorbExpiries[xorb],
+				};
+			}
+			if (cmp < 0) {
+				low = mid + 1;
+			} else {
+				high = mid - 1;
+			}
+		}
+		return undefined;
+	}
+
+	#xorbHash(index: number): string {
+		let hash = this.#xorbHashCache.get(index);
+		if (hash === undefined) {
+			hash = hexFromHashBytes(this.#xorbHashes, index);
+			this.#xorbHashCache.set(index, hash);
+		}
+		return hash;
+	}
+}
+
+function nowSeconds(): number {
+	return Math.floor(Date.now() / 1000);
+}
+
+function writeHashBytes(hash: string, out: Uint8Array, offset: number): void {
+	for (let i = 0; i < HASH_LENGTH; i++) {
+		out[offset + i] = parseInt(hash.slice(2 * i, 2 * i + 2), 16);
+	}
+}
+
+function hexFromHashBytes(hashes: Uint8Array, index: number): string {
+	let hex = "";
+	for (let i = index * HASH_LENGTH; i < (index + 1) * HASH_LENGTH; i++) {
+		hex += hashes[i].toString(16).padStart(2, "0");
+	}
+	return hex;
+}
+
+function compareHashBytes(hashes: Uint8Array, offset: number, needle: Uint8Array): number {
+	for (let i = 0; i < HASH_LENGTH; i++) {
+		const diff = hashes[offset + i] - needle[i];
+		if (diff !== 0) {
+			return diff;
+		}
+	}
+	return 0;
+}
@@ -0,0 +1,55 @@
+import { describe, expect, it } from "vitest";
+import { ConcurrencyController } from "./ConcurrencyController";
+
+describe("ConcurrencyController", () => {
+	const busy = { throttled: false, pending: true, saturated: true };
+
+	it("should climb while nothing is transferred and there is work", () => {
+		const controller = new ConcurrencyController({ initialConcurrency: 1, maxConcurrency: 3 });
+
+		expect(controller.tick({ ...busy, rate: 0 })).toBe(2);
+		expect(controller.tick({ ...busy, rate: 0 })).toBe(3);
+		expect(controller.tick({ ...busy, rate: 0 })).toBe(3);
+		expect(controller.tick({ ...busy, rate: 0, pending: false })).toBe(3);
+	});
+
+	it("should keep an extra transfer only if it improves throughput", () => {
+		const controller = new ConcurrencyController({ initialConcurrency: 1, maxConcurrency: 8 });
+
+		// Skipped measurement, then level 1 is measured and level 2 is probed
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(1);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(2);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(2);
+		// Level 2 doesn't pay for itself
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(1);
+		// And the controller holds at the plateau
+		for (let i = 0; i < 5; i++) {
+			expect(controller.tick({ ...busy, rate: 100 })).toBe(1);
+		}
+	});
+
+	it("should walk back down to measure the levels skipped by zero-rate climbs, but not below the initial level", () => {
+		const controller = new ConcurrencyController({ initialConcurrency: 2, maxConcurrency: 8 });
+
+		expect(controller.tick({ ...busy, rate: 0 })).toBe(3);
+		expect(controller.tick({ ...busy, rate: 0 })).toBe(4);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(4);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(3);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(3);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(2);
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(2);
+		// Level 2 is the lowest one: it's measured, then the controller probes up again
+		expect(controller.tick({ ...busy, rate: 100 })).toBe(3);
+	});
+
+	it("should step down when throttled", () => {
+		const decrement = new ConcurrencyController({ initialConcurrency: 8, maxConcurrency: 8 });
+		const halve = new ConcurrencyController({ initialConcurrency: 8, maxConcurrency: 8, backoff: "halve" });
+
+		expect(decrement.tick({ ...busy, rate: 100, throttled: true })).toBe(7);
+		expect(halve.tick({ ...busy, rate: 100, throttled: true })).toBe(4);
+		expect(halve.tick({ ...busy, rate: 100, throttled: true })).toBe(2);
+		expect(halve.tick({ ...busy, rate: 100, throttled: true })).toBe(1);
+		expect(halve.tick({ ...busy, rate: 100, throttled: true })).toBe(1);
+	});
+});
@@ -0,0 +1,109 @@
+/** An extra transfer is kept only if aggregate throughput improves by at least this factor. */
+const PROBE_KEEP_MARGIN = 1.05;
+/** Ticks between upward re-probes once a concurrency plateau has been found, or after backing off. */
+const PLATEAU_HOLD_TICKS = 10;
+
+/**
+ * Adaptive concurrency controller (plateau-seeking, throughput-driven), called at regular ticks.
+ *
+ * Probes one extra transfer at a time, keeping a per-level average of aggregate throughput. A probe is
+ * kept only when the new level actually improves aggregate throughput; otherwise back off to the plateau
+ * and hold there, re-probing only occasionally in case conditions changed. On an already-saturated link
+ * this settles back to the lowest level — the worst case is a brief probe — while unsaturated paths keep
+ * ramping. Ticks where nothing flowed probe up regardless: the bottleneck is latency, which extra
+ * transfers hide. Throttling (rate limits, retryable errors) always steps down.
+ */
+export class ConcurrencyController {
+	/**
+	 * Current number of concurrent transfers allowed
+	 */
+	target: number;
+	readonly maxConcurrency: number;
+	#backoff: "decrement" | "halve";
+	#levelRate = new Map<number, number>();
+	/** Measurements skipped while the latest target change takes effect */
+	#settleTicks = 1;
+	/** Plateau hold: no upward probes while positive */
+	#holdTicks = 0;
+	/** Lowest target so far: the levels below it were never used, so they don't need a baseline */
+	#lowestTarget: number;
+
+	constructor(opts: {
+		initialConcurrency: number;
+		maxConcurrency: number;
+		/**
+		 * How to step down when throttled
+		 *
+		 * @default "decrement"
+		 */
+		backoff?: "decrement" | "halve";
+	}) {
+		this.maxConcurrency = Math.max(1, opts.maxConcurrency);
+		this.target = Math.min(this.maxConcurrency, Math.max(1, opts.initialConcurrency));
+		this.#backoff = opts.backoff ?? "decrement";
+		this.#lowestTarget = this.target;
+	}
+
+	/**
+	 * Skips the measurement of the next tick, eg when transfers start again after being idle
+	 */
+	settle(): void {
+		this.#settleTicks = 1;
+	}
+
+	/**
+	 * Updates the target from what happened during the last tick
+	 *
+	 * @returns the new target
+	 */
+	tick(sample: {
+		/** Bytes transferred during the tick */
+		rate: number;
+		/** Whether transfers were throttled during the tick */
+		throttled: boolean;
+		/** Whether there is work for an extra transfer */
+		pending: boolean;
+		/**
+		 * Whether the tick is a valid throughput sample for the current target, ie there was work for every
+		 * transfer and no extra transfers were still running
+		 */
+		saturated: boolean;
+	}): number {
+		this.#holdTicks = Math.max(0, this.#holdTicks - 1);
+		if (sample.throttled) {
+			this.target = Math.max(1, this.#backoff === "halve" ? Math.floor(this.target / 2) : this.target - 1);
+			this.#lowestTarget = Math.min(this.#lowestTarget, this.target);
+			this.#settleTicks = 1;
+			this.#holdTicks = PLATEAU_HOLD_TICKS;
+		} else if (sample.rate === 0 && sample.pending) {
+			// Nothing transferred during the tick: latency-bound or stalled, so an extra transfer
+			// cannot reduce aggregate throughput
+			this.target = Math.min(this.maxConcurrency, this.target + 1);
+			this.#settleTicks = 1;
+		} else if (this.#settleTicks > 0) {
+			this.#settleTicks--;
+		} else if (sample.saturated) {
+			const ewma = ((this.#levelRate.get(this.target) ?? sample.rate) + sample.rate) / 2;
+			this.#levelRate.set(this.target, ewma);
+			const below = this.#levelRate.get(this.target - 1);
+			if (this.target > this.#lowestTarget && below === undefined) {
+				// The level below was never measured (skipped by a zero-rate climb): step
+				// down to establish its baseline, keeping this level's average for the way
+				// back up. Repeats until a measured level (or the lowest target) is reached,
+				// so stall-climbs always have a path back down.
+				this.target--;
+				this.#settleTicks = 1;
+			} else if (below !== undefined && ewma < below * PROBE_KEEP_MARGIN) {
+				// The extra transfer doesn't pay for itself: back off and hold.
+				this.#levelRate.delete(this.target);
+				this.target--;
+				this.#settleTicks = 1;
+				this.#holdTicks = PLATEAU_HOLD_TICKS;
+			} else if (this.#holdTicks === 0 && this.target < this.maxConcurrency) {
+				this.target++;
+				this.#settleTicks = 1;
+			}
+		}
+		return this.target;
+	}
+}
@@ -0,0 +1,76 @@
+import { mkdtemp, readdir, rm } from "node:fs/promises";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import { afterEach, beforeEach, describe, expect, it } from "vitest";
+import { DiskXetChunkStore } from "./DiskXetChunkStore";
+
+describe("DiskXetChunkStore", () => {
+	let dir: string;
+
+	beforeEach(async () => {
+		dir = await mkdtemp(join(tmpdir(), "xet-chunk-store-"));
+	});
+
+	afterEach(async () => {
+		await rm(dir, { recursive: true, force: true });
+	});
+
+	const chunks = (...contents: string[]) => contents.map((content) => new TextEncoder().encode(content));
+
+	it("should store and retrieve chunks by xorb hash and chunk range", async () => {
+		const store = new DiskXetChunkStore({ dir });
+
+		expect(await store.has("abcdef", { start: 0, end: 2 })).toBe(false);
+		await store.set("abcdef", { start: 0, end: 2 }, chunks("hello", "world"));
+
+		expect(await store.has("abcdef", { start: 0, end: 2 })).toBe(true);
+		expect(await store.has("abcdef", { start: 0, end: 3 })).toBe(false);
+		expect(await store.get("abcdef", { start: 0, end: 2 })).toEqual(chunks("hello", "world"));
+
+		// A new instance reloads the index from disk
+		const reloaded = new DiskXetChunkStore({ dir });
+		expect(await reloaded.get("abcdef", { start: 0, end: 2 })).toEqual(chunks("hello", "world"));
+	});
+
+	it("should share entries between overlapping ranges of a xorb", async () => {
+		const store = new DiskXetChunkStore({ dir });
+
+		await store.set("abcdef", { start: 1, end: 3 }, chunks("b", "c"));
+		await store.set("abcdef", { start: 0, end: 4 }, chunks("a", "b", "c", "d"));
+		// The first entry is contained in the second one
+		expect(await readdir(join(dir, "ab"))).toEqual(["abcdef.0-4"]);
+
+		await store.set("abcdef", { start: 2, end: 4 }, chunks("c", "d"));
+		expect(await readdir(join(dir, "ab"))).toEqual(["abcdef.0-4"]);
+
+		const reloaded = new DiskXetChunkStore({ dir });
+		expect(await reloaded.has("abcdef", { start: 1, end: 3 })).toBe(true);
+		expect(await reloaded.has("abcdef", { start: 3, end: 5 })).toBe(false);
+		expect(await reloaded.get("abcdef", { start: 1, end: 3 })).toEqual(chunks("b", "c"));
+		expect(await reloaded.get("abcdef", { start: 3, end: 4 })).toEqual(chunks("d"));
+	});
+
+	it("should evict the least recently used entries beyond maxBytes", async () => {
+		// Each entry: 4 (count) + 4 (length) + 10 (data) = 18 bytes
+		const store = new DiskXetChunkStore({ dir, maxBytes: 40 });
+
+		await store.set("aa", { start: 0, end: 1 }, chunks("0123456789"));
+		await store.set("bb", { start: 0, end: 1 }, chunks("0123456789"));
+		// Touch "aa" so "bb" becomes the least recently used
+		await store.get("aa", { start: 0, end: 1 });
+		await store.set("cc", { start: 0, end: 1 }, chunks("0123456789"));
+
+		expect(await store.has("aa", { start: 0, end: 1 })).toBe(true);
+		expect(await store.has("bb", { start: 0, end: 1 })).toBe(false);
+		expect(await store.has("cc", { start: 0, end: 1 })).toBe(true);
+		expect(await readdir(join(dir, "bb"))).toEqual([]);
+	});
+
+	it("should ignore unsafe hashes", async () => {
+		const store = new DiskXetChunkStore({ dir });
+
+		await store.set("../escape", { start: 0, end: 1 }, chunks("data"));
+		expect(await store.get("../escape", { start: 0, end: 1 })).toBeUndefined();
+		expect(await readdir(dir)).toEqual([]);
+	});
+});
@@ -0,0 +1,292 @@
+import { mkdir, readdir, readFile, rename, stat, unlink, utimes, writeFile } from "node:fs/promises";
+import { join } from "node:path";
+import { insecureRandomString } from "./insecureRandomString";
+import { sum } from "./sum";
+import type { XetChunkStore } from "./XetBlob";
+
+const DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024;
+const SAFE_HASH_REGEX = /^[\w-]+$/;
+const ENTRY_KEY_REGEX = /^([\w-]+)\.(\d+)-(\d+)$/;
+
+interface ChunkRange {
+	start: number;
+	end: number;
+}
+
+/**
+ * On-disk {@link XetChunkStore}, with a size cap and LRU eviction.
+ *
+ * Each xorb range is stored in its own file, named after the xorb hash and the chunk range, so
+ * the store can be shared across downloads, revisions and processes. Writes are atomic (temp file + rename).
+ *
+ * A range is read from any entry of the same xorb that contains it, and storing a range replaces the
+ * entries it contains.
+ *
+ * The size cap is enforced by each process on the entries it knows of: entries added by other processes
+ * are only accounted for after a restart.
+ *
+ * @example
+ * const chunkStore = new DiskXetChunkStore({ dir: "/data/xet-chunk-store", maxBytes: 50e9 });
+ * const blob = await downloadFile({ repo, path, xetChunkStore: chunkStore });
+ */
+export class DiskXetChunkStore implements XetChunkStore {
+	readonly dir: string;
+	readonly maxBytes: number;
+	/** Entry sizes by key, in LRU order (least recently used first) */
+	#index: Promise<Map<string, number>> | undefined;
+	/** Chunk ranges of the entries, by xorb hash */
+	#ranges = new Map<string, ChunkRange[]>();
+	#totalBytes = 0;
+
+	constructor(params: {
+		dir: string;
+		/**
+		 * Max total size of the store, least recently used entries are evicted beyond it.
+		 *
+		 * @default 10GB
+		 */
+		maxBytes?: number;
+	}) {
+		this.dir = params.dir;
+		this.maxBytes = params.maxBytes ?? DEFAULT_MAX_BYTES;
+	}
+
+	async has(hash: string, range: ChunkRange): Promise<boolean> {
+		if (!SAFE_HASH_REGEX.test(hash)) {
+			return false;
+		}
+		await this.#loadIndex();
+		return this.#findRange(hash, range) !== undefined;
+	}
+
+	async get(hash: string, range: ChunkRange): Promise<Uint8Array[] | undefined> {
+		if (!SAFE_HASH_REGEX.test(hash)) {
+			return undefined;
+		}
+		const index = await this.#loadIndex();
+		const stored = this.#findRange(hash, range);
+		if (!stored) {
+			return undefined;
+		}
+		const key = entryKey(hash, stored);
+		const size = index.get(key) ?? 0;
+
+		const path = this.#entryPath(key);
+		let data: Uint8Array;
+		try {
+			data = await readFile(path);
+		} catch {
+			// Evicted by another process
+			this.#forget(index, key);
+			return undefined;
+		}
+
+		const chunks = decodeEntry(data, stored.end - stored.start, {
+			start: range.start - stored.start,
+			end: range.end - stored.start,
+		});
+		if (!chunks) {
+			this.#forget(index, key);
+			await unlink(path).catch(() => {});
+			return undefined;
+		}
+
+		// Move to the most recently used position, and persist it for the next processes
+		index.delete(key);
+		index.set(key, size);
+		const now = new Date();
+		await utimes(path, now, now).catch(() => {});
+
+		return chunks;
+	}
+
+	async set(hash: string, range: ChunkRange, chunks: Uint8Array[]): Promise<void> {
+		if (!SAFE_HASH_REGEX.test(hash)) {
+			return;
+		}
+		const index = await this.#loadIndex();
+		if (this.#findRange(hash, range)) {
+			return;
+		}
+		const key = entryKey(hash, range);
+
+		const data = encodeEntry(chunks);
+		if (data.byteLength > this.maxBytes) {
+			return;
+		}
+
+		const path = this.#entryPath(key);
+		const tmpPath = `${path}.${insecureRandomString()}.tmp`;
+		await mkdir(join(this.dir, key.slice(0, 2)), { recursive: true });
+		try {
+			await writeFile(tmpPath, data);
+			await rename(tmpPath, path);
+		} catch (err) {
+			await unlink(tmpPath).catch(() => {});
+			throw err;
+		}
+
+		// Concurrent writes of the same range all rename to the same path, count it once
+		if (index.has(key)) {
+			return;
+		}
+
+		// Entries within the new range are now redundant
+		for (const contained of this.#ranges.get(hash) ?? []) {
+			if (contained.start >= range.start && contained.end <= range.end) {
+				const containedKey = entryKey(hash, contained);
+				this.#forget(index, containedKey);
+				await unlink(this.#entryPath(containedKey)).catch(() => {});
+			}
+		}
+		this.#remember(index, key, data.byteLength);
+
+		for (const [oldKey, oldSize] of index) {
+			if (this.#totalBytes <= this.maxBytes) {
+				break;
+			}
+			this.#forget(index, oldKey, oldSize);
+			await unlink(this.#entryPath(oldKey)).catch(() => {});
+		}
+	}
+
+	#entryPath(key: string): string {
+		return join(this.dir, key.slice(0, 2), key);
+	}
+
+	/**
+	 * @returns the range of an entry of the xorb that contains the given range
+	 */
+	#findRange(hash: string, range: ChunkRange): ChunkRange | undefined {
+		return this.#ranges.get(hash)?.find((stored) => stored.start <= range.start && stored.end >= range.end);
+	}
+
+	#remember(index: Map<string, number>, key: string, size: number): void {
+		const parsed = parseEntryKey(key);
+		if (!parsed || index.has(key)) {
+			return;
+		}
+		index.set(key, size);
+		this.#totalBytes += size;
+		const ranges = this.#ranges.get(parsed.hash);
+		if (ranges) {
+			ranges.push(parsed.range);
+		} else {
+			this.#ranges.set(parsed.hash, [parsed.range]);
+		}
+	}
+
+	#forget(index: Map<string, number>, key: string, size = index.get(key) ?? 0): void {
+		if (!index.delete(key)) {
+			return;
+		}
+		this.#totalBytes -= size;
+		const parsed = parseEntryKey(key);
+		if (!parsed) {
+			return;
+		}
+		const ranges = this.#ranges.get(parsed.hash)?.filter(
+			(stored) => stored.start !== parsed.range.start || stored.end !== parsed.range.end,
+		);
+		if (ranges?.length) {
+			this.#ranges.set(parsed.hash, ranges);
+		} else {
+			this.#ranges.delete(parsed.hash);
+		}
+	}
+
+	#loadIndex(): Promise<Map<string, number>> {
+		this.#index ??= (async () => {
+			const subDirs = await readdir(this.dir).catch(() => []);
+			const entries = (
+				await Promise.all(
+					subDirs.map(async (subDir) => {
+						const names = await readdir(join(this.dir, subDir)).catch(() => []);
+						return Promise.all(
+							names
+								.filter((name) => parseEntryKey(name))
+								.map(async (name) => {
+									const stats = await stat(join(this.dir, subDir, name)).catch(() => undefined);
+									return stats?.isFile() ? { key: name, size: stats.size, mtimeMs: stats.mtimeMs } : undefined;
+								}),
+						);
+					}),
+				)
+			)
+				.flat()
+				.filter((entry) => entry !== undefined);
+
+			entries.sort((a, b) => a.mtimeMs - b.mtimeMs);
+			const index = new Map<string, number>();
+			for (const entry of entries) {
+				this.#remember(index, entry.key, entry.size);
+			}
+			return index;
+		})();
+		return this.#index;
+	}
+}
+
+function entryKey(hash: string, range: ChunkRange): string {
+	return `${hash}.${range.start}-${range.end}`;
+}
+
+/**
+ * @returns undefined if the file name is not an entry, eg a temp file
+ */
+function parseEntryKey(key: string): { hash: string; range: ChunkRange } | undefined {
+	const match = ENTRY_KEY_REGEX.exec(key);
+	return match ? { hash: match[1], range: { start: Number(match[2]), end: Number(match[3]) } } : undefined;
+}
+
+/**
+ * Entry layout: chunk count (u32 LE), each chunk length (u32 LE), then the chunks' data
+ */
+function encodeEntry(chunks: Uint8Array[]): Uint8Array {
+	const headerLength = 4 + 4 * chunks.length;
+	const data = new Uint8Array(headerLength + sum(chunks.map((chunk) => chunk.byteLength)));
+	const view = new DataView(data.buffer);
+	view.setUint32(0, chunks.length, true);
+	let offset = headerLength;
+	for (const [i, chunk] of chunks.entries()) {
+		view.setUint32(4 + 4 * i, chunk.byteLength, true);
+		data.set(chunk, offset);
+		offset += chunk.byteLength;
+	}
+	return data;
+}
+
+/**
+ * @param count The expected number of chunks
+ * @param range The chunks to return, relative to the start of the entry
+ * @returns undefined if the entry is corrupted
+ */
+function decodeEntry(data: Uint8Array, count: number, range: ChunkRange): Uint8Array[] | undefined {
+	if (data.byteLength < 4) {
+		return undefined;
+	}
+	const view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+	if (view.getUint32(0, true) !== count) {
+		return undefined;
+	}
+	const headerLength = 4 + 4 * count;
+	if (data.byteLength < headerLength) {
+		return undefined;
+	}
+
+	const chunks: Uint8Array[] = [];
+	let offset = headerLength;
+	for (let i = 0; i < count; i++) {
+		const length = view.getUint32(4 + 4 * i, true);
+		if (offset + length > data.byteLength) {
+			return undefined;
+		}
+		if (i >= range.start && i < range.end) {
+			// Copy: the stream consumer can take ownership of each chunk's buffer
+			// (and `Buffer.slice` doesn't copy)
+			chunks.push(new Uint8Array(data.buffer, data.byteOffset + offset, length).slice());
+		}
+		offset += length;
+	}
+	return offset === data.byteLength ? chunks : undefined;
+}
@@ -0,0 +1,176 @@
+import { describe, expect, it } from "vitest";
+import { HubApiError } from "../error";
+import type { TransferStat } from "./TransferScheduler";
+import { TransferScheduler } from "./TransferScheduler";
+
+function sleep(ms: number): Promise<void> {
+	return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+describe("TransferScheduler", () => {
+	it("should limit the number of concurrent transfers and bytes in flight", async () => {
+		const scheduler = new TransferScheduler({ initialConcurrency: 3, maxConcurrency: 3, maxInFlightBytes: 250 });
+		let active = 0;
+		let maxActive = 0;
+		let bytes = 0;
+		let maxBytes = 0;
+
+		const order: number[] = [];
+		await Promise.all(
+			Array.from({ length: 10 }, (_, i) =>
+				scheduler.run({ path: "file", part: i + 1, bytes: 100 }, async () => {
+					order.push(i);
+					active++;
+					bytes += 100;
+					maxActive = Math.max(maxActive, active);
+					maxBytes = Math.max(maxBytes, bytes);
+					await sleep(5);
+					active--;
+					bytes -= 100;
+				}),
+			),
+		);
+
+		expect(maxActive).toBe(2);
+		expect(maxBytes).toBe(200);
+		expect(order).toEqual([0, 1, 2, 3, 4, 5, 6, 7, 8, 9]);
+	});
+
+	it("should run a transfer larger than the byte budget alone", async () => {
+		const scheduler = new TransferScheduler({ maxInFlightBytes: 100 });
+		let active = 0;
+		let maxActive = 0;
+
+		await Promise.all(
+			[500, 10, 500].map((bytes) =>
+				scheduler.run({ path: "file", bytes }, async () => {
+					active++;
+					maxActive = Math.max(maxActive, active);
+					await sleep(5);
+					active--;
+				}),
+			),
+		);
+
+		expect(maxActive).toBe(1);
+	});
+
+	it("should retry transfers failing with retryable errors", async () => {
+		const stats: TransferStat[] = [];
+		const scheduler = new TransferScheduler({ retryDelayMs: 1, onStat: (stat) => stats.push(stat) });
+
+		let calls = 0;
+		const result = await scheduler.run({ path: "file", part: 2, bytes: 10 }, async () => {
+			calls++;
+			if (calls === 1) {
+				throw new TypeError("fetch failed");
+			}
+			if (calls === 2) {
+				throw new HubApiError("https://s3", 503);
+			}
+			return "etag";
+		});
+
+		expect(result).toBe("etag");
+		expect(stats).toHaveLength(1);
+		expect(stats[0].path).toBe("file");
+		expect(stats[0].part).toBe(2);
+		expect(stats[0].bytes).toBe(10);
+		expect(stats[0].attempts).toBe(3);
+	});
+
+	it("should not retry other errors, nor more than maxAttempts", async () => {
+		const scheduler = new TransferScheduler({ retryDelayMs: 1, maxAttempts: 2 });
+
+		let calls = 0;
+		await expect(
+			scheduler.run({ path: "file", bytes: 10 }, async () => {
+				calls++;
+				throw new HubApiError("https://s3", 403);
+			}),
+		).rejects.toThrow();
+		expect(calls).toBe(1);
+
+		calls = 0;
+		await expect(
+			scheduler.run({ path: "file", bytes: 10 }, async () => {
+				calls++;
+				throw new HubApiError("https://s3", 429);
+			}),
+		).rejects.toThrow();
+		expect(calls).toBe(2);
+	});
+
+	it("should stop waiting for the next attempt once aborted", async () => {
+		const scheduler = new TransferScheduler({ retryDelayMs: 60_000 });
+		const controller = new AbortController();
+
+		let calls = 0;
+		const start = Date.now();
+		const transfer = scheduler.run(
+			{ path: "file", bytes: 10 },
+			async () => {
+				calls++;
+				throw new TypeError("fetch failed");
+			},
+			{ signal: controller.signal },
+		);
+		setTimeout(() => controller.abort(), 10);
+
+		await expect(transfer).rejects.toThrow(/abort/i);
+		expect(calls).toBe(1);
+		expect(Date.now() - start).toBeLessThan(5_000);
+	});
+
+	it("should remove queued transfers once aborted", async () => {
+		const scheduler = new TransferScheduler({ initialConcurrency: 1, maxConcurrency: 1 });
+		const controller = new AbortController();
+
+		const order: string[] = [];
+		const first = scheduler.run({ path: "first", bytes: 10 }, async () => {
+			await sleep(20);
+			order.push("first");
+		});
+		const aborted = scheduler.run({ path: "aborted", bytes: 10 }, async () => order.push("aborted"), {
+			signal: controller.signal,
+		});
+		const last = scheduler.run({ path: "last", bytes: 10 }, async () => order.push("last"));
+		controller.abort();
+
+		await expect(aborted).rejects.toThrow(/abort/i);
+		await Promise.all([first, last]);
+		expect(order).toEqual(["first", "last"]);
+	});
+
+	it("should increase the concurrency while transfers wait, and halve it on failures", async () => {
+		const scheduler = new TransferScheduler({
+			initialConcurrency: 2,
+			maxConcurrency: 16,
+			retryDelayMs: 1,
+			controllerTickMs: 5,
+		});
+
+		// Long transfers: nothing completes during the ticks, so the controller probes up
+		await Promise.all(
+			Array.from({ length: 20 }, (_, i) => scheduler.run({ path: "file", part: i + 1, bytes: 1 }, () => sleep(40))),
+		);
+		const increased = scheduler.concurrency;
+		expect(increased).toBeGreaterThan(2);
+
+		let failed = false;
+		let minConcurrency = Infinity;
+		await Promise.all(
+			Array.from({ length: 20 }, (_, i) =>
+				scheduler.run({ path: "file", part: i + 1, bytes: 1 }, async () => {
+					minConcurrency = Math.min(minConcurrency, scheduler.concurrency);
+					if (!failed) {
+						failed = true;
+						throw new HubApiError("https://s3", 429);
+					}
+					await sleep(20);
+				}),
+			),
+		);
+		expect(minConcurrency).toBeLessThan(increased);
+	});
+});
@@ -0,0 +1,293 @@
+import { HubApiError } from "../error";
+import { ConcurrencyController } from "./ConcurrencyController";
+import { isFrontend } from "./isFrontend";
+
+// Browsers get lower ceilings: connections may share an HTTP/2 session, and bodies
+// are read into memory before being sent (see the WebBlob workaround in commit)
+const DEFAULT_MAX_CONCURRENCY = isFrontend ? 6 : 32;
+const DEFAULT_INITIAL_CONCURRENCY = 5;
+const DEFAULT_MAX_IN_FLIGHT_BYTES = isFrontend ? 256 * 1024 * 1024 : 2 * 1024 * 1024 * 1024;
+const DEFAULT_MAX_ATTEMPTS = 3;
+const DEFAULT_RETRY_DELAY_MS = 1000;
+const CONTROLLER_TICK_MS = 1000;
+
+export interface TransferStat {
+	/**
+	 * Path of the file the transfer is for
+	 */
+	path: string;
+	/**
+	 * Part number, for multipart uploads
+	 */
+	part?: number;
+	bytes: number;
+	/**
+	 * Duration of the successful attempt, in ms
+	 */
+	durationMs: number;
+	bytesPerSecond: number;
+	/**
+	 * Number of attempts, including the successful one
+	 */
+	attempts: number;
+	/**
+	 * Concurrency target of the scheduler when the transfer started
+	 */
+	concurrency: number;
+}
+
+export interface TransferSchedulerOptions {
+	/**
+	 * Ceiling for the number of concurrent transfers, which is tuned from the measured throughput
+	 *
+	 * @default 32 (6 in browsers)
+	 */
+	maxConcurrency?: number;
+	/**
+	 * Number of concurrent transfers to start with
+	 *
+	 * @default 5
+	 */
+	initialConcurrency?: number;
+	/**
+	 * Maximum number of bytes being transferred at once. A transfer larger than that runs alone.
+	 *
+	 * @default 2GB (256MB in browsers)
+	 */
+	maxInFlightBytes?: number;
+	/**
+	 * Attempts per transfer, for network errors, 429 and 5xx responses
+	 *
+	 * @default 3
+	 */
+	maxAttempts?: number;
+	/**
+	 * Delay before the first retry of a transfer, doubled at each retry
+	 *
+	 * @default 1000
+	 */
+	retryDelayMs?: number;
+	/**
+	 * Called after each successful transfer
+	 */
+	onStat?: (stat: TransferStat) => void;
+	/**
+	 * @internal For tests
+	 */
+	controllerTickMs?: number;
+}
+
+/**
+ * Network errors, rate limits and server errors, which are worth retrying
+ */
+export function isRetryableTransferError(err: unknown): boolean {
+	if (err instanceof HubApiError) {
+		return err.statusCode === 429 || err.statusCode >= 500;
+	}
+	return err instanceof TypeError || /terminated|socket|network|ECONNRESET|fetch failed/i.test(String(err));
+}
+
+function abortReason(signal: AbortSignal): unknown {
+	return signal.reason ?? new DOMException("Aborted", "AbortError");
+}
+
+function sleep(ms: number, signal?: AbortSignal): Promise<void> {
+	return new Promise((resolve, reject) => {
+		if (signal?.aborted) {
+			return reject(abortReason(signal));
+		}
+		const onAbort = () => {
+			clearTimeout(timeout);
+			reject(abortReason(signal as AbortSignal));
+		};
+		const timeout = setTimeout(() => {
+			signal?.removeEventListener("abort", onAbort);
+			resolve();
+		}, ms);
+		signal?.addEventListener("abort", onAbort, { once: true });
+	});
+}
+
+/**
+ * Runs transfers (files or parts of files) with a shared byte budget and concurrency limit.
+ *
+ * The concurrency starts at `initialConcurrency` and is tuned from the aggregate throughput by a
+ * {@link ConcurrencyController}, like in `XetBlob.readDataParallel`: an extra transfer is kept only if it improves
+ * throughput, and the concurrency is halved when transfers fail with retryable errors (additive increase,
+ * multiplicative decrease).
+ *
+ * Transfers start in the order they are submitted, so that the parts of a file are sent before the next file's.
+ */
+export class TransferScheduler {
+	#maxInFlightBytes: number;
+	#maxAttempts: number;
+	#retryDelayMs: number;
+	#tickMs: number;
+	#onStat?: (stat: TransferStat) => void;
+
+	#concurrency: ConcurrencyController;
+	#active = 0;
+	#inFlightBytes = 0;
+	#queue: Array<{ bytes: number; start: () => void }> = [];
+
+	// Controller state
+	#controller: ReturnType<typeof setInterval> | undefined;
+	#completedBytes = 0;
+	#lastBytes = 0;
+	#failures = 0;
+	#lastFailures = 0;
+	/** Whether transfers waited for a slot during the tick, ie the concurrency was the bottleneck */
+	#limited = false;
+
+	constructor(opts?: TransferSchedulerOptions) {
+		this.#maxInFlightBytes = opts?.maxInFlightBytes ?? DEFAULT_MAX_IN_FLIGHT_BYTES;
+		this.#maxAttempts = Math.max(1, opts?.maxAttempts ?? DEFAULT_MAX_ATTEMPTS);
+		this.#retryDelayMs = opts?.retryDelayMs ?? DEFAULT_RETRY_DELAY_MS;
+		this.#tickMs = opts?.controllerTickMs ?? CONTROLLER_TICK_MS;
+		this.#onStat = opts?.onStat;
+		this.#concurrency = new ConcurrencyController({
+			initialConcurrency: opts?.initialConcurrency ?? DEFAULT_INITIAL_CONCURRENCY,
+			maxConcurrency: opts?.maxConcurrency ?? DEFAULT_MAX_CONCURRENCY,
+			backoff: "halve",
+		});
+	}
+
+	/**
+	 * Current number of concurrent transfers allowed
+	 */
+	get concurrency(): number {
+		return this.#concurrency.target;
+	}
+
+	/**
+	 * Runs `transfer` once there is room for `bytes` more bytes, retrying it on retryable errors.
+	 *
+	 * `transfer` is called again for each attempt, so it must recreate its request body.
+	 *
+	 * Once `opts.signal` is aborted, the transfer stops waiting for room or for its next attempt.
+	 */
+	async run<T>(
+		info: { path: string; part?: number; bytes: number },
+		transfer: () => Promise<T>,
+		opts?: { signal?: AbortSignal },
+	): Promise<T> {
+		const signal = opts?.signal;
+		await this.#acquire(info.bytes, signal);
+		try {
+			const concurrency = this.#concurrency.target;
+			for (let attempt = 1; ; attempt++) {
+				const start = Date.now();
+				try {
+					const result = await transfer();
+					const durationMs = Date.now() - start;
+					this.#completedBytes += info.bytes;
+					this.#onStat?.({
+						path: info.path,
+						part: info.part,
+						bytes: info.bytes,
+						durationMs,
+						bytesPerSecond: durationMs > 0 ? (info.bytes * 1000) / durationMs : info.bytes * 1000,
+						attempts: attempt,
+						concurrency,
+					});
+					return result;
+				} catch (err) {
+					if (attempt >= this.#maxAttempts || !isRetryableTransferError(err) || signal?.aborted) {
+						throw err;
+					}
+					this.#failures++;
+					await sleep(this.#retryDelayMs * 2 ** (attempt - 1), signal);
+				}
+			}
+		} finally {
+			this.#release(info.bytes);
+		}
+	}
+
+	#fits(bytes: number): boolean {
+		return (
+			this.#active < this.#concurrency.target &&
+			(this.#inFlightBytes === 0 || this.#inFlightBytes + bytes <= this.#maxInFlightBytes)
+		);
+	}
+
+	async #acquire(bytes: number, signal?: AbortSignal): Promise<void> {
+		if (signal?.aborted) {
+			throw abortReason(signal);
+		}
+		this.#startController();
+		if (this.#queue.length === 0 && this.#fits(bytes)) {
+			this.#active++;
+			this.#inFlightBytes += bytes;
+			return;
+		}
+		await new Promise<void>((resolve, reject) => {
+			const onAbort = () => {
+				this.#queue.splice(this.#queue.indexOf(entry), 1);
+				// The transfers behind it may fit now
+				this.#drain();
+				if (this.#active === 0 && this.#queue.length === 0) {
+					this.#stopController();
+				}
+				reject(abortReason(signal as AbortSignal));
+			};
+			const entry = {
+				bytes,
+				start: () => {
+					signal?.removeEventListener("abort", onAbort);
+					resolve();
+				},
+			};
+			signal?.addEventListener("abort", onAbort, { once: true });
+			this.#queue.push(entry);
+		});
+	}
+
+	#release(bytes: number): void {
+		this.#active--;
+		this.#inFlightBytes -= bytes;
+		this.#drain();
+		if (this.#active === 0 && this.#queue.length === 0) {
+			this.#stopController();
+		}
+	}
+
+	#drain(): void {
+		while (this.#queue.length > 0 && this.#fits(this.#queue[0].bytes)) {
+			const next = this.#queue.shift();
+			if (next) {
+				this.#active++;
+				this.#inFlightBytes += next.bytes;
+				next.start();
+			}
+		}
+		if (this.#queue.length > 0 && this.#active >= this.#concurrency.target) {
+			this.#limited = true;
+		}
+	}
+
+	#startController(): void {
+		if (this.#controller !== undefined) {
+			return;
+		}
+		this.#lastBytes = this.#completedBytes;
+		this.#concurrency.settle();
+		this.#controller = setInterval(() => this.#tick(), this.#tickMs);
+	}
+
+	#stopController(): void {
+		clearInterval(this.#controller);
+		this.#controller = undefined;
+	}
+
+	#tick(): void {
+		const rate = this.#completedBytes - this.#lastBytes;
+		this.#lastBytes = this.#completedBytes;
+		const limited = this.#limited || (this.#queue.length > 0 && this.#active >= this.#concurrency.target);
+		this.#limited = false;
+		const throttled = this.#failures > this.#lastFailures;
+		this.#lastFailures = this.#failures;
+		this.#concurrency.tick({ rate, throttled, pending: limited, saturated: limited });
+		this.#drain();
+	}
+}
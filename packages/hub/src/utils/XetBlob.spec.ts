@@ -1,5 +1,5 @@
 import { describe, expect, it } from "vitest";
-import type { ReconstructionInfo } from "./XetBlob";
+import type { ReconstructionInfo, XetChunkStore } from "./XetBlob";
 import { bg4_regroup_bytes, bg4_split_bytes, XetBlob } from "./XetBlob";
 import { combineUint8Arrays } from "./combineUint8Arrays";
 import { sum } from "./sum";
@@ -474,6 +474,42 @@ describe("XetBlob", () => {
 
 			expect(await blob.text()).toBe(fixture.wholeText);
 		});
+
+		it.each([false, true])("only fetches terms missing from the chunk store (parallel: %s)", async (parallel) => {
+			const fixture = makeParallelFixture(6);
+			const entries = new Map<string, Uint8Array[]>();
+			const key = (hash: string, range: { start: number; end: number }) => `${hash}.${range.start}-${range.end}`;
+			const chunkStore: XetChunkStore = {
+				has: async (hash, range) => entries.has(key(hash, range)),
+				get: async (hash, range) => entries.get(key(hash, range))?.map((chunk) => chunk.slice()),
+				set: async (hash, range, chunks) => {
+					entries.set(
+						key(hash, range),
+						chunks.map((chunk) => chunk.slice()),
+					);
+				},
+			};
+
+			const requested: number[] = [];
+			const download = () =>
+				new XetBlob({
+					hash: "test",
+					size: fixture.wholeText.length,
+					refreshUrl: "https://huggingface.co",
+					parallelDownloads: parallel,
+					chunkStore,
+					fetch: makeFetch(fixture, { onXorbRequest: (i) => requested.push(i) }),
+				}).text();
+
+			expect(await download()).toBe(fixture.wholeText);
+			expect(requested).toHaveLength(6);
+			expect(entries.size).toBe(6);
+
+			requested.length = 0;
+			entries.delete(key("xorb3", { start: 0, end: 2 }));
+			expect(await download()).toBe(fixture.wholeText);
+			expect(requested).toEqual([3]);
+		});
 	});
 
 	describe("multi-range fetch entries", () => {
@@ -2,12 +2,13 @@ import { createApiError } from "../error";
 import type { CredentialsParams } from "../types/public";
 import { checkCredentials } from "./checkCredentials";
 import { combineUint8Arrays } from "./combineUint8Arrays";
-import { decompress as lz4_decompress } from "../vendor/lz4js";
 import { RangeList } from "./RangeList";
 import { StreamingMultipartParser } from "./multipart";
 import { sum } from "./sum";
 import { isFrontend } from "./isFrontend";
+import { ConcurrencyController } from "./ConcurrencyController";
 import { concatUint8Arrays } from "./concatUint8Arrays";
+import { bg4Regroup, bg4Split, lz4DecompressInto } from "./xetChunkCodec";
 
 const JWT_SAFETY_PERIOD = 60_000;
 const JWT_CACHE_SIZE = 1_000;
@@ -47,6 +48,11 @@ type XetBlobCreateOptions = {
 	 * @default true
 	 */
 	parallelDownloads?: boolean | ParallelDownloadOptions;
+	/**
+	 * Local store of decoded chunks, shared across downloads. Terms found in the store are not fetched,
+	 * and fetched terms are added to it, so downloading a new revision of a file only fetches the changed data.
+	 */
+	chunkStore?: XetChunkStore;
 } & ({ hash: string; reconstructionUrl?: string } | { hash?: string; reconstructionUrl: string }) &
 	Partial<CredentialsParams>;
 
@@ -69,6 +75,25 @@ export interface ParallelDownloadOptions {
 	controllerTickMs?: number;
 }
 
+/**
+ * Store of decoded xorb chunks, content-addressed by xorb hash and chunk range.
+ *
+ * See `DiskXetChunkStore` for an on-disk implementation with a size cap and LRU eviction.
+ */
+export interface XetChunkStore {
+	/**
+	 * Whether the chunks of the xorb range are in the store, without reading them.
+	 *
+	 * A `true` answer is only a hint: {@link get} can still miss, eg if the entry was evicted in the meantime.
+	 */
+	has(hash: string, range: { start: number; end: number }): Promise<boolean>;
+	/**
+	 * @returns one array per chunk of the range, or `undefined` if the range is not in the store
+	 */
+	get(hash: string, range: { start: number; end: number }): Promise<Uint8Array[] | undefined>;
+	set(hash: string, range: { start: number; end: number }, chunks: Uint8Array[]): Promise<void>;
+}
+
 // Browsers get a lower concurrency ceiling: connections may share an HTTP/2 session, and
 // tab/worker memory is scarcer than in Node. The byte budget derivation is identical
 // everywhere — a cap below ~3x the entry size degrades below serial performance (entries
@@ -79,10 +104,6 @@ const PARALLEL_DEFAULT_MAX_CONCURRENCY = isFrontend ? 4 : 8;
 const PARALLEL_MIN_IN_FLIGHT_BYTES = 64 * 1024 * 1024;
 const PARALLEL_MAX_IN_FLIGHT_BYTES = 256 * 1024 * 1024;
 const PARALLEL_CONTROLLER_TICK_MS = 500;
-/** An extra connection is kept only if aggregate throughput improves by at least this factor. */
-const PARALLEL_PROBE_KEEP_MARGIN = 1.05;
-/** Ticks between upward re-probes once a concurrency plateau has been found (~5s). */
-const PARALLEL_PLATEAU_HOLD_TICKS = 10;
 
 /** Simple broadcast notifier: `wait()` resolves at the next `notifyAll()`. */
 class Notifier {
@@ -152,6 +173,7 @@ export interface ReconstructionInfo {
 	offset_into_first_range: number;
 }
 
+type XorbTerm = ReconstructionInfo["terms"][number];
 type XorbFetchEntry = ReconstructionInfo["xorbs"][string][number];
 type XorbRangeDescriptor = XorbFetchEntry["ranges"][number];
 
@@ -206,9 +228,17 @@ function parseChunkHeader(view: DataView): ChunkHeader {
 function decompressChunk(chunkHeader: ChunkHeader, compressed: Uint8Array): Uint8Array {
 	switch (chunkHeader.compression_scheme) {
 		case XetChunkCompressionScheme.LZ4:
-			return lz4_decompress(compressed, chunkHeader.uncompressed_length);
-		case XetChunkCompressionScheme.ByteGroupingLZ4:
-			return bg4_regroup_bytes(lz4_decompress(compressed, chunkHeader.uncompressed_length));
+		case XetChunkCompressionScheme.ByteGroupingLZ4: {
+			// Decompress (and regroup) straight into a buffer of the final size
+			const uncompressed = new Uint8Array(chunkHeader.uncompressed_length);
+			const length = lz4DecompressInto(compressed, uncompressed, {
+				byteGrouping: chunkHeader.compression_scheme === XetChunkCompressionScheme.ByteGroupingLZ4,
+			});
+			if (length !== chunkHeader.uncompressed_length) {
+				throw new Error(`Chunk decompressed to ${length} bytes, expected ${chunkHeader.uncompressed_length}`);
+			}
+			return uncompressed;
+		}
 		default:
 			// Copy so we don't retain the (possibly much larger) source buffer
 			return compressed.slice();
@@ -293,6 +323,36 @@ function commitChunks(staged: StagedChunks): number {
 	return committed;
 }
 
+/**
+ * Fill the term's ranges that don't have data yet with chunks from the store.
+ *
+ * @returns the number of bytes committed, or `undefined` on a miss or on an entry that doesn't match the term
+ */
+async function loadTermFromStore(
+	store: XetChunkStore,
+	term: XorbTerm,
+	rangeList: RangeList<Uint8Array[]>,
+): Promise<number | undefined> {
+	const chunks = await store.get(term.hash, term.range).catch(() => undefined);
+	if (
+		!chunks ||
+		chunks.length !== term.range.end - term.range.start ||
+		sum(chunks.map((chunk) => chunk.byteLength)) !== term.unpacked_length
+	) {
+		return undefined;
+	}
+
+	let committed = 0;
+	for (const range of rangeList.getRanges(term.range.start, term.range.end)) {
+		if (range.data) {
+			continue;
+		}
+		range.data = chunks.slice(range.start - term.range.start, range.end - term.range.start);
+		committed += sum(range.data.map((chunk) => chunk.byteLength));
+	}
+	return committed;
+}
+
 /**
  * XetBlob is a blob implementation that fetches data directly from the Xet storage
  */
@@ -308,6 +368,7 @@ export class XetBlob extends Blob {
 	reconstructionInfo: ReconstructionInfo | undefined;
 	listener: XetBlobCreateOptions["listener"];
 	parallelDownloads?: boolean | ParallelDownloadOptions;
+	chunkStore?: XetChunkStore;
 
 	constructor(params: XetBlobCreateOptions) {
 		super([]);
@@ -321,6 +382,7 @@ export class XetBlob extends Blob {
 		this.listener = params.listener;
 		this.internalLogging = params.internalLogging ?? false;
 		this.parallelDownloads = params.parallelDownloads;
+		this.chunkStore = params.chunkStore;
 
 		if (params.readToken) {
 			const key = cacheKey({ refreshUrl: this.refreshUrl, initialAccessToken: this.accessToken });
@@ -353,6 +415,7 @@ export class XetBlob extends Blob {
 		blob.listener = this.listener;
 		blob.internalLogging = this.internalLogging;
 		blob.parallelDownloads = this.parallelDownloads;
+		blob.chunkStore = this.chunkStore;
 
 		return blob;
 	}
@@ -440,7 +503,14 @@ export class XetBlob extends Blob {
 			rangeList.add(term.range.start, term.range.end);
 		}
 		const listener = this.listener;
+		const chunkStore = this.chunkStore;
 		const log = this.internalLogging ? (...args: unknown[]) => console.log(...args) : () => {};
+		// Store failures never fail the download
+		const saveTermToStore = async (term: XorbTerm, chunks: Uint8Array[]) => {
+			await chunkStore?.set(term.hash, term.range, chunks).catch((error) => {
+				log("failed to save term to chunk store", term.hash, error);
+			});
+		};
 
 		async function* readData(
 			reconstructionInfo: ReconstructionInfo,
@@ -560,6 +630,11 @@ export class XetBlob extends Blob {
 				};
 
 				let termRanges = rangeList.getRanges(term.range.start, term.range.end);
+				let fromStore = false;
+
+				if (chunkStore && !termRanges.every((range) => range.data)) {
+					fromStore = (await loadTermFromStore(chunkStore, term, rangeList)) !== undefined;
+				}
 
 				if (!termRanges.every((range) => range.data)) {
 					const located = locate(reconstructionInfo);
@@ -586,6 +661,12 @@ export class XetBlob extends Blob {
 							);
 						}
 
+						if (chunkStore && !fromStore) {
+							// Before yielding: the consumer can take ownership of the chunks
+							// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
+							await saveTermToStore(term, termRanges.flatMap((range) => range.data!));
+						}
+
 						rangeLoop: for (const range of termRanges) {
 							// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
 							for (let chunk of range.data!) {
@@ -678,6 +759,8 @@ export class XetBlob extends Blob {
 
 				let leftoverBytes: Uint8Array | undefined = undefined;
 				let totalFetchBytes = 0;
+				// The term's chunks, to save them to the chunk store once complete
+				const storeChunks: Uint8Array[] | undefined = chunkStore ? [] : undefined;
 
 				fetchData: while (!done && totalBytesRead < maxBytes) {
 					const result = await reader.read();
@@ -733,6 +816,10 @@ export class XetBlob extends Blob {
 							stored = true;
 						}
 
+						if (shouldYield && storeChunks) {
+							storeChunks.push(uncompressed);
+						}
+
 						if (shouldYield) {
 							if (readBytesToSkip) {
 								const skipped = Math.min(readBytesToSkip, uncompressed.byteLength);
@@ -755,7 +842,7 @@ export class XetBlob extends Blob {
 									stored,
 								);
 								totalBytesRead += uncompressed.byteLength;
-								yield stored ? uncompressed.slice() : uncompressed;
+								yield stored || storeChunks ? uncompressed.slice() : uncompressed;
 								listener?.({ event: "progress", progress: { read: totalBytesRead, total: maxBytes } });
 							}
 						}
@@ -777,6 +864,10 @@ export class XetBlob extends Blob {
 
 				log("done", done, "total read", totalBytesRead, maxBytes, totalFetchBytes);
 
+				if (storeChunks && storeChunks.length === term.range.end - term.range.start) {
+					await saveTermToStore(term, storeChunks);
+				}
+
 				// Release the reader
 				log("cancel reader");
 				await reader.cancel();
@@ -807,6 +898,8 @@ export class XetBlob extends Blob {
 				hash: string;
 				ranges: XorbFetchEntry["ranges"];
 				url: string;
+				/** Term to read from the chunk store, the entry is only fetched if the store misses */
+				storedTerm?: XorbTerm;
 			}
 			const locateEntryFor = (info: ReconstructionInfo, term: (typeof terms)[number]) => {
 				for (const entry of info.xorbs[term.hash] ?? []) {
@@ -822,13 +915,21 @@ export class XetBlob extends Blob {
 			const plan: PlanItem[] = [];
 			const planIndexByUrl = new Map<string, number>();
 			const termEntryIndex: number[] = [];
-			for (const term of terms) {
+			const termInStore = await Promise.all(
+				terms.map((term) => (chunkStore ? chunkStore.has(term.hash, term.range).catch(() => false) : false)),
+			);
+			for (const [termIdx, term] of terms.entries()) {
 				const entry = locateEntryFor(reconstructionInfo, term);
 				if (!entry) {
 					throw new Error(
 						`Failed to find fetch info for term ${term.hash} and range ${term.range.start}-${term.range.end}`,
 					);
 				}
+				if (termInStore[termIdx]) {
+					termEntryIndex.push(plan.length);
+					plan.push({ hash: term.hash, ranges: entry.ranges, url: entry.url, storedTerm: term });
+					continue;
+				}
 				let idx = planIndexByUrl.get(entry.url);
 				if (idx === undefined) {
 					idx = plan.length;
@@ -839,7 +940,10 @@ export class XetBlob extends Blob {
 			}
 
 			const maxConcurrency = Math.max(1, opts.maxConcurrency ?? PARALLEL_DEFAULT_MAX_CONCURRENCY);
-			const estimateEntryBytes = (item: PlanItem) => sum(item.ranges.map((r) => r.bytes.end - r.bytes.start + 1));
+			const estimateEntryBytes = (item: PlanItem) =>
+				item.storedTerm
+					? item.storedTerm.unpacked_length
+					: sum(item.ranges.map((r) => r.bytes.end - r.bytes.start + 1));
 			// Budget for downloaded-but-not-yet-consumed bytes. Derived from the reconstruction so a
 			// file with large xorb fetches still gets real parallelism, without an unbounded worst case.
 			const largestEntryBytes = plan.length ? Math.max(...plan.map(estimateEntryBytes)) : 0;
@@ -917,6 +1021,17 @@ export class XetBlob extends Blob {
 					throw new Error(`Failed to find range list for entry ${item.hash}`);
 				}
 
+				if (item.storedTerm && chunkStore) {
+					const committed = await loadTermFromStore(chunkStore, item.storedTerm, rangeList);
+					if (committed !== undefined) {
+						tally.committed += committed;
+						notifier.notifyAll();
+						return;
+					}
+					// Evicted since planning: fall back to fetching the entry
+					log("chunk store miss for planned term", item.hash);
+				}
+
 				let resp = await customFetch(item.url, { headers: { Range: rangeHeaderFor(item) } });
 				let attempts403 = 0;
 				let attempts429 = 0;
@@ -1126,19 +1241,11 @@ export class XetBlob extends Blob {
 
 			// ---- Adaptive concurrency controller (plateau-seeking, throughput-driven)
 			//
-			// Starts serial and probes one extra connection at a time, keeping a per-level
-			// average of aggregate decode throughput. A probe is kept only when the new level
-			// actually improves aggregate throughput; otherwise back off to the plateau and
-			// hold there, re-probing only occasionally in case conditions changed. On an
-			// already-saturated link this settles back to serial — the worst case is a brief
-			// probe — while unsaturated paths keep ramping. Ticks where nothing flowed probe
-			// up regardless: the bottleneck is latency, which extra connections hide. Rate
-			// limits (429s) always step down.
-			const levelRate = new Map<number, number>();
+			// Starts serial and probes one extra connection at a time, driven by the aggregate
+			// decode throughput. Rate limits (429s) always step down.
+			const concurrency = new ConcurrencyController({ initialConcurrency: state.target, maxConcurrency });
 			let lastBytes = 0;
 			let last429 = 0;
-			let settleTicks = 1; // measurements skipped while the latest target change takes effect
-			let holdTicks = 0; // plateau hold: no upward probes while positive
 			const controller = setInterval(() => {
 				const rate = state.decodedBytes - lastBytes;
 				lastBytes = state.decodedBytes;
@@ -1148,45 +1255,17 @@ export class XetBlob extends Blob {
 				// suppress legitimate climbs later).
 				const tickHighWater = state.activeHighWater;
 				state.activeHighWater = state.active;
-				holdTicks = Math.max(0, holdTicks - 1);
-				if (state.count429 > last429) {
-					last429 = state.count429;
-					state.target = Math.max(1, state.target - 1);
-					settleTicks = 1;
-					holdTicks = PARALLEL_PLATEAU_HOLD_TICKS;
-				} else if (rate === 0 && state.nextEntry < plan.length) {
-					// Nothing decoded during the tick: latency-bound (TTFB) or stalled, so an
-					// extra connection cannot reduce aggregate throughput. (Pointless once no
-					// unclaimed entries remain — an extra worker would have nothing to fetch.)
-					state.target = Math.min(maxConcurrency, state.target + 1);
-					settleTicks = 1;
-				} else if (settleTicks > 0) {
-					settleTicks--;
-				} else if (state.claimed >= state.target && tickHighWater <= state.target) {
+				const throttled = state.count429 > last429;
+				last429 = state.count429;
+				state.target = concurrency.tick({
+					rate,
+					throttled,
+					// Pointless to add a connection once no unclaimed entries remain: it would have nothing to fetch
+					pending: state.nextEntry < plan.length,
 					// Enough work for every connection during the tick (workers hold their claim
-					// between entries) and no extra connections still draining: a valid
-					// throughput sample for the current level.
-					const ewma = ((levelRate.get(state.target) ?? rate) + rate) / 2;
-					levelRate.set(state.target, ewma);
-					const below = levelRate.get(state.target - 1);
-					if (state.target > 1 && below === undefined) {
-						// The level below was never measured (skipped by a zero-rate climb): step
-						// down to establish its baseline, keeping this level's average for the way
-						// back up. Repeats until a measured level (or 1) is reached, so stall-climbs
-						// always have a path back down.
-						state.target--;
-						settleTicks = 1;
-					} else if (below !== undefined && ewma < below * PARALLEL_PROBE_KEEP_MARGIN) {
-						// The extra connection doesn't pay for itself: back off and hold.
-						levelRate.delete(state.target);
-						state.target--;
-						settleTicks = 1;
-						holdTicks = PARALLEL_PLATEAU_HOLD_TICKS;
-					} else if (holdTicks === 0 && state.target < maxConcurrency) {
-						state.target++;
-						settleTicks = 1;
-					}
-				}
+					// between entries) and no extra connections still draining
+					saturated: state.claimed >= state.target && tickHighWater <= state.target,
+				});
 				state.targetHistory.push(state.target);
 				notifier.notifyAll();
 			}, opts.controllerTickMs ?? PARALLEL_CONTROLLER_TICK_MS);
@@ -1229,6 +1308,12 @@ export class XetBlob extends Blob {
 						);
 					}
 
+					if (chunkStore && !termInStore[termIdx]) {
+						// Before yielding: the consumer can take ownership of the chunks
+						// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
+						await saveTermToStore(term, termRanges.flatMap((range) => range.data!));
+					}
+
 					rangeLoop: for (const range of termRanges) {
 						// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
 						for (let chunk of range.data!) {
@@ -1387,51 +1472,9 @@ export function bg4_regroup_bytes(bytes: Uint8Array): Uint8Array {
 	// ret[2::4] = x[g2_pos:g3_pos]
 	// ret[3::4] = x[g3_pos:]
 
-	// todo: optimize to do it in-place
-
-	const split = Math.floor(bytes.byteLength / 4);
-	const rem = bytes.byteLength % 4;
-	const g1_pos = split + (rem >= 1 ? 1 : 0);
-	const g2_pos = g1_pos + split + (rem >= 2 ? 1 : 0);
-	const g3_pos = g2_pos + split + (rem == 3 ? 1 : 0);
-
 	const ret = new Uint8Array(bytes.byteLength);
-	for (let i = 0, j = 0; i < bytes.byteLength; i += 4, j++) {
-		ret[i] = bytes[j];
-	}
-
-	for (let i = 1, j = g1_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[i] = bytes[j];
-	}
-
-	for (let i = 2, j = g2_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[i] = bytes[j];
-	}
-
-	for (let i = 3, j = g3_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[i] = bytes[j];
-	}
-
+	bg4Regroup(bytes, ret);
 	return ret;
-
-	// alternative implementation (to benchmark which one is faster)
-	// for (let i = 0; i < bytes.byteLength - 3; i += 4) {
-	// 	ret[i] = bytes[i / 4];
-	// 	ret[i + 1] = bytes[g1_pos + i / 4];
-	// 	ret[i + 2] = bytes[g2_pos + i / 4];
-	// 	ret[i + 3] = bytes[g3_pos + i / 4];
-	// }
-
-	// if (rem === 1) {
-	// 	ret[bytes.byteLength - 1] = bytes[g1_pos - 1];
-	// } else if (rem === 2) {
-	// 	ret[bytes.byteLength - 2] = bytes[g1_pos - 1];
-	// 	ret[bytes.byteLength - 1] = bytes[g2_pos - 1];
-	// } else if (rem === 3) {
-	// 	ret[bytes.byteLength - 3] = bytes[g1_pos - 1];
-	// 	ret[bytes.byteLength - 2] = bytes[g2_pos - 1];
-	// 	ret[bytes.byteLength - 1] = bytes[g3_pos - 1];
-	// }
 }
 
 export function bg4_split_bytes(bytes: Uint8Array): Uint8Array {
@@ -1439,32 +1482,7 @@ export function bg4_split_bytes(bytes: Uint8Array): Uint8Array {
 	// It takes interleaved bytes and groups them by 4
 
 	const ret = new Uint8Array(bytes.byteLength);
-	const split = Math.floor(bytes.byteLength / 4);
-	const rem = bytes.byteLength % 4;
-
-	// Calculate group positions in the output array
-	const g1_pos = split + (rem >= 1 ? 1 : 0);
-	const g2_pos = g1_pos + split + (rem >= 2 ? 1 : 0);
-	const g3_pos = g2_pos + split + (rem == 3 ? 1 : 0);
-
-	// Extract every 4th byte starting from position 0, 1, 2, 3
-	// and place them in their respective groups
-	for (let i = 0, j = 0; i < bytes.byteLength; i += 4, j++) {
-		ret[j] = bytes[i];
-	}
-
-	for (let i = 1, j = g1_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[j] = bytes[i];
-	}
-
-	for (let i = 2, j = g2_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[j] = bytes[i];
-	}
-
-	for (let i = 3, j = g3_pos; i < bytes.byteLength; i += 4, j++) {
-		ret[j] = bytes[i];
-	}
-
+	bg4Split(bytes, ret);
 	return ret;
 }
 
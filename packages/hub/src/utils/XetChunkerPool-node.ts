@@ -0,0 +1,55 @@
+import { existsSync } from "node:fs";
+import { cpus } from "node:os";
+import { join } from "node:path";
+import { Worker } from "node:worker_threads";
+import type { ChunkedSegment } from "./chunkSegment";
+import type { XetSegmentChunker } from "./XetChunkerPool";
+
+export function defaultPoolSize(): number {
+	return cpus().length;
+}
+
+export function spawnNodeChunkWorker(workerUrl: string | URL | undefined): XetSegmentChunker {
+	// Next to the bundled index.js / index.mjs
+	const script = workerUrl ?? join(__dirname, "xet-chunk-worker.js");
+	if (typeof script === "string" && !existsSync(script)) {
+		throw new Error(`Xet chunk worker script not found at ${script}, pass workerUrl to XetChunkerPool.create`);
+	}
+
+	const worker = new Worker(script);
+	// Only keep the process alive while the worker is busy
+	worker.unref();
+
+	let pending: { resolve: (result: ChunkedSegment) => void; reject: (err: unknown) => void } | undefined;
+	let failure: unknown;
+
+	const fail = (err: unknown) => {
+		failure ??= err;
+		pending?.reject(err);
+		pending = undefined;
+	};
+	worker.on("message", (result: ChunkedSegment) => {
+		worker.unref();
+		pending?.resolve(result);
+		pending = undefined;
+	});
+	worker.on("error", fail);
+	worker.on("exit", (code) => fail(new Error(`Xet chunk worker exited with code ${code}`)));
+
+	return {
+		chunk(data) {
+			if (failure) {
+				return Promise.reject(failure);
+			}
+			return new Promise((resolve, reject) => {
+				pending = { resolve, reject };
+				worker.ref();
+				worker.postMessage(data, [data.buffer as ArrayBuffer]);
+			});
+		},
+		terminate() {
+			failure ??= new Error("Xet chunk worker terminated");
+			void worker.terminate();
+		},
+	};
+}
@@ -0,0 +1,55 @@
+import { describe, expect, it } from "vitest";
+import { getChunks, hashToHex } from "@huggingface/xetchunk-wasm";
+import { chunkSegment } from "./chunkSegment";
+import { chunkStreamInParallel, XetChunkerPool } from "./XetChunkerPool";
+
+function inProcessPool(size: number): XetChunkerPool {
+	return new XetChunkerPool(
+		Array.from({ length: size }, () => ({
+			chunk: async (data: Uint8Array) => chunkSegment(data),
+			terminate: () => {},
+		})),
+	);
+}
+
+function randomData(size: number): Uint8Array {
+	const data = new Uint8Array(size);
+	for (let offset = 0; offset < size; offset += 65_536) {
+		crypto.getRandomValues(data.subarray(offset, Math.min(size, offset + 65_536)));
+	}
+	return data;
+}
+
+async function chunkInParallel(data: Uint8Array, segmentSize: number) {
+	const chunks: Array<{ hash: string; length: number }> = [];
+	let dataLength = 0;
+	for await (const output of chunkStreamInParallel(new Blob([data]).stream(), inProcessPool(3), { segmentSize })) {
+		dataLength += output.data.length;
+		chunks.push(...output.chunks);
+	}
+	return { chunks, dataLength };
+}
+
+describe("chunkStreamInParallel", () => {
+	it("should give the same chunks as sequential chunking", async () => {
+		const data = randomData(3_500_000);
+		const expected = getChunks(data).map((chunk) => ({ hash: hashToHex(chunk.hash), length: chunk.length }));
+
+		for (const segmentSize of [200_000, 1_000_000, 10_000_000]) {
+			const { chunks, dataLength } = await chunkInParallel(data, segmentSize);
+			expect(dataLength).toBe(data.length);
+			expect(chunks).toEqual(expected);
+		}
+	});
+
+	it("should resync when segments have no boundary in common with the sequential chunking", async () => {
+		// Runs of zeros give evenly spaced boundaries, that segments starting mid-run don't share
+		const data = new Uint8Array(1_500_000);
+		data.set(randomData(300_000), 600_000);
+		const expected = getChunks(data).map((chunk) => ({ hash: hashToHex(chunk.hash), length: chunk.length }));
+
+		const { chunks, dataLength } = await chunkInParallel(data, 100_000);
+		expect(dataLength).toBe(data.length);
+		expect(chunks).toEqual(expected);
+	});
+});
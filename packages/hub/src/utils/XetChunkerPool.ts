@@ -0,0 +1,283 @@
+import { createChunker, finalize, hashToHex, nextBlock, type Chunk } from "@huggingface/xetchunk-wasm";
+import type { ChunkedSegment } from "./chunkSegment";
+import { isFrontend } from "./isFrontend";
+
+const TARGET_CHUNK_SIZE = 64 * 1024;
+const MAX_CHUNK_SIZE = 2 * TARGET_CHUNK_SIZE;
+const HASH_LENGTH = 32;
+/**
+ * Files are split in segments of this size to be chunked by the workers. Smaller files are chunked on the main thread.
+ */
+export const XET_CHUNKER_SEGMENT_SIZE = 8 * 1024 * 1024;
+
+/**
+ * A worker chunking one segment at a time
+ */
+export interface XetSegmentChunker {
+	chunk(data: Uint8Array): Promise<ChunkedSegment>;
+	terminate(): void;
+}
+
+/**
+ * Pool of workers chunking and hashing files for xet uploads, using worker_threads in Node.js and Web Workers in browsers.
+ *
+ * When passed to `commit` / `uploadFiles`, files larger than {@link XET_CHUNKER_SEGMENT_SIZE} are split in segments chunked in parallel
+ * by the workers, and the main thread only assembles the xorbs. The pool can be shared by several uploads.
+ *
+ * In browsers, `workerUrl` must point to `dist/browser/xet-chunk-worker.mjs`, as served by your bundler.
+ *
+ * @example
+ * const pool = await XetChunkerPool.create();
+ * try {
+ *   await uploadFiles({ repo, files, accessToken, xetChunkerPool: pool });
+ * } finally {
+ *   pool.terminate();
+ * }
+ */
+export class XetChunkerPool {
+	readonly size: number;
+	#workers: XetSegmentChunker[];
+	#idle: XetSegmentChunker[];
+	#waiting: Array<(worker: XetSegmentChunker) => void> = [];
+
+	constructor(workers: XetSegmentChunker[]) {
+		if (!workers.length) {
+			throw new TypeError("XetChunkerPool needs at least one worker");
+		}
+		this.size = workers.length;
+		this.#workers = workers;
+		this.#idle = [...workers];
+	}
+
+	static async create(opts?: {
+		/**
+		 * Number of workers
+		 *
+		 * @default the number of CPU cores
+		 */
+		size?: number;
+		/**
+		 * URL or path of the worker script. Required in browsers.
+		 *
+		 * @default dist/xet-chunk-worker.js in Node.js
+		 */
+		workerUrl?: string | URL;
+	}): Promise<XetChunkerPool> {
+		if (isFrontend) {
+			if (!opts?.workerUrl) {
+				throw new TypeError("workerUrl is required to create a XetChunkerPool in browsers");
+			}
+			const workerUrl = opts.workerUrl;
+			const size = opts.size ?? globalThis.navigator?.hardwareConcurrency ?? 4;
+			return new XetChunkerPool(Array.from({ length: size }, () => spawnWebChunkWorker(workerUrl)));
+		}
+
+		if (!nodeModule) {
+			nodeModule = await import("./XetChunkerPool-node");
+		}
+		const { spawnNodeChunkWorker, defaultPoolSize } = nodeModule;
+		const size = opts?.size ?? defaultPoolSize();
+		return new XetChunkerPool(Array.from({ length: size }, () => spawnNodeChunkWorker(opts?.workerUrl)));
+	}
+
+	/**
+	 * Chunk a segment on the first available worker. The segment's buffer is transferred to the worker.
+	 */
+	async chunk(data: Uint8Array): Promise<ChunkedSegment> {
+		const worker = this.#idle.pop() ?? (await new Promise<XetSegmentChunker>((resolve) => this.#waiting.push(resolve)));
+		try {
+			return await worker.chunk(data);
+		} finally {
+			const next = this.#waiting.shift();
+			if (next) {
+				next(worker);
+			} else {
+				this.#idle.push(worker);
+			}
+		}
+	}
+
+	terminate(): void {
+		for (const worker of this.#workers) {
+			worker.terminate();
+		}
+	}
+}
+
+function spawnWebChunkWorker(workerUrl: string | URL): XetSegmentChunker {
+	const worker = new Worker(workerUrl, { type: "module" });
+
+	let pending: { resolve: (result: ChunkedSegment) => void; reject: (err: unknown) => void } | undefined;
+	let failure: unknown;
+
+	worker.addEventListener("message", (event: MessageEvent<ChunkedSegment>) => {
+		pending?.resolve(event.data);
+		pending = undefined;
+	});
+	worker.addEventListener("error", (event: ErrorEvent) => {
+		failure ??= event.error ?? new Error(event.message);
+		pending?.reject(failure);
+		pending = undefined;
+	});
+
+	return {
+		chunk(data) {
+			if (failure) {
+				return Promise.reject(failure);
+			}
+			return new Promise((resolve, reject) => {
+				pending = { resolve, reject };
+				worker.postMessage(data, [data.buffer as ArrayBuffer]);
+			});
+		},
+		terminate() {
+			failure ??= new Error("Xet chunk worker terminated");
+			worker.terminate();
+		},
+	};
+}
+
+/**
+ * Chunks a stream with the pool, giving the same chunks as a sequential chunker.
+ *
+ * The stream is cut in segments, each chunked by a worker as if there was a chunk boundary at its start. A boundary only
+ * depends on the bytes since the previous boundary, so once the sequential chunking of the bytes before a segment reaches
+ * one of the segment's boundaries, the segment's next chunks are the sequential ones. This usually takes a single chunk.
+ *
+ * @yields the data read from the stream, in order, along with the chunks it completes
+ */
+export async function* chunkStreamInParallel(
+	stream: ReadableStream<Uint8Array>,
+	pool: XetChunkerPool,
+	opts?: { segmentSize?: number },
+): AsyncGenerator<{ data: Uint8Array; chunks: Array<{ hash: string; length: number }> }> {
+	const segmentSize = opts?.segmentSize ?? XET_CHUNKER_SEGMENT_SIZE;
+	const inFlight: Promise<ChunkedSegment>[] = [];
+	// Bytes after the last chunk boundary
+	let tail: Uint8Array[] = [];
+	let isFirstSegment = true;
+
+	const resync = ({ data, hashes, lengths }: ChunkedSegment) => {
+		const chunks: Array<{ hash: string; length: number }> = [];
+		// Position in the segment from which its chunks are used, and the index of the first one
+		let syncPosition = 0;
+		let syncIndex = 0;
+
+		if (!isFirstSegment) {
+			const nextIndexByBoundary = new Map<number, number>([[0, 0]]);
+			let end = 0;
+			for (let i = 0; i < lengths.length; i++) {
+				end += lengths[i];
+				nextIndexByBoundary.set(end, i + 1);
+			}
+
+			const chunker = createChunker(TARGET_CHUNK_SIZE);
+			const tailLength = tail.reduce((acc, piece) => acc + piece.length, 0);
+			let chunkEnd = -tailLength;
+			const feed = (bytes: Uint8Array): boolean => {
+				for (const chunk of nextBlock(chunker, bytes)) {
+					chunks.push(toHexChunk(chunk));
+					chunkEnd += chunk.length;
+					const nextIndex = nextIndexByBoundary.get(chunkEnd);
+					if (nextIndex !== undefined) {
+						syncPosition = chunkEnd;
+						syncIndex = nextIndex;
+						return true;
+					}
+				}
+				return false;
+			};
+
+			let synced = tail.some(feed);
+			for (let offset = 0; !synced && offset < data.length; offset += MAX_CHUNK_SIZE) {
+				synced = feed(data.subarray(offset, offset + MAX_CHUNK_SIZE));
+			}
+			if (!synced) {
+				// No common boundary, the sequential chunking continues in the next segment
+				tail = dropBytes([...tail, data], chunkEnd + tailLength);
+				return chunks;
+			}
+		}
+		isFirstSegment = false;
+
+		let end = syncPosition;
+		for (let i = syncIndex; i < lengths.length; i++) {
+			chunks.push(toHexChunk({ hash: hashes.subarray(i * HASH_LENGTH, (i + 1) * HASH_LENGTH), length: lengths[i] }));
+			end += lengths[i];
+		}
+		tail = [data.subarray(end)];
+		return chunks;
+	};
+
+	const dispatch = (segment: Uint8Array) => {
+		const promise = pool.chunk(segment);
+		// Errors are surfaced when the segment's turn comes
+		promise.catch(() => {});
+		inFlight.push(promise);
+	};
+
+	const reader = stream.getReader();
+	let segment = new Uint8Array(segmentSize);
+	let segmentOffset = 0;
+	while (true) {
+		const { done, value } = await reader.read();
+		if (done) {
+			break;
+		}
+		let valueOffset = 0;
+		while (valueOffset < value.length) {
+			const n = Math.min(value.length - valueOffset, segmentSize - segmentOffset);
+			segment.set(value.subarray(valueOffset, valueOffset + n), segmentOffset);
+			valueOffset += n;
+			segmentOffset += n;
+
+			if (segmentOffset === segmentSize) {
+				dispatch(segment);
+				segment = new Uint8Array(segmentSize);
+				segmentOffset = 0;
+
+				// Keep every worker busy, without reading the whole file in advance
+				if (inFlight.length > pool.size) {
+					const result = await (inFlight.shift() as Promise<ChunkedSegment>);
+					yield { data: result.data, chunks: resync(result) };
+				}
+			}
+		}
+	}
+	if (segmentOffset > 0) {
+		dispatch(segment.subarray(0, segmentOffset));
+	}
+
+	for (const promise of inFlight) {
+		const result = await promise;
+		yield { data: result.data, chunks: resync(result) };
+	}
+
+	const chunker = createChunker(TARGET_CHUNK_SIZE);
+	const lastChunks = tail.flatMap((piece) => nextBlock(chunker, piece));
+	const lastChunk = finalize(chunker);
+	if (lastChunk) {
+		lastChunks.push(lastChunk);
+	}
+	yield { data: new Uint8Array(0), chunks: lastChunks.map(toHexChunk) };
+}
+
+function toHexChunk(chunk: Chunk): { hash: string; length: number } {
+	return { hash: hashToHex(chunk.hash), length: chunk.length };
+}
+
+function dropBytes(pieces: Uint8Array[], n: number): Uint8Array[] {
+	const result: Uint8Array[] = [];
+	for (const piece of pieces) {
+		if (n >= piece.length) {
+			n -= piece.length;
+			continue;
+		}
+		result.push(piece.subarray(n));
+		n = 0;
+	}
+	return result;
+}
+
+// eslint-disable-next-line @typescript-eslint/consistent-type-imports
+let nodeModule: typeof import("./XetChunkerPool-node");
@@ -0,0 +1,28 @@
+import { createChunker, nextBlock } from "@huggingface/xetchunk-wasm";
+
+const TARGET_CHUNK_SIZE = 64 * 1024;
+const HASH_LENGTH = 32;
+
+export interface ChunkedSegment {
+	/** The segment's data, handed back to the caller after being transferred to a worker */
+	data: Uint8Array;
+	/** Hashes of the segment's complete chunks, concatenated */
+	hashes: Uint8Array;
+	lengths: Uint32Array;
+}
+
+/**
+ * Chunks and hashes a segment of a file, as if there was a chunk boundary at its start.
+ *
+ * Only complete chunks are returned, the bytes after the last boundary belong to a chunk overlapping the next segment.
+ */
+export function chunkSegment(data: Uint8Array): ChunkedSegment {
+	const chunks = nextBlock(createChunker(TARGET_CHUNK_SIZE), data);
+	const hashes = new Uint8Array(chunks.length * HASH_LENGTH);
+	const lengths = new Uint32Array(chunks.length);
+	for (const [i, chunk] of chunks.entries()) {
+		hashes.set(chunk.hash, i * HASH_LENGTH);
+		lengths[i] = chunk.length;
+	}
+	return { data, hashes, lengths };
+}
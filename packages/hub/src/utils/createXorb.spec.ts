@@ -1,7 +1,8 @@
 import { describe, expect, it } from "vitest";
-import { backtrackDedup, CurrentXorbInfo } from "./createXorbs";
+import { backtrackDedup, createXorbs, CurrentXorbInfo } from "./createXorbs";
 import type { ShardData } from "./shardParser";
 import { ChunkCache } from "./ChunkCache";
+import { sha256 } from "./sha256";
 
 describe("createXorb", () => {
 	describe("backtrackDedup", () => {
@@ -34,6 +35,7 @@ describe("createXorb", () => {
 			];
 			const shardData: ShardData = {
 				hmacKey: "shard1",
+				hmacKeyExpiry: 0,
 				xorbs: [
 					{
 						hash: "remoteXorb1",
@@ -90,4 +92,42 @@ describe("createXorb", () => {
 			expect(chunkCache.getChunk("chunk2", computeHmac)).toEqual({ xorbIndex: 0, chunkIndex: 0 });
 		});
 	});
+
+	describe("createXorbs", () => {
+		it("should compute the sha256 of files while chunking them", async () => {
+			const content = new Blob([new Uint8Array(300_000).map((_, i) => (i * 7919) % 251)]);
+			const expectedSha256 = await (async () => {
+				const iterator = sha256(content);
+				let res: IteratorResult<number, string>;
+				do {
+					res = await iterator.next();
+				} while (!res.done);
+				return res.value;
+			})();
+
+			const files = (async function* () {
+				yield { content, path: "computed.bin" };
+				yield { content, path: "given.bin", sha256: "given" };
+			})();
+
+			const shas: Record<string, string | undefined> = {};
+			for await (const event of createXorbs(files, {
+				accessToken: undefined,
+				fetch: async () => new Response(null, { status: 404 }),
+				xetParams: {
+					accessToken: "token",
+					casUrl: "https://cas.test",
+					expiresAt: new Date(Date.now() + 3_600_000),
+					refreshWriteTokenUrl: "https://hub.test/xet-write-token",
+				},
+				computeSha256: true,
+			})) {
+				if (event.event === "file") {
+					shas[event.path] = event.sha256;
+				}
+			}
+
+			expect(shas).toEqual({ "computed.bin": expectedSha256, "given.bin": "given" });
+		});
+	});
 });
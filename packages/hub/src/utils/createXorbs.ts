@@ -1,10 +1,13 @@
-import { bg4_split_bytes, XET_CHUNK_HEADER_BYTES, XetChunkCompressionScheme } from "./XetBlob";
-import { compress as lz4_compress } from "../vendor/lz4js";
-import { ChunkCache } from "./ChunkCache";
+import { XET_CHUNK_HEADER_BYTES, XetChunkCompressionScheme } from "./XetBlob";
+import { lz4Compress } from "./xetChunkCodec";
+import { ChunkCache, memoizeHmacFunction, NO_HMAC_KEY } from "./ChunkCache";
+import type { ChunkCacheSnapshot, ChunkCacheSnapshotEntry } from "./ChunkCacheSnapshot";
 import { xetWriteToken, type XetWriteTokenParams } from "./xetWriteToken";
 import type { ShardData } from "./shardParser";
-import { parseShardData } from "./shardParser";
+import { ShardView } from "./shardParser";
 import { SplicedBlob } from "./SplicedBlob";
+import { createSha256Hasher } from "./sha256";
+import { chunkStreamInParallel, XET_CHUNKER_SEGMENT_SIZE, type XetChunkerPool } from "./XetChunkerPool";
 import {
 	createChunker,
 	nextBlock,
@@ -133,6 +136,18 @@ export async function* createXorbs(
 	fileSources: AsyncGenerator<{ content: Blob; path: string; sha256?: string }>,
 	params: XetWriteTokenParams & {
 		yieldCallback?: (event: { event: "fileProgress"; path: string; progress: number }) => void;
+		/**
+		 * Dedup info from previous sessions, checked before global dedup. Chunks of this session are added to it.
+		 */
+		chunkCacheSnapshot?: ChunkCacheSnapshot;
+		/**
+		 * Workers to chunk and hash large files in parallel, instead of on the main thread
+		 */
+		chunkerPool?: XetChunkerPool;
+		/**
+		 * Compute the sha256 of files that don't have one while reading them for chunking, and set it on their "file" event
+		 */
+		computeSha256?: boolean;
 	},
 ): AsyncGenerator<
 	| XorbEvent
@@ -160,8 +175,11 @@ export async function* createXorbs(
 	const chunkCache = new ChunkCache();
 	let xorb = new CurrentXorbInfo();
 
+	const localXorbHashes: string[] = [];
+
 	const nextXorb = (currentFile: { path: string; uploadedBytes: number; size: number }): XorbEvent => {
 		const event = xorb.event(computeXorbHashHex);
+		localXorbHashes[event.id] = event.hash;
 
 		xorbId++;
 		xorb = new CurrentXorbInfo();
@@ -191,6 +209,24 @@ export async function* createXorbs(
 
 	const remoteXorbHashes: string[] = [""]; // starts at index 1 (to simplify implem a bit)
 
+	// The same chunk hash is looked up in the chunk cache, then in the snapshot: compute its HMACs once
+	const computeHmac = memoizeHmacFunction(computeHmacHex);
+
+	const snapshotXorbIndices = new Map<string, number>();
+	const getChunkFromSnapshot = (hash: string) => {
+		const found = params.chunkCacheSnapshot?.getChunk(hash, computeHmac);
+		if (!found) {
+			return undefined;
+		}
+		let xorbIndex = snapshotXorbIndices.get(found.xorbHash);
+		if (xorbIndex === undefined) {
+			xorbIndex = -remoteXorbHashes.length;
+			remoteXorbHashes.push(found.xorbHash);
+			snapshotXorbIndices.set(found.xorbHash, xorbIndex);
+		}
+		return { xorbIndex, chunkIndex: found.chunkIndex };
+	};
+
 	for await (const fileSource of fileSources) {
 		params.yieldCallback?.({
 			event: "fileProgress",
@@ -220,10 +256,11 @@ export async function* createXorbs(
 					remoteXorbHashes,
 					params,
 					chunkCache,
-					computeHmacHex,
+					computeHmac,
 					{
 						maxChunks: 1,
 						isAtBeginning: true,
+						getChunkFromSnapshot,
 					},
 				);
 			}
@@ -232,7 +269,8 @@ export async function* createXorbs(
 			let isFirstFileChunk = true;
 			const sourceChunks: Array<Uint8Array> = [];
 
-			const reader = fileSource.content.stream().getReader();
+			const sha256Hasher = params.computeSha256 && !fileSource.sha256 ? await createSha256Hasher() : undefined;
+
 			let processedBytes = 0;
 			let dedupedBytes = 0; // Track bytes that were deduplicated
 			// Needed to compute the final file hash
@@ -258,7 +296,7 @@ export async function* createXorbs(
 					// Remove chunks from source data
 					const chunkToCopy = removeChunkFromSourceData(sourceChunks, chunk.length);
 
-					let cacheData = chunkCache.getChunk(chunk.hash, computeHmacHex);
+					let cacheData = chunkCache.getChunk(chunk.hash, computeHmac) ?? getChunkFromSnapshot(chunk.hash);
 					if (cacheData === undefined && chunk.dedup && bytesSinceRemoteDedup >= INTERVAL_BETWEEN_REMOTE_DEDUP) {
 						const token = await xetWriteToken(params);
 						bytesSinceRemoteDedup = 0;
@@ -271,22 +309,13 @@ export async function* createXorbs(
 
 						// todo: handle non-404 non-429 errors, eg throw error
 						if (shardResp.ok) {
-							const shard = await shardResp.blob();
-							const shardData = await parseShardData(shard);
-
-							for (const xorb of shardData.xorbs) {
-								const remoteXorbId = -remoteXorbHashes.length;
-								remoteXorbHashes.push(xorb.hash);
-								let i = 0;
-								for (const chunk of xorb.chunks) {
-									chunkCache.addChunkToCache(chunk.hash, remoteXorbId, i++, shardData.hmacKey);
-								}
-							}
-							cacheData = chunkCache.getChunk(chunk.hash, computeHmacHex);
+							const shard = await ShardView.fromBlob(await shardResp.blob());
+							addShardToCache(shard, chunkCache, remoteXorbHashes);
+							cacheData = chunkCache.getChunk(chunk.hash, computeHmac);
 
 							// We backtrack a bit to check if new dedup info contains older chunks
 							const oldDedupedBytes = dedupedBytes;
-							dedupedBytes = backtrackDedup(xorb, computeHmacHex, shardData, chunkCache, chunkMetadata, dedupedBytes);
+							dedupedBytes = backtrackDedup(xorb, computeHmac, shard, chunkCache, chunkMetadata, dedupedBytes);
 
 							if (dedupedBytes > oldDedupedBytes) {
 								xorb.fileUploadedBytes[fileSource.path] ??= 0;
@@ -367,15 +396,28 @@ export async function* createXorbs(
 				}
 			};
 
-			while (true) {
-				const { done, value } = await reader.read();
-				if (done) {
-					yield* addChunks(finalizeChunker(chunker));
-					break;
+			if (params.chunkerPool && fileSource.content.size > XET_CHUNKER_SEGMENT_SIZE) {
+				for await (const { data, chunks } of chunkStreamInParallel(fileSource.content.stream(), params.chunkerPool)) {
+					if (data.length) {
+						processedBytes += data.length;
+						sourceChunks.push(data);
+						sha256Hasher?.update(data);
+					}
+					yield* addChunks(chunks.map((chunk) => ({ ...chunk, dedup: false })));
+				}
+			} else {
+				const reader = fileSource.content.stream().getReader();
+				while (true) {
+					const { done, value } = await reader.read();
+					if (done) {
+						yield* addChunks(finalizeChunker(chunker));
+						break;
+					}
+					processedBytes += value.length;
+					sourceChunks.push(value);
+					sha256Hasher?.update(value);
+					yield* addChunks(addDataToChunker(value, chunker));
 				}
-				processedBytes += value.length;
-				sourceChunks.push(value);
-				yield* addChunks(addDataToChunker(value, chunker));
 			}
 
 			const fileRepresentation = buildFileRepresentation(chunkMetadata, fileChunks, computeVerificationHashHex);
@@ -389,7 +431,7 @@ export async function* createXorbs(
 				event: "file" as const,
 				path: fileSource.path,
 				hash: computeFileHashHex(fileChunks),
-				sha256: fileSource.sha256,
+				sha256: fileSource.sha256 ?? sha256Hasher?.digest(),
 				dedupRatio,
 				representation: fileRepresentation,
 			});
@@ -397,7 +439,9 @@ export async function* createXorbs(
 	}
 
 	if (xorb.offset > 0) {
-		yield xorb.event(computeXorbHashHex);
+		const event = xorb.event(computeXorbHashHex);
+		localXorbHashes[event.id] = event.hash;
+		yield event;
 	}
 
 	for (const event of pendingFileEvents) {
@@ -407,12 +451,63 @@ export async function* createXorbs(
 		}));
 		yield event;
 	}
+
+	params.chunkCacheSnapshot?.add(
+		chunkCacheEntries(chunkCache, localXorbHashes, remoteXorbHashes),
+		[...chunkCache.hmacExpiries].map(([key, expiresAt]) => ({ key, expiresAt: expiresAt || Infinity })),
+	);
+}
+
+/**
+ * Registers the xorbs of a remote shard and makes its chunks available for dedup
+ */
+function addShardToCache(
+	shard: ShardView,
+	chunkCache: ChunkCache,
+	/** Will be mutated */
+	remoteXorbHashes: string[],
+): void {
+	if (shard.hmacKey && shard.hmacKey !== NO_HMAC_KEY) {
+		// Keys are kept in the chunk cache snapshot, and tried on each miss
+		chunkCache.hmacExpiries.set(shard.hmacKey, shard.hmacKeyExpiry);
+	}
+	const firstXorbIndex = -remoteXorbHashes.length;
+	for (let i = 0; i < shard.xorbCount; i++) {
+		remoteXorbHashes.push(shard.xorbHash(i));
+	}
+	chunkCache.addShard(shard, firstXorbIndex);
+}
+
+/**
+ * Entries of the chunk cache whose xorb hash is known, ie local xorbs that were emitted and remote xorbs
+ */
+function* chunkCacheEntries(
+	chunkCache: ChunkCache,
+	localXorbHashes: string[],
+	remoteXorbHashes: string[],
+): Generator<ChunkCacheSnapshotEntry> {
+	for (const [hash, index] of chunkCache.map) {
+		const xorbIndex = chunkCache.xorbIndices[index];
+		const xorbHash = xorbIndex >= 0 ? localXorbHashes[xorbIndex] : remoteXorbHashes[-xorbIndex];
+		if (xorbHash) {
+			yield { hash, xorbHash, chunkIndex: chunkCache.chunkIndices[index], expiresAt: Infinity };
+		}
+	}
+	for (const { shard, firstXorbIndex } of chunkCache.shards) {
+		for (let xorbIndex = 0; xorbIndex < shard.xorbCount; xorbIndex++) {
+			const xorbHash = remoteXorbHashes[-(firstXorbIndex - xorbIndex)];
+			const chunkCount = shard.xorbChunkCount(xorbIndex);
+			for (let chunkIndex = 0; chunkIndex < chunkCount; chunkIndex++) {
+				yield { hash: shard.chunkHash(xorbIndex, chunkIndex), xorbHash, chunkIndex, expiresAt: Infinity };
+			}
+		}
+	}
 }
 
 export function backtrackDedup(
 	xorb: CurrentXorbInfo,
 	computeHmac: (hash: string, key: string) => string,
-	shardData: ShardData,
+	shard: Pick<ShardData, "hmacKey">,
 	chunkCache: ChunkCache,
 	chunkMetadata: { xorbId: number | string; chunkIndex: number; length: number }[],
 	dedupedBytes: number,
@@ -424,7 +519,7 @@ export function backtrackDedup(
 		chunkToRecheckIndex++
 	) {
 		const chunk = xorb.chunks[chunkToRecheckIndex];
-		const hmacHash = computeHmac(chunk.hash, shardData.hmacKey);
+		const hmacHash = computeHmac(chunk.hash, shard.hmacKey);
 		const cacheData = chunkCache.getChunk(hmacHash, null);
 		if (cacheData !== undefined) {
 			chunkIndexesToBacktrackFor.set(chunkToRecheckIndex, {
@@ -559,8 +654,8 @@ function removeChunkFromSourceData(sourceChunks: Array<Uint8Array>, chunkLength:
  * If it returns 0, it means there wasn't enough space in the xorb
  */
 function writeChunk(xorb: CurrentXorbInfo, chunk: Uint8Array, hash: string): boolean {
-	const regularCompressedChunk = lz4_compress(chunk);
-	const bgCompressedChunk = lz4_compress(bg4_split_bytes(chunk));
+	const regularCompressedChunk = lz4Compress(chunk);
+	const bgCompressedChunk = lz4Compress(chunk, { byteGrouping: true });
 	const compressedChunk =
 		bgCompressedChunk.length < regularCompressedChunk.length ? bgCompressedChunk : regularCompressedChunk;
 	const chunkToWrite = compressedChunk.length < chunk.length ? compressedChunk : chunk;
@@ -695,6 +790,10 @@ async function loadDedupInfoToCache(
 		 * Will process content up to the end of the chunk after this position
 		 */
 		maxChunks?: number;
+		/**
+		 * Lookup in dedup info from previous sessions, before global dedup
+		 */
+		getChunkFromSnapshot?: (hash: string) => { xorbIndex: number; chunkIndex: number } | undefined;
 	},
 ): Promise<void> {
 	const chunker = createChunker(TARGET_CHUNK_SIZE);
@@ -719,7 +818,7 @@ async function loadDedupInfoToCache(
 
 			removeChunkFromSourceData(sourceChunks, chunk.length);
 
-			let cacheData = cache.getChunk(chunk.hash, computeHmacHex);
+			let cacheData = cache.getChunk(chunk.hash, computeHmacHex) ?? opts?.getChunkFromSnapshot?.(chunk.hash);
 
 			if (cacheData !== undefined) {
 				dedupedBytes += chunk.length;
@@ -738,17 +837,8 @@ async function loadDedupInfoToCache(
 				});
 
 				if (shardResp.ok) {
-					const shard = await shardResp.blob();
-					const shardData = await parseShardData(shard);
-
-					for (const xorb of shardData.xorbs) {
-						const remoteXorbId = -remoteXorbHashes.length;
-						remoteXorbHashes.push(xorb.hash);
-						let i = 0;
-						for (const xorbChunk of xorb.chunks) {
-							cache.addChunkToCache(xorbChunk.hash, remoteXorbId, i++, shardData.hmacKey);
-						}
-					}
+					const shard = await ShardView.fromBlob(await shardResp.blob());
+					addShardToCache(shard, cache, remoteXorbHashes);
 					cacheData = cache.getChunk(chunk.hash, computeHmacHex);
 				}
 			}
@@ -0,0 +1,63 @@
+import { afterEach, describe, expect, it } from "vitest";
+import { mkdtemp, readFile, readdir, rm, utimes, writeFile } from "node:fs/promises";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import { withLockFile } from "./lockFile";
+
+const dirs: string[] = [];
+
+async function createStaleLock(): Promise<{ dir: string; lockPath: string }> {
+	const dir = await mkdtemp(join(tmpdir(), "hf-lock-"));
+	dirs.push(dir);
+	const lockPath = join(dir, "repo.lock");
+	await writeFile(lockPath, "12345");
+	const longAgo = new Date(Date.now() - 3_600_000);
+	await utimes(lockPath, longAgo, longAgo);
+	return { dir, lockPath };
+}
+
+describe("withLockFile", () => {
+	afterEach(async () => {
+		await Promise.all(dirs.splice(0).map((dir) => rm(dir, { recursive: true, force: true })));
+	});
+
+	it("should take over a stale lock", async () => {
+		const { dir, lockPath } = await createStaleLock();
+
+		expect(await withLockFile(lockPath, async () => "done", { staleMs: 60_000 })).toBe("done");
+		expect(await readdir(dir)).toEqual([]);
+	});
+
+	it("should let a single waiter take over a stale lock", async () => {
+		const { lockPath } = await createStaleLock();
+
+		let active = 0;
+		let maxActive = 0;
+		await Promise.all(
+			Array.from({ length: 5 }, () =>
+				withLockFile(
+					lockPath,
+					async () => {
+						active++;
+						maxActive = Math.max(maxActive, active);
+						await new Promise((resolve) => setTimeout(resolve, 20));
+						active--;
+					},
+					{ staleMs: 60_000 },
+				),
+			),
+		);
+
+		expect(maxActive).toBe(1);
+	});
+
+	it("should not remove a lock that was taken over", async () => {
+		const { lockPath } = await createStaleLock();
+
+		await withLockFile(lockPath, async () => {
+			await writeFile(lockPath, "other owner");
+		});
+
+		expect(await readFile(lockPath, "utf-8")).toBe("other owner");
+	});
+});
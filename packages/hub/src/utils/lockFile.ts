@@ -0,0 +1,94 @@
+import { randomUUID } from "node:crypto";
+import { link, mkdir, open, readFile, rename, stat, unlink, utimes } from "node:fs/promises";
+import { dirname } from "node:path";
+
+/**
+ * Removes a stale lock file, unless it was replaced by a live lock in the meantime.
+ *
+ * The lock file is first moved away with an atomic rename, so that only one waiter takes it over.
+ */
+async function removeStaleLock(lockPath: string, stale: { mtimeMs: number; owner: string }): Promise<void> {
+	const takenPath = `${lockPath}.${randomUUID()}.stale`;
+	try {
+		await rename(lockPath, takenPath);
+	} catch {
+		// Released or taken over in the meantime
+		return;
+	}
+	try {
+		const [takenStat, owner] = await Promise.all([stat(takenPath), readFile(takenPath, "utf-8")]);
+		if (takenStat.mtimeMs !== stale.mtimeMs || owner !== stale.owner) {
+			// Another waiter already replaced the stale lock with its own: give it back
+			await link(takenPath, lockPath).catch(() => {});
+		}
+	} finally {
+		await unlink(takenPath).catch(() => {});
+	}
+}
+
+/**
+ * Runs `fn` while holding the lock file at `lockPath`, waiting for it to be released if another process holds it.
+ *
+ * The lock is a file created exclusively, so it works across processes (and across hosts on most network file systems).
+ * A lock file older than `staleMs` is considered left over by a crashed process and taken over.
+ * Its modification time is refreshed while `fn` runs, so that long operations keep the lock.
+ */
+export async function withLockFile<T>(
+	lockPath: string,
+	fn: () => Promise<T>,
+	opts?: {
+		/**
+		 * @default 600_000 (10 minutes)
+		 */
+		staleMs?: number;
+	},
+): Promise<T> {
+	const staleMs = opts?.staleMs ?? 600_000;
+	await mkdir(dirname(lockPath), { recursive: true });
+
+	// Written in the lock file, to tell our lock apart from one that replaced it
+	const owner = `${process.pid} ${randomUUID()}`;
+	let delay = 10;
+	for (;;) {
+		try {
+			const handle = await open(lockPath, "wx");
+			await handle.writeFile(owner);
+			await handle.close();
+			break;
+		} catch (err) {
+			if ((err as NodeJS.ErrnoException).code !== "EEXIST") {
+				throw err;
+			}
+		}
+
+		try {
+			const [lockStat, lockOwner] = await Promise.all([stat(lockPath), readFile(lockPath, "utf-8")]);
+			if (Date.now() - lockStat.mtimeMs > staleMs) {
+				await removeStaleLock(lockPath, { mtimeMs: lockStat.mtimeMs, owner: lockOwner });
+				continue;
+			}
+		} catch {
+			// The lock was released in the meantime
+			continue;
+		}
+
+		await new Promise((resolve) => setTimeout(resolve, delay));
+		delay = Math.min(delay * 2, 1000);
+	}
+
+	const refresh = setInterval(() => {
+		const now = new Date();
+		utimes(lockPath, now, now).catch(() => {});
+	}, staleMs / 3);
+	refresh.unref?.();
+
+	try {
+		return await fn();
+	} finally {
+		clearInterval(refresh);
+		// Only remove the lock if it's still ours
+		if ((await readFile(lockPath, "utf-8").catch(() => undefined)) === owner) {
+			await unlink(lockPath).catch(() => {});
+		}
+	}
+}
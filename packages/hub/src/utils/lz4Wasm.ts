@@ -0,0 +1,830 @@
+/**
+ * LZ4 block codec and BG4 byte (re)grouping as a WebAssembly module generated at runtime,
+ * following the approach of the `gearhash-jit` and `blake3-jit` packages: no .wasm file to bundle or fetch.
+ *
+ * The block functions are straight ports of the vendored lz4js ones (same output for the compressor),
+ * with bounds checks in the decompressor. Frames are handled on the JS side, see `xetChunkCodec.ts`.
+ *
+ * Exported functions, all offsets are in the shared memory:
+ *
+ *   decompressBlock(src, srcEnd, dstStart, dst, dstEnd) -> i32: end of the decompressed data, or -1 if the block is invalid
+ *     (matches can reference data down to `dstStart`)
+ *   compressBlock(src, srcLen, dst, hashTable) -> i32: compressed length, or 0 if no match was found
+ *     (hashTable is 64kB u32, to be zeroed at the start of each frame, dst must hold compressBound(srcLen) bytes)
+ *   bg4Regroup(src, dst, len): interleaves the 4 byte groups of src into dst
+ *   bg4Split(src, dst, len): inverse of bg4Regroup
+ */
+
+export const LZ4_HASH_TABLE_BYTES = 4 << 16;
+
+const WASM_MAGIC_AND_VERSION = [0x00, 0x61, 0x73, 0x6d, 0x01, 0x00, 0x00, 0x00];
+const I32 = 0x7f;
+const V128 = 0x7b;
+
+const op = {
+	block: 0x02,
+	loop: 0x03,
+	if: 0x04,
+	else: 0x05,
+	end: 0x0b,
+	br: 0x0c,
+	brIf: 0x0d,
+	return: 0x0f,
+	localGet: 0x20,
+	localSet: 0x21,
+	localTee: 0x22,
+	i32Load: 0x28,
+	i32Load8U: 0x2d,
+	i32Load16U: 0x2f,
+	i32Store: 0x36,
+	i32Store8: 0x3a,
+	i32Store16: 0x3b,
+	i32Const: 0x41,
+	i32Eqz: 0x45,
+	i32Eq: 0x46,
+	i32Ne: 0x47,
+	i32LtU: 0x49,
+	i32GtU: 0x4b,
+	i32GeU: 0x4f,
+	i32Add: 0x6a,
+	i32Sub: 0x6b,
+	i32And: 0x71,
+	i32Or: 0x72,
+	i32Xor: 0x73,
+	i32Shl: 0x74,
+	i32ShrU: 0x76,
+	void: 0x40,
+} as const;
+
+function signedLeb128(n: number): number[] {
+	const bytes: number[] = [];
+	let value = n | 0;
+	for (;;) {
+		const byte = value & 0x7f;
+		value >>= 7;
+		if ((value === 0 && (byte & 0x40) === 0) || (value === -1 && (byte & 0x40) !== 0)) {
+			bytes.push(byte);
+			return bytes;
+		}
+		bytes.push(byte | 0x80);
+	}
+}
+
+function unsignedLeb128(n: number): number[] {
+	const bytes: number[] = [];
+	do {
+		let byte = n & 0x7f;
+		n >>>= 7;
+		if (n !== 0) {
+			byte |= 0x80;
+		}
+		bytes.push(byte);
+	} while (n !== 0);
+	return bytes;
+}
+
+function vec(items: number[][]): number[] {
+	return [...unsignedLeb128(items.length), ...items.flat()];
+}
+
+function section(id: number, content: number[]): number[] {
+	return [id, ...unsignedLeb128(content.length), ...content];
+}
+
+function name(str: string): number[] {
+	return [str.length, ...Array.from(str, (c) => c.charCodeAt(0))];
+}
+
+// Small helpers to keep the function bodies readable
+const get = (local: number) => [op.localGet, local];
+const set = (local: number) => [op.localSet, local];
+const tee = (local: number) => [op.localTee, local];
+const i32 = (n: number) => [op.i32Const, ...signedLeb128(n)];
+const load8 = (offset = 0) => [op.i32Load8U, 0, ...unsignedLeb128(offset)];
+const load16 = [op.i32Load16U, 0, 0];
+const load32 = [op.i32Load, 0, 0];
+const store8 = (offset = 0) => [op.i32Store8, 0, ...unsignedLeb128(offset)];
+const store16 = [op.i32Store16, 0, 0];
+const store32 = [op.i32Store, 0, 0];
+const memoryCopy = [0xfc, 0x0a, 0x00, 0x00];
+const memoryFill = [0xfc, 0x0b, 0x00];
+/** local += n */
+const inc = (local: number, n: number[] = i32(1)) => [...get(local), ...n, op.i32Add, ...set(local)];
+
+const simd = {
+	v128Load: [0xfd, 0x00, 0x00, 0x00],
+	v128Store: [0xfd, 0x0b, 0x00, 0x00],
+	i32x4Splat: [0xfd, 0x11],
+	i32x4ExtractLane: (lane: number) => [0xfd, 0x1b, lane],
+	i32x4ReplaceLane: (lane: number) => [0xfd, 0x1c, lane],
+	/** 4x4 byte transpose of the first operand: [a0 a1 a2 a3 b0 b1 ...] <-> [a0 b0 c0 d0 a1 b1 ...], its own inverse */
+	transpose: [0xfd, 0x0d, 0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15],
+};
+
+/**
+ * Reads an LZ4 length continuation (a run of bytes added to `len` until one isn't 0xff),
+ * branching to `errorDepth` if the block ends first
+ */
+function readLength(s: number, sEnd: number, len: number, byte: number, errorDepth: number): number[] {
+	return [
+		op.loop,
+		op.void,
+		...get(s),
+		...get(sEnd),
+		op.i32GeU,
+		op.brIf,
+		errorDepth + 1,
+		...get(s),
+		...load8(),
+		...tee(byte),
+		...get(len),
+		op.i32Add,
+		...set(len),
+		...inc(s),
+		...get(byte),
+		...i32(0xff),
+		op.i32Eq,
+		op.brIf,
+		0,
+		op.end,
+	];
+}
+
+/**
+ * Writes `n` (already reduced by 15) as an LZ4 length continuation at `d`
+ */
+function writeLength(d: number, n: number): number[] {
+	return [
+		op.block,
+		op.void,
+		op.loop,
+		op.void,
+		...get(n),
+		...i32(0xff),
+		op.i32LtU,
+		op.brIf,
+		1,
+		...get(d),
+		...i32(0xff),
+		...store8(),
+		...inc(d),
+		...get(n),
+		...i32(0xff),
+		op.i32Sub,
+		...set(n),
+		op.br,
+		0,
+		op.end,
+		op.end,
+		...get(d),
+		...get(n),
+		...store8(),
+		...inc(d),
+	];
+}
+
+function decompressBlockBody(): number[] {
+	// params: 0 src, 1 srcEnd, 2 dstStart, 3 dst, 4 dstEnd
+	const [s, sEnd, dStart, d, dEnd] = [0, 1, 2, 3, 4];
+	const [token, len, byte, offset, match] = [5, 6, 7, 8, 9];
+	const locals = vec([[5, I32]]);
+
+	// Depths are relative to the sequence loop, inside `block $error`
+	const code = [
+		op.block,
+		op.void,
+		op.loop,
+		op.void,
+
+		// End of block
+		...get(s),
+		...get(sEnd),
+		op.i32GeU,
+		op.if,
+		op.void,
+		...get(d),
+		op.return,
+		op.end,
+
+		...get(s),
+		...load8(),
+		...set(token),
+		...inc(s),
+
+		// Literals
+		...get(token),
+		...i32(4),
+		op.i32ShrU,
+		...tee(len),
+		...i32(15),
+		op.i32Eq,
+		op.if,
+		op.void,
+		...readLength(s, sEnd, len, byte, 2),
+		op.end,
+		...get(len),
+		...get(sEnd),
+		...get(s),
+		op.i32Sub,
+		op.i32GtU,
+		op.brIf,
+		1,
+		...get(len),
+		...get(dEnd),
+		...get(d),
+		op.i32Sub,
+		op.i32GtU,
+		op.brIf,
+		1,
+		...get(d),
+		...get(s),
+		...get(len),
+		...memoryCopy,
+		...inc(d, get(len)),
+		...inc(s, get(len)),
+
+		// The last sequence only has literals
+		...get(s),
+		...get(sEnd),
+		op.i32GeU,
+		op.if,
+		op.void,
+		...get(d),
+		op.return,
+		op.end,
+
+		// Match offset
+		...get(sEnd),
+		...get(s),
+		op.i32Sub,
+		...i32(2),
+		op.i32LtU,
+		op.brIf,
+		1,
+		...get(s),
+		...load16,
+		...tee(offset),
+		op.i32Eqz,
+		...get(offset),
+		...get(d),
+		...get(dStart),
+		op.i32Sub,
+		op.i32GtU,
+		op.i32Or,
+		op.brIf,
+		1,
+		...inc(s, i32(2)),
+
+		// Match length
+		...get(token),
+		...i32(15),
+		op.i32And,
+		...tee(len),
+		...i32(15),
+		op.i32Eq,
+		op.if,
+		op.void,
+		...readLength(s, sEnd, len, byte, 2),
+		op.end,
+		...inc(len, i32(4)),
+		...get(len),
+		...get(dEnd),
+		...get(d),
+		op.i32Sub,
+		op.i32GtU,
+		op.brIf,
+		1,
+
+		// Match copy: memory.copy has memmove semantics, so overlapping matches (repeating the last `offset` bytes) are copied byte by byte
+		...get(d),
+		...get(offset),
+		op.i32Sub,
+		...set(match),
+		...get(offset),
+		...get(len),
+		op.i32GeU,
+		op.if,
+		op.void,
+		...get(d),
+		...get(match),
+		...get(len),
+		...memoryCopy,
+		op.else,
+		...get(offset),
+		...i32(1),
+		op.i32Eq,
+		op.if,
+		op.void,
+		...get(d),
+		...get(match),
+		...load8(),
+		...get(len),
+		...memoryFill,
+		op.else,
+		...get(d),
+		...get(len),
+		op.i32Add,
+		...set(byte),
+		op.loop,
+		op.void,
+		...get(d),
+		...get(match),
+		...load8(),
+		...store8(),
+		...inc(d),
+		...inc(match),
+		...get(d),
+		...get(byte),
+		op.i32LtU,
+		op.brIf,
+		0,
+		op.end,
+		// d is already advanced, compensate for the common increment below
+		...get(d),
+		...get(len),
+		op.i32Sub,
+		...set(d),
+		op.end,
+		op.end,
+		...inc(d, get(len)),
+
+		op.br,
+		0,
+		op.end,
+		op.end,
+		...i32(-1),
+	];
+
+	return [...locals, ...code, op.end];
+}
+
+function compressBlockBody(): number[] {
+	// params: 0 src, 1 srcLen, 2 dst, 3 hashTable
+	const [src, srcLen, dst, table] = [0, 1, 2, 3];
+	const [s, sEnd, limit, anchor, d, seq, h, m, searchCount, literals, mLength, slot] = [
+		4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+	];
+	const locals = vec([[12, I32]]);
+
+	// util.hashU32 from lz4js, applied to the value on the stack
+	const hash = [
+		...tee(h),
+		...i32(2127912214),
+		op.i32Add,
+		...get(h),
+		...i32(12),
+		op.i32Shl,
+		op.i32Add,
+		...tee(h),
+		...i32(-949894596),
+		op.i32Xor,
+		...get(h),
+		...i32(19),
+		op.i32ShrU,
+		op.i32Xor,
+		...tee(h),
+		...i32(374761393),
+		op.i32Add,
+		...get(h),
+		...i32(5),
+		op.i32Shl,
+		op.i32Add,
+		...tee(h),
+		...i32(-744332180),
+		op.i32Add,
+		...get(h),
+		...i32(9),
+		op.i32Shl,
+		op.i32Xor,
+		...tee(h),
+		...i32(-42973499),
+		op.i32Add,
+		...get(h),
+		...i32(3),
+		op.i32Shl,
+		op.i32Add,
+		...tee(h),
+		...i32(-1252372727),
+		op.i32Xor,
+		...get(h),
+		...i32(16),
+		op.i32ShrU,
+		op.i32Xor,
+		// Crush to 16 bits
+		...tee(h),
+		...i32(16),
+		op.i32ShrU,
+		...get(h),
+		op.i32Xor,
+		...i32(0xffff),
+		op.i32And,
+	];
+
+	/** Writes a token with `count` literals and `matchToken` as match length, followed by the literal length continuation */
+	const writeToken = (matchToken: number[]) => [
+		...get(literals),
+		...i32(15),
+		op.i32GeU,
+		op.if,
+		op.void,
+		...get(d),
+		...i32(0xf0),
+		...matchToken,
+		op.i32Add,
+		...store8(),
+		...inc(d),
+		...get(literals),
+		...i32(15),
+		op.i32Sub,
+		...set(slot),
+		...writeLength(d, slot),
+		op.else,
+		...get(d),
+		...get(literals),
+		...i32(4),
+		op.i32Shl,
+		...matchToken,
+		op.i32Add,
+		...store8(),
+		...inc(d),
+		op.end,
+		// Literals
+		...get(d),
+		...get(anchor),
+		...get(literals),
+		...memoryCopy,
+		...inc(d, get(literals)),
+	];
+
+	const code = [
+		...get(src),
+		...tee(s),
+		...tee(anchor),
+		...get(srcLen),
+		op.i32Add,
+		...tee(sEnd),
+		...i32(12),
+		op.i32Sub,
+		...set(limit),
+		...get(dst),
+		...set(d),
+		...i32(67),
+		...set(searchCount),
+
+		op.block,
+		op.void,
+		op.loop,
+		op.void,
+		...get(s),
+		...get(limit),
+		op.i32GtU,
+		op.brIf,
+		1,
+
+		...get(s),
+		...load32,
+		...tee(seq),
+		...hash,
+		...i32(2),
+		op.i32Shl,
+		...get(table),
+		op.i32Add,
+		...tee(slot),
+		...load32,
+		...i32(1),
+		op.i32Sub,
+		...set(m),
+		...get(slot),
+		...get(s),
+		...i32(1),
+		op.i32Add,
+		...store32,
+
+		// No match: the stored position is empty, too far, or the bytes differ
+		...get(m),
+		...i32(-1),
+		op.i32Eq,
+		...get(s),
+		...get(m),
+		op.i32Sub,
+		...i32(16),
+		op.i32ShrU,
+		op.i32Or,
+		op.if,
+		op.void,
+		...i32(1),
+		...set(slot),
+		op.else,
+		...get(m),
+		...load32,
+		...get(seq),
+		op.i32Ne,
+		...set(slot),
+		op.end,
+		...get(slot),
+		op.if,
+		op.void,
+		...get(s),
+		...get(searchCount),
+		...i32(6),
+		op.i32ShrU,
+		op.i32Add,
+		...set(s),
+		...inc(searchCount),
+		op.br,
+		1,
+		op.end,
+
+		...i32(67),
+		...set(searchCount),
+		...get(s),
+		...get(anchor),
+		op.i32Sub,
+		...set(literals),
+
+		// Extend the match
+		...inc(s, i32(4)),
+		...inc(m, i32(4)),
+		...get(s),
+		...set(mLength),
+		op.block,
+		op.void,
+		op.loop,
+		op.void,
+		...get(s),
+		...get(sEnd),
+		...i32(5),
+		op.i32Sub,
+		op.i32GeU,
+		op.brIf,
+		1,
+		...get(s),
+		...load8(),
+		...get(m),
+		...load8(),
+		op.i32Ne,
+		op.brIf,
+		1,
+		...inc(s),
+		...inc(m),
+		op.br,
+		0,
+		op.end,
+		op.end,
+		...get(s),
+		...get(mLength),
+		op.i32Sub,
+		...set(mLength),
+
+		...writeToken([
+			...get(mLength),
+			...i32(15),
+			...get(mLength),
+			...i32(15),
+			op.i32LtU,
+			0x1b, // select
+		]),
+
+		// Offset, s - 4 - (m - 4) = s - m
+		...get(d),
+		...get(s),
+		...get(m),
+		op.i32Sub,
+		...store16,
+		...inc(d, i32(2)),
+
+		...get(mLength),
+		...i32(15),
+		op.i32GeU,
+		op.if,
+		op.void,
+		...get(mLength),
+		...i32(15),
+		op.i32Sub,
+		...set(slot),
+		...writeLength(d, slot),
+		op.end,
+
+		...get(s),
+		...set(anchor),
+		op.br,
+		0,
+		op.end,
+		op.end,
+
+		// Nothing was encoded
+		...get(anchor),
+		...get(src),
+		op.i32Eq,
+		op.if,
+		op.void,
+		...i32(0),
+		op.return,
+		op.end,
+
+		// Trailing literals
+		...get(sEnd),
+		...get(anchor),
+		op.i32Sub,
+		...set(literals),
+		...writeToken(i32(0)),
+
+		...get(d),
+		...get(dst),
+		op.i32Sub,
+	];
+
+	return [...locals, ...code, op.end];
+}
+
+/**
+ * @param interleaved whether the function goes from grouped to interleaved bytes (regroup) or the opposite (split)
+ */
+function bg4Body(interleaved: boolean, useSimd: boolean): number[] {
+	// params: 0 src, 1 dst, 2 len
+	const [src, dst, len] = [0, 1, 2];
+	// Pointers to the 4 groups, in src when regrouping or in dst when splitting
+	const [split, rem, g0, g1, g2, g3, i, vector] = [3, 4, 5, 6, 7, 8, 9, 10];
+	// v128 locals are only valid with SIMD support
+	const locals = vec(useSimd ? [[7, I32], [1, V128]] : [[7, I32]]);
+	const groups = [g0, g1, g2, g3];
+	const interleavedPtr = interleaved ? dst : src;
+	const groupedPtr = interleaved ? src : dst;
+
+	/** pushes `pointer + i` (times 4) */
+	const at = (pointer: number, scale = 1) => [
+		...get(pointer),
+		...get(i),
+		...(scale === 4 ? [...i32(2), op.i32Shl] : []),
+		op.i32Add,
+	];
+
+	const code = [
+		...get(len),
+		...i32(2),
+		op.i32ShrU,
+		...set(split),
+		...get(len),
+		...i32(3),
+		op.i32And,
+		...set(rem),
+		...get(groupedPtr),
+		...set(g0),
+		// g(k+1) = gk + split + (rem > k)
+		...[0, 1, 2].flatMap((k) => [
+			...get(groups[k]),
+			...get(split),
+			op.i32Add,
+			...get(rem),
+			...i32(k),
+			op.i32GtU,
+			op.i32Add,
+			...set(groups[k + 1]),
+		]),
+		...i32(0),
+		...set(i),
+	];
+
+	if (useSimd) {
+		code.push(
+			op.block,
+			op.void,
+			op.loop,
+			op.void,
+			...get(i),
+			...i32(4),
+			op.i32Add,
+			...get(split),
+			op.i32GtU,
+			op.brIf,
+			1,
+		);
+		if (interleaved) {
+			code.push(
+				...at(interleavedPtr, 4),
+				...at(g0),
+				...load32,
+				...simd.i32x4Splat,
+				...[1, 2, 3].flatMap((k) => [...at(groups[k]), ...load32, ...simd.i32x4ReplaceLane(k)]),
+				...tee(vector),
+				...get(vector),
+				...simd.transpose,
+				...simd.v128Store,
+			);
+		} else {
+			code.push(
+				...at(interleavedPtr, 4),
+				...simd.v128Load,
+				...tee(vector),
+				...get(vector),
+				...simd.transpose,
+				...set(vector),
+				...[0, 1, 2, 3].flatMap((k) => [...at(groups[k]), ...get(vector), ...simd.i32x4ExtractLane(k), ...store32]),
+			);
+		}
+		code.push(...inc(i, i32(4)), op.br, 0, op.end, op.end);
+	}
+
+	// Scalar loop, for the rest
+	code.push(
+		op.block,
+		op.void,
+		op.loop,
+		op.void,
+		...get(i),
+		...get(split),
+		op.i32GeU,
+		op.brIf,
+		1,
+		...[0, 1, 2, 3].flatMap((k) =>
+			interleaved
+				? [...at(interleavedPtr, 4), ...at(groups[k]), ...load8(), ...store8(k)]
+				: [...at(groups[k]), ...at(interleavedPtr, 4), ...load8(k), ...store8()],
+		),
+		...inc(i),
+		op.br,
+		0,
+		op.end,
+		op.end,
+	);
+
+	// Tail: the last byte of the first `rem` groups
+	code.push(...get(split), ...set(i));
+	for (let k = 1; k <= 3; k++) {
+		code.push(...get(rem), ...i32(k), op.i32GeU, op.if, op.void);
+		if (interleaved) {
+			code.push(...at(interleavedPtr, 4), ...get(groups[k]), ...i32(1), op.i32Sub, ...load8(), ...store8(k - 1));
+		} else {
+			code.push(...get(groups[k]), ...i32(1), op.i32Sub, ...at(interleavedPtr, 4), ...load8(k - 1), ...store8());
+		}
+		code.push(op.end);
+	}
+
+	return [...locals, ...code, op.end];
+}
+
+/**
+ * Generates the module bytecode, with or without SIMD instructions
+ */
+export function generateLz4WasmBytes(useSimd: boolean): Uint8Array {
+	const types = [
+		[0x60, ...vec([[I32], [I32], [I32], [I32], [I32]]), ...vec([[I32]])],
+		[0x60, ...vec([[I32], [I32], [I32], [I32]]), ...vec([[I32]])],
+		[0x60, ...vec([[I32], [I32], [I32]]), 0x00],
+	];
+	const functions = [
+		{ name: "decompressBlock", type: 0, body: decompressBlockBody() },
+		{ name: "compressBlock", type: 1, body: compressBlockBody() },
+		{ name: "bg4Regroup", type: 2, body: bg4Body(true, useSimd) },
+		{ name: "bg4Split", type: 2, body: bg4Body(false, useSimd) },
+	];
+
+	return new Uint8Array([
+		...WASM_MAGIC_AND_VERSION,
+		...section(0x01, vec(types)),
+		// Memory "js"."mem", min 1 page
+		...section(0x02, vec([[...name("js"), ...name("mem"), 0x02, 0x00, 0x01]])),
+		...section(0x03, vec(functions.map((fn) => [fn.type]))),
+		...section(0x07, vec(functions.map((fn, index) => [...name(fn.name), 0x00, index]))),
+		...section(0x0a, vec(functions.map((fn) => [...unsignedLeb128(fn.body.length), ...fn.body]))),
+	]);
+}
+
+export interface Lz4WasmExports {
+	memory: WebAssembly.Memory;
+	simd: boolean;
+	decompressBlock(src: number, srcEnd: number, dstStart: number, dst: number, dstEnd: number): number;
+	compressBlock(src: number, srcLen: number, dst: number, hashTable: number): number;
+	bg4Regroup(src: number, dst: number, len: number): void;
+	bg4Split(src: number, dst: number, len: number): void;
+}
+
+let instance: Lz4WasmExports | null | undefined;
+
+/**
+ * Compiles the module on first call, with SIMD if the runtime supports it
+ *
+ * @returns null if WebAssembly is not available, eg disabled by a Content Security Policy
+ */
+export function lz4Wasm(): Lz4WasmExports | null {
+	if (instance !== undefined) {
+		return instance;
+	}
+	instance = null;
+	if (typeof WebAssembly === "undefined") {
+		return instance;
+	}
+	for (const useSimd of [true, false]) {
+		try {
+			const memory = new WebAssembly.Memory({ initial: 1 });
+			const exports = new WebAssembly.Instance(new WebAssembly.Module(generateLz4WasmBytes(useSimd)), {
+				js: { mem: memory },
+			}).exports as unknown as Omit<Lz4WasmExports, "memory" | "simd">;
+			instance = { ...exports, memory, simd: useSimd };
+			break;
+		} catch {
+			// Try without SIMD, or fall back to JS
+		}
+	}
+	return instance;
+}
@@ -0,0 +1,105 @@
+import { describe, expect, it } from "vitest";
+import { HubApiError } from "../error";
+import { paginate } from "./paginate";
+
+/**
+ * Pages of `pageSize` numbers, linked with `Link` headers. Responses are sent after `delayMs`.
+ */
+function createPagedFetch(opts: { pages: number; pageSize: number; delayMs?: number; failingPage?: number }) {
+	const requested: number[] = [];
+	let aborted = 0;
+	const fetchPage = (async (input: string | URL | Request, init?: RequestInit) => {
+		const page = Number(new URL(input.toString()).searchParams.get("page") ?? "0");
+		requested.push(page);
+		await new Promise((resolve) => setTimeout(resolve, opts.delayMs ?? 0));
+		init?.signal?.addEventListener("abort", () => aborted++);
+		if (page === opts.failingPage) {
+			return new Response(JSON.stringify({ error: "Page not available" }), {
+				status: 500,
+				headers: { "Content-Type": "application/json" },
+			});
+		}
+		const items = Array.from({ length: opts.pageSize }, (_, i) => ({ id: page * opts.pageSize + i }));
+		return new Response(JSON.stringify(items), {
+			headers:
+				page < opts.pages - 1 ? { Link: `<https://hub.test/api/models?page=${page + 1}>; rel="next"` } : undefined,
+		});
+	}) as typeof fetch;
+	return { fetch: fetchPage, requested, aborted: () => aborted };
+}
+
+async function collect<T>(iterator: AsyncIterable<T>): Promise<T[]> {
+	const items: T[] = [];
+	for await (const item of iterator) {
+		items.push(item);
+	}
+	return items;
+}
+
+describe("paginate", () => {
+	it("should yield the items of all pages, in order", async () => {
+		for (const prefetchPages of [undefined, 0, 1, 3]) {
+			const { fetch } = createPagedFetch({ pages: 5, pageSize: 3 });
+			const items = await collect(
+				paginate<{ id: number }>("https://hub.test/api/models", { headers: {}, fetch, prefetchPages }),
+			);
+			expect(items.map((item) => item.id)).toEqual(Array.from({ length: 15 }, (_, i) => i));
+		}
+	});
+
+	it("should request pages ahead of the page being consumed", async () => {
+		const { fetch, requested } = createPagedFetch({ pages: 10, pageSize: 2 });
+
+		const iterator = paginate("https://hub.test/api/models", { headers: {}, fetch, prefetchPages: 2 });
+		await iterator.next();
+		await new Promise((resolve) => setTimeout(resolve, 20));
+		expect(requested).toEqual([0, 1, 2]);
+
+		// Consuming the first page makes room for one more
+		await iterator.next();
+		await iterator.next();
+		await new Promise((resolve) => setTimeout(resolve, 20));
+		expect(requested).toEqual([0, 1, 2, 3]);
+
+		await iterator.return(undefined);
+	});
+
+	it("should only request the next page once the current one is consumed by default", async () => {
+		const { fetch, requested } = createPagedFetch({ pages: 10, pageSize: 2 });
+
+		const iterator = paginate("https://hub.test/api/models", { headers: {}, fetch });
+		await iterator.next();
+		await new Promise((resolve) => setTimeout(resolve, 20));
+		expect(requested).toEqual([0]);
+
+		await iterator.return(undefined);
+	});
+
+	it("should throw the error of a failing page once it is reached", async () => {
+		const { fetch } = createPagedFetch({ pages: 5, pageSize: 2, failingPage: 2 });
+
+		const items: number[] = [];
+		await expect(async () => {
+			for await (const item of paginate<{ id: number }>("https://hub.test/api/models", {
+				headers: {},
+				fetch,
+				prefetchPages: 3,
+			})) {
+				items.push(item.id);
+			}
+		}).rejects.toThrow(HubApiError);
+		expect(items).toEqual([0, 1, 2, 3]);
+	});
+
+	it("should abort prefetched pages when the consumer stops", async () => {
+		const { fetch, aborted } = createPagedFetch({ pages: 10, pageSize: 2, delayMs: 5 });
+
+		for await (const item of paginate("https://hub.test/api/models", { headers: {}, fetch, prefetchPages: 2 })) {
+			void item;
+			await new Promise((resolve) => setTimeout(resolve, 20));
+			break;
+		}
+		await new Promise((resolve) => setTimeout(resolve, 20));
+		expect(aborted()).toBeGreaterThan(0);
+	});
+});
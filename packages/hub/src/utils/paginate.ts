@@ -0,0 +1,95 @@
+import { createApiError } from "../error";
+import { parseLinkHeader } from "./parseLinkHeader";
+import { streamJsonArrayItems } from "./streamJson";
+
+export interface PaginateOptions {
+	/**
+	 * Number of pages to request ahead of the page being consumed.
+	 *
+	 * When set, the items of each page are also parsed and yielded as the page is downloaded,
+	 * rather than once the whole page is received. Set to `0` to only stream the items.
+	 *
+	 * By default, a page is requested once all items of the previous page are consumed, and parsed at once.
+	 */
+	prefetchPages?: number;
+}
+
+interface Page {
+	res: Response;
+	next: string | undefined;
+}
+
+/**
+ * Yields the items of a paginated Hub API endpoint, following the `Link` headers.
+ *
+ * Stops requesting pages when the consumer stops iterating.
+ */
+export async function* paginate<T>(
+	url: string,
+	params: {
+		headers: Record<string, string>;
+		fetch?: typeof fetch;
+	} & PaginateOptions,
+): AsyncGenerator<T> {
+	const prefetchPages = params.prefetchPages;
+	const customFetch = params.fetch ?? fetch;
+	const controller = new AbortController();
+
+	/** Requested pages, the first one being the page currently consumed */
+	const pages: Promise<Page>[] = [];
+	/** The last requested page, once its headers are received */
+	let lastPage: Page | undefined;
+
+	const request = (pageUrl: string) => {
+		const page = customFetch(pageUrl, {
+			headers: params.headers,
+			...(prefetchPages !== undefined && { signal: controller.signal }),
+		}).then(async (res): Promise<Page> => {
+			if (!res.ok) {
+				throw await createApiError(res);
+			}
+			const linkHeader = res.headers.get("Link");
+			const fetched = { res, next: linkHeader ? parseLinkHeader(linkHeader).next : undefined };
+			lastPage = fetched;
+			requestNext();
+			return fetched;
+		});
+		// Errors are thrown when the page is reached
+		page.catch(() => undefined);
+		pages.push(page);
+	};
+
+	/** Requests the page after the last requested one, if its url is known and there is room */
+	const requestNext = () => {
+		if (lastPage?.next && pages.length < 1 + (prefetchPages ?? 0)) {
+			const next = lastPage.next;
+			lastPage = undefined;
+			request(next);
+		}
+	};
+
+	request(url);
+
+	try {
+		while (pages.length) {
+			const { res } = await pages[0];
+
+			if (prefetchPages === undefined || !res.body) {
+				const items: T[] = await res.json();
+				yield* items;
+			} else {
+				yield* streamJsonArrayItems<T>(res.body);
+			}
+
+			pages.shift();
+			requestNext();
+		}
+	} finally {
+		if (pages.length) {
+			controller.abort();
+			for (const page of pages) {
+				page.then((p) => p.res.body?.cancel()).catch(() => undefined);
+			}
+		}
+	}
+}
@@ -0,0 +1,29 @@
+import { describe, expect, it } from "vitest";
+import { promisesAllOrAbort } from "./promisesAllOrAbort";
+
+describe("promisesAllOrAbort", () => {
+	it("should return the results in order", async () => {
+		const results = await promisesAllOrAbort(
+			[3, 1, 2].map((n) => new Promise<number>((resolve) => setTimeout(() => resolve(n), n))),
+			new AbortController(),
+		);
+
+		expect(results).toEqual([3, 1, 2]);
+	});
+
+	it("should abort and wait for the other promises before rejecting with the first error", async () => {
+		const controller = new AbortController();
+		let settled = 0;
+		const running = (ms: number) =>
+			new Promise<void>((resolve, reject) => {
+				controller.signal.addEventListener("abort", () => setTimeout(() => reject(new Error("aborted")), ms));
+			}).finally(() => settled++);
+
+		await expect(
+			promisesAllOrAbort([running(10), Promise.reject(new Error("first")), running(20)], controller),
+		).rejects.toThrow("first");
+
+		expect(controller.signal.aborted).toBe(true);
+		expect(settled).toBe(2);
+	});
+});
@@ -0,0 +1,22 @@
+/**
+ * Like `Promise.all`, but once a promise rejects, aborts `abortController` and waits for the other promises
+ * to settle before rejecting with that first error, so that nothing is left running in the background.
+ */
+export async function promisesAllOrAbort<T>(promises: Promise<T>[], abortController: AbortController): Promise<T[]> {
+	let failure: { error: unknown } | undefined;
+	const results = await Promise.allSettled(
+		promises.map((promise) =>
+			promise.catch((error) => {
+				if (!failure) {
+					failure = { error };
+					abortController.abort();
+				}
+				throw error;
+			}),
+		),
+	);
+	if (failure) {
+		throw failure.error;
+	}
+	return results.map((result) => (result as PromiseFulfilledResult<T>).value);
+}
@@ -24,3 +24,15 @@ export async function* sha256Node(
 
 	return sha256Stream.digest("hex");
 }
+
+export function createSha256HasherNode(): { update(data: Uint8Array): void; digest(): string } {
+	const hash = createHash("sha256");
+	return {
+		update(data) {
+			hash.update(data);
+		},
+		digest() {
+			return hash.digest("hex");
+		},
+	};
+}
@@ -203,6 +203,29 @@ export async function* sha256(
 	return yield* cryptoModule.sha256Node(buffer, { abortSignal: opts?.abortSignal });
 }
 
+/**
+ * Incremental sha256, to hash data while it's being read for something else
+ */
+export async function createSha256Hasher(): Promise<{ update(data: Uint8Array): void; digest(): string }> {
+	if (isFrontend) {
+		if (!wasmModule) {
+			wasmModule = await import("../vendor/hash-wasm/sha256-wrapper");
+		}
+		const sha256 = await wasmModule.createSHA256();
+		sha256.init();
+		return {
+			update: (data) => sha256.update(data),
+			digest: () => sha256.digest("hex"),
+		};
+	}
+
+	if (!cryptoModule) {
+		cryptoModule = await import("./sha256-node");
+	}
+
+	return cryptoModule.createSha256HasherNode();
+}
+
 // eslint-disable-next-line @typescript-eslint/consistent-type-imports
 let cryptoModule: typeof import("./sha256-node");
 // eslint-disable-next-line @typescript-eslint/consistent-type-imports
@@ -1,4 +1,4 @@
-import { parseShardData } from "./shardParser";
+import { parseShardData, ShardView } from "./shardParser";
 import { readFile } from "fs/promises";
 import { expect, describe, it } from "vitest";
 import { hmac, hashToHex, hexToBytes } from "@huggingface/xetchunk-wasm";
@@ -22,4 +22,59 @@ describe("shardParser", () => {
 		const chunkHash = "9502eec19d4b0c9f7b389228fa801f68ecdf15d69ccd1da2f9ddbd0219898335";
 		expect(hashToHex(hmac(hexToBytes(chunkHash), hexToBytes(shard.hmacKey)))).toEqual(shard.xorbs[1].chunks[0].hash);
 	});
+
+	describe("ShardView", () => {
+		it("finds every chunk of the shard", async () => {
+			const bytes = new Uint8Array(await readFile("tests/gpt2-64-8bits.tflite.shard"));
+			const shard = new ShardView(bytes);
+			const shardData = await parseShardData(new Blob([bytes]));
+
+			expect(shard.hmacKey).toBe(shardData.hmacKey);
+			expect(shard.xorbCount).toBe(shardData.xorbs.length);
+			expect(shard.chunkCount).toBe(shardData.xorbs.reduce((acc, xorb) => acc + xorb.chunks.length, 0));
+			shardData.xorbs.forEach((xorb, xorbIndex) => {
+				expect(shard.xorbHash(xorbIndex)).toBe(xorb.hash);
+				xorb.chunks.forEach((chunk, chunkIndex) => {
+					expect(shard.findChunk(chunk.hash)).toEqual({ xorbIndex, chunkIndex });
+				});
+			});
+			expect(shard.findChunk("00".repeat(32))).toBeUndefined();
+			expect(shard.findChunk("not-a-hash")).toBeUndefined();
+		});
+
+		it("uses the shard's chunk lookup table when present", async () => {
+			const original = new Uint8Array(await readFile("tests/gpt2-64-8bits.tflite.shard"));
+			const shardData = await parseShardData(new Blob([original]));
+
+			// Insert a chunk lookup table before the footer: (u64 truncated hash, u32 xorb entry, u32 chunk index)
+			const entries: Array<{ key: bigint; xorbEntry: number; chunkIndex: number }> = [];
+			let xorbEntry = 0;
+			for (const xorb of shardData.xorbs) {
+				xorb.chunks.forEach((chunk, chunkIndex) => {
+					entries.push({ key: BigInt("0x" + chunk.hash.slice(0, 16)), xorbEntry, chunkIndex });
+				});
+				xorbEntry += 1 + xorb.chunks.length;
+			}
+			entries.sort((a, b) => (a.key < b.key ? -1 : a.key > b.key ? 1 : 0));
+
+			const footerStart = original.length - 200;
+			const bytes = new Uint8Array(original.length + entries.length * 16);
+			bytes.set(original.subarray(0, footerStart));
+			bytes.set(original.subarray(footerStart), footerStart + entries.length * 16);
+			const view = new DataView(bytes.buffer);
+			entries.forEach(({ key, xorbEntry, chunkIndex }, i) => {
+				view.setBigUint64(footerStart + i * 16, key, true);
+				view.setUint32(footerStart + i * 16 + 8, xorbEntry, true);
+				view.setUint32(footerStart + i * 16 + 12, chunkIndex, true);
+			});
+			const newFooterStart = footerStart + entries.length * 16;
+			view.setBigUint64(newFooterStart + 56, BigInt(footerStart), true);
+			view.setBigUint64(newFooterStart + 64, BigInt(entries.length), true);
+
+			const shard = new ShardView(bytes);
+			const [xorb] = shardData.xorbs;
+			expect(shard.findChunk(xorb.chunks[1].hash)).toEqual({ xorbIndex: 0, chunkIndex: 1 });
+			expect(shard.findChunk(shardData.xorbs[1].chunks[0].hash)).toEqual({ xorbIndex: 1, chunkIndex: 0 });
+		});
+	});
 });
@@ -1,7 +1,6 @@
 import { SHARD_FOOTER_VERSION, SHARD_HEADER_VERSION, SHARD_MAGIC_TAG } from "./uploadShards";
 
 const HASH_LENGTH = 32;
-const XORB_HASH_BOOKEND = "ff".repeat(HASH_LENGTH);
 
 // Read 4 uint64 in little endian and convert to hex
 function readHashFromArray(array: Uint8Array, offset: number): string {
@@ -22,6 +21,8 @@ function readHashFromArray(array: Uint8Array, offset: number): string {
 
 export interface ShardData {
 	hmacKey: string;
+	/** Seconds since epoch, 0 if the shard has no expiry */
+	hmacKeyExpiry: number;
 	xorbs: Array<{
 		hash: string;
 		chunks: Array<{
@@ -32,118 +33,292 @@ export interface ShardData {
 	}>;
 }
 
-export async function parseShardData(shardBlob: Blob): Promise<ShardData> {
-	const shard = new Uint8Array(await shardBlob.arrayBuffer());
-	const shardView = new DataView(shard.buffer);
+const SHARD_ENTRY_SIZE = 48;
+const CHUNK_LOOKUP_ENTRY_SIZE = 16;
+
+/**
+ * Read-only view over the bytes of a shard.
+ *
+ * Unlike {@link parseShardData}, nothing is decoded upfront apart from the position of each xorb: hashes are only
+ * converted to strings when asked for, and {@link ShardView.findChunk} looks chunks up by binary search over the
+ * shard's chunk lookup table.
+ */
+export class ShardView {
+	readonly hmacKey: string;
+	/** Seconds since epoch, 0 if the shard has no expiry */
+	readonly hmacKeyExpiry: number;
+	readonly xorbCount: number;
+	readonly chunkCount: number;
+
+	#shard: Uint8Array;
+	#view: DataView;
+	#xorbInfoStart: number;
+	/** Entry index (in 48-byte entries from the start of the xorb info section) of each xorb header */
+	#xorbEntries: Uint32Array;
+	#lookup: DataView | undefined;
+	#lookupLength: number;
+
+	constructor(shard: Uint8Array) {
+		const view = new DataView(shard.buffer, shard.byteOffset, shard.byteLength);
 
-	const magicTag = shard.slice(0, SHARD_MAGIC_TAG.length);
-	if (!magicTag.every((byte, i) => byte === SHARD_MAGIC_TAG[i])) {
-		throw new Error("Invalid shard magic tag");
+		if (!SHARD_MAGIC_TAG.every((byte, i) => shard[i] === byte)) {
+			throw new Error("Invalid shard magic tag");
+		}
+
+		const version = view.getBigUint64(SHARD_MAGIC_TAG.length, true);
+		if (version !== SHARD_HEADER_VERSION) {
+			throw new Error(`Invalid shard version: ${version}`);
+		}
+
+		const footerSize = Number(view.getBigUint64(SHARD_MAGIC_TAG.length + 8, true));
+
+		// Read footer to get section offsets
+		const footerStart = shard.length - footerSize;
+		const footerVersion = view.getBigUint64(footerStart, true);
+		if (footerVersion !== SHARD_FOOTER_VERSION) {
+			throw new Error(`Invalid shard footer version: ${footerVersion}`);
+		}
+
+		// version: u64,                    // Footer version (must be 1)
+		// file_info_offset: u64,           // Offset to file info section
+		// cas_info_offset: u64,            // Offset to CAS info section
+		// file_lookup_offset: u64,         // Offset to file lookup table
+		// file_lookup_num_entry: u64,      // Number of file lookup entries
+		// cas_lookup_offset: u64,          // Offset to CAS lookup table
+		// cas_lookup_num_entry: u64,       // Number of CAS lookup entries
+		// chunk_lookup_offset: u64,        // Offset to chunk lookup table
+		// chunk_lookup_num_entry: u64,     // Number of chunk lookup entries
+		// chunk_hash_hmac_key: [u64; 4],   // HMAC key for chunk hashes (32 bytes)
+		// shard_creation_timestamp: u64,   // Creation time (seconds since epoch)
+		// shard_key_expiry: u64,           // Expiry time (seconds since epoch)
+		// _buffer: [u64; 6],               // Reserved space (48 bytes)
+		// stored_bytes_on_disk: u64,       // Total bytes stored on disk
+		// materialized_bytes: u64,         // Total materialized bytes
+		// stored_bytes: u64,               // Total stored bytes
+		// footer_offset: u64,
+		const xorbInfoStart = Number(view.getBigUint64(footerStart + 16, true));
+		const fileLookupStart = Number(view.getBigUint64(footerStart + 24, true));
+		const chunkLookupStart = Number(view.getBigUint64(footerStart + 56, true));
+		const numChunkLookups = Number(view.getBigUint64(footerStart + 64, true));
+		this.hmacKey = readHashFromArray(shard, footerStart + 72);
+		this.hmacKeyExpiry = Number(view.getBigUint64(footerStart + 112, true));
+
+		// Only the xorb headers are read: each is followed by its chunk entries, which are skipped
+		const xorbEntries: number[] = [];
+		let chunkCount = 0;
+		let entry = 0;
+		while (xorbInfoStart + (entry + 1) * SHARD_ENTRY_SIZE <= fileLookupStart) {
+			const offset = xorbInfoStart + entry * SHARD_ENTRY_SIZE;
+			if (isBookend(shard, offset)) {
+				break;
+			}
+			const xorbChunkCount = view.getUint32(offset + HASH_LENGTH + 4, true);
+			xorbEntries.push(entry);
+			chunkCount += xorbChunkCount;
+			entry += 1 + xorbChunkCount;
+		}
+
+		this.#shard = shard;
+		this.#view = view;
+		this.#xorbInfoStart = xorbInfoStart;
+		this.#xorbEntries = Uint32Array.from(xorbEntries);
+		this.xorbCount = xorbEntries.length;
+		this.chunkCount = chunkCount;
+
+		if (numChunkLookups > 0) {
+			this.#lookup = new DataView(shard.buffer, shard.byteOffset + chunkLookupStart, numChunkLookups * CHUNK_LOOKUP_ENTRY_SIZE);
+		}
+		this.#lookupLength = numChunkLookups;
 	}
 
-	const version = shardView.getBigUint64(SHARD_MAGIC_TAG.length, true);
-	if (version !== SHARD_HEADER_VERSION) {
-		throw new Error(`Invalid shard version: ${version}`);
+	static async fromBlob(shardBlob: Blob): Promise<ShardView> {
+		return new ShardView(new Uint8Array(await shardBlob.arrayBuffer()));
 	}
 
-	const footerSize = Number(shardView.getBigUint64(SHARD_MAGIC_TAG.length + 8, true));
+	xorbHash(xorbIndex: number): string {
+		return readHashFromArray(this.#shard, this.#entryOffset(this.#xorbEntries[xorbIndex]));
+	}
 
-	// Read footer to get section offsets
-	const footerStart = shard.length - footerSize;
-	const footerVersion = shardView.getBigUint64(footerStart, true);
-	if (footerVersion !== SHARD_FOOTER_VERSION) {
-		throw new Error(`Invalid shard footer version: ${footerVersion}`);
+	xorbChunkCount(xorbIndex: number): number {
+		return this.#view.getUint32(this.#entryOffset(this.#xorbEntries[xorbIndex]) + HASH_LENGTH + 4, true);
 	}
 
-	// version: u64,                    // Footer version (must be 1)
-	// file_info_offset: u64,           // Offset to file info section
-	// cas_info_offset: u64,            // Offset to CAS info section
-	// file_lookup_offset: u64,         // Offset to file lookup table
-	// file_lookup_num_entry: u64,      // Number of file lookup entries
-	// cas_lookup_offset: u64,          // Offset to CAS lookup table
-	// cas_lookup_num_entry: u64,       // Number of CAS lookup entries
-	// chunk_lookup_offset: u64,        // Offset to chunk lookup table
-	// chunk_lookup_num_entry: u64,     // Number of chunk lookup entries
-	// chunk_hash_hmac_key: [u64; 4],   // HMAC key for chunk hashes (32 bytes)
-	// shard_creation_timestamp: u64,   // Creation time (seconds since epoch)
-	// shard_key_expiry: u64,           // Expiry time (seconds since epoch)
-	// _buffer: [u64; 6],               // Reserved space (48 bytes)
-	// stored_bytes_on_disk: u64,       // Total bytes stored on disk
-	// materialized_bytes: u64,         // Total materialized bytes
-	// stored_bytes: u64,               // Total stored bytes
-	// footer_offset: u64,
-
-	//	const fileInfoStart = Number(shardView.getBigUint64(footerStart + 8, true));
-	const xorbInfoStart = Number(shardView.getBigUint64(footerStart + 16, true));
-	const fileLookupStart = Number(shardView.getBigUint64(footerStart + 24, true));
-	// const numFileLookups = Number(shardView.getBigUint64(footerStart + 32, true));
-	// const xorbLookupStart = Number(shardView.getBigUint64(footerStart + 40, true));
-	// const numXorbLookups = Number(shardView.getBigUint64(footerStart + 48, true));
-	// const chunkLookupStart = Number(shardView.getBigUint64(footerStart + 56, true));
-	// const numChunkLookups = Number(shardView.getBigUint64(footerStart + 64, true));
-	const hmacKey = readHashFromArray(shard, footerStart + 72);
-	// const shardCreationTimestamp = Number(shardView.getBigUint64(footerStart + 104, true));
-	// const shardKeyExpiry = Number(shardView.getBigUint64(footerStart + 112, true));
-	// const storedBytesOnDisk = Number(shardView.getBigUint64(footerStart + 168, true));
-	// const materializedBytes = Number(shardView.getBigUint64(footerStart + 176, true));
-	// const storedBytes = Number(shardView.getBigUint64(footerStart + 184, true));
-	// const footerOffset = Number(shardView.getBigUint64(footerStart + 192, true));
-
-	// Parse XORB Info Section
-	const xorbs: ShardData["xorbs"] = [];
-	let offset = xorbInfoStart;
+	chunk(xorbIndex: number, chunkIndex: number): { hash: string; startOffset: number; unpackedLength: number } {
+		const offset = this.#chunkOffset(xorbIndex, chunkIndex);
+		return {
+			hash: readHashFromArray(this.#shard, offset),
+			startOffset: this.#view.getUint32(offset + HASH_LENGTH, true),
+			unpackedLength: this.#view.getUint32(offset + HASH_LENGTH + 4, true),
+		};
+	}
 
-	while (offset < fileLookupStart) {
-		// Read xorb entry
-		const xorbHash = readHashFromArray(shard, offset);
-		offset += HASH_LENGTH;
+	chunkHash(xorbIndex: number, chunkIndex: number): string {
+		return readHashFromArray(this.#shard, this.#chunkOffset(xorbIndex, chunkIndex));
+	}
 
-		if (xorbHash === XORB_HASH_BOOKEND) {
-			break;
+	/**
+	 * @param hash The hex hash of the chunk, as stored in the shard (ie with the shard's HMAC key applied, if any)
+	 */
+	findChunk(hash: string): { xorbIndex: number; chunkIndex: number } | undefined {
+		if (hash.length !== HASH_LENGTH * 2) {
+			return undefined;
+		}
+		// The lookup table is keyed by the first u64 of the hash
+		const hi = parseInt(hash.slice(0, 8), 16);
+		const lo = parseInt(hash.slice(8, 16), 16);
+		if (Number.isNaN(hi) || Number.isNaN(lo)) {
+			return undefined;
 		}
 
-		// const flags = shardView.getUint32(offset, true);
-		offset += 4;
+		const lookup = this.#getLookup();
+		let low = 0;
+		let high = this.#lookupLength;
+		while (low < high) {
+			const mid = (low + high) >>> 1;
+			const midHi = lookup.getUint32(mid * CHUNK_LOOKUP_ENTRY_SIZE + 4, true);
+			const midLo = lookup.getUint32(mid * CHUNK_LOOKUP_ENTRY_SIZE, true);
+			if (midHi < hi || (midHi === hi && midLo < lo)) {
+				low = mid + 1;
+			} else {
+				high = mid;
+			}
+		}
 
-		const chunkCount = shardView.getUint32(offset, true);
-		offset += 4;
+		// Truncated keys can collide, check the full hash of each candidate
+		for (let i = low; i < this.#lookupLength; i++) {
+			const offset = i * CHUNK_LOOKUP_ENTRY_SIZE;
+			if (lookup.getUint32(offset + 4, true) !== hi || lookup.getUint32(offset, true) !== lo) {
+				break;
+			}
+			const xorbEntry = lookup.getUint32(offset + 8, true);
+			const chunkIndex = lookup.getUint32(offset + 12, true);
+			const xorbIndex = this.#xorbIndexFromEntry(xorbEntry);
+			if (xorbIndex === undefined || chunkIndex >= this.xorbChunkCount(xorbIndex)) {
+				continue;
+			}
+			if (hashEquals(this.#shard, this.#entryOffset(xorbEntry + 1 + chunkIndex), hash)) {
+				return { xorbIndex, chunkIndex };
+			}
+		}
+		return undefined;
+	}
 
-		// const numBytesInXorb = shardView.getUint32(offset, true);
-		offset += 4;
+	#entryOffset(entry: number): number {
+		return this.#xorbInfoStart + entry * SHARD_ENTRY_SIZE;
+	}
 
-		// const numBytesUnpacked = shardView.getUint32(offset, true);
-		offset += 4;
+	#chunkOffset(xorbIndex: number, chunkIndex: number): number {
+		if (chunkIndex < 0 || chunkIndex >= this.xorbChunkCount(xorbIndex)) {
+			throw new RangeError(`Chunk ${chunkIndex} out of bounds for xorb ${xorbIndex}`);
+		}
+		return this.#entryOffset(this.#xorbEntries[xorbIndex] + 1 + chunkIndex);
+	}
 
-		// Read chunks for this xorb
-		const chunks: ShardData["xorbs"][number]["chunks"] = [];
-		for (let i = 0; i < chunkCount; i++) {
-			const chunkHash = readHashFromArray(shard, offset);
-			offset += HASH_LENGTH;
+	#xorbIndexFromEntry(entry: number): number | undefined {
+		let low = 0;
+		let high = this.#xorbEntries.length;
+		while (low < high) {
+			const mid = (low + high) >>> 1;
+			if (this.#xorbEntries[mid] < entry) {
+				low = mid + 1;
+			} else {
+				high = mid;
+			}
+		}
+		return this.#xorbEntries[low] === entry ? low : undefined;
+	}
+
+	/**
+	 * The shard's chunk lookup table, or one built from the xorb info section when the shard doesn't have one,
+	 * in the same layout: (u64 truncated hash, u32 xorb entry index, u32 chunk index), sorted by truncated hash
+	 */
+	#getLookup(): DataView {
+		if (this.#lookup) {
+			return this.#lookup;
+		}
+
+		const his = new Uint32Array(this.chunkCount);
+		const los = new Uint32Array(this.chunkCount);
+		const xorbEntries = new Uint32Array(this.chunkCount);
+		const chunkIndices = new Uint32Array(this.chunkCount);
+		let n = 0;
+		for (const xorbEntry of this.#xorbEntries) {
+			const xorbChunkCount = this.#view.getUint32(this.#entryOffset(xorbEntry) + HASH_LENGTH + 4, true);
+			for (let chunkIndex = 0; chunkIndex < xorbChunkCount; chunkIndex++) {
+				const offset = this.#entryOffset(xorbEntry + 1 + chunkIndex);
+				los[n] = this.#view.getUint32(offset, true);
+				his[n] = this.#view.getUint32(offset + 4, true);
+				xorbEntries[n] = xorbEntry;
+				chunkIndices[n] = chunkIndex;
+				n++;
+			}
+		}
 
-			const startOffset = shardView.getUint32(offset, true);
-			offset += 4;
+		const order = new Uint32Array(n);
+		for (let i = 0; i < n; i++) {
+			order[i] = i;
+		}
+		order.sort((a, b) => his[a] - his[b] || los[a] - los[b]);
+
+		const table = new DataView(new ArrayBuffer(n * CHUNK_LOOKUP_ENTRY_SIZE));
+		for (let i = 0; i < n; i++) {
+			const j = order[i];
+			const offset = i * CHUNK_LOOKUP_ENTRY_SIZE;
+			table.setUint32(offset, los[j], true);
+			table.setUint32(offset + 4, his[j], true);
+			table.setUint32(offset + 8, xorbEntries[j], true);
+			table.setUint32(offset + 12, chunkIndices[j], true);
+		}
 
-			const length = shardView.getUint32(offset, true);
-			offset += 4;
+		this.#lookup = table;
+		this.#lookupLength = n;
+		return table;
+	}
+}
 
-			// Skip reserved 8 bytes
-			offset += 8;
+function isBookend(array: Uint8Array, offset: number): boolean {
+	for (let i = 0; i < HASH_LENGTH; i++) {
+		if (array[offset + i] !== 0xff) {
+			return false;
+		}
+	}
+	return true;
+}
 
-			chunks.push({
-				hash: chunkHash,
-				startOffset,
-				unpackedLength: length,
-			});
+/**
+ * Compares the hash stored at `offset`, as 4 little-endian u64, with a hex hash
+ */
+function hashEquals(array: Uint8Array, offset: number, hash: string): boolean {
+	for (let word = 0; word < HASH_LENGTH; word += 8) {
+		for (let byte = 0; byte < 8; byte++) {
+			const hexOffset = (word + 7 - byte) * 2;
+			if (array[offset + word + byte] !== parseInt(hash.slice(hexOffset, hexOffset + 2), 16)) {
+				return false;
+			}
 		}
+	}
+	return true;
+}
+
+/**
+ * Decodes the whole shard. Prefer {@link ShardView} for large shards, which doesn't create objects for every chunk
+ */
+export async function parseShardData(shardBlob: Blob): Promise<ShardData> {
+	const shard = await ShardView.fromBlob(shardBlob);
 
-		xorbs.push({
-			hash: xorbHash,
-			chunks,
-		});
+	const xorbs: ShardData["xorbs"] = [];
+	for (let xorbIndex = 0; xorbIndex < shard.xorbCount; xorbIndex++) {
+		const chunks: ShardData["xorbs"][number]["chunks"] = [];
+		const chunkCount = shard.xorbChunkCount(xorbIndex);
+		for (let chunkIndex = 0; chunkIndex < chunkCount; chunkIndex++) {
+			chunks.push(shard.chunk(xorbIndex, chunkIndex));
+		}
+		xorbs.push({ hash: shard.xorbHash(xorbIndex), chunks });
 	}
 
 	return {
-		hmacKey,
+		hmacKey: shard.hmacKey,
+		hmacKeyExpiry: shard.hmacKeyExpiry,
 		xorbs,
 	};
 }
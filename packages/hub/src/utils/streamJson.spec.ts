@@ -1,5 +1,11 @@
 import { describe, expect, it } from "vitest";
-import { JsonStreamParseError, streamJson, type JsonStreamEvent } from "./streamJson";
+import {
+	JsonStreamParseError,
+	JsonStreamTokenizer,
+	streamJson,
+	streamJsonArrayItems,
+	type JsonStreamEvent,
+} from "./streamJson";
 
 const encoder = new TextEncoder();
 
@@ -266,3 +272,151 @@ describe("streamJson", () => {
 		]);
 	});
 });
+
+describe("JsonStreamTokenizer", () => {
+	it("skips the values the caller doesn't need", async () => {
+		const text = JSON.stringify({
+			a: 1,
+			skipped: { "x]}": ['"', "\\", { y: "}" }], z: [] },
+			b: { skipped: "string \" ]", c: true },
+			d: [{ skipped: -1.5e3 }, { skipped: null, e: "e" }],
+		});
+
+		for (const chunkSize of [1, 2, 5, Infinity]) {
+			const events: JsonStreamEvent[] = [];
+			for await (const event of streamJson(byteStream(text, chunkSize), { skipValue: (key) => key === "skipped" })) {
+				events.push(event);
+			}
+			const keys = events.flatMap((event) => (event.type === "key" ? [event.key] : []));
+			expect(keys).toEqual(["a", "b", "c", "d", "e"]);
+			const values = events.flatMap((event) => (event.type === "value" ? [event.value] : []));
+			expect(values).toEqual([1, true, "e"]);
+		}
+	});
+
+	it("passes the depth of the object to skipValue", async () => {
+		const keys: Array<[string, number]> = [];
+		for await (const _event of streamJson(byteStream('{"a":{"b":[{"c":1}]},"d":2}'), {
+			skipValue: (key, depth) => {
+				keys.push([key, depth]);
+				return false;
+			},
+		})) {
+			void _event;
+		}
+		expect(keys).toEqual([
+			["a", 1],
+			["b", 2],
+			["c", 4],
+			["d", 1],
+		]);
+	});
+
+	it("rejects a key without value, even when skipped", async () => {
+		for (const text of ['{"a":}', '{"a":,"b":1}', '{"a":1,"b":}']) {
+			await expect(async () => {
+				for await (const _event of streamJson(byteStream(text), { skipValue: () => true })) {
+					void _event;
+				}
+			}).rejects.toThrow(JsonStreamParseError);
+		}
+	});
+
+	it("decodes strings like TextDecoder, whatever the chunk boundaries", async () => {
+		const words = ["plain", "é", "中文", "🤗", "a\\\"b", "\\u00e9", "\\ud83e\\udd17", "\ufffd", "x".repeat(300)];
+		const value = Array.from({ length: 300 }, (_, i) => ({
+			[words[i % words.length] + i]: words.slice(0, i % (words.length + 1)).join(" "),
+			n: i % 3 ? i * 1.5 : -i,
+		}));
+		const bytes = encoder.encode(JSON.stringify(value));
+		// invalid UTF-8 inside a string: a lone continuation byte, and a truncated sequence
+		const invalid = new Uint8Array([...encoder.encode('["a'), 0x80, 0x62, 0xe2, 0x82, ...encoder.encode('c", "ok"]')]);
+
+		for (const chunkSize of [1, 2, 3, 4, 7, 64, 1000, 4096]) {
+			for (const doc of [bytes, invalid]) {
+				const chunks = {
+					async *[Symbol.asyncIterator]() {
+						for (let i = 0; i < doc.length; i += chunkSize) {
+							yield doc.slice(i, i + chunkSize);
+						}
+					},
+				};
+				const items: unknown[] = [];
+				for await (const item of streamJsonArrayItems(chunks)) {
+					items.push(item);
+				}
+				expect(items).toEqual(JSON.parse(new TextDecoder().decode(doc)));
+			}
+		}
+	});
+
+	it("emits events synchronously, and does not keep the written buffers", () => {
+		const events: JsonStreamEvent[] = [];
+		const tokenizer = new JsonStreamTokenizer((event) => events.push(event));
+		const buffer = new Uint8Array(4);
+
+		for (const chunk of ['{"ke', 'y":"', "valu", 'e"}']) {
+			const bytes = encoder.encode(chunk);
+			buffer.set(bytes);
+			tokenizer.write(buffer.subarray(0, bytes.length));
+		}
+		tokenizer.end();
+
+		expect(events).toEqual([
+			{ type: "startObject" },
+			{ type: "key", key: "key" },
+			{ type: "value", value: "value" },
+			{ type: "endObject" },
+		]);
+	});
+
+	it("ignores a UTF-8 BOM, like TextDecoder", async () => {
+		expect(await reconstruct("\ufeff" + '{"a":"é"}', 1)).toEqual({ a: "é" });
+		expect(await reconstruct("\ufeff" + "[1]")).toEqual([1]);
+		// only at the start of the document
+		expect(await reconstruct('["\ufeffa","\ufeff"]')).toEqual(["\ufeffa", "\ufeff"]);
+	});
+});
+
+describe("streamJsonArrayItems", () => {
+	it("yields the elements of the top-level array, equal to JSON.parse", async () => {
+		const value = [{ a: [1, { b: null }], "": "x" }, "str", 2, [], {}, [[true]], false];
+		const text = JSON.stringify(value).replace('"a"', '"__proto__":{"polluted":true},"a"');
+
+		for (const chunkSize of [1, 3, Infinity]) {
+			const items: unknown[] = [];
+			for await (const item of streamJsonArrayItems(byteStream(text, chunkSize))) {
+				items.push(item);
+			}
+			expect(items).toEqual(JSON.parse(text));
+			expect(Object.getPrototypeOf(items[0])).toBe(Object.prototype);
+		}
+	});
+
+	it("yields each element as soon as it is received", async () => {
+		let chunksRead = 0;
+		const source = {
+			async *[Symbol.asyncIterator]() {
+				for (const chunk of ['[{"a":1},', '{"b":2}', "]"]) {
+					chunksRead++;
+					yield encoder.encode(chunk);
+				}
+			},
+		};
+
+		const iterator = streamJsonArrayItems(source);
+		expect((await iterator.next()).value).toEqual({ a: 1 });
+		expect(chunksRead).toBe(1);
+		expect((await iterator.next()).value).toEqual({ b: 2 });
+		expect(chunksRead).toBe(2);
+		expect((await iterator.next()).done).toBe(true);
+	});
+
+	it("rejects documents that are not arrays", async () => {
+		await expect(async () => {
+			for await (const _item of streamJsonArrayItems(byteStream('{"a":1}'))) {
+				void _item;
+			}
+		}).rejects.toThrow(JsonStreamParseError);
+	});
+});
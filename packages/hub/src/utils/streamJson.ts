@@ -10,8 +10,10 @@
  * what it cares about and let everything else be garbage collected. Memory usage is bounded by
  * the size of the largest individual token (string / number), not by the size of the document.
  *
- * The implementation is a resumable state machine: any token may be split across chunk
- * boundaries (including multi-byte UTF-8 sequences and `\uXXXX` escapes).
+ * The implementation is a resumable state machine working directly on the UTF-8 bytes: any token
+ * may be split across chunk boundaries (including multi-byte UTF-8 sequences and `\uXXXX` escapes).
+ * Byte classes come from lookup tables, string contents are found with `indexOf` and only decoded
+ * once complete, and values the consumer doesn't need can be skipped without being parsed.
  *
  * Strictness: the accepted grammar is RFC 8259 (same as `JSON.parse`), minus a few checks that
  * would cost a lot for little benefit here — notably number *shapes* are validated by `Number()`
@@ -39,6 +41,28 @@ export class JsonStreamParseError extends Error {
 	}
 }
 
+export interface JsonStreamOptions {
+	/**
+	 * Maximum length, in characters, of a single string / number token.
+	 *
+	 * @default 16_000_000
+	 */
+	maxTokenLength?: number;
+	/**
+	 * Maximum object/array nesting depth.
+	 *
+	 * @default 1_000
+	 */
+	maxDepth?: number;
+	/**
+	 * Called with each object key, and the depth of the object (1 for the top-level object).
+	 *
+	 * Return `true` to skip the key and its value: no events are emitted for them, and the value is
+	 * scanned without being parsed, only checking that its brackets are balanced.
+	 */
+	skipValue?: (key: string, depth: number) => boolean;
+}
+
 /**
  * Guards against a single unterminated string/number consuming unbounded memory: that is the one
  * thing streaming does *not* protect us from, since a token has to be buffered to be emitted.
@@ -51,6 +75,12 @@ const DEFAULT_MAX_TOKEN_LENGTH = 16_000_000; // 16M chars
  */
 const DEFAULT_MAX_DEPTH = 1_000;
 
+/**
+ * A UTF-16 code unit takes at most 3 bytes of UTF-8, so a string whose bytes exceed 3x the limit is
+ * too long whatever they decode to.
+ */
+const MAX_BYTES_PER_CHAR = 3;
+
 // Scanner states.
 const S_VALUE = 0; // expecting a value
 const S_VALUE_OR_ARRAY_END = 1; // right after `[`: a value, or `]` for an empty array
@@ -64,8 +94,51 @@ const S_KEY = 8; // after `,` in an object: a key is required
 const S_KEY_OR_OBJECT_END = 9; // right after `{`: a key, or `}` for an empty object
 const S_AFTER_KEY = 10; // expecting `:`
 const S_DONE = 11; // the top-level value is complete; only trailing whitespace allowed
-
-const ESCAPES: Record<string, string> = {
+const S_SKIP = 12; // inside a value skipped with `skipValue`
+
+// Bytes.
+const QUOTE = 0x22; // "
+const BACKSLASH = 0x5c; // \
+const COMMA = 0x2c; // ,
+const COLON = 0x3a; // :
+const OPEN_BRACE = 0x7b; // {
+const CLOSE_BRACE = 0x7d; // }
+const OPEN_BRACKET = 0x5b; // [
+const CLOSE_BRACKET = 0x5d; // ]
+const MINUS = 0x2d; // -
+const LOWERCASE_U = 0x75; // u
+const UTF8_BOM = [0xef, 0xbb, 0xbf];
+
+// Lookup tables, indexed by byte.
+const WHITESPACE = new Uint8Array(256);
+const NUMBER_START = new Uint8Array(256);
+const NUMBER_CHARS = new Uint8Array(256);
+const LITERAL_CHARS = new Uint8Array(256);
+/** Value of a hex digit, -1 for other bytes */
+const HEX_VALUES = new Int8Array(256).fill(-1);
+/** Char code of `\X` escapes, 0 for invalid escapes */
+const ESCAPES = new Uint8Array(256);
+
+for (const c of " \n\r\t") {
+	WHITESPACE[c.charCodeAt(0)] = 1;
+}
+for (let i = 0; i < 10; i++) {
+	NUMBER_START[0x30 + i] = 1;
+	NUMBER_CHARS[0x30 + i] = 1;
+	HEX_VALUES[0x30 + i] = i;
+}
+NUMBER_START[MINUS] = 1;
+for (const c of "-+.eE") {
+	NUMBER_CHARS[c.charCodeAt(0)] = 1;
+}
+for (let i = 0; i < 26; i++) {
+	LITERAL_CHARS[0x61 + i] = 1;
+}
+for (let i = 0; i < 6; i++) {
+	HEX_VALUES[0x61 + i] = 10 + i;
+	HEX_VALUES[0x41 + i] = 10 + i;
+}
+for (const [c, escaped] of Object.entries({
 	'"': '"',
 	"\\": "\\",
 	"/": "/",
@@ -74,379 +147,738 @@ const ESCAPES: Record<string, string> = {
 	n: "\n",
 	r: "\r",
 	t: "\t",
-};
-
-function isWhitespace(c: string): boolean {
-	return c === " " || c === "\n" || c === "\r" || c === "\t";
+})) {
+	ESCAPES[c.charCodeAt(0)] = escaped.charCodeAt(0);
 }
 
-function isNumberChar(c: string): boolean {
-	return (c >= "0" && c <= "9") || c === "-" || c === "+" || c === "." || c === "e" || c === "E";
+// Structural events carry no data, so they're shared rather than allocated for each occurrence.
+const START_OBJECT: JsonStreamEvent = { type: "startObject" };
+const END_OBJECT: JsonStreamEvent = { type: "endObject" };
+const START_ARRAY: JsonStreamEvent = { type: "startArray" };
+const END_ARRAY: JsonStreamEvent = { type: "endArray" };
+
+function describeByte(byte: number): string {
+	return byte < 0x80 ? JSON.stringify(String.fromCharCode(byte)) : `0x${byte.toString(16)}`;
 }
 
-function isHexDigit(c: string): boolean {
-	return (c >= "0" && c <= "9") || (c >= "a" && c <= "f") || (c >= "A" && c <= "F");
+function unexpected(byte: number): never {
+	throw new JsonStreamParseError(`Unexpected character ${describeByte(byte)} in JSON`);
 }
 
 /**
- * Normalizes the accepted sources into an async iterable of byte chunks.
+ * Push-based tokenizer behind {@link streamJson}: bytes are passed to `write`, and events are emitted
+ * synchronously through `onEvent`.
  *
- * `ReadableStream` is only async-iterable on Node and recent browsers, so we go through a reader
- * explicitly. The reader is always released/cancelled, which matters for early `break`/`throw`:
- * it lets an underlying HTTP response be torn down instead of downloading the rest of the body.
+ * Use it directly to handle events without the overhead of an async generator.
+ *
+ * @example
+ * const tokenizer = new JsonStreamTokenizer((event) => { ... });
+ * for await (const bytes of stream) {
+ *   tokenizer.write(bytes);
+ * }
+ * tokenizer.end();
  */
-async function* toByteChunks(
-	source: ReadableStream<Uint8Array> | AsyncIterable<Uint8Array>,
-): AsyncGenerator<Uint8Array> {
-	if (!("getReader" in source)) {
-		yield* source;
-		return;
-	}
-
-	const reader = source.getReader();
-	try {
-		while (true) {
-			const { done, value } = await reader.read();
-			if (done) {
-				return;
-			}
-			if (value) {
-				yield value;
-			}
-		}
-	} finally {
-		// cancel() rejects if the stream is already errored/closed; we don't care either way
-		await reader.cancel().catch(() => undefined);
-	}
-}
-
-export async function* streamJson(
-	source: ReadableStream<Uint8Array> | AsyncIterable<Uint8Array>,
-	options?: {
-		/**
-		 * Maximum length, in characters, of a single string / number token.
-		 *
-		 * @default 16_000_000
-		 */
-		maxTokenLength?: number;
-		/**
-		 * Maximum object/array nesting depth.
-		 *
-		 * @default 1_000
-		 */
-		maxDepth?: number;
-	},
-): AsyncGenerator<JsonStreamEvent, void, undefined> {
-	const maxTokenLength = options?.maxTokenLength ?? DEFAULT_MAX_TOKEN_LENGTH;
-	const maxDepth = options?.maxDepth ?? DEFAULT_MAX_DEPTH;
-
-	let state = S_VALUE;
+export class JsonStreamTokenizer {
+	#onEvent: (event: JsonStreamEvent) => void;
+	#maxTokenLength: number;
+	#maxDepth: number;
+	#skipValue?: (key: string, depth: number) => boolean;
+	/** The BOM is handled by #skipBom: elsewhere, U+FEFF is a regular character */
+	#decoder = new TextDecoder("utf-8", { ignoreBOM: true });
+
+	#state = S_VALUE;
 	/** Container stack; `true` = array, `false` = object. Its depth is the nesting depth. */
-	const stack: boolean[] = [];
-	/** Buffer for the token being scanned (string contents, number/literal text). */
-	let token = "";
+	#stack: boolean[] = [];
+	/** Decoded text of the token being scanned (string contents, number/literal text). */
+	#token = "";
+	/** Undecoded bytes of the string being scanned, when it spans chunks. */
+	#raw: Uint8Array[] = [];
+	#rawLength = 0;
 	/** Whether the string being scanned is an object key rather than a value. */
-	let stringIsKey = false;
-	/** Hex digits collected so far for a `\uXXXX` escape. */
-	let unicode = "";
-
-	function checkTokenLength(): void {
-		if (token.length > maxTokenLength) {
-			throw new JsonStreamParseError(`JSON token exceeds the maximum length of ${maxTokenLength} characters`);
-		}
-	}
-
-	/** Called once a complete value has been emitted, to decide what may follow. */
-	function afterValue(): void {
-		state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
-	}
-
-	function finishNumber(): JsonStreamEvent {
-		const value = Number(token);
-		if (token === "" || !Number.isFinite(value)) {
-			throw new JsonStreamParseError(`Invalid JSON number: ${JSON.stringify(token)}`);
-		}
-		token = "";
-		afterValue();
-		return { type: "value", value };
-	}
-
-	function finishLiteral(): JsonStreamEvent {
-		const text = token;
-		token = "";
-		afterValue();
-		switch (text) {
-			case "true":
-				return { type: "value", value: true };
-			case "false":
-				return { type: "value", value: false };
-			case "null":
-				return { type: "value", value: null };
-			default:
-				throw new JsonStreamParseError(`Invalid JSON literal: ${JSON.stringify(text)}`);
-		}
-	}
-
-	function unexpected(c: string): never {
-		throw new JsonStreamParseError(`Unexpected character ${JSON.stringify(c)} in JSON`);
-	}
-
-	function pushContainer(isArray: boolean): void {
-		if (stack.length >= maxDepth) {
-			throw new JsonStreamParseError(`JSON nesting is deeper than the maximum of ${maxDepth} levels`);
-		}
-		stack.push(isArray);
+	#stringIsKey = false;
+	/** Value and number of the hex digits collected so far for a `\uXXXX` escape. */
+	#unicode = 0;
+	#unicodeDigits = 0;
+	/** Number of bytes of the UTF-8 BOM matched at the start of the document, -1 once past it. */
+	#bom = 0;
+	/** The chunk being written, once decoded by #decodeRange, `null` if it's not valid UTF-8 */
+	#chunkText: string | null | undefined;
+	#chunkStart = 0;
+	#chunkEnd = 0;
+	#chunkIsAscii = false;
+	/** Last byte offset converted by #charOffset, and the matching offset in #chunkText */
+	#cursorByte = 0;
+	#cursorChar = 0;
+
+	// Skipping state
+	/** Whether the value of the key being scanned is skipped */
+	#skipNext = false;
+	#skipDepth = 0;
+	#skipInString = false;
+	#skipEscape = false;
+	/** Whether the skipped value has started, ie something other than whitespace was seen */
+	#skipStarted = false;
+
+	constructor(onEvent: (event: JsonStreamEvent) => void, options?: JsonStreamOptions) {
+		this.#onEvent = onEvent;
+		this.#maxTokenLength = options?.maxTokenLength ?? DEFAULT_MAX_TOKEN_LENGTH;
+		this.#maxDepth = options?.maxDepth ?? DEFAULT_MAX_DEPTH;
+		this.#skipValue = options?.skipValue;
 	}
 
 	/**
-	 * Consumes a decoded text chunk, yielding every event it completes. All parser state lives in
-	 * the enclosing scope, so this can be called once per chunk and resumes mid-token.
+	 * Consumes a chunk of the document, emitting every event it completes.
+	 *
+	 * The chunk is not kept after the call returns, so its buffer can be reused.
 	 */
-	function* feed(chunk: string): Generator<JsonStreamEvent> {
-		let i = 0;
-
-		while (i < chunk.length) {
-			// --- string scanning: hot path, so consume runs of plain characters at once -------
-			if (state === S_STRING) {
-				let j = i;
-				while (j < chunk.length && chunk[j] !== '"' && chunk[j] !== "\\") {
-					j++;
-				}
-				if (j > i) {
-					token += chunk.slice(i, j);
-					checkTokenLength();
-					i = j;
-					continue;
-				}
-				if (chunk[i] === "\\") {
-					state = S_STRING_ESCAPE;
-					i++;
+	write(bytes: Uint8Array): void {
+		const length = bytes.length;
+		let i = this.#bom >= 0 ? this.#skipBom(bytes) : 0;
+		const stack = this.#stack;
+		const onEvent = this.#onEvent;
+		let state = this.#state;
+		/** Cached positions of the next `"` and `\` at or after `i`, `length` if there are none */
+		let quotePos = -1;
+		let backslashPos = -1;
+
+		try {
+			while (i < length) {
+				// --- string scanning: hot path, so find the end of the run of plain bytes at once --
+				if (state === S_STRING) {
+					if (quotePos < i) {
+						quotePos = bytes.indexOf(QUOTE, i);
+						if (quotePos === -1) {
+							quotePos = length;
+						}
+					}
+					if (backslashPos < i) {
+						backslashPos = bytes.indexOf(BACKSLASH, i);
+						if (backslashPos === -1) {
+							backslashPos = length;
+						}
+					}
+					if (quotePos === length && backslashPos === length) {
+						// The string continues in the next chunk. Copy, the caller may reuse the buffer.
+						this.#pushRaw(bytes.slice(i));
+						i = length;
+						continue;
+					}
+					if (backslashPos < quotePos) {
+						this.#appendString(bytes, i, backslashPos);
+						state = S_STRING_ESCAPE;
+						i = backslashPos + 1;
+						continue;
+					}
+					this.#appendString(bytes, i, quotePos);
+					i = quotePos + 1;
+					const text = this.#token;
+					this.#token = "";
+					if (this.#stringIsKey) {
+						this.#stringIsKey = false;
+						state = S_AFTER_KEY;
+						if (this.#skipValue?.(text, stack.length)) {
+							this.#skipNext = true;
+						} else {
+							onEvent({ type: "key", key: text });
+						}
+					} else {
+						state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+						onEvent({ type: "value", value: text });
+					}
 					continue;
 				}
-				// closing quote
-				i++;
-				const text = token;
-				token = "";
-				if (stringIsKey) {
-					stringIsKey = false;
-					state = S_AFTER_KEY;
-					yield { type: "key", key: text };
-				} else {
-					afterValue();
-					yield { type: "value", value: text };
-				}
-				continue;
-			}
 
-			if (state === S_STRING_ESCAPE) {
-				const c = chunk[i++];
-				if (c === "u") {
-					unicode = "";
-					state = S_STRING_UNICODE;
+				if (state === S_SKIP) {
+					if (this.#skipInString) {
+						if (this.#skipEscape) {
+							this.#skipEscape = false;
+							i++;
+							continue;
+						}
+						if (quotePos < i) {
+							quotePos = bytes.indexOf(QUOTE, i);
+							if (quotePos === -1) {
+								quotePos = length;
+							}
+						}
+						if (backslashPos < i) {
+							backslashPos = bytes.indexOf(BACKSLASH, i);
+							if (backslashPos === -1) {
+								backslashPos = length;
+							}
+						}
+						if (backslashPos < quotePos) {
+							this.#skipEscape = true;
+							i = backslashPos + 1;
+							continue;
+						}
+						i = quotePos + 1;
+						if (quotePos < length) {
+							this.#skipInString = false;
+							if (this.#skipDepth === 0) {
+								state = S_AFTER_VALUE;
+							}
+						}
+						continue;
+					}
+
+					const c = bytes[i];
+					if (c === QUOTE) {
+						this.#skipInString = true;
+						this.#skipStarted = true;
+						i++;
+					} else if (c === OPEN_BRACE || c === OPEN_BRACKET) {
+						this.#skipDepth++;
+						this.#skipStarted = true;
+						i++;
+					} else if (c === CLOSE_BRACE || c === CLOSE_BRACKET || c === COMMA) {
+						if (this.#skipDepth > 0) {
+							if (c !== COMMA) {
+								this.#skipDepth--;
+								if (this.#skipDepth === 0) {
+									state = S_AFTER_VALUE;
+								}
+							}
+							i++;
+						} else if (!this.#skipStarted) {
+							unexpected(c);
+						} else {
+							// end of a skipped number / literal: reprocess `c` in the new state
+							state = S_AFTER_VALUE;
+						}
+					} else {
+						if (!WHITESPACE[c]) {
+							this.#skipStarted = true;
+						}
+						i++;
+					}
 					continue;
 				}
-				const escaped = ESCAPES[c];
-				if (escaped === undefined) {
-					throw new JsonStreamParseError(`Invalid escape sequence "\\${c}" in JSON string`);
-				}
-				token += escaped;
-				checkTokenLength();
-				state = S_STRING;
-				continue;
-			}
 
-			if (state === S_STRING_UNICODE) {
-				const c = chunk[i++];
-				if (!isHexDigit(c)) {
-					throw new JsonStreamParseError(`Invalid unicode escape "\\u${unicode}${c}" in JSON string`);
-				}
-				unicode += c;
-				if (unicode.length === 4) {
-					// Surrogate pairs come through as two consecutive escapes and recombine naturally
-					// here, since we append raw code units.
-					token += String.fromCharCode(parseInt(unicode, 16));
-					checkTokenLength();
-					unicode = "";
+				if (state === S_STRING_ESCAPE) {
+					const c = bytes[i++];
+					if (c === LOWERCASE_U) {
+						this.#unicode = 0;
+						this.#unicodeDigits = 0;
+						state = S_STRING_UNICODE;
+						continue;
+					}
+					const escaped = ESCAPES[c];
+					if (escaped === 0) {
+						throw new JsonStreamParseError(`Invalid escape sequence "\\${String.fromCharCode(c)}" in JSON string`);
+					}
+					this.#token += String.fromCharCode(escaped);
+					this.#checkTokenLength(this.#token.length);
 					state = S_STRING;
+					continue;
 				}
-				continue;
-			}
 
-			// --- numbers and literals end on the first character that can't belong to them ----
-			if (state === S_NUMBER) {
-				let j = i;
-				while (j < chunk.length && isNumberChar(chunk[j])) {
-					j++;
-				}
-				if (j > i) {
-					token += chunk.slice(i, j);
-					checkTokenLength();
-					i = j;
+				if (state === S_STRING_UNICODE) {
+					const c = bytes[i++];
+					const value = HEX_VALUES[c];
+					if (value < 0) {
+						throw new JsonStreamParseError(
+							`Invalid unicode escape in JSON string: ${describeByte(c)} is not a hex digit`,
+						);
+					}
+					this.#unicode = this.#unicode * 16 + value;
+					if (++this.#unicodeDigits === 4) {
+						// Surrogate pairs come through as two consecutive escapes and recombine naturally
+						// here, since we append raw code units.
+						this.#token += String.fromCharCode(this.#unicode);
+						this.#checkTokenLength(this.#token.length);
+						state = S_STRING;
+					}
 					continue;
 				}
-				yield finishNumber();
-				continue; // reprocess chunk[i] in the new state
-			}
 
-			if (state === S_LITERAL) {
-				let j = i;
-				while (j < chunk.length && chunk[j] >= "a" && chunk[j] <= "z") {
-					j++;
-				}
-				if (j > i) {
-					token += chunk.slice(i, j);
-					checkTokenLength();
+				// --- numbers and literals end on the first byte that can't belong to them -------
+				if (state === S_NUMBER || state === S_LITERAL) {
+					const chars = state === S_NUMBER ? NUMBER_CHARS : LITERAL_CHARS;
+					let j = i;
+					while (j < length && chars[bytes[j]]) {
+						j++;
+					}
+					this.#token += this.#decodeRange(bytes, i, j);
+					this.#checkTokenLength(this.#token.length);
 					i = j;
+					if (j < length) {
+						onEvent(state === S_NUMBER ? this.#finishNumber() : this.#finishLiteral());
+						state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+						// reprocess bytes[i] in the new state
+					}
 					continue;
 				}
-				yield finishLiteral();
-				continue; // reprocess chunk[i] in the new state
-			}
 
-			const c = chunk[i];
+				const c = bytes[i];
 
-			if (isWhitespace(c)) {
-				i++;
-				continue;
-			}
-
-			switch (state) {
-				case S_VALUE:
-				case S_VALUE_OR_ARRAY_END: {
-					if (c === "]") {
-						if (state !== S_VALUE_OR_ARRAY_END) {
-							unexpected(c);
-						}
-						stack.pop();
-						afterValue();
-						i++;
-						yield { type: "endArray" };
-						break;
-					}
-					if (c === "{") {
-						pushContainer(false);
-						state = S_KEY_OR_OBJECT_END;
-						i++;
-						yield { type: "startObject" };
-						break;
-					}
-					if (c === "[") {
-						pushContainer(true);
-						state = S_VALUE_OR_ARRAY_END;
-						i++;
-						yield { type: "startArray" };
-						break;
-					}
-					if (c === '"') {
-						stringIsKey = false;
-						state = S_STRING;
-						i++;
-						break;
-					}
-					if (c === "-" || (c >= "0" && c <= "9")) {
-						state = S_NUMBER;
-						break; // don't consume: the number scanner takes it
-					}
-					if (c >= "a" && c <= "z") {
-						state = S_LITERAL;
-						break; // don't consume: the literal scanner takes it
-					}
-					unexpected(c);
-					break;
+				if (WHITESPACE[c]) {
+					i++;
+					continue;
 				}
 
-				case S_KEY:
-				case S_KEY_OR_OBJECT_END: {
-					if (c === "}") {
-						if (state !== S_KEY_OR_OBJECT_END) {
-							unexpected(c); // trailing comma
+				switch (state) {
+					case S_VALUE:
+					case S_VALUE_OR_ARRAY_END: {
+						if (c === QUOTE) {
+							this.#stringIsKey = false;
+							state = S_STRING;
+							i++;
+							break;
 						}
-						stack.pop();
-						afterValue();
-						i++;
-						yield { type: "endObject" };
-						break;
-					}
-					if (c === '"') {
-						stringIsKey = true;
-						state = S_STRING;
-						i++;
+						if (NUMBER_START[c]) {
+							state = S_NUMBER;
+							break; // don't consume: the number scanner takes it
+						}
+						if (c === OPEN_BRACE) {
+							this.#pushContainer(false);
+							state = S_KEY_OR_OBJECT_END;
+							i++;
+							onEvent(START_OBJECT);
+							break;
+						}
+						if (c === OPEN_BRACKET) {
+							this.#pushContainer(true);
+							state = S_VALUE_OR_ARRAY_END;
+							i++;
+							onEvent(START_ARRAY);
+							break;
+						}
+						if (c === CLOSE_BRACKET) {
+							if (state !== S_VALUE_OR_ARRAY_END) {
+								unexpected(c);
+							}
+							stack.pop();
+							state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+							i++;
+							onEvent(END_ARRAY);
+							break;
+						}
+						if (LITERAL_CHARS[c]) {
+							state = S_LITERAL;
+							break; // don't consume: the literal scanner takes it
+						}
+						unexpected(c);
 						break;
 					}
-					unexpected(c);
-					break;
-				}
 
-				case S_AFTER_KEY: {
-					if (c !== ":") {
+					case S_KEY:
+					case S_KEY_OR_OBJECT_END: {
+						if (c === QUOTE) {
+							this.#stringIsKey = true;
+							state = S_STRING;
+							i++;
+							break;
+						}
+						if (c === CLOSE_BRACE) {
+							if (state !== S_KEY_OR_OBJECT_END) {
+								unexpected(c); // trailing comma
+							}
+							stack.pop();
+							state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+							i++;
+							onEvent(END_OBJECT);
+							break;
+						}
 						unexpected(c);
-					}
-					state = S_VALUE;
-					i++;
-					break;
-				}
-
-				case S_AFTER_VALUE: {
-					if (c === ",") {
-						state = stack[stack.length - 1] ? S_VALUE : S_KEY;
-						i++;
 						break;
 					}
-					if (c === "}") {
-						if (stack[stack.length - 1] !== false) {
+
+					case S_AFTER_KEY: {
+						if (c !== COLON) {
 							unexpected(c);
 						}
-						stack.pop();
-						afterValue();
+						if (this.#skipNext) {
+							this.#skipNext = false;
+							this.#skipDepth = 0;
+							this.#skipInString = false;
+							this.#skipEscape = false;
+							this.#skipStarted = false;
+							state = S_SKIP;
+						} else {
+							state = S_VALUE;
+						}
 						i++;
-						yield { type: "endObject" };
 						break;
 					}
-					if (c === "]") {
-						if (stack[stack.length - 1] !== true) {
-							unexpected(c);
+
+					case S_AFTER_VALUE: {
+						if (c === COMMA) {
+							state = stack[stack.length - 1] ? S_VALUE : S_KEY;
+							i++;
+							break;
 						}
-						stack.pop();
-						afterValue();
-						i++;
-						yield { type: "endArray" };
+						if (c === CLOSE_BRACE) {
+							if (stack[stack.length - 1] !== false) {
+								unexpected(c);
+							}
+							stack.pop();
+							state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+							i++;
+							onEvent(END_OBJECT);
+							break;
+						}
+						if (c === CLOSE_BRACKET) {
+							if (stack[stack.length - 1] !== true) {
+								unexpected(c);
+							}
+							stack.pop();
+							state = stack.length === 0 ? S_DONE : S_AFTER_VALUE;
+							i++;
+							onEvent(END_ARRAY);
+							break;
+						}
+						unexpected(c);
 						break;
 					}
-					unexpected(c);
-					break;
+
+					case S_DONE:
+						throw new JsonStreamParseError(`Unexpected trailing content ${describeByte(c)} after JSON value`);
+
+					default:
+						throw new JsonStreamParseError(`Unreachable parser state ${state}`);
 				}
+			}
+		} finally {
+			this.#state = state;
+			this.#chunkText = undefined;
+		}
+	}
 
-				case S_DONE:
-					throw new JsonStreamParseError(`Unexpected trailing content ${JSON.stringify(c)} after JSON value`);
+	/**
+	 * Signals the end of the document, throwing if it is incomplete.
+	 */
+	end(): void {
+		// a number or literal at the very end of the document has no terminating character
+		if (this.#state === S_NUMBER) {
+			this.#state = S_DONE;
+			this.#onEvent(this.#finishNumber());
+		} else if (this.#state === S_LITERAL) {
+			this.#state = S_DONE;
+			this.#onEvent(this.#finishLiteral());
+		}
 
-				default:
-					throw new JsonStreamParseError(`Unreachable parser state ${state}`);
+		if (this.#state !== S_DONE) {
+			throw new JsonStreamParseError("Unexpected end of JSON input");
+		}
+	}
+
+	/**
+	 * Skips a UTF-8 BOM at the start of the document, like `TextDecoder` does
+	 */
+	#skipBom(bytes: Uint8Array): number {
+		let i = 0;
+		while (this.#bom >= 0 && i < bytes.length) {
+			if (bytes[i] !== UTF8_BOM[this.#bom]) {
+				if (this.#bom > 0) {
+					unexpected(bytes[i]);
+				}
+				break;
+			}
+			i++;
+			this.#bom++;
+			if (this.#bom === UTF8_BOM.length) {
+				break;
 			}
 		}
+		if (i < bytes.length || this.#bom === UTF8_BOM.length) {
+			this.#bom = -1;
+		}
+		return i;
+	}
+
+	#checkTokenLength(length: number): void {
+		if (length > this.#maxTokenLength) {
+			throw new JsonStreamParseError(`JSON token exceeds the maximum length of ${this.#maxTokenLength} characters`);
+		}
 	}
 
-	const decoder = new TextDecoder("utf-8");
+	#pushContainer(isArray: boolean): void {
+		if (this.#stack.length >= this.#maxDepth) {
+			throw new JsonStreamParseError(`JSON nesting is deeper than the maximum of ${this.#maxDepth} levels`);
+		}
+		this.#stack.push(isArray);
+	}
 
-	for await (const bytes of toByteChunks(source)) {
-		const chunk = decoder.decode(bytes, { stream: true });
-		if (chunk.length > 0) {
-			yield* feed(chunk);
+	/** Keeps the bytes of a string spanning chunks, to decode them once complete */
+	#pushRaw(bytes: Uint8Array): void {
+		this.#raw.push(bytes);
+		this.#rawLength += bytes.length;
+		this.#checkTokenLength(this.#token.length + Math.ceil(this.#rawLength / MAX_BYTES_PER_CHAR));
+	}
+
+	/** Decodes the pending bytes of the string, followed by `bytes[start, end)`, into the token */
+	#appendString(bytes: Uint8Array, start: number, end: number): void {
+		let text: string;
+		if (this.#rawLength === 0) {
+			if (start === end) {
+				return;
+			}
+			text = this.#decodeRange(bytes, start, end);
+		} else {
+			const joined = new Uint8Array(this.#rawLength + end - start);
+			let offset = 0;
+			for (const raw of this.#raw) {
+				joined.set(raw, offset);
+				offset += raw.length;
+			}
+			joined.set(bytes.subarray(start, end), offset);
+			this.#raw = [];
+			this.#rawLength = 0;
+			text = this.#decoder.decode(joined);
+		}
+		this.#token = this.#token === "" ? text : this.#token + text;
+		this.#checkTokenLength(this.#token.length);
+	}
+
+	/**
+	 * Decodes `bytes[start, end)`, which are part of the chunk being written.
+	 *
+	 * Calling `TextDecoder` for each string is slow, so the whole chunk is decoded once, the first time
+	 * it's needed, and strings are sliced out of it. Calls must be made in increasing offset order.
+	 */
+	#decodeRange(bytes: Uint8Array, start: number, end: number): string {
+		if (this.#chunkText === undefined) {
+			this.#decodeChunk(bytes);
+		}
+		const text = this.#chunkText;
+		if (text === null || start < this.#chunkStart || end > this.#chunkEnd) {
+			return this.#decoder.decode(bytes.subarray(start, end));
+		}
+		if (this.#chunkIsAscii) {
+			return text.slice(start - this.#chunkStart, end - this.#chunkStart);
 		}
+		return text.slice(this.#charOffset(bytes, start), this.#charOffset(bytes, end));
 	}
-	// flush any incomplete multi-byte sequence (yields U+FFFD, which JSON.parse would also allow)
-	const tail = decoder.decode();
-	if (tail.length > 0) {
-		yield* feed(tail);
+
+	#decodeChunk(bytes: Uint8Array): void {
+		// Leave out the ends of the characters started in the previous chunk, and the beginning of the
+		// character continued in the next one. They are part of strings spanning chunks, decoded separately.
+		let start = 0;
+		while (start < 3 && start < bytes.length && (bytes[start] & 0xc0) === 0x80) {
+			start++;
+		}
+		let end = bytes.length;
+		for (let k = end - 1; k >= start && k >= end - 3; k--) {
+			const byte = bytes[k];
+			if ((byte & 0xc0) === 0x80) {
+				continue;
+			}
+			if (byte >= 0xc0 && k + (byte >= 0xf0 ? 4 : byte >= 0xe0 ? 3 : 2) > end) {
+				end = k;
+			}
+			break;
+		}
+
+		const text = this.#decoder.decode(bytes.subarray(start, end));
+		this.#chunkStart = start;
+		this.#chunkEnd = end;
+		this.#cursorByte = start;
+		this.#cursorChar = 0;
+		// One character per byte: ASCII, or invalid bytes replaced one by one, like they would be separately
+		this.#chunkIsAscii = text.length === end - start;
+		// Invalid UTF-8 would throw off #charOffset: decode the strings separately
+		this.#chunkText = this.#chunkIsAscii || !text.includes("\ufffd") ? text : null;
 	}
 
-	// a number or literal at the very end of the document has no terminating character
-	if (state === S_NUMBER) {
-		yield finishNumber();
-	} else if (state === S_LITERAL) {
-		yield finishLiteral();
+	/** Offset in the decoded chunk of a byte offset, for a valid UTF-8 chunk */
+	#charOffset(bytes: Uint8Array, offset: number): number {
+		if (offset < this.#cursorByte) {
+			this.#cursorByte = this.#chunkStart;
+			this.#cursorChar = 0;
+		}
+		let chars = this.#cursorChar;
+		for (let k = this.#cursorByte; k < offset; k++) {
+			const byte = bytes[k];
+			// A character starts at each byte that is not a continuation byte, and 4-byte ones are surrogate pairs
+			if ((byte & 0xc0) !== 0x80) {
+				chars++;
+			}
+			if (byte >= 0xf0) {
+				chars++;
+			}
+		}
+		this.#cursorByte = offset;
+		this.#cursorChar = chars;
+		return chars;
 	}
 
-	if (state !== S_DONE) {
-		throw new JsonStreamParseError("Unexpected end of JSON input");
+	#finishNumber(): JsonStreamEvent {
+		const text = this.#token;
+		this.#token = "";
+		const value = Number(text);
+		if (text === "" || !Number.isFinite(value)) {
+			throw new JsonStreamParseError(`Invalid JSON number: ${JSON.stringify(text)}`);
+		}
+		return { type: "value", value };
+	}
+
+	#finishLiteral(): JsonStreamEvent {
+		const text = this.#token;
+		this.#token = "";
+		switch (text) {
+			case "true":
+				return { type: "value", value: true };
+			case "false":
+				return { type: "value", value: false };
+			case "null":
+				return { type: "value", value: null };
+			default:
+				throw new JsonStreamParseError(`Invalid JSON literal: ${JSON.stringify(text)}`);
+		}
+	}
+}
+
+/**
+ * Normalizes the accepted sources into an async iterable of byte chunks.
+ *
+ * `ReadableStream` is only async-iterable on Node and recent browsers, so we go through a reader
+ * explicitly. The reader is always released/cancelled, which matters for early `break`/`throw`:
+ * it lets an underlying HTTP response be torn down instead of downloading the rest of the body.
+ */
+async function* toByteChunks(
+	source: ReadableStream<Uint8Array> | AsyncIterable<Uint8Array>,
+): AsyncGenerator<Uint8Array> {
+	if (!("getReader" in source)) {
+		yield* source;
+		return;
+	}
+
+	const reader = source.getReader();
+	try {
+		while (true) {
+			const { done, value } = await reader.read();
+			if (done) {
+				return;
+			}
+			if (value) {
+				yield value;
+			}
+		}
+	} finally {
+		// cancel() rejects if the stream is already errored/closed; we don't care either way
+		await reader.cancel().catch(() => undefined);
+	}
+}
+
+/**
+ * Parses a chunk at a time with a {@link JsonStreamTokenizer}, and yields the events of each chunk
+ * once it is parsed. If a chunk is invalid, the events before the error are yielded, then it's thrown.
+ */
+export async function* streamJson(
+	source: ReadableStream<Uint8Array> | AsyncIterable<Uint8Array>,
+	options?: JsonStreamOptions,
+): AsyncGenerator<JsonStreamEvent, void, undefined> {
+	const events: JsonStreamEvent[] = [];
+	const tokenizer = new JsonStreamTokenizer((event) => events.push(event), options);
+
+	/** Runs `parse`, returning what it threw, so that the events emitted before an error are yielded first */
+	const tryParse = (parse: () => void): { error: unknown } | undefined => {
+		try {
+			parse();
+		} catch (error) {
+			return { error };
+		}
+	};
+
+	for await (const bytes of toByteChunks(source)) {
+		const failure = tryParse(() => tokenizer.write(bytes));
+		// Not `yield*`, which would add an await for each event
+		for (let i = 0; i < events.length; i++) {
+			yield events[i];
+		}
+		events.length = 0;
+		if (failure) {
+			throw failure.error;
+		}
+	}
+
+	const failure = tryParse(() => tokenizer.end());
+	for (const event of events) {
+		yield event;
+	}
+	if (failure) {
+		throw failure.error;
+	}
+}
+
+type JsonValue = string | number | boolean | null | JsonValue[] | { [key: string]: JsonValue };
+
+/**
+ * Yields the elements of a top-level JSON array one by one, as soon as each is fully received,
+ * without waiting for (or buffering) the rest of the document.
+ *
+ * Elements are rebuilt from the {@link JsonStreamTokenizer} events, so they are equal to what `JSON.parse`
+ * would have returned for them.
+ */
+export async function* streamJsonArrayItems<T = JsonValue>(
+	source: ReadableStream<Uint8Array> | AsyncIterable<Uint8Array>,
+	options?: JsonStreamOptions,
+): AsyncGenerator<T, void, undefined> {
+	/** Containers being built; the top-level array itself is not kept */
+	const stack: Array<JsonValue[] | Record<string, JsonValue>> = [];
+	const keys: string[] = [];
+	let started = false;
+	/** Elements completed by the current chunk */
+	const items: T[] = [];
+
+	/** Attaches a completed value to its parent, or to `items` if it is an element of the top-level array */
+	const attach = (value: JsonValue): void => {
+		const parent = stack[stack.length - 1];
+		if (parent === undefined) {
+			items.push(value as T);
+		} else if (Array.isArray(parent)) {
+			parent.push(value);
+		} else {
+			const key = keys.pop() as string;
+			if (key === "__proto__") {
+				// Like JSON.parse, create an own property rather than setting the prototype
+				Object.defineProperty(parent, key, { value, enumerable: true, writable: true, configurable: true });
+			} else {
+				parent[key] = value;
+			}
+		}
+	};
+
+	const tokenizer = new JsonStreamTokenizer((event) => {
+		if (!started) {
+			if (event.type !== "startArray") {
+				throw new JsonStreamParseError("Expected a JSON array");
+			}
+			started = true;
+			return;
+		}
+		switch (event.type) {
+			case "startObject":
+				stack.push({});
+				break;
+			case "startArray":
+				stack.push([]);
+				break;
+			case "endObject":
+			case "endArray": {
+				const container = stack.pop();
+				// undefined at the end of the top-level array
+				if (container !== undefined) {
+					attach(container);
+				}
+				break;
+			}
+			case "key":
+				keys.push(event.key);
+				break;
+			case "value":
+				attach(event.value);
+				break;
+		}
+	}, options);
+
+	for await (const bytes of toByteChunks(source)) {
+		tokenizer.write(bytes);
+		for (let i = 0; i < items.length; i++) {
+			yield items[i];
+		}
+		items.length = 0;
 	}
+	tokenizer.end();
 }
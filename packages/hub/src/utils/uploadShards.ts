@@ -1,8 +1,10 @@
 import { createApiError } from "../error";
 import type { RepoId } from "../types/public";
 import { createXorbs } from "./createXorbs";
+import type { ChunkCacheSnapshot } from "./ChunkCacheSnapshot";
 import { sum } from "./sum";
 import { xetWriteToken } from "./xetWriteToken";
+import type { XetChunkerPool } from "./XetChunkerPool";
 
 const SHARD_MAX_SIZE = 64 * 1024 * 1024;
 const SHARD_HEADER_SIZE = 48;
@@ -68,6 +70,12 @@ interface UploadShardsParams {
 	rev: string;
 	isPullRequest?: boolean;
 	yieldCallback?: (event: { event: "fileProgress"; path: string; progress: number }) => void;
+	chunkCacheSnapshot?: ChunkCacheSnapshot;
+	chunkerPool?: XetChunkerPool;
+	/**
+	 * Compute the sha256 of files that don't have one in the same pass as chunking, see {@link createXorbs}
+	 */
+	computeSha256?: boolean;
 }
 
 /**
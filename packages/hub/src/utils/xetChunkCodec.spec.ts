@@ -0,0 +1,90 @@
+import { afterEach, describe, expect, it } from "vitest";
+import { compress as lz4_compress } from "../vendor/lz4js";
+import {
+	bg4Regroup,
+	bg4Split,
+	lz4Compress,
+	lz4DecompressInto,
+	setXetChunkCodecWasmEnabled,
+	xetChunkCodecBackend,
+} from "./xetChunkCodec";
+
+function sampleChunks(): Uint8Array[] {
+	const floats = new Float32Array(20_000).map((_, i) => Math.round(Math.sin(i) * 100) / 100);
+	const random = new Uint8Array(70_000);
+	let state = 0x12345678;
+	for (let i = 0; i < random.length; i++) {
+		// xorshift32
+		state ^= state << 13;
+		state ^= state >>> 17;
+		state ^= state << 5;
+		random[i] = state;
+	}
+	return [
+		new Uint8Array(0),
+		new Uint8Array([1, 2, 3]),
+		new Uint8Array(100_003).fill(7),
+		new Uint8Array(floats.buffer),
+		random,
+		random.map((byte) => byte & 3),
+	];
+}
+
+describe("xetChunkCodec", () => {
+	afterEach(() => {
+		setXetChunkCodecWasmEnabled(true);
+	});
+
+	it("uses WebAssembly with SIMD when available", () => {
+		expect(xetChunkCodecBackend()).toBe("wasm-simd");
+		setXetChunkCodecWasmEnabled(false);
+		expect(xetChunkCodecBackend()).toBe("js");
+	});
+
+	for (const wasm of [true, false]) {
+		describe(wasm ? "wasm" : "js", () => {
+			it("compresses to the same frames as lz4js, and decompresses them into the output buffer", () => {
+				setXetChunkCodecWasmEnabled(wasm);
+				for (const chunk of sampleChunks()) {
+					const compressed = lz4Compress(chunk);
+					expect(compressed).toEqual(lz4_compress(chunk));
+
+					const output = new Uint8Array(chunk.byteLength);
+					expect(lz4DecompressInto(compressed, output)).toBe(chunk.byteLength);
+					expect(output).toEqual(chunk);
+				}
+			});
+
+			it("splits and regroups bytes", () => {
+				setXetChunkCodecWasmEnabled(wasm);
+				const bytes = new Uint8Array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]);
+				const split = new Uint8Array(bytes.byteLength);
+				bg4Split(bytes, split);
+				expect(split).toEqual(new Uint8Array([1, 5, 9, 2, 6, 10, 3, 7, 11, 4, 8]));
+
+				for (const chunk of sampleChunks()) {
+					const compressed = lz4Compress(chunk, { byteGrouping: true });
+					const grouped = new Uint8Array(chunk.byteLength);
+					bg4Split(chunk, grouped);
+					expect(compressed).toEqual(lz4_compress(grouped));
+
+					const output = new Uint8Array(chunk.byteLength);
+					expect(lz4DecompressInto(compressed, output, { byteGrouping: true })).toBe(chunk.byteLength);
+					expect(output).toEqual(chunk);
+
+					bg4Regroup(grouped, output.fill(0));
+					expect(output).toEqual(chunk);
+				}
+			});
+		});
+	}
+
+	it("rejects corrupt frames and outputs that are too small", () => {
+		const chunk = new Uint8Array(1000).map((_, i) => i % 13);
+		const compressed = lz4Compress(chunk);
+
+		expect(() => lz4DecompressInto(compressed, new Uint8Array(500))).toThrow(/too small/);
+		expect(() => lz4DecompressInto(compressed.subarray(0, 20), new Uint8Array(1000))).toThrow(/Invalid LZ4 frame/);
+		expect(() => lz4DecompressInto(compressed.slice(1), new Uint8Array(1000))).toThrow(/invalid magic number/);
+	});
+});
@@ -0,0 +1,297 @@
+import { compress as lz4_compress, compressBound, decompressFrame } from "../vendor/lz4js";
+import { hash as xxh32 } from "../vendor/lz4js/xxh32";
+import type { Lz4WasmExports } from "./lz4Wasm";
+import { LZ4_HASH_TABLE_BYTES, lz4Wasm } from "./lz4Wasm";
+
+/**
+ * LZ4 frames and BG4 byte grouping for xorb chunks.
+ *
+ * Uses the WebAssembly codec from `lz4Wasm.ts` when available (with SIMD for byte grouping if supported),
+ * and the vendored lz4js otherwise. Both produce the same bytes.
+ */
+
+const LZ4_MAGIC = 0x184d2204;
+const LZ4_MAX_BLOCK_SIZE = 4 * 1024 * 1024;
+const LZ4_BLOCK_UNCOMPRESSED = 0x80000000;
+const PAGE_SIZE = 64 * 1024;
+
+export type XetChunkCodecBackend = "wasm-simd" | "wasm" | "js";
+
+let wasmEnabled = true;
+
+// exported for testing and benchmarking purposes
+export function setXetChunkCodecWasmEnabled(enabled: boolean): void {
+	wasmEnabled = enabled;
+}
+
+export function xetChunkCodecBackend(): XetChunkCodecBackend {
+	const wasm = getWasm();
+	return wasm ? (wasm.simd ? "wasm-simd" : "wasm") : "js";
+}
+
+function getWasm(): Lz4WasmExports | null {
+	return wasmEnabled ? lz4Wasm() : null;
+}
+
+/**
+ * Makes sure the wasm memory is at least `bytes` long
+ *
+ * @returns a view on the whole memory, to be recreated after each call since growing the memory detaches the previous buffer
+ */
+function reserve(wasm: Lz4WasmExports, bytes: number): Uint8Array {
+	const missing = bytes - wasm.memory.buffer.byteLength;
+	if (missing > 0) {
+		wasm.memory.grow(Math.ceil(missing / PAGE_SIZE));
+	}
+	return new Uint8Array(wasm.memory.buffer);
+}
+
+function align(offset: number): number {
+	return (offset + 15) & ~15;
+}
+
+function readU32(bytes: Uint8Array, offset: number): number {
+	return (bytes[offset] | (bytes[offset + 1] << 8) | (bytes[offset + 2] << 16) | (bytes[offset + 3] << 24)) >>> 0;
+}
+
+function writeU32(bytes: Uint8Array, offset: number, value: number): void {
+	bytes[offset] = value;
+	bytes[offset + 1] = value >>> 8;
+	bytes[offset + 2] = value >>> 16;
+	bytes[offset + 3] = value >>> 24;
+}
+
+/**
+ * Decompresses an LZ4 frame into `dst`, regrouping the bytes afterwards if the chunk was compressed with byte grouping
+ *
+ * @returns the number of bytes written to `dst`
+ */
+export function lz4DecompressInto(src: Uint8Array, dst: Uint8Array, opts?: { byteGrouping?: boolean }): number {
+	const wasm = getWasm();
+
+	if (!wasm) {
+		if (!opts?.byteGrouping) {
+			return decompressFrame(src, dst);
+		}
+		const grouped = new Uint8Array(dst.byteLength);
+		const length = decompressFrame(src, grouped);
+		bg4Regroup(grouped.subarray(0, length), dst);
+		return length;
+	}
+
+	// Memory layout: hash table (unused here) | src | decompressed | regrouped
+	const srcStart = LZ4_HASH_TABLE_BYTES;
+	const dstStart = align(srcStart + src.byteLength);
+	const regroupedStart = align(dstStart + dst.byteLength);
+	const memory = reserve(wasm, opts?.byteGrouping ? regroupedStart + dst.byteLength : regroupedStart);
+	memory.set(src, srcStart);
+
+	const srcEnd = srcStart + src.byteLength;
+	const dstEnd = dstStart + dst.byteLength;
+	let s = srcStart;
+	let d = dstStart;
+
+	const frameError = (message: string) => new Error(`Invalid LZ4 frame: ${message}`);
+
+	if (src.byteLength < 7 || readU32(memory, s) !== LZ4_MAGIC) {
+		throw frameError("invalid magic number");
+	}
+	const descriptor = memory[s + 4];
+	if ((descriptor & 0xc0) !== 0x40) {
+		throw frameError("incompatible descriptor version");
+	}
+	const blockChecksums = (descriptor & 0x10) !== 0;
+	const contentSize = (descriptor & 0x08) !== 0;
+	// Block size ids 4 to 7 are valid
+	if (((memory[s + 5] >> 4) & 7) < 4) {
+		throw frameError("invalid block size");
+	}
+	s += 6 + (contentSize ? 8 : 0) + 1;
+
+	for (;;) {
+		if (s + 4 > srcEnd) {
+			throw frameError("truncated");
+		}
+		let blockSize = readU32(memory, s);
+		s += 4;
+		if (blockSize === 0) {
+			break;
+		}
+		if (blockChecksums) {
+			s += 4;
+		}
+		const uncompressed = (blockSize & LZ4_BLOCK_UNCOMPRESSED) !== 0;
+		blockSize &= ~LZ4_BLOCK_UNCOMPRESSED;
+		if (s + blockSize > srcEnd) {
+			throw frameError("truncated");
+		}
+		if (uncompressed) {
+			if (d + blockSize > dstEnd) {
+				throw frameError("output is too small");
+			}
+			memory.copyWithin(d, s, s + blockSize);
+			d += blockSize;
+		} else {
+			d = wasm.decompressBlock(s, s + blockSize, dstStart, d, dstEnd);
+			if (d < 0) {
+				throw frameError("corrupt block or output too small");
+			}
+		}
+		s += blockSize;
+	}
+
+	const length = d - dstStart;
+	if (opts?.byteGrouping) {
+		wasm.bg4Regroup(dstStart, regroupedStart, length);
+		dst.set(memory.subarray(regroupedStart, regroupedStart + length));
+	} else {
+		dst.set(memory.subarray(dstStart, d));
+	}
+	return length;
+}
+
+let frameHeader: Uint8Array | undefined;
+
+/**
+ * Same frame header as lz4js: no checksums, linked blocks of up to 4MB
+ */
+function getFrameHeader(): Uint8Array {
+	if (!frameHeader) {
+		frameHeader = new Uint8Array(7);
+		writeU32(frameHeader, 0, LZ4_MAGIC);
+		frameHeader[4] = 0x40;
+		frameHeader[5] = 7 << 4;
+		frameHeader[6] = xxh32(0, frameHeader, 4, 2) >> 8;
+	}
+	return frameHeader;
+}
+
+/**
+ * Compresses bytes to an LZ4 frame, splitting the bytes in 4 groups first if `byteGrouping` is set
+ */
+export function lz4Compress(src: Uint8Array, opts?: { byteGrouping?: boolean }): Uint8Array {
+	const wasm = getWasm();
+
+	if (!wasm) {
+		if (!opts?.byteGrouping) {
+			return lz4_compress(src);
+		}
+		const grouped = new Uint8Array(src.byteLength);
+		bg4Split(src, grouped);
+		return lz4_compress(grouped);
+	}
+
+	const blockCount = Math.ceil(src.byteLength / LZ4_MAX_BLOCK_SIZE);
+	const header = getFrameHeader();
+
+	// Memory layout: hash table | src | split src | frame
+	const srcStart = LZ4_HASH_TABLE_BYTES;
+	const splitStart = align(srcStart + src.byteLength);
+	const frameStart = opts?.byteGrouping ? align(splitStart + src.byteLength) : splitStart;
+	const memory = reserve(wasm, frameStart + header.byteLength + compressBound(src.byteLength) + 20 * blockCount + 4);
+	memory.set(src, srcStart);
+	memory.fill(0, 0, LZ4_HASH_TABLE_BYTES);
+
+	let s = srcStart;
+	if (opts?.byteGrouping) {
+		wasm.bg4Split(srcStart, splitStart, src.byteLength);
+		s = splitStart;
+	}
+	const sEnd = s + src.byteLength;
+
+	memory.set(header, frameStart);
+	let d = frameStart + header.byteLength;
+
+	while (s < sEnd) {
+		const blockSize = Math.min(sEnd - s, LZ4_MAX_BLOCK_SIZE);
+		const compressedSize = wasm.compressBlock(s, blockSize, d + 4, 0);
+
+		if (compressedSize === 0 || compressedSize > blockSize) {
+			writeU32(memory, d, LZ4_BLOCK_UNCOMPRESSED | blockSize);
+			memory.copyWithin(d + 4, s, s + blockSize);
+			d += 4 + blockSize;
+		} else {
+			writeU32(memory, d, compressedSize);
+			d += 4 + compressedSize;
+		}
+		s += blockSize;
+	}
+	writeU32(memory, d, 0);
+	d += 4;
+
+	return memory.slice(frameStart, d);
+}
+
+/**
+ * Interleaves the 4 byte groups of `src` into `dst`, see {@link bg4_regroup_bytes}
+ */
+export function bg4Regroup(src: Uint8Array, dst: Uint8Array): void {
+	const wasm = getWasm();
+	if (wasm) {
+		const dstStart = align(src.byteLength);
+		const memory = reserve(wasm, dstStart + src.byteLength);
+		memory.set(src, 0);
+		wasm.bg4Regroup(0, dstStart, src.byteLength);
+		dst.set(memory.subarray(dstStart, dstStart + src.byteLength));
+		return;
+	}
+
+	const split = Math.floor(src.byteLength / 4);
+	const rem = src.byteLength % 4;
+	const g1_pos = split + (rem >= 1 ? 1 : 0);
+	const g2_pos = g1_pos + split + (rem >= 2 ? 1 : 0);
+	const g3_pos = g2_pos + split + (rem == 3 ? 1 : 0);
+
+	for (let i = 0, j = 0; i < src.byteLength; i += 4, j++) {
+		dst[i] = src[j];
+	}
+
+	for (let i = 1, j = g1_pos; i < src.byteLength; i += 4, j++) {
+		dst[i] = src[j];
+	}
+
+	for (let i = 2, j = g2_pos; i < src.byteLength; i += 4, j++) {
+		dst[i] = src[j];
+	}
+
+	for (let i = 3, j = g3_pos; i < src.byteLength; i += 4, j++) {
+		dst[i] = src[j];
+	}
+}
+
+/**
+ * Splits `src` into 4 byte groups written to `dst`, the inverse of {@link bg4Regroup}
+ */
+export function bg4Split(src: Uint8Array, dst: Uint8Array): void {
+	const wasm = getWasm();
+	if (wasm) {
+		const dstStart = align(src.byteLength);
+		const memory = reserve(wasm, dstStart + src.byteLength);
+		memory.set(src, 0);
+		wasm.bg4Split(0, dstStart, src.byteLength);
+		dst.set(memory.subarray(dstStart, dstStart + src.byteLength));
+		return;
+	}
+
+	const split = Math.floor(src.byteLength / 4);
+	const rem = src.byteLength % 4;
+	const g1_pos = split + (rem >= 1 ? 1 : 0);
+	const g2_pos = g1_pos + split + (rem >= 2 ? 1 : 0);
+	const g3_pos = g2_pos + split + (rem == 3 ? 1 : 0);
+
+	for (let i = 0, j = 0; i < src.byteLength; i += 4, j++) {
+		dst[j] = src[i];
+	}
+
+	for (let i = 1, j = g1_pos; i < src.byteLength; i += 4, j++) {
+		dst[j] = src[i];
+	}
+
+	for (let i = 2, j = g2_pos; i < src.byteLength; i += 4, j++) {
+		dst[j] = src[i];
+	}
+
+	for (let i = 3, j = g3_pos; i < src.byteLength; i += 4, j++) {
+		dst[j] = src[i];
+	}
+}
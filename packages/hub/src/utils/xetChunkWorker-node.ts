@@ -0,0 +1,10 @@
+import { parentPort } from "node:worker_threads";
+import { chunkSegment } from "./chunkSegment";
+
+/**
+ * worker_threads entry point of `XetChunkerPool`, built to dist/xet-chunk-worker.js
+ */
+parentPort?.on("message", (data: Uint8Array) => {
+	const result = chunkSegment(data);
+	parentPort?.postMessage(result, [result.data.buffer as ArrayBuffer, result.hashes.buffer, result.lengths.buffer]);
+});
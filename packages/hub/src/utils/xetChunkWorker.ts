@@ -0,0 +1,11 @@
+import { chunkSegment } from "./chunkSegment";
+
+/**
+ * Web Worker entry point of `XetChunkerPool`. The Node.js one is in xetChunkWorker-node.ts
+ */
+self.addEventListener("message", (event: MessageEvent<Uint8Array>) => {
+	const result = chunkSegment(event.data);
+	self.postMessage(result, {
+		transfer: [result.data.buffer as ArrayBuffer, result.hashes.buffer, result.lengths.buffer],
+	});
+});
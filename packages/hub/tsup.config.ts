@@ -9,12 +9,15 @@ const baseConfig = {
 
 const nodeConfig: Options = {
 	...baseConfig,
-	entry: [...baseConfig.entry, "./cli.ts"],
+	entry: { index: "./index.ts", cli: "./cli.ts", "xet-chunk-worker": "./src/utils/xetChunkWorker-node.ts" },
 	platform: "node",
+	// XetChunkerPool locates the worker script with __dirname
+	shims: true,
 };
 
 const browserConfig: Options = {
 	...baseConfig,
+	entry: { index: "./index.ts", "xet-chunk-worker": "./src/utils/xetChunkWorker.ts" },
 	platform: "browser",
 	target: "es2022",
 	splitting: true,
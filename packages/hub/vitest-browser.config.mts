@@ -8,7 +8,11 @@ export default defineConfig({
 			"src/utils/FileBlob.spec.ts",
 			"src/utils/symlink.spec.ts",
 			"src/utils/sub-paths.spec.ts",
+			"src/utils/lockFile.spec.ts",
+			"src/utils/DiskXetChunkStore.spec.ts",
 			"src/lib/cache-management.spec.ts",
+			"src/lib/prune-cache.spec.ts",
+			"src/lib/upload-large-folder.spec.ts",
 			"src/lib/download-file-to-cache-dir.spec.ts",
 			"src/lib/snapshot-download.spec.ts",
 			"src/lib/upload-files.fs.spec.ts",
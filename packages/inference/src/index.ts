@@ -6,5 +6,8 @@ import * as snippets from "./snippets/index.js";
 export * from "./lib/getProviderHelper.js";
 export * from "./lib/makeRequestOptions.js";
 export { setLogger } from "./lib/logger.js";
+export { RetryBudget } from "./lib/retry.js";
+export { AsyncCache, type AsyncCacheEntry, type AsyncCacheStats, type AsyncCacheStore } from "./lib/cache.js";
+export { inferenceProviderMappingCache } from "./lib/getInferenceProviderMapping.js";
 
 export { snippets };
@@ -0,0 +1,177 @@
+import { getLogger } from "./logger.js";
+
+export interface AsyncCacheEntry<V> {
+	value: V;
+	/** Timestamp in ms of when the value was loaded */
+	storedAt: number;
+}
+
+/**
+ * Persistent storage behind an {@link AsyncCache}, eg Redis or a file, shared between processes or restarts.
+ *
+ * Values must survive a JSON round-trip. Errors are logged and treated as misses.
+ */
+export interface AsyncCacheStore<V> {
+	get(key: string): Promise<AsyncCacheEntry<V> | undefined>;
+	set(key: string, entry: AsyncCacheEntry<V>): Promise<void>;
+}
+
+export interface AsyncCacheStats {
+	/** Fresh values returned, from memory or from the store */
+	hits: number;
+	/** Stale values returned while being revalidated */
+	staleHits: number;
+	/** Values loaded */
+	misses: number;
+	/** Calls that waited for a load already in progress */
+	coalesced: number;
+	/** Values evicted to stay under `maxEntries` */
+	evictions: number;
+}
+
+export interface AsyncCacheOptions<V> {
+	/**
+	 * Max number of values kept in memory, least recently used values are evicted first
+	 *
+	 * @default 1000
+	 */
+	maxEntries?: number;
+	/**
+	 * How long a value is fresh, in ms
+	 *
+	 * @default 600_000 (10 minutes)
+	 */
+	ttlMs?: number;
+	/**
+	 * How long after it expires a value can still be returned, while it's reloaded in the background, in ms
+	 *
+	 * @default 0
+	 */
+	staleWhileRevalidateMs?: number;
+	store?: AsyncCacheStore<V>;
+}
+
+/**
+ * Cache for values loaded asynchronously, eg from the Hub API.
+ *
+ * - Bounded: least recently used values are evicted above `maxEntries`
+ * - Values expire after `ttlMs`, and can be served stale for `staleWhileRevalidateMs` more while they're reloaded
+ * - Concurrent calls for the same key share the same load
+ * - Optionally backed by a persistent {@link AsyncCacheStore}
+ *
+ * Failed loads are not cached.
+ */
+export class AsyncCache<V> {
+	readonly maxEntries: number;
+	readonly ttlMs: number;
+	readonly staleWhileRevalidateMs: number;
+	store?: AsyncCacheStore<V>;
+	readonly stats: AsyncCacheStats = { hits: 0, staleHits: 0, misses: 0, coalesced: 0, evictions: 0 };
+
+	#entries = new Map<string, AsyncCacheEntry<V>>();
+	#loading = new Map<string, Promise<V>>();
+
+	constructor(opts?: AsyncCacheOptions<V>) {
+		this.maxEntries = opts?.maxEntries ?? 1000;
+		this.ttlMs = opts?.ttlMs ?? 10 * 60 * 1000;
+		this.staleWhileRevalidateMs = opts?.staleWhileRevalidateMs ?? 0;
+		this.store = opts?.store;
+	}
+
+	get size(): number {
+		return this.#entries.size;
+	}
+
+	/**
+	 * @returns the cached value for the key, or the result of `load` if there's none
+	 */
+	async get(key: string, load: () => Promise<V>): Promise<V> {
+		const entry = this.#entries.get(key);
+		if (entry) {
+			const age = Date.now() - entry.storedAt;
+			if (age <= this.ttlMs) {
+				this.stats.hits++;
+				this.#touch(key, entry);
+				return entry.value;
+			}
+			if (age <= this.ttlMs + this.staleWhileRevalidateMs) {
+				this.stats.staleHits++;
+				this.#touch(key, entry);
+				if (!this.#loading.has(key)) {
+					this.#load(key, load, { skipStore: true }).catch((err) => {
+						getLogger().warn(`Failed to revalidate cached value for ${key}`, err);
+					});
+				}
+				return entry.value;
+			}
+			this.#entries.delete(key);
+		}
+
+		const loading = this.#loading.get(key);
+		if (loading) {
+			this.stats.coalesced++;
+			return loading;
+		}
+		return this.#load(key, load);
+	}
+
+	set(key: string, value: V): void {
+		this.#touch(key, { value, storedAt: Date.now() });
+	}
+
+	delete(key: string): boolean {
+		return this.#entries.delete(key);
+	}
+
+	/**
+	 * Clears the values in memory, not the ones in the store
+	 */
+	clear(): void {
+		this.#entries.clear();
+	}
+
+	#load(key: string, load: () => Promise<V>, opts?: { skipStore?: boolean }): Promise<V> {
+		const promise = (async () => {
+			if (!opts?.skipStore) {
+				const stored = await this.#readStore(key);
+				if (stored && Date.now() - stored.storedAt <= this.ttlMs) {
+					this.stats.hits++;
+					this.#touch(key, stored);
+					return stored.value;
+				}
+			}
+
+			this.stats.misses++;
+			const entry = { value: await load(), storedAt: Date.now() };
+			this.#touch(key, entry);
+			await this.store?.set(key, entry).catch((err) => {
+				getLogger().warn(`Failed to write cached value for ${key}`, err);
+			});
+			return entry.value;
+		})().finally(() => {
+			this.#loading.delete(key);
+		});
+		this.#loading.set(key, promise);
+		return promise;
+	}
+
+	async #readStore(key: string): Promise<AsyncCacheEntry<V> | undefined> {
+		try {
+			return await this.store?.get(key);
+		} catch (err) {
+			getLogger().warn(`Failed to read cached value for ${key}`, err);
+			return undefined;
+		}
+	}
+
+	#touch(key: string, entry: AsyncCacheEntry<V>): void {
+		// Maps iterate in insertion order, so re-inserting moves the key to the most recently used end
+		this.#entries.delete(key);
+		this.#entries.set(key, entry);
+		while (this.#entries.size > this.maxEntries) {
+			// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
+			this.#entries.delete(this.#entries.keys().next().value!);
+			this.stats.evictions++;
+		}
+	}
+}
@@ -1,4 +1,5 @@
 import { HF_HUB_URL } from "../config.js";
+import { AsyncCache } from "./cache.js";
 import { isUrl } from "./isUrl.js";
 
 /**
@@ -6,9 +7,7 @@ import { isUrl } from "./isUrl.js";
  * someone is calling Inference Endpoints 1000 times per second, we don't want
  * to make 1000 calls to the hub to get the task name.
  */
-const taskCache = new Map<string, { task: string; date: Date }>();
-const CACHE_DURATION = 10 * 60 * 1000;
-const MAX_CACHE_ITEMS = 1000;
+const taskCache = new AsyncCache<string>({ maxEntries: 1000, ttlMs: 10 * 60 * 1000 });
 
 export interface DefaultTaskOptions {
 	fetch?: typeof fetch;
@@ -29,34 +28,17 @@ export async function getDefaultTask(
 		return null;
 	}
 
-	const key = `${model}:${accessToken}`;
-	let cachedTask = taskCache.get(key);
-
-	if (cachedTask && cachedTask.date < new Date(Date.now() - CACHE_DURATION)) {
-		taskCache.delete(key);
-		cachedTask = undefined;
-	}
-
-	if (cachedTask === undefined) {
-		const modelTask = await (options?.fetch ?? fetch)(`${HF_HUB_URL}/api/models/${model}?expand[]=pipeline_tag`, {
-			headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
+	return taskCache
+		.get(`${model}:${accessToken}`, async () => {
+			const resp = await (options?.fetch ?? fetch)(`${HF_HUB_URL}/api/models/${model}?expand[]=pipeline_tag`, {
+				headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
+			});
+			const modelTask = (await resp.json()).pipeline_tag;
+			if (!modelTask) {
+				// Not cached
+				throw new Error(`No pipeline tag for ${model}`);
+			}
+			return modelTask;
 		})
-			.then((resp) => resp.json())
-			.then((json) => json.pipeline_tag)
-			.catch(() => null);
-
-		if (!modelTask) {
-			return null;
-		}
-
-		cachedTask = { task: modelTask, date: new Date() };
-		taskCache.set(key, { task: modelTask, date: new Date() });
-
-		if (taskCache.size > MAX_CACHE_ITEMS) {
-			// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
-			taskCache.delete(taskCache.keys().next().value!);
-		}
-	}
-
-	return cachedTask.task;
+		.catch(() => null);
 }
@@ -4,10 +4,21 @@ import { HARDCODED_MODEL_INFERENCE_MAPPING } from "../providers/consts.js";
 import { EQUIVALENT_SENTENCE_TRANSFORMERS_TASKS } from "../providers/hf-inference.js";
 import type { InferenceProvider, InferenceProviderMappingEntry, InferenceProviderOrPolicy, ModelId } from "../types.js";
 import { typedInclude } from "../utils/typedInclude.js";
+import { tokenFingerprint } from "../utils/tokenFingerprint.js";
 import { InferenceClientHubApiError, InferenceClientInputError } from "../errors.js";
 import { getLogger } from "./logger.js";
+import { AsyncCache } from "./cache.js";
 
-export const inferenceProviderMappingCache = new Map<ModelId, InferenceProviderMappingEntry[]>();
+/**
+ * Provider mappings of the models, by model id, and by access token for authenticated requests.
+ *
+ * Set its `store` to share the mappings between processes.
+ */
+export const inferenceProviderMappingCache = new AsyncCache<InferenceProviderMappingEntry[]>({
+	maxEntries: 1000,
+	ttlMs: 10 * 60 * 1000,
+	staleWhileRevalidateMs: 60 * 60 * 1000,
+});
 
 /**
  * Normalize inferenceProviderMapping to always return an array format.
@@ -58,11 +69,10 @@ export async function fetchInferenceProviderMappingForModel(
 		fetch?: (input: RequestInfo, init?: RequestInit) => Promise<Response>;
 	},
 ): Promise<InferenceProviderMappingEntry[]> {
-	let inferenceProviderMapping: InferenceProviderMappingEntry[] | null;
-	if (inferenceProviderMappingCache.has(modelId)) {
-		// eslint-disable-next-line @typescript-eslint/no-non-null-assertion
-		inferenceProviderMapping = inferenceProviderMappingCache.get(modelId)!;
-	} else {
+	// The Hub answer depends on the token (gated or private models): callers with different tokens
+	// must not share cached mappings, loads or load errors
+	const cacheKey = accessToken?.startsWith("hf_") ? `${modelId}:${tokenFingerprint(accessToken)}` : modelId;
+	return inferenceProviderMappingCache.get(cacheKey, async () => {
 		const url = `${HF_HUB_URL}/api/models/${modelId}?expand[]=inferenceProviderMapping`;
 		const resp = await (options?.fetch ?? fetch)(url, {
 			headers: accessToken?.startsWith("hf_") ? { Authorization: `Bearer ${accessToken}` } : {},
@@ -106,10 +116,8 @@ export async function fetchInferenceProviderMappingForModel(
 				{ requestId: resp.headers.get("x-request-id") ?? "", status: resp.status, body: await resp.text() },
 			);
 		}
-		inferenceProviderMapping = normalizeInferenceProviderMapping(modelId, payload.inferenceProviderMapping);
-		inferenceProviderMappingCache.set(modelId, inferenceProviderMapping);
-	}
-	return inferenceProviderMapping;
+		return normalizeInferenceProviderMapping(modelId, payload.inferenceProviderMapping);
+	});
 }
 
 export async function getInferenceProviderMapping(
@@ -0,0 +1,182 @@
+import type { Options, RetryOptions } from "../types.js";
+
+const DEFAULT_MAX_ATTEMPTS = 10;
+const DEFAULT_BASE_DELAY_MS = 500;
+const DEFAULT_MAX_DELAY_MS = 30_000;
+const DEFAULT_MAX_ELAPSED_MS = 5 * 60_000;
+const DEFAULT_RETRY_STATUSES = [429, 502, 503, 504];
+
+/**
+ * Caps retries to a fraction of requests, so that retries can't multiply the load on an overloaded provider.
+ *
+ * Each request earns `ratio` retry tokens, each retry spends one. `minRetriesPerSecond` tokens are also earned every second,
+ * so that low-traffic clients can still retry. Tokens are capped to `maxTokens`.
+ *
+ * Share one budget across requests: by default, all requests without an explicit budget share a global one.
+ */
+export class RetryBudget {
+	readonly ratio: number;
+	readonly minRetriesPerSecond: number;
+	readonly maxTokens: number;
+	#tokens: number;
+	#lastRefill = Date.now();
+
+	constructor(opts?: {
+		/** (Default: 0.2) Retry tokens earned per request */
+		ratio?: number;
+		/** (Default: 1) Retry tokens earned per second */
+		minRetriesPerSecond?: number;
+		/** (Default: 20) Max retry tokens, ie max burst of retries */
+		maxTokens?: number;
+	}) {
+		this.ratio = opts?.ratio ?? 0.2;
+		this.minRetriesPerSecond = opts?.minRetriesPerSecond ?? 1;
+		this.maxTokens = opts?.maxTokens ?? 20;
+		this.#tokens = this.maxTokens;
+	}
+
+	/** Number of retries currently allowed */
+	get tokens(): number {
+		this.#refill();
+		return this.#tokens;
+	}
+
+	recordRequest(): void {
+		this.#refill();
+		this.#tokens = Math.min(this.maxTokens, this.#tokens + this.ratio);
+	}
+
+	/**
+	 * @returns whether a retry is allowed, spending a token if so
+	 */
+	tryAcquire(): boolean {
+		this.#refill();
+		if (this.#tokens < 1) {
+			return false;
+		}
+		this.#tokens -= 1;
+		return true;
+	}
+
+	#refill(): void {
+		const now = Date.now();
+		this.#tokens = Math.min(
+			this.maxTokens,
+			this.#tokens + ((now - this.#lastRefill) / 1000) * this.minRetriesPerSecond,
+		);
+		this.#lastRefill = now;
+	}
+}
+
+const defaultRetryBudget = new RetryBudget();
+
+/**
+ * @returns the delay in ms, or undefined if the header is missing or invalid
+ */
+export function parseRetryAfter(header: string | null, now = Date.now()): number | undefined {
+	if (!header) {
+		return undefined;
+	}
+	if (/^\s*\d+(\.\d+)?\s*$/.test(header)) {
+		return Math.ceil(Number(header) * 1000);
+	}
+	const date = Date.parse(header);
+	return isNaN(date) ? undefined : Math.max(0, date - now);
+}
+
+/**
+ * Exponential backoff with full jitter: a random delay between 0 and `baseDelayMs * 2 ^ (attempt - 1)`, capped to `maxDelayMs`
+ */
+export function backoffDelay(attempt: number, retry?: RetryOptions): number {
+	const cap = Math.min(
+		retry?.maxDelayMs ?? DEFAULT_MAX_DELAY_MS,
+		(retry?.baseDelayMs ?? DEFAULT_BASE_DELAY_MS) * 2 ** (attempt - 1),
+	);
+	return Math.random() * cap;
+}
+
+/**
+ * Waits before the next attempt.
+ *
+ * Unlike `utils/delay`, the timer is not unref'd: a pending retry keeps the process alive.
+ */
+function waitForRetry(ms: number, signal?: AbortSignal): Promise<void> {
+	return new Promise((resolve, reject) => {
+		const abortError = () =>
+			signal?.reason instanceof Error ? signal.reason : new DOMException("The operation was aborted", "AbortError");
+		if (signal?.aborted) {
+			return reject(abortError());
+		}
+		const onAbort = () => {
+			clearTimeout(timeout);
+			reject(abortError());
+		};
+		const timeout = setTimeout(() => {
+			signal?.removeEventListener("abort", onAbort);
+			resolve();
+		}, ms);
+		signal?.addEventListener("abort", onAbort, { once: true });
+	});
+}
+
+function isAbortError(err: unknown): boolean {
+	return err instanceof Error && (err.name === "AbortError" || err.name === "TimeoutError");
+}
+
+/**
+ * Fetch with the retry policy of the options: retries transient failures (by default 429, 502, 503, 504 and network errors)
+ * with exponential backoff and full jitter, honoring `Retry-After`, within the attempt, time and retry budget limits.
+ *
+ * When it gives up, the last response is returned (or the last network error thrown), for the caller to handle.
+ */
+export async function fetchWithRetries(url: string, info: RequestInit, options?: Options): Promise<Response> {
+	const fetchFn = options?.fetch ?? fetch;
+	if (options?.retry_on_error === false) {
+		return fetchFn(url, info);
+	}
+
+	const retry = options?.retry;
+	const maxAttempts = retry?.maxAttempts ?? DEFAULT_MAX_ATTEMPTS;
+	const maxDelayMs = retry?.maxDelayMs ?? DEFAULT_MAX_DELAY_MS;
+	const maxElapsedMs = retry?.maxElapsedMs ?? DEFAULT_MAX_ELAPSED_MS;
+	const retryStatuses = retry?.statuses ?? DEFAULT_RETRY_STATUSES;
+	const budget = retry?.budget ?? defaultRetryBudget;
+	const start = Date.now();
+
+	budget.recordRequest();
+
+	for (let attempt = 1; ; attempt++) {
+		let response: Response | undefined;
+		let error: unknown;
+		try {
+			response = await fetchFn(url, info);
+		} catch (err) {
+			if (isAbortError(err) || options?.signal?.aborted) {
+				throw err;
+			}
+			error = err;
+		}
+		if (response && !retryStatuses.includes(response.status)) {
+			return response;
+		}
+
+		const retryAfterMs = response ? parseRetryAfter(response.headers.get("Retry-After")) : undefined;
+		const delayMs = retryAfterMs ?? backoffDelay(attempt, retry);
+		const giveUp =
+			attempt >= maxAttempts ||
+			// The server asks to wait longer than we are willing to
+			delayMs > maxDelayMs ||
+			Date.now() - start + delayMs > maxElapsedMs ||
+			!budget.tryAcquire();
+		if (giveUp) {
+			if (response) {
+				return response;
+			}
+			throw error;
+		}
+
+		retry?.onRetry?.({ url, attempt, delayMs, status: response?.status, error });
+		await response?.body?.cancel().catch(() => {});
+		await waitForRetry(delayMs, options?.signal);
+	}
+}
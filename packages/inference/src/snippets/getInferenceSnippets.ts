@@ -69,16 +69,35 @@ interface TemplateParams {
 const hasTemplate = (language: InferenceSnippetLanguage, client: Client, templateName: string): boolean =>
 	templates[language]?.[client]?.[templateName] !== undefined;
 
+/**
+ * Templates are parsed and compiled on first use, then shared by all renders
+ */
+const compiledTemplates = new Map<string, Template>();
+
+const getCompiledTemplate = (language: InferenceSnippetLanguage, client: Client, templateName: string): Template => {
+	const key = `${language}/${client}/${templateName}`;
+	let compiled = compiledTemplates.get(key);
+	if (!compiled) {
+		const template = templates[language]?.[client]?.[templateName];
+		if (!template) {
+			throw new Error(`Template not found: ${language}/${client}/${templateName}`);
+		}
+		compiled = new Template(template, { compile: true });
+		compiledTemplates.set(key, compiled);
+	}
+	return compiled;
+};
+
 const loadTemplate = (
 	language: InferenceSnippetLanguage,
 	client: Client,
 	templateName: string,
 ): ((data: TemplateParams) => string) => {
-	const template = templates[language]?.[client]?.[templateName];
-	if (!template) {
+	if (!hasTemplate(language, client, templateName)) {
 		throw new Error(`Template not found: ${language}/${client}/${templateName}`);
 	}
-	return (data: TemplateParams) => new Template(template).render({ ...data });
+	let compiled: Template | undefined;
+	return (data: TemplateParams) => (compiled ??= getCompiledTemplate(language, client, templateName)).render({ ...data });
 };
 
 const snippetImportPythonInferenceClient = loadTemplate("python", "huggingface_hub", "importInferenceClient");
@@ -142,16 +161,23 @@ const HF_JS_METHODS: Partial<Record<WidgetType, string>> = {
 const ACCESS_TOKEN_ROUTING_PLACEHOLDER = "hf_token_placeholder";
 const ACCESS_TOKEN_DIRECT_REQUEST_PLACEHOLDER = "not_hf_token_placeholder";
 
+export interface InferenceSnippetTarget {
+	provider: InferenceProviderOrPolicy;
+	inferenceProviderMapping?: InferenceProviderMappingEntry;
+}
+
+type SnippetGenerator = (
+	model: ModelDataMinimal,
+	targets: InferenceSnippetTarget[],
+	opts?: InferenceSnippetOptions,
+) => InferenceSnippet[][];
+
 // Snippet generators
-const snippetGenerator = (templateName: string, inputPreparationFn?: InputPreparationFn) => {
-	return (
-		model: ModelDataMinimal,
-		provider: InferenceProviderOrPolicy,
-		inferenceProviderMapping?: InferenceProviderMappingEntry,
-		opts?: InferenceSnippetOptions,
-	): InferenceSnippet[] => {
+const snippetGenerator = (defaultTemplateName: string, defaultInputPreparationFn?: InputPreparationFn): SnippetGenerator => {
+	return (model, targets, opts) => {
 		const logger = getLogger();
-		const providerModelId = inferenceProviderMapping?.providerId ?? model.id;
+		let templateName = defaultTemplateName;
+		let inputPreparationFn = defaultInputPreparationFn;
 		/// Hacky: hard-code conversational templates here
 		let task = model.pipeline_tag as InferenceTask;
 		if (
@@ -163,177 +189,167 @@ const snippetGenerator = (templateName: string, inputPreparationFn?: InputPrepar
 			inputPreparationFn = prepareConversationalInput;
 			task = "conversational";
 		}
-		let providerHelper: ReturnType<typeof getProviderHelper>;
-		try {
-			providerHelper = getProviderHelper(provider, task);
-		} catch (e) {
-			logger.error(`Failed to get provider helper for ${provider} (${task})`, e);
-			return [];
-		}
 
 		const placeholder = opts?.directRequest
 			? ACCESS_TOKEN_DIRECT_REQUEST_PLACEHOLDER
 			: ACCESS_TOKEN_ROUTING_PLACEHOLDER;
 		const accessTokenOrPlaceholder = opts?.accessToken ?? placeholder;
 
-		/// Prepare inputs + make request
+		/// Prepare inputs, shared by all providers
 		const inputs = opts?.inputs
 			? { inputs: opts.inputs }
 			: inputPreparationFn
 				? inputPreparationFn(model, opts)
 				: { inputs: getModelInputSnippet(model) };
-		const request = makeRequestOptionsFromResolvedModel(
-			providerModelId,
-			providerHelper,
-			{
-				accessToken: accessTokenOrPlaceholder,
-				provider,
-				endpointUrl: opts?.endpointUrl ?? (provider === "auto" ? HF_ROUTER_AUTO_ENDPOINT : undefined),
-				...inputs,
-			} as RequestArgs,
-			inferenceProviderMapping,
-			{
-				task,
-				billTo: opts?.billTo,
-			},
-		);
+		const formattedInputs = formatInputs(inputs);
 
-		/// Parse request.info.body if not a binary.
-		/// This is the body sent to the provider. Important for snippets with raw payload (e.g curl, requests, etc.)
-		let providerInputs = inputs;
-		const bodyAsObj = request.info.body;
-		if (typeof bodyAsObj === "string") {
+		return targets.map(({ provider, inferenceProviderMapping }) => {
+			const providerModelId = inferenceProviderMapping?.providerId ?? model.id;
+			let providerHelper: ReturnType<typeof getProviderHelper>;
 			try {
-				providerInputs = JSON.parse(bodyAsObj);
+				providerHelper = getProviderHelper(provider, task);
 			} catch (e) {
-				logger.error("Failed to parse body as JSON", e);
+				logger.error(`Failed to get provider helper for ${provider} (${task})`, e);
+				return [];
 			}
-		}
 
-		// Inputs for the "auto" route is strictly the same as "inputs", except the model includes the provider
-		// If not "auto" route, use the providerInputs
-		const autoInputs =
-			!opts?.endpointUrl && !opts?.directRequest
-				? provider !== "auto"
-					? {
-							...inputs,
-							model: `${model.id}:${provider}`,
-						}
-					: {
-							...inputs,
-							model: `${model.id}`, // if no :provider => auto
-						}
-				: providerInputs;
-
-		/// Prepare template injection data
-		const params: TemplateParams = {
-			accessToken: accessTokenOrPlaceholder,
-			authorizationHeader: (request.info.headers as Record<string, string>)?.Authorization,
-			baseUrl:
-				task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
-					? HF_ROUTER_AUTO_ENDPOINT
-					: removeSuffix(request.url, "/chat/completions"),
-			fullUrl:
-				task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
-					? HF_ROUTER_AUTO_ENDPOINT + "/chat/completions"
-					: request.url,
-			inputs: {
-				asObj: inputs,
-				asCurlString: formatBody(inputs, "curl"),
-				asJsonString: formatBody(inputs, "json"),
-				asPythonString: formatBody(inputs, "python"),
-				asTsString: formatBody(inputs, "ts"),
-			},
-			providerInputs: {
-				asObj: providerInputs,
-				asCurlString: formatBody(providerInputs, "curl"),
-				asJsonString: formatBody(providerInputs, "json"),
-				asPythonString: formatBody(providerInputs, "python"),
-				asTsString: formatBody(providerInputs, "ts"),
-			},
-			autoInputs: {
-				asObj: autoInputs,
-				asCurlString: formatBody(autoInputs, "curl"),
-				asJsonString: formatBody(autoInputs, "json"),
-				asPythonString: formatBody(autoInputs, "python"),
-				asTsString: formatBody(autoInputs, "ts"),
-			},
-			model,
-			provider,
-			providerModelId:
-				task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
+			/// Make request
+			const request = makeRequestOptionsFromResolvedModel(
+				providerModelId,
+				providerHelper,
+				{
+					accessToken: accessTokenOrPlaceholder,
+					provider,
+					endpointUrl: opts?.endpointUrl ?? (provider === "auto" ? HF_ROUTER_AUTO_ENDPOINT : undefined),
+					...inputs,
+				} as RequestArgs,
+				inferenceProviderMapping,
+				{
+					task,
+					billTo: opts?.billTo,
+				},
+			);
+
+			/// Parse request.info.body if not a binary.
+			/// This is the body sent to the provider. Important for snippets with raw payload (e.g curl, requests, etc.)
+			let providerInputs = inputs;
+			const bodyAsObj = request.info.body;
+			if (typeof bodyAsObj === "string") {
+				try {
+					providerInputs = JSON.parse(bodyAsObj);
+				} catch (e) {
+					logger.error("Failed to parse body as JSON", e);
+				}
+			}
+
+			// Inputs for the "auto" route is strictly the same as "inputs", except the model includes the provider
+			// If not "auto" route, use the providerInputs
+			const autoInputs =
+				!opts?.endpointUrl && !opts?.directRequest
 					? provider !== "auto"
-						? `${model.id}:${provider}` // e.g. "moonshotai/Kimi-K2-Instruct:groq"
-						: model.id
-					: (providerModelId ?? model.id),
-			billTo: opts?.billTo,
-			endpointUrl: opts?.endpointUrl,
-			task,
-			directRequest: !!opts?.directRequest,
-		};
-
-		/// Iterate over clients => check if a snippet exists => generate
-		const clients = provider === "auto" && task !== "conversational" ? CLIENTS_NON_CONVERSATIONAL_AUTO_POLICY : CLIENTS;
-		return inferenceSnippetLanguages
-			.map((language) => {
-				const langClients = clients[language] ?? [];
-				return langClients
-					.map((client) => {
-						if (!hasTemplate(language, client, templateName)) {
-							return;
-						}
-						const template = loadTemplate(language, client, templateName);
-						if (client === "huggingface_hub" && templateName.includes("basic")) {
-							if (!(model.pipeline_tag && model.pipeline_tag in HF_PYTHON_METHODS)) {
+						? {
+								...inputs,
+								model: `${model.id}:${provider}`,
+							}
+						: {
+								...inputs,
+								model: `${model.id}`, // if no :provider => auto
+							}
+					: providerInputs;
+
+			/// Prepare template injection data
+			const params: TemplateParams = {
+				accessToken: accessTokenOrPlaceholder,
+				authorizationHeader: (request.info.headers as Record<string, string>)?.Authorization,
+				baseUrl:
+					task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
+						? HF_ROUTER_AUTO_ENDPOINT
+						: removeSuffix(request.url, "/chat/completions"),
+				fullUrl:
+					task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
+						? HF_ROUTER_AUTO_ENDPOINT + "/chat/completions"
+						: request.url,
+				inputs: formattedInputs,
+				providerInputs: providerInputs === inputs ? formattedInputs : formatInputs(providerInputs),
+				autoInputs: autoInputs === inputs ? formattedInputs : formatInputs(autoInputs),
+				model,
+				provider,
+				providerModelId:
+					task === "conversational" && !opts?.endpointUrl && !opts?.directRequest
+						? provider !== "auto"
+							? `${model.id}:${provider}` // e.g. "moonshotai/Kimi-K2-Instruct:groq"
+							: model.id
+						: (providerModelId ?? model.id),
+				billTo: opts?.billTo,
+				endpointUrl: opts?.endpointUrl,
+				task,
+				directRequest: !!opts?.directRequest,
+			};
+
+			/// Iterate over clients => check if a snippet exists => generate
+			const clients =
+				provider === "auto" && task !== "conversational" ? CLIENTS_NON_CONVERSATIONAL_AUTO_POLICY : CLIENTS;
+			return inferenceSnippetLanguages
+				.map((language) => {
+					const langClients = clients[language] ?? [];
+					return langClients
+						.map((client) => {
+							if (!hasTemplate(language, client, templateName)) {
 								return;
 							}
-							params["methodName"] = HF_PYTHON_METHODS[model.pipeline_tag];
-						}
+							const template = getCompiledTemplate(language, client, templateName);
+							if (client === "huggingface_hub" && templateName.includes("basic")) {
+								if (!(model.pipeline_tag && model.pipeline_tag in HF_PYTHON_METHODS)) {
+									return;
+								}
+								params["methodName"] = HF_PYTHON_METHODS[model.pipeline_tag];
+							}
 
-						if (client === "huggingface.js" && templateName.includes("basic")) {
-							if (!(model.pipeline_tag && model.pipeline_tag in HF_JS_METHODS)) {
+							if (client === "huggingface.js" && templateName.includes("basic")) {
+								if (!(model.pipeline_tag && model.pipeline_tag in HF_JS_METHODS)) {
+									return;
+								}
+								params["methodName"] = HF_JS_METHODS[model.pipeline_tag];
+							}
+
+							/// Generate snippet
+							let snippet = template.render({ ...params }).trim();
+							if (!snippet) {
 								return;
 							}
-							params["methodName"] = HF_JS_METHODS[model.pipeline_tag];
-						}
-
-						/// Generate snippet
-						let snippet = template(params).trim();
-						if (!snippet) {
-							return;
-						}
-
-						/// Add import section separately
-						if (client === "huggingface_hub") {
-							const importSection = snippetImportPythonInferenceClient({ ...params });
-							snippet = `${importSection}\n\n${snippet}`;
-						} else if (client === "requests") {
-							const importSection = snippetImportRequests({
-								...params,
-								importBase64: snippet.includes("base64"),
-								importJson: snippet.includes("json."),
-							});
-							snippet = `${importSection}\n\n${snippet}`;
-						}
-
-						/// Replace access token placeholder
-						if (snippet.includes(placeholder)) {
-							snippet = replaceAccessTokenPlaceholder(
-								opts?.directRequest,
-								placeholder,
-								snippet,
-								language,
-								provider,
-								opts?.endpointUrl,
-							);
-						}
-
-						/// Snippet is ready!
-						return { language, client: client as string, content: snippet };
-					})
-					.filter((snippet): snippet is InferenceSnippet => snippet !== undefined);
-			})
-			.flat();
+
+							/// Add import section separately
+							if (client === "huggingface_hub") {
+								const importSection = snippetImportPythonInferenceClient({ ...params });
+								snippet = `${importSection}\n\n${snippet}`;
+							} else if (client === "requests") {
+								const importSection = snippetImportRequests({
+									...params,
+									importBase64: snippet.includes("base64"),
+									importJson: snippet.includes("json."),
+								});
+								snippet = `${importSection}\n\n${snippet}`;
+							}
+
+							/// Replace access token placeholder
+							if (snippet.includes(placeholder)) {
+								snippet = replaceAccessTokenPlaceholder(
+									opts?.directRequest,
+									placeholder,
+									snippet,
+									language,
+									provider,
+									opts?.endpointUrl,
+								);
+							}
+
+							/// Snippet is ready!
+							return { language, client: client as string, content: snippet };
+						})
+						.filter((snippet): snippet is InferenceSnippet => snippet !== undefined);
+				})
+				.flat();
+		});
 	};
 };
 
@@ -374,17 +390,7 @@ const prepareTableQuestionAnsweringInput = (model: ModelDataMinimal): object =>
 	return { query: data.query, table: JSON.stringify(data.table) };
 };
 
-const snippets: Partial<
-	Record<
-		PipelineType,
-		(
-			model: ModelDataMinimal,
-			provider: InferenceProviderOrPolicy,
-			inferenceProviderMapping?: InferenceProviderMappingEntry,
-			opts?: InferenceSnippetOptions,
-		) => InferenceSnippet[]
-	>
-> = {
+const snippets: Partial<Record<PipelineType, SnippetGenerator>> = {
 	"audio-classification": snippetGenerator("basicAudio"),
 	"audio-to-audio": snippetGenerator("basicAudio"),
 	"automatic-speech-recognition": snippetGenerator("basicAudio"),
@@ -424,13 +430,37 @@ export function getInferenceSnippets(
 	inferenceProviderMapping?: InferenceProviderMappingEntry,
 	opts?: Record<string, unknown>,
 ): InferenceSnippet[] {
-	return model.pipeline_tag && model.pipeline_tag in snippets
-		? (snippets[model.pipeline_tag]?.(model, provider, inferenceProviderMapping, opts) ?? [])
-		: [];
+	return getInferenceSnippetsForProviders(model, [{ provider, inferenceProviderMapping }], opts)[0];
+}
+
+/**
+ * Generates the snippets of a model for several providers at once, in all languages and clients.
+ *
+ * The inputs of the model are only prepared once, and the templates are shared by all snippets.
+ *
+ * @returns the snippets of each provider, in the order of `targets`
+ */
+export function getInferenceSnippetsForProviders(
+	model: ModelDataMinimal,
+	targets: InferenceSnippetTarget[],
+	opts?: Record<string, unknown>,
+): InferenceSnippet[][] {
+	const generator = model.pipeline_tag ? snippets[model.pipeline_tag] : undefined;
+	return generator ? generator(model, targets, opts) : targets.map(() => []);
 }
 
 // String manipulation helpers
 
+function formatInputs(obj: object): TemplateParams["inputs"] {
+	return {
+		asObj: obj,
+		asCurlString: formatBody(obj, "curl"),
+		asJsonString: formatBody(obj, "json"),
+		asPythonString: formatBody(obj, "python"),
+		asTsString: formatBody(obj, "ts"),
+	};
+}
+
 function formatBody(obj: object, format: "curl" | "json" | "python" | "ts"): string {
 	switch (format) {
 		case "curl":
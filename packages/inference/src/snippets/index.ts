@@ -1 +1,6 @@
-export { getInferenceSnippets, type InferenceSnippetOptions } from "./getInferenceSnippets.js";
+export {
+	getInferenceSnippets,
+	getInferenceSnippetsForProviders,
+	type InferenceSnippetOptions,
+	type InferenceSnippetTarget,
+} from "./getInferenceSnippets.js";
@@ -1,4 +1,5 @@
 import type { ChatCompletionInput, PipelineType, WidgetType } from "@huggingface/tasks";
+import type { RetryBudget } from "./lib/retry.js";
 
 /**
  * HF model id, like "meta-llama/Llama-3.3-70B-Instruct"
@@ -13,12 +14,61 @@ export interface Logger {
 	log: (message: string, ...args: unknown[]) => void;
 }
 
+export interface RetryEvent {
+	url: string;
+	/** The attempt that failed, starting at 1 */
+	attempt: number;
+	/** Delay before the next attempt */
+	delayMs: number;
+	/** Status of the failed attempt, if it got a response */
+	status?: number;
+	/** Network error of the failed attempt, if it didn't get a response */
+	error?: unknown;
+}
+
+export interface RetryOptions {
+	/**
+	 * (Default: 10) Max number of attempts, including the first one.
+	 */
+	maxAttempts?: number;
+	/**
+	 * (Default: 500) Base delay between attempts in ms, doubled after each attempt. The actual delay is random between 0 and it (full jitter).
+	 */
+	baseDelayMs?: number;
+	/**
+	 * (Default: 30_000) Max delay between attempts in ms. A longer `Retry-After` stops the retries.
+	 */
+	maxDelayMs?: number;
+	/**
+	 * (Default: 300_000) Max total time in ms, no retry is made if it would start after it.
+	 */
+	maxElapsedMs?: number;
+	/**
+	 * (Default: [429, 502, 503, 504]) HTTP statuses to retry. Network errors are always retried.
+	 */
+	statuses?: number[];
+	/**
+	 * Retry budget to use, to share between clients. By default, a global budget is shared by all requests.
+	 */
+	budget?: RetryBudget;
+	/**
+	 * Called before each retry, eg for metrics.
+	 */
+	onRetry?: (event: RetryEvent) => void;
+}
+
 export interface Options {
 	/**
-	 * (Default: true) Boolean. If a request 503s, the request will be retried with the same parameters.
+	 * (Default: true) Boolean. If a request fails with a transient error (eg 503), the request will be retried with the same parameters,
+	 * following the `retry` policy.
 	 */
 	retry_on_error?: boolean;
 
+	/**
+	 * Retry policy for transient errors: exponential backoff with jitter, honoring `Retry-After`.
+	 */
+	retry?: RetryOptions;
+
 	/**
 	 * Custom fetch function to use instead of the default one, for example to use a proxy or edit headers.
 	 */
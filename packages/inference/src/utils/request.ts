@@ -1,5 +1,6 @@
 import type { getProviderHelper } from "../lib/getProviderHelper.js";
 import { makeRequestOptions } from "../lib/makeRequestOptions.js";
+import { fetchWithRetries } from "../lib/retry.js";
 import type { InferenceTask, Options, RequestArgs } from "../types.js";
 import type { EventSourceMessage } from "../vendor/fetch-event-source/parse.js";
 import { getLines, getMessages } from "../vendor/fetch-event-source/parse.js";
@@ -47,14 +48,10 @@ export async function innerRequest<T>(
 	},
 ): Promise<ResponseWrapper<T>> {
 	const { url, info } = await makeRequestOptions(args, providerHelper, options);
-	const response = await (options?.fetch ?? fetch)(url, info);
+	const response = await fetchWithRetries(url, info, options);
 
 	const requestContext: ResponseWrapper<T>["requestContext"] = { url, info };
 
-	if (options?.retry_on_error !== false && response.status === 503) {
-		return innerRequest(args, providerHelper, options);
-	}
-
 	if (!response.ok) {
 		const contentType = response.headers.get("Content-Type");
 		if (["application/json", "application/problem+json"].some((ct) => contentType?.startsWith(ct))) {
@@ -133,11 +130,8 @@ export async function* innerStreamingRequest<T>(
 	},
 ): AsyncGenerator<T> {
 	const { url, info } = await makeRequestOptions({ ...args, stream: true }, providerHelper, options);
-	const response = await (options?.fetch ?? fetch)(url, info);
+	const response = await fetchWithRetries(url, info, options);
 
-	if (options?.retry_on_error !== false && response.status === 503) {
-		return yield* innerStreamingRequest(args, providerHelper, options);
-	}
 	if (!response.ok) {
 		if (response.headers.get("Content-Type")?.startsWith("application/json")) {
 			const output = await response.json();
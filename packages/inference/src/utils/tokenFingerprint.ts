@@ -0,0 +1,15 @@
+/**
+ * Short, non-reversible fingerprint of an access token, to key cached values by token without storing the token.
+ *
+ * Two 32-bit FNV-1a hashes with different offsets. Not a cryptographic hash: only meant to tell tokens apart.
+ */
+export function tokenFingerprint(token: string): string {
+	let h1 = 0x811c9dc5;
+	let h2 = 0x050c5d1f;
+	for (let i = 0; i < token.length; i++) {
+		const c = token.charCodeAt(i);
+		h1 = Math.imul(h1 ^ c, 0x01000193);
+		h2 = Math.imul(h2 ^ c, 0x01000193);
+	}
+	return (h1 >>> 0).toString(16).padStart(8, "0") + (h2 >>> 0).toString(16).padStart(8, "0");
+}
@@ -0,0 +1,70 @@
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+import type { AsyncCacheEntry } from "../src/lib/cache.js";
+import { AsyncCache } from "../src/lib/cache.js";
+
+describe("AsyncCache", () => {
+	beforeEach(() => {
+		vi.useFakeTimers();
+	});
+	afterEach(() => {
+		vi.useRealTimers();
+	});
+
+	it("shares one load between concurrent calls", async () => {
+		const cache = new AsyncCache<number>();
+		const load = vi.fn(async () => 42);
+
+		const values = await Promise.all([cache.get("a", load), cache.get("a", load), cache.get("a", load)]);
+
+		expect(values).toEqual([42, 42, 42]);
+		expect(load).toHaveBeenCalledTimes(1);
+		expect(cache.stats).toMatchObject({ misses: 1, coalesced: 2 });
+	});
+
+	it("doesn't cache failed loads", async () => {
+		const cache = new AsyncCache<number>();
+
+		await expect(cache.get("a", async () => Promise.reject(new Error("boom")))).rejects.toThrow("boom");
+		expect(await cache.get("a", async () => 1)).toBe(1);
+	});
+
+	it("evicts the least recently used values", async () => {
+		const cache = new AsyncCache<string>({ maxEntries: 2 });
+		await cache.get("a", async () => "a");
+		await cache.get("b", async () => "b");
+		await cache.get("a", async () => "a2");
+		await cache.get("c", async () => "c");
+
+		expect(await cache.get("a", async () => "a3")).toBe("a");
+		expect(await cache.get("b", async () => "b2")).toBe("b2");
+		expect(cache.size).toBe(2);
+		expect(cache.stats.evictions).toBe(2);
+	});
+
+	it("serves stale values while revalidating, then expires them", async () => {
+		const cache = new AsyncCache<number>({ ttlMs: 1000, staleWhileRevalidateMs: 1000 });
+		await cache.get("a", async () => 1);
+
+		vi.advanceTimersByTime(1500);
+		expect(await cache.get("a", async () => 2)).toBe(1);
+		expect(cache.stats.staleHits).toBe(1);
+		await vi.waitFor(async () => expect(await cache.get("a", async () => 3)).toBe(2));
+
+		vi.advanceTimersByTime(2500);
+		expect(await cache.get("a", async () => 4)).toBe(4);
+	});
+
+	it("reads and writes the persistent store", async () => {
+		const stored = new Map<string, AsyncCacheEntry<number>>([["a", { value: 1, storedAt: Date.now() }]]);
+		const store = {
+			get: vi.fn(async (key: string) => stored.get(key)),
+			set: vi.fn(async (key: string, entry: AsyncCacheEntry<number>) => void stored.set(key, entry)),
+		};
+		const cache = new AsyncCache<number>({ store });
+
+		expect(await cache.get("a", async () => 2)).toBe(1);
+		expect(await cache.get("b", async () => 3)).toBe(3);
+		expect(stored.get("b")?.value).toBe(3);
+		expect(cache.stats).toMatchObject({ hits: 1, misses: 1 });
+	});
+});
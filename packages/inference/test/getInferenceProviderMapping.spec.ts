@@ -0,0 +1,48 @@
+import { describe, expect, it } from "vitest";
+import { fetchInferenceProviderMappingForModel } from "../src/lib/getInferenceProviderMapping.js";
+
+describe("fetchInferenceProviderMappingForModel", () => {
+	/** Hub where the model is gated: only requests with a token get its mapping */
+	const gatedModelFetch = async (_url: RequestInfo, init?: RequestInit) => {
+		const headers = init?.headers as Record<string, string>;
+		if (!headers.Authorization) {
+			return Response.json({ error: "Access to model is restricted" }, { status: 401 });
+		}
+		return Response.json({
+			inferenceProviderMapping: [
+				{
+					provider: "together",
+					hfModelId: "org/gated",
+					providerId: headers.Authorization,
+					status: "live",
+					task: "conversational",
+				},
+			],
+		});
+	};
+
+	it("doesn't share a load or its error between callers with different tokens", async () => {
+		const [anonymous, authenticated] = await Promise.allSettled([
+			fetchInferenceProviderMappingForModel("org/gated-concurrent", undefined, { fetch: gatedModelFetch }),
+			fetchInferenceProviderMappingForModel("org/gated-concurrent", "hf_valid", { fetch: gatedModelFetch }),
+		]);
+
+		expect(anonymous.status).toBe("rejected");
+		expect(authenticated).toMatchObject({ status: "fulfilled", value: [{ providerId: "Bearer hf_valid" }] });
+	});
+
+	it("caches the mappings by token", async () => {
+		const first = await fetchInferenceProviderMappingForModel("org/gated-by-token", "hf_first", {
+			fetch: gatedModelFetch,
+		});
+		const second = await fetchInferenceProviderMappingForModel("org/gated-by-token", "hf_second", {
+			fetch: gatedModelFetch,
+		});
+
+		expect(first[0].providerId).toBe("Bearer hf_first");
+		expect(second[0].providerId).toBe("Bearer hf_second");
+		await expect(
+			fetchInferenceProviderMappingForModel("org/gated-by-token", undefined, { fetch: gatedModelFetch }),
+		).rejects.toThrow("restricted");
+	});
+});
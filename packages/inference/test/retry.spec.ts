@@ -0,0 +1,138 @@
+import { describe, expect, it, vi } from "vitest";
+import { fetchWithRetries, parseRetryAfter, RetryBudget } from "../src/lib/retry.js";
+
+function mockFetch(...statuses: Array<number | Error>) {
+	return vi.fn<Parameters<typeof fetch>, ReturnType<typeof fetch>>(async () => {
+		const status = statuses.shift() ?? 200;
+		if (status instanceof Error) {
+			throw status;
+		}
+		return new Response(status === 200 ? "ok" : "error", { status });
+	});
+}
+
+describe("fetchWithRetries", () => {
+	it("retries transient failures with backoff until success", async () => {
+		const fetch = mockFetch(503, new TypeError("fetch failed"), 502, 200);
+		const onRetry = vi.fn();
+
+		const response = await fetchWithRetries(
+			"https://example.com",
+			{},
+			{ fetch, retry: { baseDelayMs: 1, budget: new RetryBudget(), onRetry } },
+		);
+
+		expect(response.status).toBe(200);
+		expect(fetch).toHaveBeenCalledTimes(4);
+		expect(onRetry.mock.calls.map(([event]) => [event.attempt, event.status])).toEqual([
+			[1, 503],
+			[2, undefined],
+			[3, 502],
+		]);
+	});
+
+	it("returns the last response after maxAttempts", async () => {
+		const fetch = mockFetch(503, 503, 503, 503);
+
+		const response = await fetchWithRetries(
+			"https://example.com",
+			{},
+			{ fetch, retry: { baseDelayMs: 1, maxAttempts: 3, budget: new RetryBudget() } },
+		);
+
+		expect(response.status).toBe(503);
+		expect(fetch).toHaveBeenCalledTimes(3);
+	});
+
+	it("doesn't retry non-transient errors, or when retry_on_error is false", async () => {
+		const fetch = mockFetch(400, 503);
+
+		expect((await fetchWithRetries("https://example.com", {}, { fetch })).status).toBe(400);
+		expect((await fetchWithRetries("https://example.com", {}, { fetch, retry_on_error: false })).status).toBe(503);
+		expect(fetch).toHaveBeenCalledTimes(2);
+	});
+
+	it("gives up when the retry budget is exhausted", async () => {
+		const budget = new RetryBudget({ ratio: 0, minRetriesPerSecond: 0, maxTokens: 2 });
+		const fetch = mockFetch(503, 503, 503, 503);
+
+		const response = await fetchWithRetries("https://example.com", {}, { fetch, retry: { baseDelayMs: 1, budget } });
+
+		expect(response.status).toBe(503);
+		expect(fetch).toHaveBeenCalledTimes(3);
+		expect(budget.tokens).toBe(0);
+	});
+
+	it("waits through the backoff with a timer that keeps the process alive", async () => {
+		const setTimeoutSpy = vi.spyOn(globalThis, "setTimeout");
+		let calls = 0;
+		const fetch = vi.fn<Parameters<typeof fetch>, ReturnType<typeof fetch>>(async () =>
+			calls++ === 0 ? new Response("", { status: 503, headers: { "Retry-After": "0.05" } }) : new Response("ok"),
+		);
+
+		try {
+			const start = Date.now();
+			const response = await fetchWithRetries(
+				"https://example.com",
+				{},
+				{ fetch, retry: { budget: new RetryBudget() } },
+			);
+
+			expect(response.status).toBe(200);
+			expect(fetch).toHaveBeenCalledTimes(2);
+			expect(Date.now() - start).toBeGreaterThanOrEqual(45);
+
+			const backoff = setTimeoutSpy.mock.calls.findIndex(([, ms]) => ms === 50);
+			expect(backoff).not.toBe(-1);
+			const timer: unknown = setTimeoutSpy.mock.results[backoff].value;
+			if (typeof timer === "object" && timer !== null && "hasRef" in timer && typeof timer.hasRef === "function") {
+				expect(timer.hasRef()).toBe(true);
+			}
+		} finally {
+			setTimeoutSpy.mockRestore();
+		}
+	});
+
+	it("stops waiting when aborted during the backoff", async () => {
+		const controller = new AbortController();
+		const fetch = vi.fn<Parameters<typeof fetch>, ReturnType<typeof fetch>>(
+			async () => new Response("", { status: 503, headers: { "Retry-After": "10" } }),
+		);
+
+		const promise = fetchWithRetries(
+			"https://example.com",
+			{},
+			{ fetch, signal: controller.signal, retry: { budget: new RetryBudget() } },
+		);
+		setTimeout(() => controller.abort(), 10);
+
+		await expect(promise).rejects.toThrow(/abort/i);
+		expect(fetch).toHaveBeenCalledTimes(1);
+	});
+
+	it("gives up when Retry-After is longer than maxDelayMs", async () => {
+		const fetch = vi.fn<Parameters<typeof fetch>, ReturnType<typeof fetch>>(
+			async () => new Response("", { status: 429, headers: { "Retry-After": "120" } }),
+		);
+
+		const response = await fetchWithRetries(
+			"https://example.com",
+			{},
+			{ fetch, retry: { maxDelayMs: 10_000, budget: new RetryBudget() } },
+		);
+
+		expect(response.status).toBe(429);
+		expect(fetch).toHaveBeenCalledTimes(1);
+	});
+});
+
+describe("parseRetryAfter", () => {
+	it("parses seconds and HTTP dates", () => {
+		const now = Date.parse("Wed, 21 Oct 2015 07:28:00 GMT");
+		expect(parseRetryAfter("3", now)).toBe(3000);
+		expect(parseRetryAfter("Wed, 21 Oct 2015 07:28:30 GMT", now)).toBe(30_000);
+		expect(parseRetryAfter("Wed, 21 Oct 2015 07:27:00 GMT", now)).toBe(0);
+		expect(parseRetryAfter("soon", now)).toBeUndefined();
+		expect(parseRetryAfter(null, now)).toBeUndefined();
+	});
+});
@@ -0,0 +1,471 @@
+import type {
+	ArrayLiteral,
+	BinaryExpression,
+	CallExpression,
+	FloatLiteral,
+	For,
+	Identifier,
+	If,
+	IntegerLiteral,
+	MemberExpression,
+	ObjectLiteral,
+	Program,
+	SelectExpression,
+	SetStatement,
+	Statement,
+	StringLiteral,
+	Ternary,
+	TestExpression,
+	TupleLiteral,
+	UnaryExpression,
+} from "./ast";
+import type { AnyRuntimeValue } from "./runtime";
+import {
+	applyBinaryOperator,
+	applyUnaryOperator,
+	ArrayValue,
+	BooleanValue,
+	BreakControl,
+	ContinueControl,
+	Environment,
+	FloatValue,
+	FunctionValue,
+	getMemberValue,
+	IntegerValue,
+	Interpreter,
+	NullValue,
+	ObjectValue,
+	setupGlobals,
+	StringValue,
+	TupleValue,
+	UndefinedValue,
+} from "./runtime";
+
+export type Evaluator = (environment: Environment) => AnyRuntimeValue;
+export type Renderer = (environment: Environment) => string;
+
+export type CompiledTemplate = (items?: Record<string, unknown>) => string;
+
+let globals: Environment | undefined;
+
+/**
+ * The global variables, set up once and shared by all renders as the parent scope.
+ *
+ * Templates can't modify it: assignments go to the render's own scope.
+ */
+function getGlobals(): Environment {
+	if (!globals) {
+		globals = new Environment();
+		setupGlobals(globals);
+	}
+	return globals;
+}
+
+function isTruthy(value: AnyRuntimeValue): boolean {
+	return value instanceof BooleanValue ? value.value : value.__bool__().value;
+}
+
+function toOutput(value: AnyRuntimeValue): string {
+	return value.type === "NullValue" || value.type === "UndefinedValue" ? "" : value.toString();
+}
+
+/**
+ * Interpreter whose nodes are compiled once to closures, instead of being dispatched on their type at every evaluation.
+ *
+ * The closures of the common nodes call each other directly and skip the intermediate runtime values where possible
+ * (eg blocks render to plain strings). The other nodes fall back to the tree-walking implementation, whose nested
+ * evaluations still go through the compiled closures.
+ */
+export class CompilingInterpreter extends Interpreter {
+	private readonly evaluators = new WeakMap<Statement, Evaluator>();
+
+	override evaluate(statement: Statement | undefined, environment: Environment): AnyRuntimeValue {
+		if (!statement) {
+			return new UndefinedValue();
+		}
+		return this.compileNode(statement)(environment);
+	}
+
+	compileNode(node: Statement): Evaluator {
+		let evaluator = this.evaluators.get(node);
+		if (!evaluator) {
+			evaluator = this.createEvaluator(node);
+			this.evaluators.set(node, evaluator);
+		}
+		return evaluator;
+	}
+
+	compileBlock(statements: Statement[]): Renderer {
+		const renderers = statements.map((statement) => this.compileStatement(statement));
+		switch (renderers.length) {
+			case 0:
+				return () => "";
+			case 1:
+				return renderers[0];
+			default:
+				return (environment) => {
+					let result = "";
+					for (const render of renderers) {
+						result += render(environment);
+					}
+					return result;
+				};
+		}
+	}
+
+	private compileStatement(statement: Statement): Renderer {
+		switch (statement.type) {
+			case "StringLiteral": {
+				const text = (statement as StringLiteral).value;
+				return () => text;
+			}
+			case "If":
+				return this.compileIf(statement as If);
+			case "For":
+				return this.compileFor(statement as For);
+			case "Comment":
+				return () => "";
+			default: {
+				const evaluate = this.compileNode(statement);
+				return (environment) => toOutput(evaluate(environment));
+			}
+		}
+	}
+
+	private createEvaluator(node: Statement): Evaluator {
+		switch (node.type) {
+			case "Program": {
+				const render = this.compileBlock((node as Program).body);
+				return (environment) => new StringValue(render(environment));
+			}
+			case "If":
+			case "For": {
+				const render = this.compileStatement(node);
+				return (environment) => new StringValue(render(environment));
+			}
+			case "Set":
+				return this.compileSet(node as SetStatement);
+			case "Break":
+				return () => {
+					throw new BreakControl();
+				};
+			case "Continue":
+				return () => {
+					throw new ContinueControl();
+				};
+			case "Comment":
+				return () => new NullValue();
+
+			// Literals are immutable, so they are shared between evaluations
+			case "IntegerLiteral": {
+				const value = new IntegerValue((node as IntegerLiteral).value);
+				return () => value;
+			}
+			case "FloatLiteral": {
+				const value = new FloatValue((node as FloatLiteral).value);
+				return () => value;
+			}
+			case "StringLiteral": {
+				const value = new StringValue((node as StringLiteral).value);
+				return () => value;
+			}
+			case "ArrayLiteral": {
+				const items = (node as ArrayLiteral).value.map((item) => this.compileNode(item));
+				return (environment) => new ArrayValue(items.map((item) => item(environment)));
+			}
+			case "TupleLiteral": {
+				const items = (node as TupleLiteral).value.map((item) => this.compileNode(item));
+				return (environment) => new TupleValue(items.map((item) => item(environment)));
+			}
+			case "ObjectLiteral": {
+				const entries = [...(node as ObjectLiteral).value].map(
+					([key, value]) => [this.compileNode(key), this.compileNode(value)] as const,
+				);
+				return (environment) => {
+					const mapping = new Map<string, AnyRuntimeValue>();
+					for (const [key, value] of entries) {
+						const evaluatedKey = key(environment);
+						if (!(evaluatedKey instanceof StringValue)) {
+							throw new Error(`Object keys must be strings: got ${evaluatedKey.type}`);
+						}
+						mapping.set(evaluatedKey.value, value(environment));
+					}
+					return new ObjectValue(mapping);
+				};
+			}
+
+			case "Identifier": {
+				const name = (node as Identifier).value;
+				return (environment) => environment.lookupVariable(name);
+			}
+			case "MemberExpression":
+				return this.compileMemberExpression(node as MemberExpression);
+			case "CallExpression":
+				return this.compileCallExpression(node as CallExpression);
+			case "UnaryExpression": {
+				const operator = (node as UnaryExpression).operator.value;
+				const argument = this.compileNode((node as UnaryExpression).argument);
+				if (operator === "not") {
+					return (environment) => new BooleanValue(!argument(environment).value);
+				}
+				return (environment) => applyUnaryOperator(operator, argument(environment));
+			}
+			case "BinaryExpression":
+				return this.compileBinaryExpression(node as BinaryExpression);
+			case "TestExpression": {
+				const { operand, negate, test } = node as TestExpression;
+				const evaluateOperand = this.compileNode(operand);
+				return (environment) => {
+					const value = evaluateOperand(environment);
+					const testFunction = environment.tests.get(test.value);
+					if (!testFunction) {
+						throw new Error(`Unknown test: ${test.value}`);
+					}
+					const result = testFunction(value);
+					return new BooleanValue(negate ? !result : result);
+				};
+			}
+			case "SelectExpression": {
+				const lhs = this.compileNode((node as SelectExpression).lhs);
+				const test = this.compileNode((node as SelectExpression).test);
+				return (environment) => (isTruthy(test(environment)) ? lhs(environment) : new UndefinedValue());
+			}
+			case "Ternary": {
+				const condition = this.compileNode((node as Ternary).condition);
+				const trueExpr = this.compileNode((node as Ternary).trueExpr);
+				const falseExpr = this.compileNode((node as Ternary).falseExpr);
+				return (environment) => (isTruthy(condition(environment)) ? trueExpr(environment) : falseExpr(environment));
+			}
+			default:
+				// Macros, call blocks, filters, slices...
+				return (environment) => super.evaluate(node, environment);
+		}
+	}
+
+	private compileIf(node: If): Renderer {
+		const test = this.compileNode(node.test);
+		const body = this.compileBlock(node.body);
+		const alternate = this.compileBlock(node.alternate);
+		return (environment) => (isTruthy(test(environment)) ? body(environment) : alternate(environment));
+	}
+
+	private compileFor(node: For): Renderer {
+		let iterableNode = node.iterable;
+		let test: Evaluator | undefined;
+		if (iterableNode.type === "SelectExpression") {
+			test = this.compileNode((iterableNode as SelectExpression).test);
+			iterableNode = (iterableNode as SelectExpression).lhs;
+		}
+		const evaluateIterable = this.compileNode(iterableNode);
+		const body = this.compileBlock(node.body);
+		const defaultBlock = this.compileBlock(node.defaultBlock);
+
+		const loopvar = node.loopvar;
+		let assignLoopVariables: (scope: Environment, current: AnyRuntimeValue) => void;
+		let checkUnpacking: ((current: AnyRuntimeValue) => void) | undefined;
+		if (loopvar.type === "Identifier") {
+			const name = (loopvar as Identifier).value;
+			assignLoopVariables = (scope, current) => scope.setVariable(name, current);
+		} else if (loopvar.type === "TupleLiteral") {
+			const names = (loopvar as TupleLiteral).value;
+			checkUnpacking = (current) => {
+				if (current.type !== "ArrayValue") {
+					throw new Error(`Cannot unpack non-iterable type: ${current.type}`);
+				}
+				const length = (current as ArrayValue).value.length;
+				if (names.length !== length) {
+					throw new Error(`Too ${names.length > length ? "few" : "many"} items to unpack`);
+				}
+			};
+			assignLoopVariables = (scope, current) => {
+				const items = (current as ArrayValue).value;
+				for (let j = 0; j < names.length; ++j) {
+					if (names[j].type !== "Identifier") {
+						throw new Error(`Cannot unpack non-identifier type: ${names[j].type}`);
+					}
+					scope.setVariable((names[j] as Identifier).value, items[j]);
+				}
+			};
+		} else {
+			const invalidLoopVariables = () => {
+				throw new Error(`Invalid loop variable(s): ${loopvar.type}`);
+			};
+			checkUnpacking = invalidLoopVariables;
+			assignLoopVariables = invalidLoopVariables;
+		}
+
+		return (environment) => {
+			// Scope for the for loop
+			const scope = new Environment(environment);
+
+			let iterable = evaluateIterable(scope);
+			if (!(iterable instanceof ArrayValue || iterable instanceof ObjectValue)) {
+				throw new Error(`Expected iterable or object type in for loop: got ${iterable.type}`);
+			}
+			if (iterable instanceof ObjectValue) {
+				iterable = iterable.keys();
+			}
+
+			let items = iterable.value;
+			if (checkUnpacking) {
+				// Unpacking errors are raised before the first iteration
+				items.forEach(checkUnpacking);
+			}
+			if (test) {
+				const filterTest = test;
+				items = items.filter((current) => {
+					const loopScope = new Environment(scope);
+					assignLoopVariables(loopScope, current);
+					return isTruthy(filterTest(loopScope));
+				});
+			}
+
+			let result = "";
+			let noIteration = true;
+			for (let i = 0; i < items.length; ++i) {
+				const loop = new Map<string, AnyRuntimeValue>([
+					["index", new IntegerValue(i + 1)],
+					["index0", new IntegerValue(i)],
+					["revindex", new IntegerValue(items.length - i)],
+					["revindex0", new IntegerValue(items.length - i - 1)],
+					["first", new BooleanValue(i === 0)],
+					["last", new BooleanValue(i === items.length - 1)],
+					["length", new IntegerValue(items.length)],
+					["previtem", i > 0 ? items[i - 1] : new UndefinedValue()],
+					["nextitem", i < items.length - 1 ? items[i + 1] : new UndefinedValue()],
+				]);
+				scope.setVariable("loop", new ObjectValue(loop));
+				assignLoopVariables(scope, items[i]);
+
+				try {
+					result += body(scope);
+				} catch (err) {
+					if (err instanceof ContinueControl) {
+						continue;
+					}
+					if (err instanceof BreakControl) {
+						break;
+					}
+					throw err;
+				}
+				noIteration = false;
+			}
+
+			if (noIteration) {
+				result += defaultBlock(scope);
+			}
+			return result;
+		};
+	}
+
+	private compileSet(node: SetStatement): Evaluator {
+		if (node.assignee.type !== "Identifier") {
+			return (environment) => super.evaluate(node, environment);
+		}
+		const name = (node.assignee as Identifier).value;
+		if (node.value) {
+			const value = this.compileNode(node.value);
+			return (environment) => {
+				environment.setVariable(name, value(environment));
+				return new NullValue();
+			};
+		}
+		const body = this.compileBlock(node.body);
+		return (environment) => {
+			environment.setVariable(name, new StringValue(body(environment)));
+			return new NullValue();
+		};
+	}
+
+	private compileMemberExpression(node: MemberExpression): Evaluator {
+		if (node.computed && node.property.type === "SliceExpression") {
+			return (environment) => super.evaluate(node, environment);
+		}
+		const object = this.compileNode(node.object);
+		if (node.computed) {
+			const property = this.compileNode(node.property);
+			return (environment) => {
+				const evaluatedObject = object(environment);
+				return getMemberValue(evaluatedObject, property(environment));
+			};
+		}
+		const property =
+			node.property.type === "IntegerLiteral"
+				? new IntegerValue((node.property as IntegerLiteral).value)
+				: new StringValue((node.property as Identifier).value);
+		return (environment) => getMemberValue(object(environment), property);
+	}
+
+	private compileCallExpression(node: CallExpression): Evaluator {
+		if (node.args.some((arg) => arg.type === "SpreadExpression" || arg.type === "KeywordArgumentExpression")) {
+			return (environment) => super.evaluate(node, environment);
+		}
+		const args = node.args.map((arg) => this.compileNode(arg));
+		const callee = this.compileNode(node.callee);
+		return (environment) => {
+			const evaluatedArgs = args.map((arg) => arg(environment));
+			const fn = callee(environment);
+			if (fn.type !== "FunctionValue") {
+				throw new Error(`Cannot call something that is not a function: got ${fn.type}`);
+			}
+			return (fn as FunctionValue).value(evaluatedArgs, environment);
+		};
+	}
+
+	private compileBinaryExpression(node: BinaryExpression): Evaluator {
+		const operator = node.operator.value;
+		const left = this.compileNode(node.left);
+		const right = this.compileNode(node.right);
+		switch (operator) {
+			case "and":
+				return (environment) => {
+					const value = left(environment);
+					return isTruthy(value) ? right(environment) : value;
+				};
+			case "or":
+				return (environment) => {
+					const value = left(environment);
+					return isTruthy(value) ? value : right(environment);
+				};
+			case "==":
+				return (environment) => new BooleanValue(left(environment).value == right(environment).value);
+			case "!=":
+				return (environment) => new BooleanValue(left(environment).value != right(environment).value);
+			default:
+				return (environment) => {
+					const evaluatedLeft = left(environment);
+					return applyBinaryOperator(operator, evaluatedLeft, right(environment));
+				};
+		}
+	}
+}
+
+/**
+ * Compiles a parsed template to a render function.
+ *
+ * Rendering gives the same output as the {@link Interpreter}, with the node dispatch done once at compile time,
+ * and the globals set up once and shared by all renders.
+ */
+export function compile(program: Program): CompiledTemplate {
+	const interpreter = new CompilingInterpreter();
+	const render = interpreter.compileBlock(program.body);
+	return (items) => render(createRenderEnvironment(items));
+}
+
+/**
+ * Creates the environment of a render, with the user-defined variables, on top of the shared globals.
+ */
+export function createRenderEnvironment(items?: Record<string, unknown>): Environment {
+	const globals = getGlobals();
+	const environment = new Environment(globals);
+	if (items) {
+		for (const [key, value] of Object.entries(items)) {
+			// Like the interpreter, which declares the globals and the user-defined variables in the same environment
+			if (globals.variables.has(key)) {
+				throw new SyntaxError(`Variable already declared: ${key}`);
+			}
+			environment.set(key, value);
+		}
+	}
+	return environment;
+}
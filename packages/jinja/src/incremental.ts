@@ -0,0 +1,486 @@
+import type { For, Identifier, Macro, MemberExpression, Program, SetStatement } from "./ast";
+import { Statement } from "./ast";
+import type { Evaluator, Renderer } from "./compiler";
+import { CompilingInterpreter, createRenderEnvironment } from "./compiler";
+import type { Template } from "./index";
+import type { AnyRuntimeValue } from "./runtime";
+import {
+	ArrayValue,
+	BooleanValue,
+	ContinueControl,
+	Environment,
+	FunctionValue,
+	IntegerValue,
+	ObjectValue,
+	UndefinedValue,
+} from "./runtime";
+
+/**
+ * Properties of `loop` that don't depend on the items after the next one
+ */
+const PREFIX_LOOP_PROPERTIES = new Set(["index", "index0", "first", "last", "previtem", "nextitem"]);
+
+/**
+ * Globals whose value changes between renders
+ */
+const IMPURE_GLOBALS = new Set(["strftime_now"]);
+
+interface LoopPlan {
+	/** Statements before the loop */
+	pre: Renderer;
+	iterable: Evaluator;
+	loopvar: string;
+	body: Renderer;
+	/** Statements after the loop */
+	post: Renderer;
+	/** Variables that the loop body can read, directly or through macros */
+	referenced: Set<string>;
+	/** Macros defined before the loop, which are the same at every render */
+	macros: Set<string>;
+}
+
+interface Checkpoint {
+	/** Number of loop items rendered */
+	index: number;
+	output: string;
+	variables: Map<string, AnyRuntimeValue>;
+	loopVariables: Map<string, AnyRuntimeValue>;
+}
+
+interface RenderState {
+	preOutput: string;
+	preVariables: Map<string, AnyRuntimeValue>;
+	items: AnyRuntimeValue[];
+	checkpoint: Checkpoint;
+}
+
+/**
+ * Renders a template repeatedly with a growing list of items, typically the messages of a chat.
+ *
+ * The output of the main top-level loop of the template is checkpointed before its last item. When the next render
+ * starts with the same items, the state is restored from the checkpoint and only the remaining items are rendered,
+ * so a render costs about the same for the 200th message as for the 2nd.
+ *
+ * The output is always the same as with {@link Template.render}: renders fall back to a full render when the template
+ * has no such loop, when the loop body reads something that depends on the next items (eg `messages`, `loop.length`),
+ * or when the items or variables read by the loop changed since the last render.
+ *
+ * ```ts
+ * const renderer = new IncrementalRenderer(new Template(chatTemplate));
+ * renderer.render({ messages: messages.slice(0, 2), add_generation_prompt: true });
+ * // Only renders the last 3 messages
+ * renderer.render({ messages: messages.slice(0, 4), add_generation_prompt: true });
+ * ```
+ */
+export class IncrementalRenderer {
+	/**
+	 * Number of loop items whose output was reused by the last render
+	 */
+	reusedItems = 0;
+
+	private readonly plan?: LoopPlan;
+	private state?: RenderState;
+
+	constructor(readonly template: Template) {
+		this.plan = planLoop(template.parsed, new CompilingInterpreter());
+	}
+
+	render(items?: Record<string, unknown>): string {
+		this.reusedItems = 0;
+		const output = this.plan && this.renderIncrementally(this.plan, items);
+		if (output === undefined) {
+			this.state = undefined;
+			return this.template.render(items);
+		}
+		return output;
+	}
+
+	/**
+	 * Forgets the checkpoint, eg to free memory at the end of a chat
+	 */
+	reset(): void {
+		this.state = undefined;
+	}
+
+	/**
+	 * @returns the output, or undefined if the template must be rendered fully
+	 */
+	private renderIncrementally(plan: LoopPlan, items: Record<string, unknown> | undefined): string | undefined {
+		const environment = createRenderEnvironment(items);
+		const preOutput = plan.pre(environment);
+
+		const names = [...environment.variables.keys()].filter(
+			(name) => plan.referenced.has(name) && !plan.macros.has(name),
+		);
+		const holdsMessages = messagesChecker(environment.variables.get("messages"));
+		if (names.some((name) => holdsMessages(environment.variables.get(name) as AnyRuntimeValue))) {
+			return undefined;
+		}
+		const memo = new Map<AnyRuntimeValue, AnyRuntimeValue>();
+		const preVariables = cloneVariables(environment.variables, names, memo);
+		// The loop body could modify objects shared with variables that it doesn't read, which we don't restore
+		for (const [name, value] of environment.variables) {
+			if (!plan.referenced.has(name) && reaches(value, memo)) {
+				return undefined;
+			}
+		}
+
+		// Scope for the for loop
+		const scope = new Environment(environment);
+		const iterable = plan.iterable(scope);
+		if (!(iterable instanceof ArrayValue) || iterable.value.length === 0) {
+			return undefined;
+		}
+		const loopItems = iterable.value;
+
+		let start = 0;
+		let output = "";
+		const previous = this.state;
+		if (
+			previous &&
+			loopItems.length > previous.checkpoint.index &&
+			previous.preOutput === preOutput &&
+			variablesEqual(previous.preVariables, preVariables) &&
+			// Including the last item, which was the `nextitem` of the item before it
+			previous.items.every((item, i) => valuesEqual(item, loopItems[i]))
+		) {
+			const { checkpoint } = previous;
+			const restoreMemo = new Map<AnyRuntimeValue, AnyRuntimeValue>();
+			for (const [name, value] of checkpoint.variables) {
+				environment.setVariable(name, cloneValue(value, restoreMemo));
+			}
+			for (const [name, value] of checkpoint.loopVariables) {
+				scope.setVariable(name, cloneValue(value, restoreMemo));
+			}
+			start = checkpoint.index;
+			output = checkpoint.output;
+		}
+
+		let checkpoint: Checkpoint | undefined;
+		for (let i = start; i < loopItems.length; ++i) {
+			if (i === loopItems.length - 1) {
+				// Before the last item, whose output depends on the items after it (eg `loop.last`)
+				const checkpointMemo = new Map<AnyRuntimeValue, AnyRuntimeValue>();
+				checkpoint = {
+					index: i,
+					output,
+					variables: cloneVariables(environment.variables, names, checkpointMemo),
+					loopVariables: cloneVariables(
+						scope.variables,
+						[...scope.variables.keys()].filter((name) => name !== "loop" && name !== plan.loopvar),
+						checkpointMemo,
+					),
+				};
+			}
+
+			scope.setVariable("loop", loopObject(loopItems, i));
+			scope.setVariable(plan.loopvar, loopItems[i]);
+			try {
+				output += plan.body(scope);
+			} catch (err) {
+				if (err instanceof ContinueControl) {
+					continue;
+				}
+				throw err;
+			}
+		}
+
+		output = preOutput + output + plan.post(environment);
+		this.state = { preOutput, preVariables, items: loopItems, checkpoint: checkpoint as Checkpoint };
+		this.reusedItems = start;
+		return output;
+	}
+}
+
+function loopObject(items: AnyRuntimeValue[], i: number): ObjectValue {
+	return new ObjectValue(
+		new Map<string, AnyRuntimeValue>([
+			["index", new IntegerValue(i + 1)],
+			["index0", new IntegerValue(i)],
+			["revindex", new IntegerValue(items.length - i)],
+			["revindex0", new IntegerValue(items.length - i - 1)],
+			["first", new BooleanValue(i === 0)],
+			["last", new BooleanValue(i === items.length - 1)],
+			["length", new IntegerValue(items.length)],
+			["previtem", i > 0 ? items[i - 1] : new UndefinedValue()],
+			["nextitem", i < items.length - 1 ? items[i + 1] : new UndefinedValue()],
+		]),
+	);
+}
+
+/**
+ * Finds the first top-level for loop, and checks that its body only depends on the current and previous items
+ */
+function planLoop(program: Program, interpreter: CompilingInterpreter): LoopPlan | undefined {
+	const index = program.body.findIndex((statement) => statement.type === "For");
+	if (index === -1) {
+		return undefined;
+	}
+	const loop = program.body[index] as For;
+	if (loop.loopvar.type !== "Identifier" || loop.iterable.type === "SelectExpression" || loop.defaultBlock.length) {
+		return undefined;
+	}
+	const loopvar = (loop.loopvar as Identifier).value;
+
+	const macros = new Set<string>();
+	for (const statement of program.body.slice(0, index)) {
+		walk(statement, (node) => {
+			if (node.type === "Macro") {
+				macros.add((node as Macro).name.value);
+			}
+			return true;
+		});
+	}
+
+	// The body can call macros defined anywhere, which run in the scope of the loop
+	const referenced = new Set<string>();
+	const macroBodies: Statement[][] = [];
+	walk(program, (node) => {
+		if (node.type === "Macro") {
+			macroBodies.push((node as Macro).body);
+		}
+		return true;
+	});
+	for (const statements of [loop.body, ...macroBodies]) {
+		for (const statement of statements) {
+			if (!checkLoopBody(statement, loopvar, referenced)) {
+				return undefined;
+			}
+		}
+	}
+	if ([...referenced].some((name) => IMPURE_GLOBALS.has(name))) {
+		return undefined;
+	}
+
+	return {
+		pre: interpreter.compileBlock(program.body.slice(0, index)),
+		iterable: interpreter.compileNode(loop.iterable),
+		loopvar,
+		body: interpreter.compileBlock(loop.body),
+		post: interpreter.compileBlock(program.body.slice(index + 1)),
+		referenced,
+		macros,
+	};
+}
+
+/**
+ * Collects the variables read by the loop body, and checks that it doesn't break out of the loop, read `loop`
+ * properties that depend on the next items, or modify the items.
+ */
+function checkLoopBody(statement: Statement, loopvar: string, referenced: Set<string>): boolean {
+	let valid = true;
+	// Variables of the nested loops, which hold parts of the items
+	const itemVariables = new Set([loopvar]);
+	const check = (node: Statement, nested: boolean): boolean => {
+		switch (node.type) {
+			case "Break":
+				valid &&= nested;
+				return false;
+			case "For": {
+				const { loopvar: nestedLoopvar, iterable, body, defaultBlock } = node as For;
+				walk(nestedLoopvar, (identifier) => {
+					if (identifier.type === "Identifier") {
+						itemVariables.add((identifier as Identifier).value);
+					}
+					return true;
+				});
+				walk(iterable, (child) => check(child, nested));
+				for (const child of defaultBlock) {
+					walk(child, (grandchild) => check(grandchild, nested));
+				}
+				// `loop` is the nested loop's in its body
+				for (const child of body) {
+					walk(child, (grandchild) => check(grandchild, true));
+				}
+				return false;
+			}
+			case "Set": {
+				let assignee = (node as SetStatement).assignee;
+				while (assignee.type === "MemberExpression") {
+					assignee = (assignee as MemberExpression).object;
+				}
+				if (assignee.type === "Identifier" && itemVariables.has((assignee as Identifier).value)) {
+					valid &&= (node as SetStatement).assignee.type === "Identifier";
+				}
+				return true;
+			}
+			case "MemberExpression": {
+				const { object, property, computed } = node as MemberExpression;
+				if (object.type === "Identifier" && (object as Identifier).value === "loop" && !nested) {
+					valid &&= !computed && PREFIX_LOOP_PROPERTIES.has((property as Identifier).value);
+					return false;
+				}
+				if (!computed) {
+					walk(object, (child) => check(child, nested));
+					return false;
+				}
+				return true;
+			}
+			case "Identifier": {
+				const name = (node as Identifier).value;
+				valid &&= nested || name !== "loop";
+				referenced.add(name);
+				return true;
+			}
+			default:
+				return true;
+		}
+	};
+	walk(statement, (node) => check(node, false));
+	return valid;
+}
+
+/**
+ * Visits the node and its descendants, depth first. The visitor returns false to skip the descendants of a node.
+ */
+function walk(node: Statement, visit: (node: Statement) => boolean): void {
+	if (!visit(node)) {
+		return;
+	}
+	for (const value of Object.values(node)) {
+		if (value instanceof Statement) {
+			walk(value, visit);
+		} else if (Array.isArray(value)) {
+			for (const item of value) {
+				if (item instanceof Statement) {
+					walk(item, visit);
+				}
+			}
+		} else if (value instanceof Map) {
+			for (const [key, item] of value) {
+				walk(key, visit);
+				walk(item, visit);
+			}
+		}
+	}
+}
+
+/**
+ * @returns whether a value holds a list of messages, whose next items the loop body could read
+ */
+function messagesChecker(messages: AnyRuntimeValue | undefined): (value: AnyRuntimeValue) => boolean {
+	if (!(messages instanceof ArrayValue)) {
+		return () => false;
+	}
+	const messageItems = new Set(messages.value);
+	return (value) => {
+		const seen = new Set<AnyRuntimeValue>();
+		const visit = (current: AnyRuntimeValue): boolean => {
+			if (seen.has(current)) {
+				return false;
+			}
+			seen.add(current);
+			if (current instanceof ArrayValue) {
+				return current === messages || current.value.some((item) => messageItems.has(item) || visit(item));
+			}
+			if (current instanceof ObjectValue) {
+				return [...current.value.values()].some(visit);
+			}
+			return false;
+		};
+		return visit(value);
+	};
+}
+
+/**
+ * Whether the value holds one of the arrays or objects of the memo
+ */
+function reaches(value: AnyRuntimeValue, memo: Map<AnyRuntimeValue, AnyRuntimeValue>): boolean {
+	const seen = new Set<AnyRuntimeValue>();
+	const visit = (current: AnyRuntimeValue): boolean => {
+		if (!(current instanceof ArrayValue || current instanceof ObjectValue) || seen.has(current)) {
+			return false;
+		}
+		seen.add(current);
+		return memo.has(current) || [...current.value.values()].some(visit);
+	};
+	return visit(value);
+}
+
+function cloneVariables(
+	variables: Map<string, AnyRuntimeValue>,
+	names: string[],
+	memo: Map<AnyRuntimeValue, AnyRuntimeValue>,
+): Map<string, AnyRuntimeValue> {
+	const clone = new Map<string, AnyRuntimeValue>();
+	for (const name of names) {
+		const value = variables.get(name);
+		if (value) {
+			clone.set(name, cloneValue(value, memo));
+		}
+	}
+	return clone;
+}
+
+/**
+ * Deep copy of the arrays and objects, which templates can modify. The memo keeps the values shared between variables shared.
+ */
+function cloneValue(value: AnyRuntimeValue, memo: Map<AnyRuntimeValue, AnyRuntimeValue>): AnyRuntimeValue {
+	if (!(value instanceof ArrayValue || value instanceof ObjectValue)) {
+		return value;
+	}
+	let clone = memo.get(value);
+	if (!clone) {
+		if (value instanceof ArrayValue) {
+			const array: AnyRuntimeValue[] = [];
+			clone = new (value.constructor as typeof ArrayValue)(array);
+			memo.set(value, clone);
+			for (const item of value.value) {
+				array.push(cloneValue(item, memo));
+			}
+		} else {
+			const map = new Map<string, AnyRuntimeValue>();
+			clone = new (value.constructor as typeof ObjectValue)(map);
+			memo.set(value, clone);
+			for (const [key, item] of value.value) {
+				map.set(key, cloneValue(item, memo));
+			}
+		}
+	}
+	return clone;
+}
+
+function variablesEqual(a: Map<string, AnyRuntimeValue>, b: Map<string, AnyRuntimeValue>): boolean {
+	if (a.size !== b.size) {
+		return false;
+	}
+	for (const [name, value] of a) {
+		const other = b.get(name);
+		if (!other || !valuesEqual(value, other)) {
+			return false;
+		}
+	}
+	return true;
+}
+
+function valuesEqual(a: AnyRuntimeValue, b: AnyRuntimeValue): boolean {
+	if (a === b) {
+		return true;
+	}
+	if (a.type !== b.type) {
+		return false;
+	}
+	if (a instanceof ArrayValue) {
+		const other = (b as ArrayValue).value;
+		return a.value.length === other.length && a.value.every((item, i) => valuesEqual(item, other[i]));
+	}
+	if (a instanceof ObjectValue) {
+		const other = (b as ObjectValue).value;
+		if (a.value.size !== other.size) {
+			return false;
+		}
+		// Same keys in the same order, which matters for eg `items()` and `tojson`
+		const otherEntries = other.entries();
+		for (const [key, item] of a.value) {
+			const [otherKey, otherItem] = otherEntries.next().value as [string, AnyRuntimeValue];
+			if (key !== otherKey || !valuesEqual(item, otherItem)) {
+				return false;
+			}
+		}
+		return true;
+	}
+	if (a instanceof FunctionValue) {
+		return false;
+	}
+	return a.value === b.value;
+}
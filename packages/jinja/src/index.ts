@@ -16,22 +16,66 @@ import { Environment, Interpreter, setupGlobals } from "./runtime";
 import type { Program } from "./ast";
 import type { StringValue } from "./runtime";
 import { format } from "./format";
+import { compile } from "./compiler";
+import type { CompiledTemplate } from "./compiler";
+
+const TEMPLATE_CACHE_SIZE = 64;
+const templateCache = new Map<string, Template>();
 
 export class Template {
 	parsed: Program;
+	private compiled?: CompiledTemplate;
 
 	/**
 	 * @param {string} template The template string
+	 * @param options.compile Compile the template on creation, to make renders faster. See {@link Template.compile}.
 	 */
-	constructor(template: string) {
+	constructor(template: string, options?: { compile?: boolean }) {
 		const tokens = tokenize(template, {
 			lstrip_blocks: true,
 			trim_blocks: true,
 		});
 		this.parsed = parse(tokens);
+		if (options?.compile) {
+			this.compile();
+		}
+	}
+
+	/**
+	 * Gets a compiled template for the source, parsing and compiling it only if it's not in the cache.
+	 *
+	 * The cache holds the last 64 templates used, keyed by their source. Use it to render the same chat templates repeatedly.
+	 */
+	static fromCache(template: string): Template {
+		let cached = templateCache.get(template);
+		if (cached) {
+			// Move to the end, as the most recently used
+			templateCache.delete(template);
+		} else {
+			cached = new Template(template, { compile: true });
+			if (templateCache.size >= TEMPLATE_CACHE_SIZE) {
+				templateCache.delete(templateCache.keys().next().value as string);
+			}
+		}
+		templateCache.set(template, cached);
+		return cached;
+	}
+
+	/**
+	 * Compiles the template to closures, so that the following renders don't walk the syntax tree again.
+	 *
+	 * Worth it when the template is rendered more than a few times.
+	 */
+	compile(): this {
+		this.compiled ??= compile(this.parsed);
+		return this;
 	}
 
 	render(items?: Record<string, unknown>): string {
+		if (this.compiled) {
+			return this.compiled(items);
+		}
+
 		// Create a new environment for this template
 		const env = new Environment();
 		setupGlobals(env);
@@ -55,3 +99,4 @@ export class Template {
 }
 
 export { Environment, Interpreter, tokenize, parse };
+export { IncrementalRenderer } from "./incremental";
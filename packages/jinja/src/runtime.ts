@@ -41,8 +41,8 @@ export type AnyRuntimeValue =
 	| UndefinedValue;
 
 // Control-flow exceptions for loop break/continue
-class BreakControl extends Error {}
-class ContinueControl extends Error {}
+export class BreakControl extends Error {}
+export class ContinueControl extends Error {}
 
 const EMPTY_BUILTINS: ReadonlyMap<string, AnyRuntimeValue> = new Map();
 
@@ -567,20 +567,7 @@ export class Environment {
 	/**
 	 * The variables declared in this environment.
 	 */
-	variables: Map<string, AnyRuntimeValue> = new Map([
-		[
-			"namespace",
-			new FunctionValue((args) => {
-				if (args.length === 0) {
-					return new ObjectValue(new Map());
-				}
-				if (args.length !== 1 || !(args[0] instanceof ObjectValue)) {
-					throw new Error("`namespace` expects either zero arguments or a single object argument");
-				}
-				return args[0];
-			}),
-		],
-	]);
+	variables: Map<string, AnyRuntimeValue> = new Map([["namespace", NAMESPACE_FUNCTION]]);
 
 	/**
 	 * The tests available in this environment.
@@ -692,14 +679,30 @@ export class Environment {
 	}
 
 	lookupVariable(name: string): AnyRuntimeValue {
-		try {
-			return this.resolve(name).variables.get(name) ?? new UndefinedValue();
-		} catch {
-			return new UndefinedValue();
+		// eslint-disable-next-line @typescript-eslint/no-this-alias
+		for (let env: Environment | undefined = this; env; env = env.parent) {
+			const value = env.variables.get(name);
+			if (value) {
+				return value;
+			}
 		}
+		return new UndefinedValue();
 	}
 }
 
+/**
+ * Stateless, so shared by all environments
+ */
+const NAMESPACE_FUNCTION = new FunctionValue((args) => {
+	if (args.length === 0) {
+		return new ObjectValue(new Map());
+	}
+	if (args.length !== 1 || !(args[0] instanceof ObjectValue)) {
+		throw new Error("`namespace` expects either zero arguments or a single object argument");
+	}
+	return args[0];
+});
+
 export function setupGlobals(env: Environment): void {
 	// Declare global variables
 	env.set("false", false);
@@ -815,6 +818,166 @@ function compareRuntimeValues(a: AnyRuntimeValue, b: AnyRuntimeValue, caseSensit
 	}
 }
 
+/**
+ * Applies a non-logical binary operator to evaluated operands.
+ */
+export function applyBinaryOperator(operator: string, left: AnyRuntimeValue, right: AnyRuntimeValue): AnyRuntimeValue {
+	// Equality operators
+	switch (operator) {
+		case "==":
+			return new BooleanValue(left.value == right.value);
+		case "!=":
+			return new BooleanValue(left.value != right.value);
+	}
+
+	if (left instanceof UndefinedValue || right instanceof UndefinedValue) {
+		if (right instanceof UndefinedValue && ["in", "not in"].includes(operator)) {
+			// Special case: `anything in undefined` is `false` and `anything not in undefined` is `true`
+			return new BooleanValue(operator === "not in");
+		}
+		throw new Error(`Cannot perform operation ${operator} on undefined values`);
+	} else if (left instanceof NullValue || right instanceof NullValue) {
+		throw new Error("Cannot perform operation on null values");
+	} else if (operator === "~") {
+		// toString and concatenation
+		return new StringValue(left.value.toString() + right.value.toString());
+	} else if (
+		(left instanceof IntegerValue || left instanceof FloatValue) &&
+		(right instanceof IntegerValue || right instanceof FloatValue)
+	) {
+		// Evaulate pure numeric operations with binary operators.
+		const a = left.value,
+			b = right.value;
+		switch (operator) {
+			// Arithmetic operators
+			case "+":
+			case "-":
+			case "*": {
+				const res = operator === "+" ? a + b : operator === "-" ? a - b : a * b;
+				const isFloat = left instanceof FloatValue || right instanceof FloatValue;
+				return isFloat ? new FloatValue(res) : new IntegerValue(res);
+			}
+			case "/":
+				return new FloatValue(a / b);
+			case "//": {
+				// Floor division (rounds towards negative infinity, matching Python semantics)
+				const res = Math.floor(a / b);
+				const isFloat = left instanceof FloatValue || right instanceof FloatValue;
+				return isFloat ? new FloatValue(res) : new IntegerValue(res);
+			}
+			case "%": {
+				const rem = a % b;
+				const isFloat = left instanceof FloatValue || right instanceof FloatValue;
+				return isFloat ? new FloatValue(rem) : new IntegerValue(rem);
+			}
+			// Comparison operators
+			case "<":
+				return new BooleanValue(a < b);
+			case ">":
+				return new BooleanValue(a > b);
+			case ">=":
+				return new BooleanValue(a >= b);
+			case "<=":
+				return new BooleanValue(a <= b);
+		}
+	} else if (left instanceof ArrayValue && right instanceof ArrayValue) {
+		// Evaluate array operands with binary operator.
+		switch (operator) {
+			case "+":
+				return new ArrayValue(left.value.concat(right.value));
+		}
+	} else if (right instanceof ArrayValue) {
+		const member = right.value.find((x) => x.value === left.value) !== undefined;
+		switch (operator) {
+			case "in":
+				return new BooleanValue(member);
+			case "not in":
+				return new BooleanValue(!member);
+		}
+	}
+
+	if (left instanceof StringValue || right instanceof StringValue) {
+		// Support string concatenation as long as at least one operand is a string
+		switch (operator) {
+			case "+":
+				return new StringValue(left.value.toString() + right.value.toString());
+		}
+	}
+
+	if (left instanceof StringValue && right instanceof StringValue) {
+		switch (operator) {
+			case "in":
+				return new BooleanValue(right.value.includes(left.value));
+			case "not in":
+				return new BooleanValue(!right.value.includes(left.value));
+		}
+	}
+
+	if (left instanceof StringValue && right instanceof ObjectValue) {
+		switch (operator) {
+			case "in":
+				return new BooleanValue(right.value.has(left.value));
+			case "not in":
+				return new BooleanValue(!right.value.has(left.value));
+		}
+	}
+
+	throw new SyntaxError(`Unknown operator "${operator}" between ${left.type} and ${right.type}`);
+}
+
+/**
+ * Applies a unary operator to an evaluated operand.
+ */
+export function applyUnaryOperator(operator: string, argument: AnyRuntimeValue): AnyRuntimeValue {
+	switch (operator) {
+		case "not":
+			return new BooleanValue(!argument.value);
+		case "+":
+		case "-": {
+			const sign = operator === "-" ? -1 : 1;
+			if (argument instanceof IntegerValue || argument instanceof FloatValue || argument instanceof BooleanValue) {
+				const value = argument instanceof BooleanValue ? (argument.value ? 1 : 0) : argument.value;
+				const result = sign * value;
+				return argument instanceof FloatValue ? new FloatValue(result) : new IntegerValue(result);
+			}
+			throw new SyntaxError(`Unknown operator "${operator}" for ${argument.type}`);
+		}
+		default:
+			throw new SyntaxError(`Unknown operator: ${operator}`);
+	}
+}
+
+/**
+ * Gets a property of an evaluated object, or its item at an evaluated index.
+ */
+export function getMemberValue(object: AnyRuntimeValue, property: AnyRuntimeValue): AnyRuntimeValue {
+	let value;
+	if (object instanceof ObjectValue) {
+		if (!(property instanceof StringValue)) {
+			throw new Error(`Cannot access property with non-string: got ${property.type}`);
+		}
+		value = object.value.get(property.value) ?? object.builtins.get(property.value);
+	} else if (object instanceof ArrayValue || object instanceof StringValue) {
+		if (property instanceof IntegerValue) {
+			value = object.value.at(property.value);
+			if (object instanceof StringValue) {
+				value = new StringValue(object.value.at(property.value));
+			}
+		} else if (property instanceof StringValue) {
+			value = object.builtins.get(property.value);
+		} else {
+			throw new Error(`Cannot access property with non-string/non-number: got ${property.type}`);
+		}
+	} else {
+		if (!(property instanceof StringValue)) {
+			throw new Error(`Cannot access property with non-string: got ${property.type}`);
+		}
+		value = object.builtins.get(property.value);
+	}
+
+	return value instanceof RuntimeValue ? value : new UndefinedValue();
+}
+
 export class Interpreter {
 	global: Environment;
 
@@ -844,108 +1007,8 @@ export class Interpreter {
 				return left.__bool__().value ? left : this.evaluate(node.right, environment);
 		}
 
-		// Equality operators
 		const right = this.evaluate(node.right, environment);
-		switch (node.operator.value) {
-			case "==":
-				return new BooleanValue(left.value == right.value);
-			case "!=":
-				return new BooleanValue(left.value != right.value);
-		}
-
-		if (left instanceof UndefinedValue || right instanceof UndefinedValue) {
-			if (right instanceof UndefinedValue && ["in", "not in"].includes(node.operator.value)) {
-				// Special case: `anything in undefined` is `false` and `anything not in undefined` is `true`
-				return new BooleanValue(node.operator.value === "not in");
-			}
-			throw new Error(`Cannot perform operation ${node.operator.value} on undefined values`);
-		} else if (left instanceof NullValue || right instanceof NullValue) {
-			throw new Error("Cannot perform operation on null values");
-		} else if (node.operator.value === "~") {
-			// toString and concatenation
-			return new StringValue(left.value.toString() + right.value.toString());
-		} else if (
-			(left instanceof IntegerValue || left instanceof FloatValue) &&
-			(right instanceof IntegerValue || right instanceof FloatValue)
-		) {
-			// Evaulate pure numeric operations with binary operators.
-			const a = left.value,
-				b = right.value;
-			switch (node.operator.value) {
-				// Arithmetic operators
-				case "+":
-				case "-":
-				case "*": {
-					const res = node.operator.value === "+" ? a + b : node.operator.value === "-" ? a - b : a * b;
-					const isFloat = left instanceof FloatValue || right instanceof FloatValue;
-					return isFloat ? new FloatValue(res) : new IntegerValue(res);
-				}
-				case "/":
-					return new FloatValue(a / b);
-				case "//": {
-					// Floor division (rounds towards negative infinity, matching Python semantics)
-					const res = Math.floor(a / b);
-					const isFloat = left instanceof FloatValue || right instanceof FloatValue;
-					return isFloat ? new FloatValue(res) : new IntegerValue(res);
-				}
-				case "%": {
-					const rem = a % b;
-					const isFloat = left instanceof FloatValue || right instanceof FloatValue;
-					return isFloat ? new FloatValue(rem) : new IntegerValue(rem);
-				}
-				// Comparison operators
-				case "<":
-					return new BooleanValue(a < b);
-				case ">":
-					return new BooleanValue(a > b);
-				case ">=":
-					return new BooleanValue(a >= b);
-				case "<=":
-					return new BooleanValue(a <= b);
-			}
-		} else if (left instanceof ArrayValue && right instanceof ArrayValue) {
-			// Evaluate array operands with binary operator.
-			switch (node.operator.value) {
-				case "+":
-					return new ArrayValue(left.value.concat(right.value));
-			}
-		} else if (right instanceof ArrayValue) {
-			const member = right.value.find((x) => x.value === left.value) !== undefined;
-			switch (node.operator.value) {
-				case "in":
-					return new BooleanValue(member);
-				case "not in":
-					return new BooleanValue(!member);
-			}
-		}
-
-		if (left instanceof StringValue || right instanceof StringValue) {
-			// Support string concatenation as long as at least one operand is a string
-			switch (node.operator.value) {
-				case "+":
-					return new StringValue(left.value.toString() + right.value.toString());
-			}
-		}
-
-		if (left instanceof StringValue && right instanceof StringValue) {
-			switch (node.operator.value) {
-				case "in":
-					return new BooleanValue(right.value.includes(left.value));
-				case "not in":
-					return new BooleanValue(!right.value.includes(left.value));
-			}
-		}
-
-		if (left instanceof StringValue && right instanceof ObjectValue) {
-			switch (node.operator.value) {
-				case "in":
-					return new BooleanValue(right.value.has(left.value));
-				case "not in":
-					return new BooleanValue(!right.value.has(left.value));
-			}
-		}
-
-		throw new SyntaxError(`Unknown operator "${node.operator.value}" between ${left.type} and ${right.type}`);
+		return applyBinaryOperator(node.operator.value, left, right);
 	}
 
 	private evaluateArguments(
@@ -1435,23 +1498,7 @@ export class Interpreter {
 	 */
 	private evaluateUnaryExpression(node: UnaryExpression, environment: Environment): AnyRuntimeValue {
 		const argument = this.evaluate(node.argument, environment);
-
-		switch (node.operator.value) {
-			case "not":
-				return new BooleanValue(!argument.value);
-			case "+":
-			case "-": {
-				const sign = node.operator.value === "-" ? -1 : 1;
-				if (argument instanceof IntegerValue || argument instanceof FloatValue || argument instanceof BooleanValue) {
-					const value = argument instanceof BooleanValue ? (argument.value ? 1 : 0) : argument.value;
-					const result = sign * value;
-					return argument instanceof FloatValue ? new FloatValue(result) : new IntegerValue(result);
-				}
-				throw new SyntaxError(`Unknown operator "${node.operator.value}" for ${argument.type}`);
-			}
-			default:
-				throw new SyntaxError(`Unknown operator: ${node.operator.value}`);
-		}
+		return applyUnaryOperator(node.operator.value, argument);
 	}
 
 	private evaluateTernaryExpression(node: Ternary, environment: Environment): AnyRuntimeValue {
@@ -1548,31 +1595,7 @@ export class Interpreter {
 			property = new StringValue((expr.property as Identifier).value);
 		}
 
-		let value;
-		if (object instanceof ObjectValue) {
-			if (!(property instanceof StringValue)) {
-				throw new Error(`Cannot access property with non-string: got ${property.type}`);
-			}
-			value = object.value.get(property.value) ?? object.builtins.get(property.value);
-		} else if (object instanceof ArrayValue || object instanceof StringValue) {
-			if (property instanceof IntegerValue) {
-				value = object.value.at(property.value);
-				if (object instanceof StringValue) {
-					value = new StringValue(object.value.at(property.value));
-				}
-			} else if (property instanceof StringValue) {
-				value = object.builtins.get(property.value);
-			} else {
-				throw new Error(`Cannot access property with non-string/non-number: got ${property.type}`);
-			}
-		} else {
-			if (!(property instanceof StringValue)) {
-				throw new Error(`Cannot access property with non-string: got ${property.type}`);
-			}
-			value = object.builtins.get(property.value);
-		}
-
-		return value instanceof RuntimeValue ? value : new UndefinedValue();
+		return getMemberValue(object, property);
 	}
 
 	private evaluateSet(node: SetStatement, environment: Environment): NullValue {
@@ -0,0 +1,86 @@
+import { describe, expect, it } from "vitest";
+
+import { Template } from "../src/index";
+import { OLLAMA_CHAT_TEMPLATE_MAPPING } from "../../ollama-utils/src/chat-template-automap";
+
+const CONTEXT = {
+	messages: [
+		{ role: "system", content: "You are a helpful assistant." },
+		{ role: "user", content: "What's the weather like in Paris?" },
+		{
+			role: "assistant",
+			content: "",
+			tool_calls: [{ type: "function", function: { name: "get_weather", arguments: { city: "Paris" } } }],
+		},
+		{ role: "tool", name: "get_weather", content: '{"temperature": 18}' },
+		{ role: "assistant", content: "It's 18°C in Paris." },
+		{ role: "user", content: "Thanks!" },
+	],
+	tools: [
+		{
+			type: "function",
+			function: {
+				name: "get_weather",
+				description: "Get the weather in a city",
+				parameters: { type: "object", properties: { city: { type: "string" } }, required: ["city"] },
+			},
+		},
+	],
+	add_generation_prompt: true,
+	bos_token: "<s>",
+	eos_token: "</s>",
+};
+
+function render(template, context = CONTEXT) {
+	try {
+		return template.render(context);
+	} catch (error) {
+		return error;
+	}
+}
+
+describe("Compiled templates", () => {
+	describe("should render real-world chat templates like the interpreter", () => {
+		for (const { model, gguf } of OLLAMA_CHAT_TEMPLATE_MAPPING) {
+			let template;
+			try {
+				template = new Template(gguf);
+			} catch {
+				// Not supported by the parser
+				continue;
+			}
+			it(model, () => {
+				const expected = render(template);
+				expect(render(new Template(gguf).compile())).toEqual(expected);
+				// Rendering twice shouldn't leak state between renders
+				expect(render(Template.fromCache(gguf))).toEqual(expected);
+				expect(render(Template.fromCache(gguf))).toEqual(expected);
+			});
+		}
+	});
+
+	it("should reject user-defined variables that shadow globals like the interpreter", () => {
+		const source = `{{ messages | length }}`;
+		for (const key of ["true", "None", "namespace", "range", "raise_exception", "strftime_now"]) {
+			const context = { ...CONTEXT, [key]: 1 };
+			const expected = render(new Template(source), context);
+			expect(expected).toEqual(new SyntaxError(`Variable already declared: ${key}`));
+			expect(render(new Template(source).compile(), context)).toEqual(expected);
+		}
+	});
+
+	it("should keep the variables of separate renders apart", () => {
+		const template = new Template(`{% if x is defined %}{{ x }}{% else %}none{% endif %}{% set x = 1 %}`, {
+			compile: true,
+		});
+		expect(template.render({ x: 2 })).toEqual("2");
+		expect(template.render()).toEqual("none");
+	});
+
+	it("should reuse cached templates", () => {
+		const source = `{{ messages | length }}`;
+		const template = Template.fromCache(source);
+		expect(Template.fromCache(source)).toBe(template);
+		expect(template.render(CONTEXT)).toEqual("6");
+	});
+});
@@ -0,0 +1,92 @@
+import { describe, expect, it } from "vitest";
+
+import { IncrementalRenderer, Template } from "../src/index";
+import { OLLAMA_CHAT_TEMPLATE_MAPPING } from "../../ollama-utils/src/chat-template-automap";
+
+const MESSAGES = [
+	{ role: "system", content: "You are a helpful assistant." },
+	{ role: "user", content: "Hello!" },
+	{ role: "assistant", content: "Hi, how can I help?" },
+	{ role: "user", content: "What's 2 + 2?" },
+	{ role: "assistant", content: "4" },
+	{ role: "user", content: "And 3 + 3?" },
+	{ role: "assistant", content: "6" },
+	{ role: "user", content: "Thanks!" },
+];
+
+function render(renderer, items) {
+	try {
+		return renderer.render(items);
+	} catch (error) {
+		return error;
+	}
+}
+
+/**
+ * Renders the conversation as it grows, and checks that each incremental render matches a full render
+ */
+function renderConversation(source) {
+	const template = new Template(source);
+	const renderer = new IncrementalRenderer(template);
+	const reusedItems = [];
+	for (let length = 1; length <= MESSAGES.length; length++) {
+		const items = { messages: MESSAGES.slice(0, length), add_generation_prompt: true, bos_token: "<s>", eos_token: "</s>" };
+		expect(render(renderer, items)).toEqual(render(template, items));
+		reusedItems.push(renderer.reusedItems);
+	}
+	return reusedItems;
+}
+
+describe("IncrementalRenderer", () => {
+	it("should only render the new messages", () => {
+		const reusedItems = renderConversation(
+			`{{ bos_token }}{% for message in messages %}<|{{ message.role }}|>{{ message.content }}{% if not loop.last %}\n{% endif %}{% endfor %}{% if add_generation_prompt %}<|assistant|>{% endif %}`,
+		);
+		expect(reusedItems).toEqual([0, 0, 1, 2, 3, 4, 5, 6]);
+	});
+
+	it("should restore the variables set by the loop", () => {
+		const reusedItems = renderConversation(
+			`{% set ns = namespace(turns=0) %}{% for message in messages %}{% if message.role == 'user' %}{% set ns.turns = ns.turns + 1 %}{% endif %}[{{ ns.turns }}] {{ message.content }}\n{% endfor %}{{ ns.turns }} turns`,
+		);
+		expect(reusedItems).toEqual([0, 0, 1, 2, 3, 4, 5, 6]);
+	});
+
+	it("should render fully when the loop body reads the next messages", () => {
+		for (const source of [
+			`{% for message in messages %}{{ message.content }} ({{ loop.index }}/{{ loop.length }}){% endfor %}`,
+			`{% for message in messages %}{{ message.content }}{% if messages|length > 3 %}!{% endif %}{% endfor %}`,
+			`{% set loop_messages = messages[1:] %}{% for message in loop_messages %}{{ message.content }}{% if loop_messages[loop.index0 + 1] is defined %}, {% endif %}{% endfor %}`,
+			`{% for message in messages %}{% set message.seen = true %}{{ message.content }}{% endfor %}`,
+		]) {
+			expect(renderConversation(source).every((reused) => reused === 0)).toBe(true);
+		}
+	});
+
+	it("should render fully when a previous message changed", () => {
+		const template = new Template(`{% for message in messages %}{{ message.content }};{% endfor %}`);
+		const renderer = new IncrementalRenderer(template);
+		renderer.render({ messages: MESSAGES.slice(0, 4) });
+
+		const edited = [...MESSAGES.slice(0, 5)];
+		edited[1] = { role: "user", content: "Hey!" };
+		expect(renderer.render({ messages: edited })).toEqual(template.render({ messages: edited }));
+		expect(renderer.reusedItems).toEqual(0);
+	});
+
+	it("should render real-world chat templates like a full render", () => {
+		let incremental = 0;
+		for (const { gguf } of OLLAMA_CHAT_TEMPLATE_MAPPING) {
+			try {
+				new Template(gguf);
+			} catch {
+				// Not supported by the parser
+				continue;
+			}
+			if (renderConversation(gguf).some((reused) => reused > 0)) {
+				incremental++;
+			}
+		}
+		expect(incremental).toBeGreaterThan(0);
+	});
+});
@@ -0,0 +1,42 @@
+import { bench, describe } from "vitest";
+
+import { Template } from "../src/index";
+import { OLLAMA_CHAT_TEMPLATE_MAPPING } from "../../ollama-utils/src/chat-template-automap";
+
+/**
+ * Compares rendering the real-world chat templates with the interpreter and compiled.
+ *
+ * Usage: pnpm --filter jinja bench
+ */
+
+const messages = [{ role: "system", content: "You are a helpful assistant." }];
+for (let i = 0; i < 20; i++) {
+	messages.push({ role: "user", content: `Question ${i}: what's ${i} + ${i}?` });
+	messages.push({ role: "assistant", content: `${i} + ${i} = ${2 * i}` });
+}
+const context = { messages, add_generation_prompt: true, bos_token: "<s>", eos_token: "</s>" };
+
+const templates = [];
+for (const { gguf } of OLLAMA_CHAT_TEMPLATE_MAPPING) {
+	try {
+		const interpreted = new Template(gguf);
+		interpreted.render(context);
+		templates.push({ interpreted, compiled: new Template(gguf).compile() });
+	} catch {
+		// Skip the templates that can't be parsed or rendered with this context
+	}
+}
+
+describe(`render ${templates.length} chat templates`, () => {
+	bench("interpreted", () => {
+		for (const { interpreted } of templates) {
+			interpreted.render(context);
+		}
+	});
+
+	bench("compiled", () => {
+		for (const { compiled } of templates) {
+			compiled.render(context);
+		}
+	});
+});
@@ -5603,6 +5603,26 @@ describe("Templates", () => {
 			}
 		});
 	});
+
+	describe("Compilation", () => {
+		describe("compiling shouldn't change output", () => {
+			for (const [name, text] of Object.entries(TEST_STRINGS)) {
+				it(`compiling ${name}`, () => {
+					const context = TEST_CONTEXT[name];
+
+					const render = (template) => {
+						try {
+							return template.render(context);
+						} catch (error) {
+							return error;
+						}
+					};
+
+					expect(render(new Template(text, { compile: true }))).toEqual(render(new Template(text)));
+				});
+			}
+		});
+	});
 });
 
 describe("Error checking", () => {
@@ -1,5 +1,5 @@
 import type { InferenceProviderOrPolicy } from "@huggingface/inference";
-import type { ChatCompletionInputMessageTool } from "./McpClient";
+import type { ChatCompletionInputMessageTool, ToolExecutionOptions } from "./McpClient";
 import { McpClient } from "./McpClient";
 import type { ChatCompletionInputMessage, ChatCompletionStreamOutput } from "@huggingface/tasks";
 import type { ChatCompletionInputTool } from "@huggingface/tasks/src/tasks/chat-completion/inference";
@@ -66,6 +66,7 @@ export class Agent extends McpClient {
 		apiKey,
 		servers,
 		prompt,
+		...toolExecutionOptions
 	}: (
 		| {
 				provider: InferenceProviderOrPolicy;
@@ -80,8 +81,12 @@ export class Agent extends McpClient {
 		apiKey?: string;
 		servers: (ServerConfig | StdioServerParameters)[];
 		prompt?: string;
-	}) {
-		super(provider ? { provider, endpointUrl, model, apiKey } : { provider, endpointUrl, model, apiKey });
+	} & ToolExecutionOptions) {
+		super(
+			provider
+				? { provider, endpointUrl, model, apiKey, ...toolExecutionOptions }
+				: { provider, endpointUrl, model, apiKey, ...toolExecutionOptions },
+		);
 		/// ^This shenanigan is just here to please an overzealous TS type-checker.
 		this.servers = servers;
 		this.prompt = prompt ?? DEFAULT_SYSTEM_PROMPT;
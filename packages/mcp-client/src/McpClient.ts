@@ -19,6 +19,25 @@ import { ResultFormatter } from "./ResultFormatter.js";
 
 type ToolName = string;
 
+const DEFAULT_TOOL_CONCURRENCY = 4;
+
+export interface ToolExecutionOptions {
+	/**
+	 * Max number of tool calls running at the same time, across all the turns of this client
+	 *
+	 * @default 4
+	 */
+	toolConcurrency?: number;
+	/**
+	 * Timeout of a tool call, in ms. Defaults to the MCP SDK's request timeout
+	 */
+	toolTimeoutMs?: number;
+	/**
+	 * Timeouts of specific tools, in ms, by tool name. Override `toolTimeoutMs`
+	 */
+	toolTimeoutsMs?: Record<ToolName, number>;
+}
+
 export interface ChatCompletionInputMessageTool extends ChatCompletionInputMessage {
 	role: "tool";
 	tool_call_id: string;
@@ -34,11 +53,20 @@ export class McpClient {
 	private clients: Map<ToolName, Client> = new Map();
 	public readonly availableTools: ChatCompletionInputTool[] = [];
 
+	private readonly toolConcurrency: number;
+	private readonly toolTimeoutMs: number | undefined;
+	private readonly toolTimeoutsMs: Record<ToolName, number>;
+	private runningToolCalls = 0;
+	private readonly queuedToolCalls: Array<() => void> = [];
+
 	constructor({
 		provider,
 		endpointUrl,
 		model,
 		apiKey,
+		toolConcurrency,
+		toolTimeoutMs,
+		toolTimeoutsMs,
 	}: (
 		| {
 				provider: InferenceProviderOrPolicy;
@@ -51,10 +79,13 @@ export class McpClient {
 	) & {
 		model: string;
 		apiKey?: string;
-	}) {
+	} & ToolExecutionOptions) {
 		this.client = endpointUrl ? new InferenceClient(apiKey, { endpointUrl: endpointUrl }) : new InferenceClient(apiKey);
 		this.provider = provider;
 		this.model = model;
+		this.toolConcurrency = toolConcurrency ?? DEFAULT_TOOL_CONCURRENCY;
+		this.toolTimeoutMs = toolTimeoutMs;
+		this.toolTimeoutsMs = toolTimeoutsMs ?? {};
 	}
 
 	async addMcpServers(servers: (ServerConfig | StdioServerParameters)[]): Promise<void> {
@@ -204,47 +235,115 @@ export class McpClient {
 		}
 		messages.push(assistantMessage);
 
-		for (const toolCall of finalToolCallValues) {
-			const toolName = toolCall.function.name ?? "unknown";
-			/// TODO(Fix upstream type so this is always a string)^
-			const toolMessage: ChatCompletionInputMessageTool = {
-				role: "tool",
-				tool_call_id: toolCall.id,
-				content: "",
-				name: toolName,
-			};
-			if (opts.exitLoopTools?.map((t) => t.function.name).includes(toolName)) {
-				messages.push(toolMessage);
-				return yield toolMessage;
-			}
-			let toolArgs: Record<string, unknown> = {};
+		const exitLoopToolNames = opts.exitLoopTools?.map((t) => t.function.name) ?? [];
+		const exitLoopIndex = finalToolCallValues.findIndex((toolCall) =>
+			exitLoopToolNames.includes(toolCall.function.name ?? "unknown"),
+		);
+		/// The tool calls after an exit loop tool are not run
+		const toolCalls = exitLoopIndex === -1 ? finalToolCallValues : finalToolCallValues.slice(0, exitLoopIndex);
+		const toolMessages = toolCalls.map((toolCall) => this.createToolMessage(toolCall));
+
+		/// Run the tool calls concurrently, yield their results as they complete,
+		/// and add them to the history in the order of the tool calls
+		if (toolCalls.length > 0) {
+			const pending = new Map<number, Promise<number>>(
+				toolCalls.map(
+					(toolCall, i) => [i, this.runToolCall(toolCall, toolMessages[i], opts.abortSignal).then(() => i)] as const,
+				),
+			);
+			const completed = new Set<number>();
+			let pushed = 0;
+			const abort = abortPromise(opts.abortSignal);
 			try {
-				toolArgs = toolCall.function.arguments === "" ? {} : JSON.parse(toolCall.function.arguments);
-			} catch (error) {
-				if (error instanceof SyntaxError) {
-					toolMessage.content = `Invalid JSON generated by the model: ${error.message}`;
-					messages.push(toolMessage);
-					yield toolMessage;
-					continue;
-				} else {
-					throw error;
+				while (pending.size > 0) {
+					const i = await Promise.race([...pending.values(), abort.promise]);
+					pending.delete(i);
+					completed.add(i);
+					while (completed.has(pushed)) {
+						messages.push(toolMessages[pushed++]);
+					}
+					yield toolMessages[i];
 				}
+			} finally {
+				abort.dispose();
 			}
+		}
 
-			/// Get the appropriate session for this tool
-			const client = this.clients.get(toolName);
-			if (client) {
-				try {
-					const result = await client.callTool({ name: toolName, arguments: toolArgs, signal: opts.abortSignal });
-					toolMessage.content = ResultFormatter.format(result);
-				} catch (error) {
-					toolMessage.content = `Error: MCP tool call failed with error message: ${error}`;
-				}
-			} else {
-				toolMessage.content = `Error: No session found for tool: ${toolName}`;
-			}
+		if (exitLoopIndex !== -1) {
+			const toolMessage = this.createToolMessage(finalToolCallValues[exitLoopIndex]);
 			messages.push(toolMessage);
-			yield toolMessage;
+			return yield toolMessage;
+		}
+	}
+
+	private createToolMessage(toolCall: ChatCompletionStreamOutputDeltaToolCall): ChatCompletionInputMessageTool {
+		return {
+			role: "tool",
+			tool_call_id: toolCall.id,
+			content: "",
+			name: toolCall.function.name ?? "unknown",
+		};
+	}
+
+	/**
+	 * Runs the tool call, and sets its result or error as the content of the tool message
+	 */
+	private async runToolCall(
+		toolCall: ChatCompletionStreamOutputDeltaToolCall,
+		toolMessage: ChatCompletionInputMessageTool,
+		abortSignal?: AbortSignal,
+	): Promise<void> {
+		const toolName = toolMessage.name ?? "unknown";
+		let toolArgs: Record<string, unknown> = {};
+		try {
+			toolArgs = toolCall.function.arguments === "" ? {} : JSON.parse(toolCall.function.arguments);
+		} catch (error) {
+			if (error instanceof SyntaxError) {
+				toolMessage.content = `Invalid JSON generated by the model: ${error.message}`;
+				return;
+			}
+			throw error;
+		}
+
+		/// Get the appropriate session for this tool
+		const client = this.clients.get(toolName);
+		if (!client) {
+			toolMessage.content = `Error: No session found for tool: ${toolName}`;
+			return;
+		}
+
+		await this.acquireToolCallSlot();
+		try {
+			if (abortSignal?.aborted) {
+				return;
+			}
+			const result = await client.callTool({ name: toolName, arguments: toolArgs }, undefined, {
+				signal: abortSignal,
+				timeout: this.toolTimeoutsMs[toolName] ?? this.toolTimeoutMs,
+			});
+			toolMessage.content = ResultFormatter.format(result);
+		} catch (error) {
+			toolMessage.content = `Error: MCP tool call failed with error message: ${error}`;
+		} finally {
+			this.releaseToolCallSlot();
+		}
+	}
+
+	private async acquireToolCallSlot(): Promise<void> {
+		if (this.runningToolCalls < this.toolConcurrency) {
+			this.runningToolCalls++;
+			return;
+		}
+		await new Promise<void>((resolve) => this.queuedToolCalls.push(resolve));
+	}
+
+	private releaseToolCallSlot(): void {
+		const next = this.queuedToolCalls.shift();
+		if (next) {
+			/// Hand the slot over to the next tool call
+			next();
+		} else {
+			this.runningToolCalls--;
 		}
 	}
 
@@ -257,3 +356,21 @@ export class McpClient {
 		return this.cleanup();
 	}
 }
+
+/**
+ * A promise rejected with an "AbortError" when the signal aborts, to stop waiting for tool calls that don't handle the signal
+ */
+function abortPromise(signal?: AbortSignal): { promise: Promise<never>; dispose: () => void } {
+	let onAbort = () => {};
+	const promise = new Promise<never>((_, reject) => {
+		onAbort = () => reject(new Error("AbortError"));
+	});
+	// Avoid unhandled rejections when nothing waits for it anymore
+	promise.catch(() => {});
+	if (signal?.aborted) {
+		onAbort();
+	} else {
+		signal?.addEventListener("abort", onAbort, { once: true });
+	}
+	return { promise, dispose: () => signal?.removeEventListener("abort", onAbort) };
+}
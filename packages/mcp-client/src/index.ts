@@ -1,4 +1,4 @@
 export * from "./McpClient";
 export * from "./Agent";
-export type { ChatCompletionInputMessageTool } from "./McpClient";
+export type { ChatCompletionInputMessageTool, ToolExecutionOptions } from "./McpClient";
 export type { ServerConfig } from "./types";
@@ -1,4 +1,5 @@
 import { describe, expect, it } from "vitest";
+import type { ChatCompletionInputMessage } from "@huggingface/tasks";
 import { McpClient } from "../src";
 
 if (!process.env.HF_TOKEN) {
@@ -16,3 +17,101 @@ describe("McpClient", () => {
 		expect(client.availableTools.length).toBe(0);
 	});
 });
+
+function toolCallChunk(index: number, name: string, args: string) {
+	return {
+		choices: [
+			{
+				index: 0,
+				delta: {
+					role: "assistant",
+					tool_calls: [{ index, id: `call_${index}`, type: "function", function: { name, arguments: args } }],
+				},
+			},
+		],
+	};
+}
+
+/**
+ * A client whose model calls the given tools, served by fake MCP servers that answer after `delayMs`
+ */
+function clientWithTools(
+	tools: Record<string, number>,
+	opts?: { toolConcurrency?: number; toolTimeoutsMs?: Record<string, number> },
+) {
+	const client = new McpClient({ provider: "together", model: "Qwen/Qwen2.5-72B-Instruct", ...opts });
+	const calls: string[] = [];
+	Object.assign(client, {
+		client: {
+			async *chatCompletionStream() {
+				let index = 0;
+				for (const name of Object.keys(tools)) {
+					yield toolCallChunk(index++, name, "{}");
+				}
+			},
+		},
+	});
+	for (const [name, delayMs] of Object.entries(tools)) {
+		(client as unknown as { clients: Map<string, unknown> }).clients.set(name, {
+			async callTool(_params: unknown, _schema: unknown, options: { timeout?: number }) {
+				calls.push(name);
+				if (options.timeout !== undefined && options.timeout < delayMs) {
+					throw new Error("Request timed out");
+				}
+				await new Promise((resolve) => setTimeout(resolve, delayMs));
+				return { content: [{ type: "text", text: `${name} done` }] };
+			},
+		});
+	}
+	return { client, calls };
+}
+
+describe("McpClient tool calls", () => {
+	it("runs tool calls concurrently, yields them as they complete and stores them in order", async () => {
+		const { client } = clientWithTools({ slow: 200, fast: 10 });
+		const messages: ChatCompletionInputMessage[] = [];
+
+		const start = Date.now();
+		const yielded = [];
+		for await (const item of client.processSingleTurnWithTools(messages)) {
+			if ("role" in item && item.role === "tool") {
+				yielded.push(item.name);
+			}
+		}
+
+		expect(Date.now() - start).toBeLessThan(350);
+		expect(yielded).toEqual(["fast", "slow"]);
+		expect(messages.map((message) => (message.role === "tool" ? message.name : message.role))).toEqual([
+			"assistant",
+			"slow",
+			"fast",
+		]);
+	});
+
+	it("applies per-tool timeouts", async () => {
+		const { client } = clientWithTools({ slow: 200, fast: 10 }, { toolTimeoutsMs: { slow: 50 } });
+		const messages: ChatCompletionInputMessage[] = [];
+		for await (const _ of client.processSingleTurnWithTools(messages)) {
+			// consume
+		}
+		expect(messages[1].content).toContain("Request timed out");
+		expect(messages[2].content).toContain("fast done");
+	});
+
+	it("stops waiting for tool calls on abort", async () => {
+		const { client, calls } = clientWithTools({ a: 5000, b: 5000, c: 5000 }, { toolConcurrency: 2 });
+		const controller = new AbortController();
+		setTimeout(() => controller.abort(), 50);
+
+		const start = Date.now();
+		await expect(async () => {
+			for await (const _ of client.processSingleTurnWithTools([], { abortSignal: controller.signal })) {
+				// consume
+			}
+		}).rejects.toThrow("AbortError");
+		expect(Date.now() - start).toBeLessThan(1000);
+		// The third call waited for a slot, and was not started after the abort
+		await new Promise((resolve) => setTimeout(resolve, 10));
+		expect(calls).toEqual(["a", "b"]);
+	});
+});
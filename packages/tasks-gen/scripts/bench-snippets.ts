@@ -0,0 +1,83 @@
+/*
+ * Times the generation of the full matrix of Inference API snippets fixtures (test cases x providers x languages).
+ *
+ * Compares the per-language calls of generate-snippets-fixtures.ts, that generate every language and keep one,
+ * with one getInferenceSnippetsForProviders call per test case.
+ *
+ * Usage:
+ *
+ * pnpm --filter tasks-gen bench:snippets
+ * pnpm --filter tasks-gen bench:snippets --iterations 50
+ */
+
+import { parseArgs } from "node:util";
+
+import { snippets } from "@huggingface/inference";
+import { inferenceSnippetLanguages } from "@huggingface/tasks";
+
+import { getProviderMapping, TEST_CASES } from "./snippets-test-cases.js";
+
+function generatePerLanguage(): number {
+	let count = 0;
+	for (const { task, model, providers, lora, opts } of TEST_CASES) {
+		for (const language of inferenceSnippetLanguages) {
+			for (const provider of providers) {
+				const generated = snippets.getInferenceSnippets(
+					model,
+					provider,
+					getProviderMapping(model, provider, task, lora),
+					opts,
+				);
+				count += generated.filter((snippet) => snippet.language === language).length;
+			}
+		}
+	}
+	return count;
+}
+
+function generateBatched(): number {
+	let count = 0;
+	for (const { task, model, providers, lora, opts } of TEST_CASES) {
+		const generated = snippets.getInferenceSnippetsForProviders(
+			model,
+			providers.map((provider) => ({
+				provider,
+				inferenceProviderMapping: getProviderMapping(model, provider, task, lora),
+			})),
+			opts,
+		);
+		count += generated.flat().length;
+	}
+	return count;
+}
+
+function measure(label: string, iterations: number, fn: () => number): void {
+	// The first run includes parsing the templates
+	let start = performance.now();
+	const count = fn();
+	const first = performance.now() - start;
+
+	start = performance.now();
+	for (let i = 0; i < iterations; i++) {
+		fn();
+	}
+	const average = (performance.now() - start) / iterations;
+	console.log(
+		`${label.padEnd(14)} first run ${first.toFixed(1).padStart(8)} ms, then ${average.toFixed(1).padStart(8)} ms/run  (${count} snippets)`,
+	);
+}
+
+const { values: args } = parseArgs({
+	options: {
+		iterations: {
+			type: "string",
+			short: "n",
+			default: "20",
+		},
+	},
+});
+const iterations = Number(args.iterations);
+
+console.log(`Generating ${TEST_CASES.length} test cases, ${iterations} iterations`);
+measure("per language", iterations, generatePerLanguage);
+measure("batched", iterations, generateBatched);
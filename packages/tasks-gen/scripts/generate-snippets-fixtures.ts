@@ -24,315 +24,12 @@ import { snippets } from "@huggingface/inference";
 import type { InferenceSnippet, ModelDataMinimal, SnippetInferenceProvider, WidgetType } from "@huggingface/tasks";
 import { inferenceSnippetLanguages } from "@huggingface/tasks";
 
+import { getProviderMapping, TEST_CASES } from "./snippets-test-cases.js";
+
 const LANGUAGES = ["js", "python", "sh"] as const;
 type Language = (typeof LANGUAGES)[number];
 const EXTENSIONS: Record<Language, string> = { sh: "sh", js: "js", python: "py" };
 
-const TEST_CASES: {
-	testName: string;
-	task: WidgetType;
-	model: ModelDataMinimal;
-	providers: InferenceProviderOrPolicy[];
-	lora?: boolean;
-	opts?: snippets.InferenceSnippetOptions;
-}[] = [
-	{
-		testName: "automatic-speech-recognition",
-		task: "automatic-speech-recognition",
-		model: {
-			id: "openai/whisper-large-v3-turbo",
-			pipeline_tag: "automatic-speech-recognition",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "conversational-llm-non-stream",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference", "together", "auto"],
-		opts: { streaming: false },
-	},
-	{
-		testName: "conversational-llm-stream",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference", "together", "auto"],
-		opts: { streaming: true },
-	},
-	{
-		testName: "conversational-vlm-non-stream",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.2-11B-Vision-Instruct",
-			pipeline_tag: "image-text-to-text",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference", "fireworks-ai", "auto"],
-		opts: { streaming: false },
-	},
-	{
-		testName: "conversational-vlm-stream",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.2-11B-Vision-Instruct",
-			pipeline_tag: "image-text-to-text",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference", "fireworks-ai", "auto"],
-		opts: { streaming: true },
-	},
-	{
-		testName: "conversational-llm-custom-endpoint",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-		opts: { endpointUrl: "http://localhost:8080/v1" },
-	},
-	{
-		testName: "document-question-answering",
-		task: "document-question-answering",
-		model: {
-			id: "impira/layoutlm-invoices",
-			pipeline_tag: "document-question-answering",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "image-classification",
-		task: "image-classification",
-		model: {
-			id: "Falconsai/nsfw_image_detection",
-			pipeline_tag: "image-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "image-to-image",
-		task: "image-to-image",
-		model: {
-			id: "black-forest-labs/FLUX.1-Kontext-dev",
-			pipeline_tag: "image-to-image",
-			tags: [],
-			inference: "",
-		},
-		providers: ["fal-ai", "replicate", "hf-inference"],
-	},
-	{
-		testName: "image-to-video",
-		task: "image-to-video",
-		model: {
-			id: "Wan-AI/Wan2.2-I2V-A14B",
-			pipeline_tag: "image-to-video",
-			tags: [],
-			inference: "",
-		},
-		providers: ["fal-ai"],
-	},
-	{
-		testName: "tabular",
-		task: "tabular-classification",
-		model: {
-			id: "templates/tabular-classification",
-			pipeline_tag: "tabular-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "text-to-audio-transformers",
-		task: "text-to-audio",
-		model: {
-			id: "facebook/musicgen-small",
-			pipeline_tag: "text-to-audio",
-			tags: ["transformers"],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "text-to-image",
-		task: "text-to-image",
-		model: {
-			id: "black-forest-labs/FLUX.1-schnell",
-			pipeline_tag: "text-to-image",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference", "fal-ai"],
-	},
-	{
-		testName: "text-to-video",
-		task: "text-to-video",
-		model: {
-			id: "tencent/HunyuanVideo",
-			pipeline_tag: "text-to-video",
-			tags: [],
-			inference: "",
-		},
-		providers: ["replicate", "fal-ai"],
-	},
-	{
-		testName: "text-classification",
-		task: "text-classification",
-		model: {
-			id: "distilbert/distilbert-base-uncased-finetuned-sst-2-english",
-			pipeline_tag: "text-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "basic-snippet--token-classification",
-		task: "token-classification",
-		model: {
-			id: "FacebookAI/xlm-roberta-large-finetuned-conll03-english",
-			pipeline_tag: "token-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "zero-shot-classification",
-		task: "zero-shot-classification",
-		model: {
-			id: "facebook/bart-large-mnli",
-			pipeline_tag: "zero-shot-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "zero-shot-image-classification",
-		task: "zero-shot-image-classification",
-		model: {
-			id: "openai/clip-vit-large-patch14",
-			pipeline_tag: "zero-shot-image-classification",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "text-to-image--lora",
-		task: "text-to-image",
-		model: {
-			id: "openfree/flux-chatgpt-ghibli-lora",
-			pipeline_tag: "text-to-image",
-			tags: ["lora", "base_model:adapter:black-forest-labs/FLUX.1-dev", "base_model:black-forest-labs/FLUX.1-dev"],
-			inference: "",
-		},
-		lora: true,
-		providers: ["fal-ai"],
-	},
-	{
-		testName: "bill-to-param",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-		opts: { billTo: "huggingface" },
-	},
-	{
-		testName: "with-access-token",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-		opts: { accessToken: "hf_xxx" },
-	},
-	{
-		testName: "explicit-direct-request",
-		task: "conversational",
-		model: {
-			id: "meta-llama/Llama-3.1-8B-Instruct",
-			pipeline_tag: "text-generation",
-			tags: ["conversational"],
-			inference: "",
-		},
-		providers: ["together"],
-		opts: { directRequest: true },
-	},
-	{
-		testName: "text-to-speech",
-		task: "text-to-speech",
-		model: {
-			id: "nari-labs/Dia-1.6B",
-			pipeline_tag: "text-to-speech",
-			tags: [],
-			inference: "",
-		},
-		providers: ["fal-ai"],
-	},
-	{
-		testName: "feature-extraction",
-		task: "feature-extraction",
-		model: {
-			id: "intfloat/multilingual-e5-large-instruct",
-			pipeline_tag: "feature-extraction",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "question-answering",
-		task: "question-answering",
-		model: {
-			id: "google-bert/bert-large-uncased-whole-word-masking-finetuned-squad",
-			pipeline_tag: "question-answering",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-	{
-		testName: "table-question-answering",
-		task: "table-question-answering",
-		model: {
-			id: "google-bert/bert-large-uncased-whole-word-masking-finetuned-squad",
-			pipeline_tag: "table-question-answering",
-			tags: [],
-			inference: "",
-		},
-		providers: ["hf-inference"],
-	},
-] as const;
-
 const rootDirFinder = (): string => {
 	let currentPath = path.normalize(import.meta.url).replace("file:", "");
 
@@ -359,24 +56,7 @@ function generateInferenceSnippet(
 	lora: boolean = false,
 	opts?: Record<string, unknown>,
 ): InferenceSnippet[] {
-	const allSnippets = snippets.getInferenceSnippets(
-		model,
-		provider,
-		{
-			provider: provider,
-			hfModelId: model.id,
-			providerId: provider === "hf-inference" ? model.id : `<${provider} alias for ${model.id}>`,
-			status: "live",
-			task,
-			...(lora && task === "text-to-image"
-				? {
-						adapter: "lora",
-						adapterWeightsPath: `<path to LoRA weights in .safetensors format>`,
-					}
-				: {}),
-		},
-		opts,
-	);
+	const allSnippets = snippets.getInferenceSnippets(model, provider, getProviderMapping(model, provider, task, lora), opts);
 	return allSnippets
 		.filter((snippet) => snippet.language == language)
 		.sort((snippetA, snippetB) => snippetA.client.localeCompare(snippetB.client));
@@ -441,6 +121,18 @@ if (import.meta.vitest) {
 						});
 					});
 				});
+				it("batched", () => {
+					const targets = providers.map((provider) => ({
+						provider,
+						inferenceProviderMapping: getProviderMapping(model, provider, task, lora),
+					}));
+					const batchedSnippets = snippets.getInferenceSnippetsForProviders(model, targets, opts);
+					expect(batchedSnippets).toEqual(
+						targets.map(({ provider, inferenceProviderMapping }) =>
+							snippets.getInferenceSnippets(model, provider, inferenceProviderMapping, opts),
+						),
+					);
+				});
 			});
 		});
 	});
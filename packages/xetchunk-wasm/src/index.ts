@@ -1,3 +1,14 @@
-export { createChunker, finalize, nextBlock, getChunks, hashToHex, hexToBytes, type Chunk } from "./xet-chunker.js";
+export {
+	createChunker,
+	finalize,
+	nextBlock,
+	writeBuffer,
+	commit,
+	getChunks,
+	hashToHex,
+	hexToBytes,
+	type Chunk,
+	type ChunkerOptions,
+} from "./xet-chunker.js";
 export { xorbHash } from "./xorb-hash.js";
 export { fileHash, hmac, verificationHash } from "./hash-utils.js";
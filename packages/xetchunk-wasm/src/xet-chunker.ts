@@ -16,20 +16,33 @@ export interface Chunk {
 	length: number;
 }
 
-interface NextResult {
-	chunk: Chunk | null;
-	bytesConsumed: number;
+export interface ChunkerOptions {
+	/**
+	 * Size of the WASM-owned ring buffer data is written to, scanned and hashed in.
+	 * At least twice the maximum chunk size.
+	 *
+	 * @default 4MB
+	 */
+	bufferSize?: number;
 }
 
+const DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024;
+
 class XetChunker {
 	private minimumChunk: number;
 	private maximumChunk: number;
-	private chunkBuf: Uint8Array;
-	private curChunkLen: number;
 	private gear: Hasher;
 	private blake3: Blake3Hasher;
-
-	constructor(targetChunkSize: number = TARGET_CHUNK_SIZE) {
+	/** Ring buffer in the gear hasher's WASM memory */
+	private buffer: Uint8Array;
+	/** Start of the pending chunk in `buffer` */
+	private chunkStart = 0;
+	/** Bytes of the pending chunk before this offset were fed to the gear hash, or skipped */
+	private scanned = 0;
+	/** End of the data written to `buffer` */
+	private end = 0;
+
+	constructor(targetChunkSize: number = TARGET_CHUNK_SIZE, options?: ChunkerOptions) {
 		if (targetChunkSize <= 0) {
 			throw new Error("Target chunk size must be greater than 0");
 		}
@@ -57,152 +70,133 @@ class XetChunker {
 
 		this.minimumChunk = targetChunkSize / MINIMUM_CHUNK_DIVISOR;
 		this.maximumChunk = maximumChunk;
-		this.chunkBuf = new Uint8Array(maximumChunk);
-		this.curChunkLen = 0;
-		this.gear = new Hasher(mask);
+		this.gear = new Hasher(mask, {
+			bufferSize: Math.max(options?.bufferSize ?? DEFAULT_BUFFER_SIZE, 2 * maximumChunk),
+		});
+		this.buffer = this.gear.buffer!;
 		this.blake3 = Blake3Hasher.newKeyed(BLAKE3_DATA_KEY);
 	}
 
 	/**
-	 * Streaming entry point: accepts an arbitrary slice of data, accumulates
-	 * it, and emits a chunk when a boundary (or max size) is reached.
-	 * Data is copied into an internal buffer because it may span calls.
+	 * Free space at the end of the ring buffer, at least the maximum chunk size.
+	 * Write data here then call `commit` with the number of bytes written:
+	 * the data is scanned and hashed where it is, without being copied.
+	 *
+	 * The pending (incomplete) chunk is moved to the start of the buffer when
+	 * space runs out, so views returned by earlier calls must not be reused.
 	 */
-	next(data: Uint8Array, isFinal: boolean): NextResult {
-		const nBytes = data.length;
-		let createChunk = false;
-		let consumeLen = 0;
-
-		if (nBytes !== 0) {
-			if (this.curChunkLen + HASH_WINDOW_SIZE < this.minimumChunk) {
-				const maxAdvance = Math.min(this.minimumChunk - this.curChunkLen - HASH_WINDOW_SIZE - 1, nBytes - consumeLen);
-				consumeLen += maxAdvance;
-				this.curChunkLen += maxAdvance;
-			}
-
-			const readEnd = Math.min(nBytes, consumeLen + this.maximumChunk - this.curChunkLen);
-
-			let bytesToNextBoundary: number;
-			const position = this.gear.nextMatch(data.subarray(consumeLen, readEnd));
-
-			if (position !== -1) {
-				bytesToNextBoundary = position;
-				createChunk = true;
-			} else {
-				bytesToNextBoundary = readEnd - consumeLen;
-			}
-
-			if (bytesToNextBoundary + this.curChunkLen >= this.maximumChunk) {
-				bytesToNextBoundary = this.maximumChunk - this.curChunkLen;
-				createChunk = true;
-			}
-
-			this.curChunkLen += bytesToNextBoundary;
-			consumeLen += bytesToNextBoundary;
-
-			this.chunkBuf.set(data.subarray(0, consumeLen), this.curChunkLen - consumeLen);
+	writeBuffer(): Uint8Array {
+		if (this.buffer.length - this.end < this.maximumChunk) {
+			this.buffer.copyWithin(0, this.chunkStart, this.end);
+			this.end -= this.chunkStart;
+			this.scanned -= this.chunkStart;
+			this.chunkStart = 0;
 		}
+		return this.buffer.subarray(this.end);
+	}
 
-		if (createChunk || (isFinal && this.curChunkLen > 0)) {
-			const chunkData = this.chunkBuf.subarray(0, this.curChunkLen);
-			const hash = this.blake3.reset().update(chunkData).finalize(32);
-			const chunk: Chunk = {
-				length: chunkData.length,
-				hash: hash,
-			};
-			this.curChunkLen = 0;
-			this.gear.resetHash();
-			return {
-				chunk,
-				bytesConsumed: consumeLen,
-			};
+	/**
+	 * Processes `length` bytes written to `writeBuffer()`, returning the
+	 * chunks they complete.
+	 */
+	commit(length: number, isFinal: boolean): Chunk[] {
+		if (length < 0 || this.end + length > this.buffer.length) {
+			throw new RangeError(`Cannot commit ${length} bytes, only ${this.buffer.length - this.end} bytes are writable`);
 		}
+		this.end += length;
 
-		return {
-			chunk: null,
-			bytesConsumed: consumeLen,
-		};
+		const chunks: Chunk[] = [];
+		for (let chunk = this.nextChunk(); chunk; chunk = this.nextChunk()) {
+			chunks.push(chunk);
+		}
+		if (isFinal) {
+			const last = this.finish();
+			if (last) chunks.push(last);
+		}
+		return chunks;
 	}
 
 	/**
-	 * Batch entry point: processes a large contiguous buffer and returns all
-	 * complete chunks. Hashes directly from `data` — no intermediate copy
-	 * to chunkBuf — for every chunk whose bytes are fully within `data`.
+	 * Batch entry point: processes a buffer of any size and returns all
+	 * complete chunks. The data is copied once, into the ring buffer.
 	 */
 	nextBlock(data: Uint8Array, isFinal: boolean): Chunk[] {
 		const chunks: Chunk[] = [];
 		let pos = 0;
 
-		// Drain any leftover from a previous nextBlock / next call.
-		while (pos < data.length && this.curChunkLen > 0) {
-			const result = this.next(data.subarray(pos), false);
-			if (result.chunk) chunks.push(result.chunk);
-			pos += result.bytesConsumed;
-		}
-
-		const minSkip = this.minimumChunk > HASH_WINDOW_SIZE
-			? this.minimumChunk - HASH_WINDOW_SIZE - 1
-			: 0;
-
 		while (pos < data.length) {
-			const chunkStart = pos;
-			const scanStart = Math.min(pos + minSkip, data.length);
-			const scanEnd = Math.min(data.length, pos + this.maximumChunk);
-
-			const position = this.gear.nextMatch(data.subarray(scanStart, scanEnd));
-
-			let chunkEnd: number;
-			let foundBoundary: boolean;
-
-			if (position !== -1 && scanStart + position - chunkStart <= this.maximumChunk) {
-				chunkEnd = scanStart + position;
-				foundBoundary = true;
-			} else if (scanEnd - chunkStart >= this.maximumChunk) {
-				chunkEnd = chunkStart + this.maximumChunk;
-				foundBoundary = true;
-			} else {
-				foundBoundary = false;
-				chunkEnd = scanEnd;
+			const target = this.writeBuffer();
+			const length = Math.min(target.length, data.length - pos);
+			target.set(data.subarray(pos, pos + length));
+			pos += length;
+			for (const chunk of this.commit(length, false)) {
+				chunks.push(chunk);
 			}
+		}
 
-			if (foundBoundary) {
-				const hash = this.blake3.reset()
-					.update(data.subarray(chunkStart, chunkEnd))
-					.finalize(32);
-				chunks.push({ length: chunkEnd - chunkStart, hash });
-				pos = chunkEnd;
-				this.gear.resetHash();
-			} else if (isFinal) {
-				const hash = this.blake3.reset()
-					.update(data.subarray(chunkStart))
-					.finalize(32);
-				chunks.push({ length: data.length - chunkStart, hash });
-				pos = data.length;
-			} else {
-				this.chunkBuf.set(data.subarray(chunkStart), 0);
-				this.curChunkLen = data.length - chunkStart;
-				pos = data.length;
-			}
+		if (isFinal) {
+			const last = this.finish();
+			if (last) chunks.push(last);
 		}
 
 		return chunks;
 	}
 
 	finish(): Chunk | null {
-		if (this.curChunkLen > 0) {
-			const chunkData = this.chunkBuf.subarray(0, this.curChunkLen);
-			const hash = this.blake3.reset().update(chunkData).finalize(32);
-			const chunk: Chunk = { length: this.curChunkLen, hash };
-			this.curChunkLen = 0;
-			this.gear.resetHash();
-			return chunk;
+		if (this.end > this.chunkStart) {
+			return this.emitChunk(this.end);
 		}
 		return null;
 	}
+
+	/**
+	 * Scans the pending data for the end of the current chunk, skipping the
+	 * bytes that can't be a boundary because of the minimum chunk size.
+	 */
+	private nextChunk(): Chunk | null {
+		const minSkip = this.minimumChunk > HASH_WINDOW_SIZE ? this.minimumChunk - HASH_WINDOW_SIZE - 1 : 0;
+		this.scanned = Math.max(this.scanned, Math.min(this.chunkStart + minSkip, this.end));
+		const scanEnd = Math.min(this.end, this.chunkStart + this.maximumChunk);
+
+		if (this.scanned < scanEnd) {
+			const position = this.gear.nextMatch(this.buffer.subarray(this.scanned, scanEnd));
+			if (position !== -1) {
+				return this.emitChunk(this.scanned + position);
+			}
+			this.scanned = scanEnd;
+		}
+
+		if (this.scanned - this.chunkStart >= this.maximumChunk) {
+			return this.emitChunk(this.chunkStart + this.maximumChunk);
+		}
+		return null;
+	}
+
+	/** Hashes the pending chunk up to `chunkEnd` in place, and starts the next one */
+	private emitChunk(chunkEnd: number): Chunk {
+		const hash = this.blake3.reset().update(this.buffer.subarray(this.chunkStart, chunkEnd)).finalize(32);
+		const chunk: Chunk = { length: chunkEnd - this.chunkStart, hash };
+		this.chunkStart = chunkEnd;
+		this.scanned = chunkEnd;
+		this.gear.resetHash();
+		return chunk;
+	}
+}
+
+export function createChunker(targetChunkSize: number = TARGET_CHUNK_SIZE, options?: ChunkerOptions): XetChunker {
+	return new XetChunker(targetChunkSize, options);
+}
+
+/**
+ * Zero-copy input: returns the chunker's WASM-owned buffer to write the next
+ * bytes to, then call `commit(chunker, bytesWritten)`.
+ */
+export function writeBuffer(chunker: XetChunker): Uint8Array {
+	return chunker.writeBuffer();
 }
 
-export function createChunker(targetChunkSize: number = TARGET_CHUNK_SIZE): XetChunker {
-	return new XetChunker(targetChunkSize);
+export function commit(chunker: XetChunker, length: number): Chunk[] {
+	return chunker.commit(length, false);
 }
 
 export function nextBlock(chunker: XetChunker, data: Uint8Array): Chunk[] {
@@ -1,4 +1,4 @@
-import { Hasher } from "@huggingface/blake3-jit";
+import { hashMany } from "@huggingface/blake3-jit";
 import type { Chunk } from "./xet-chunker.js";
 import { hashToHex } from "./xet-chunker.js";
 
@@ -11,8 +11,6 @@ const BLAKE3_NODE_KEY = new Uint8Array([
 
 const INDEX_OF_LAST_BYTE_OF_LAST_U64_IN_CHUNK_HASH = 3 * 8;
 
-const nodeHasher = Hasher.newKeyed(BLAKE3_NODE_KEY);
-
 export function xorbHash(chunks: Chunk[]): Uint8Array {
 	if (chunks.length === 0) {
 		return new Uint8Array(32);
@@ -21,7 +19,9 @@ export function xorbHash(chunks: Chunk[]): Uint8Array {
 	let currentChunks = chunks;
 
 	while (currentChunks.length > 1) {
-		const nodes: Chunk[] = [];
+		// Serialize every node of the level first, then hash them all at once across the SIMD lanes
+		const nodes: Uint8Array[] = [];
+		const lengths: number[] = [];
 		let currentIndex = 0;
 		let numOfChildrenSoFar = 0;
 
@@ -32,34 +32,35 @@ export function xorbHash(chunks: Chunk[]): Uint8Array {
 				(numOfChildrenSoFar >= 2 &&
 					currentChunks[i].hash[INDEX_OF_LAST_BYTE_OF_LAST_U64_IN_CHUNK_HASH] % MEAN_CHUNK_PER_NODE === 0)
 			) {
-				nodes.push(mergedHashOfSequence(currentChunks.slice(currentIndex, i + 1)));
+				const children = currentChunks.slice(currentIndex, i + 1);
+				nodes.push(serializeSequence(children));
+				lengths.push(children.reduce((total, chunk) => total + chunk.length, 0));
 				currentIndex = i + 1;
 				numOfChildrenSoFar = 0;
 			} else {
 				numOfChildrenSoFar++;
 			}
 		}
-		currentChunks = nodes;
+
+		const hashes = hashMany(nodes, BLAKE3_NODE_KEY, new Uint8Array(nodes.length * 32));
+		currentChunks = lengths.map((length, i) => ({ hash: hashes.subarray(i * 32, i * 32 + 32), length }));
 	}
 
 	return currentChunks[0].hash;
 }
 
 /**
- * Matches Rust's `merged_hash_of_sequence`: serializes each entry as
- * "{hash_hex} : {length_decimal}\n" then hashes with BLAKE3_NODE_KEY.
+ * Matches Rust's `merged_hash_of_sequence` input: serializes each entry as
+ * "{hash_hex} : {length_decimal}\n", to be hashed with BLAKE3_NODE_KEY.
  */
-function mergedHashOfSequence(chunks: Chunk[]): Chunk {
+function serializeSequence(chunks: Chunk[]): Uint8Array {
 	let text = "";
-	let totalLength = 0;
 	for (const chunk of chunks) {
 		text += hashToHex(chunk.hash) + " : " + chunk.length + "\n";
-		totalLength += chunk.length;
 	}
 	const bytes = new Uint8Array(text.length);
 	for (let i = 0; i < text.length; i++) {
 		bytes[i] = text.charCodeAt(i);
 	}
-	const hash = nodeHasher.reset().update(bytes).finalize(32);
-	return { hash, length: totalLength };
+	return bytes;
 }
@@ -1,5 +1,5 @@
 import { parseArgs } from "node:util";
-import { createChunker, finalize, nextBlock, hashToHex } from "../dist/esm/index.js";
+import { createChunker, finalize, nextBlock, writeBuffer, commit, hashToHex } from "../dist/esm/index.js";
 import { createReadStream } from "node:fs";
 import { Chunker } from "../vendor/chunker_wasm.js";
 
@@ -65,6 +65,29 @@ function runJS() {
 	return chunks;
 }
 
+// Writes the data straight into the chunker's WASM buffer, as a file reader would
+function runZeroCopy() {
+	const chunker = createChunker(64 * 1024);
+	const chunks = [];
+
+	for (let i = 0; i < data.length; ) {
+		const buffer = writeBuffer(chunker);
+		const length = Math.min(buffer.length, CHUNK_SIZE, data.length - i);
+		buffer.set(data.subarray(i, i + length));
+		i += length;
+		for (const c of commit(chunker, length)) {
+			chunks.push({ hash: hashToHex(c.hash), length: c.length });
+		}
+	}
+
+	const lastChunk = finalize(chunker);
+	if (lastChunk) {
+		chunks.push({ hash: hashToHex(lastChunk.hash), length: lastChunk.length });
+	}
+
+	return chunks;
+}
+
 function runRust() {
 	const chunker = new Chunker(64 * 1024);
 	const chunks = [];
@@ -87,6 +110,15 @@ function runRust() {
 console.log("Verifying chunk boundaries match...");
 const jsChunks = runJS();
 const rustChunks = runRust();
+const zeroCopyChunks = runZeroCopy();
+
+if (
+	zeroCopyChunks.length !== jsChunks.length ||
+	zeroCopyChunks.some((c, i) => c.hash !== jsChunks[i].hash || c.length !== jsChunks[i].length)
+) {
+	console.error("MISMATCH: writeBuffer/commit chunks differ from nextBlock chunks");
+	process.exit(1);
+}
 
 if (jsChunks.length !== rustChunks.length) {
 	console.error(`MISMATCH: JS produced ${jsChunks.length} chunks, Rust produced ${rustChunks.length}`);
@@ -131,6 +163,7 @@ function bench(label, fn) {
 }
 
 const jsMbps = bench(`JS   (gearhash-jit + blake3-jit, ${ROUNDS} rounds)`, runJS);
+bench(`JS   (writeBuffer + commit,      ${ROUNDS} rounds)`, runZeroCopy);
 const rsMbps = bench(`Rust (thin-wasm,                ${ROUNDS} rounds)`, runRust);
 
 console.log(`\nJS: ${jsMbps.toFixed(1)} MB/s | Rust: ${rsMbps.toFixed(1)} MB/s | ratio: ${((jsMbps / rsMbps) * 100).toFixed(1)}%`);
@@ -1,5 +1,18 @@
 import { describe, it, expect } from "vitest";
-import { createChunker, finalize, nextBlock, getChunks, hashToHex, hexToBytes, xorbHash, fileHash, hmac, verificationHash } from "../src/index.js";
+import {
+	createChunker,
+	finalize,
+	nextBlock,
+	writeBuffer,
+	commit,
+	getChunks,
+	hashToHex,
+	hexToBytes,
+	xorbHash,
+	fileHash,
+	hmac,
+	verificationHash,
+} from "../src/index.js";
 import type { Chunk } from "../src/index.js";
 import { createRandomArray } from "@huggingface/splitmix64-wasm";
 
@@ -450,6 +463,31 @@ describe("xetchunk-wasm", () => {
 				expect(finalChunk.hash instanceof Uint8Array).toBe(true);
 			}
 		});
+
+		it("should give the same chunks when writing straight to the chunker's buffer", () => {
+			const data = new Uint8Array(createRandomArray(1000000, 0n));
+			const expected = getChunks(data).map((chunk) => ({ length: chunk.length, hash: hashToHex(chunk.hash) }));
+
+			// Smallest ring buffer, so the pending chunk gets moved back to its start many times
+			const chunker = createChunker(64 * 1024, { bufferSize: 0 });
+			const chunks: Chunk[] = [];
+			let offset = 0;
+			for (let i = 0; offset < data.length; i++) {
+				const buffer = writeBuffer(chunker);
+				expect(buffer.length).toBeGreaterThanOrEqual(128 * 1024);
+				const length = Math.min((i * 7919) % buffer.length, data.length - offset);
+				buffer.set(data.subarray(offset, offset + length));
+				offset += length;
+				chunks.push(...commit(chunker, length));
+			}
+			const lastChunk = finalize(chunker);
+			if (lastChunk) {
+				chunks.push(lastChunk);
+			}
+
+			expect(chunks.map((chunk) => ({ length: chunk.length, hash: hashToHex(chunk.hash) }))).toEqual(expected);
+			expect(() => commit(chunker, writeBuffer(chunker).length + 1)).toThrow(RangeError);
+		});
 	});
 
 	describe("Hash functions (verified against Rust thin-wasm)", () => {